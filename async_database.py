@@ -0,0 +1,295 @@
+"""
+非同期データベースアクセス
+
+全ハンドラーで共有する database オブジェクトの非同期版です（SQLite / aiosqlite）。
+読み込みは上限つきの接続プールから接続を借りて実行し、書き込みは write-behind で
+N ミリ秒ごと、または M 件たまるごとに1つのトランザクションにまとめてコミットします。
+SQL は prepare() で名前をつけて登録しておくと、接続ごとのステートメントキャッシュで
+再利用されます。
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import aiosqlite
+    AIOSQLITE_AVAILABLE = True
+except ImportError:
+    AIOSQLITE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Write:
+    """コミット待ちの書き込み"""
+    sql: str
+    params: Sequence[Any]
+    future: Optional[asyncio.Future]
+
+
+class AsyncDatabase:
+    """接続プールと書き込みのまとめ処理つきの非同期データベース
+
+    使い方:
+        database = AsyncDatabase('bot.db', pool_size=4, batch_interval=50, batch_size=500)
+        database.prepare('get_user', 'SELECT * FROM users WHERE id = ?')
+        database.prepare('add_point', 'UPDATE users SET point = point + ? WHERE id = ?')
+        await database.open()
+
+        row = await database.fetchone('get_user', (user_id,))
+        await database.write('add_point', (1, user_id))              # コミットを待たない
+        await database.write('add_point', (1, user_id), wait=True)   # コミットまで待つ
+        await database.close()   # 未コミットの書き込みを書き出してから閉じる
+
+    handle() の中では、write() でコミットを待たずに次の note の処理へ進めます。
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, batch_interval: float = 50,
+                 batch_size: int = 500, timeout: float = 30.0, cached_statements: int = 256):
+        """データベースの初期化
+
+        Args:
+            path: SQLite のファイルパス
+            pool_size: 読み込み用の接続数の上限
+            batch_interval: 書き込みをまとめてコミットする間隔（ミリ秒）
+            batch_size: この件数たまったら間隔を待たずにコミットする
+            timeout: ロックを待つ時間の上限（秒）
+            cached_statements: 接続ごとにキャッシュするプリペアドステートメントの数
+        """
+        if not AIOSQLITE_AVAILABLE:
+            raise ImportError("aiosqlite がインストールされていません: pip install aiosqlite")
+        if pool_size < 1 or batch_size < 1:
+            raise ValueError("pool_size と batch_size は1以上を指定してください")
+        self.path = path
+        self.pool_size = pool_size
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+
+        self._statements: Dict[str, str] = {}
+        self._pool: Optional[asyncio.Queue] = None
+        self._connections: List[Any] = []
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._writer = None
+        self._pending: List[_Write] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Condition] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._committing = False   # まとめた書き込みをコミット中か
+        self._flushing = False     # flush() が待っているか
+        self.stats = {'reads': 0, 'writes': 0, 'batches': 0, 'failed_writes': 0}
+
+    def prepare(self, name: str, sql: str):
+        """SQL に名前をつけて登録する
+
+        登録した名前は fetchone() などの SQL の代わりに指定できます。同じ文字列の SQL を
+        使い回すため、接続ごとのステートメントキャッシュでコンパイル済みの文が再利用されます。
+
+        Args:
+            name: 文の名前
+            sql: SQL 文（? または :name のプレースホルダーを使う）
+        """
+        self._statements[name] = sql
+
+    def _sql(self, statement: str) -> str:
+        return self._statements.get(statement, statement)
+
+    async def _connect(self):
+        # トランザクションは BEGIN で明示的に始める
+        connection = await aiosqlite.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                             cached_statements=self.cached_statements)
+        connection.row_factory = sqlite3.Row
+        await connection.execute('PRAGMA journal_mode=WAL')
+        await connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    async def open(self):
+        """書き込み用の接続を開き、書き込みのまとめ処理を起動する（読み込み用の接続は必要に応じて開く）"""
+        if self._writer_task is not None:
+            return
+        self._pool = asyncio.Queue()
+        self._pool_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._writer = await self._connect()
+        self._writer_task = asyncio.create_task(self._write_loop(), name='database-writer')
+
+    @asynccontextmanager
+    async def connection(self):
+        """読み込み用の接続をプールから借りる
+
+        プールの接続がすべて使用中で上限に達している場合は、返却されるまで待ちます。
+        """
+        if self._pool is None:
+            raise RuntimeError("open() を呼び出してから使用してください")
+        if self._pool.empty():
+            async with self._pool_lock:
+                if self._pool.empty() and len(self._connections) < self.pool_size:
+                    connection = await self._connect()
+                    self._connections.append(connection)
+                    self._pool.put_nowait(connection)
+        connection = await self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put_nowait(connection)
+
+    async def fetchone(self, statement: str, params: Sequence[Any] = ()):
+        """1行を取得する
+
+        Args:
+            statement: prepare() で登録した名前、または SQL 文
+            params: プレースホルダーの値
+
+        Returns:
+            sqlite3.Row（該当する行がない場合は None）
+        """
+        async with self.connection() as connection:
+            async with connection.execute(self._sql(statement), params) as cursor:
+                self.stats['reads'] += 1
+                return await cursor.fetchone()
+
+    async def fetchall(self, statement: str, params: Sequence[Any] = ()):
+        """すべての行を取得する
+
+        Returns:
+            sqlite3.Row のリスト
+        """
+        async with self.connection() as connection:
+            async with connection.execute(self._sql(statement), params) as cursor:
+                self.stats['reads'] += 1
+                return await cursor.fetchall()
+
+    async def write(self, statement: str, params: Sequence[Any] = (), wait: bool = False):
+        """INSERT・UPDATE・DELETE をまとめ処理の列に入れる
+
+        列の書き込みは他のハンドラーの書き込みと一緒に、1つのトランザクションでコミットされます。
+
+        Args:
+            statement: prepare() で登録した名前、または SQL 文
+            params: プレースホルダーの値
+            wait: コミットされるまで待つかどうか
+
+        Raises:
+            sqlite3.Error: wait=True で、この書き込みが失敗した場合（パラメータの誤りでは TypeError なども）
+        """
+        if self._writer_task is None:
+            raise RuntimeError("open() を呼び出してから使用してください")
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append(_Write(self._sql(statement), params, future))
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def _write_loop(self):
+        """列の書き込みを batch_interval ごと、または batch_size 件ごとにコミットする"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            # 最初の書き込みから batch_interval が経つか、batch_size 件たまるまで待つ
+            deadline = time.monotonic() + self.batch_interval / 1000
+            while len(self._pending) < self.batch_size and not self._flushing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._wakeup.clear()
+            await self._commit_pending()
+            if self._pending:
+                self._wakeup.set()
+
+    async def _commit_pending(self):
+        """列の先頭から batch_size 件を1つのトランザクションでコミットする"""
+        batch = self._pending[:self.batch_size]
+        del self._pending[:self.batch_size]
+        self._committing = True
+        try:
+            try:
+                await self._writer.execute('BEGIN')
+                for item in batch:
+                    await self._writer.execute(item.sql, item.params)
+                await self._writer.commit()
+                self._resolve(batch)
+            except Exception as e:
+                await self._rollback()
+                logger.warning(f"{len(batch)}件の書き込みのコミットに失敗したため、1件ずつやり直します: {e}")
+                await self._commit_one_by_one(batch)
+            self.stats['writes'] += len(batch)
+            self.stats['batches'] += 1
+        finally:
+            # 書き込みのまとめ処理が止まっても flush() が待ち続けないようにする
+            self._committing = False
+            if not self._pending:
+                self._flushing = False
+            async with self._flushed:
+                self._flushed.notify_all()
+
+    async def _commit_one_by_one(self, batch: List[_Write]):
+        """失敗した書き込みだけを捨て、他の書き込みはコミットする"""
+        for item in batch:
+            try:
+                await self._writer.execute(item.sql, item.params)
+                await self._writer.commit()
+                self._resolve([item])
+            except Exception as e:
+                # sqlite3.Error の他、パラメータの型の誤り（TypeError・OverflowError など）もここに来る
+                await self._rollback()
+                self.stats['failed_writes'] += 1
+                logger.error(f"書き込みに失敗しました: {e}（{item.sql}）")
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(e)
+
+    async def _rollback(self):
+        try:
+            await self._writer.rollback()
+        except Exception as e:
+            logger.error(f"ロールバックに失敗しました: {e}")
+
+    @staticmethod
+    def _resolve(batch: List[_Write]):
+        for item in batch:
+            if item.future is not None and not item.future.done():
+                item.future.set_result(None)
+
+    async def flush(self):
+        """列に入っている書き込みがすべてコミットされるまで待つ"""
+        if self._writer_task is None or not (self._pending or self._committing):
+            return
+        # batch_interval を待たずにコミットさせる
+        self._flushing = True
+        self._wakeup.set()
+        async with self._flushed:
+            await self._flushed.wait_for(lambda: not (self._pending or self._committing))
+
+    async def close(self):
+        """未コミットの書き込みを書き出してから、すべての接続を閉じる"""
+        if self._writer_task is None:
+            return
+        await self.flush()
+        self._writer_task.cancel()
+        await asyncio.gather(self._writer_task, return_exceptions=True)
+        self._writer_task = None
+        if self._pending:
+            # flush() の後に write() された分も書き出す
+            while self._pending:
+                await self._commit_pending()
+
+        await self._writer.close()
+        for connection in self._connections:
+            await connection.close()
+        self._connections.clear()
+        self._pool = None
+        self._writer = None
@@ -5,6 +5,7 @@
 共通のリプライ送信処理や初期化処理を提供します。
 """
 
+import inspect
 import logging
 from typing import Any, Dict
 
@@ -20,7 +21,7 @@ class BaseHandler:
     - エラーハンドリング
     """
     
-    def __init__(self, config, database, data_service, bot_client):
+    def __init__(self, config, database, data_service, bot_client, reply_sender=None):
         """ハンドラーの初期化
         
         Args:
@@ -28,11 +29,13 @@ class BaseHandler:
             database: データベースアクセスオブジェクト
             data_service: データサービスオブジェクト
             bot_client: ボットクライアントオブジェクト（None可能）
+            reply_sender: 全ハンドラーで共有する ReplySender（None可能）
         """
         self.config = config
         self.database = database
         self.data_service = data_service
         self.bot_client = bot_client
+        self.reply_sender = reply_sender
         
     async def handle(self, note, command: Dict[str, Any]):
         """各ハンドラーで実装必須のメソッド
@@ -44,4 +47,29 @@ class BaseHandler:
         Raises:
             NotImplementedError: サブクラスで実装されていない場合
         """
-        raise NotImplementedError("各ハンドラ
\ No newline at end of file
+        raise NotImplementedError("各ハンドラーで handle() を実装してください")
+    
+    async def reply(self, note, text: str, **params):
+        """note にリプライする
+        
+        reply_sender があれば共有の ReplySender を通して送信するため、レート制限・再送・
+        重複の除去が全ハンドラーでまとめて行われます。ない場合は bot_client.reply() で
+        直接送信します。
+        
+        Args:
+            note: Misskeyのnoteオブジェクト
+            text: 本文
+            **params: reply() に渡す追加のパラメータ
+        
+        Returns:
+            作成された note（送信先がない場合は None）
+        """
+        if self.reply_sender is not None:
+            return await self.reply_sender.reply(note, text, **params)
+        if self.bot_client is None:
+            logger.warning(f"{type(self).__name__}: reply_sender も bot_client もないため送信しません")
+            return None
+        result = self.bot_client.reply(note, text, **params)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
@@ -0,0 +1,282 @@
+"""
+データサービスのキャッシュ
+
+全ハンドラーで共有する data_service を包み、ユーザー・プロフィールなどの取得結果を
+メソッドごとの TTL でキャッシュします。
+同じ引数の呼び出しが同時に来た場合は、データサービスへの呼び出しを1回にまとめます（single-flight）。
+キャッシュは件数とおおよそのメモリ使用量の上限を超えると、最も長く使われていないものから捨てます（LRU）。
+"""
+
+import asyncio
+import inspect
+import logging
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    """キャッシュの1件"""
+    value: Any
+    expires: float
+    size: int
+
+
+@dataclass
+class CacheStats:
+    """メソッドごとのキャッシュの利用状況"""
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0       # 実行中の呼び出しの結果を共有した回数
+    evictions: int = 0
+    invalidations: int = 0
+
+
+def estimate_size(value, _seen=None) -> int:
+    """値のおおよそのメモリ使用量（バイト）を求める
+
+    辞書・リスト・タプル・集合・__dict__ を持つオブジェクトの中身までたどります。
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+
+def _make_key(method: str, args: tuple, kwargs: dict) -> Tuple:
+    """呼び出しの引数からキャッシュのキーを作る（ハッシュできない引数は repr で代用）"""
+    key = (method, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = (method, repr(args), repr(sorted(kwargs.items())))
+    return key
+
+
+class CachedDataService:
+    """data_service を包む非同期の TTL/LRU キャッシュ
+
+    使い方:
+        data_service = CachedDataService(
+            data_service,
+            ttls={'get_user': 300, 'get_profile': 60},
+            max_entries=10000,
+            max_bytes=32 * 1024 * 1024,
+        )
+        # 書き込み系のメソッドを呼んだら関連するキャッシュを捨てる
+        data_service.invalidate_on('update_profile', ['get_profile'])
+
+        handler = SomeHandler(config, database, data_service, bot_client)
+        user = await handler.data_service.get_user(user_id)
+
+    ttls に指定したメソッドだけをキャッシュし、それ以外の属性・メソッドは元の
+    data_service をそのまま返します。元のメソッドは同期・非同期のどちらでも構いませんが、
+    キャッシュするメソッドは常にコルーチンとして呼び出してください。
+    """
+
+    def __init__(self, data_service, ttls: Dict[str, float], max_entries: int = 10000,
+                 max_bytes: Optional[int] = 32 * 1024 * 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """キャッシュの初期化
+
+        Args:
+            data_service: 元のデータサービスオブジェクト
+            ttls: キャッシュするメソッド名 → TTL（秒）
+            max_entries: キャッシュする件数の上限
+            max_bytes: キャッシュのおおよそのメモリ使用量の上限（None で無制限）
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self._service = data_service
+        self._ttls = dict(ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._bytes = 0
+        self._in_flight: Dict[Tuple, asyncio.Task] = {}
+        self._wrappers: Dict[str, Callable] = {}
+        self._invalidate_hooks: Dict[str, Tuple[str, ...]] = {}
+        self._listeners = []
+        self._stats: Dict[str, CacheStats] = {method: CacheStats() for method in self._ttls}
+
+    def __getattr__(self, name):
+        # __init__ で設定した属性以外はここに来る
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._ttls:
+            wrapper = self._wrappers.get(name)
+            if wrapper is None:
+                wrapper = self._wrappers[name] = self._cached_method(name)
+            return wrapper
+        if name in self._invalidate_hooks:
+            return self._invalidating_method(name)
+        return getattr(self._service, name)
+
+    def _cached_method(self, method: str):
+        async def call(*args, **kwargs):
+            return await self._get(method, args, kwargs)
+        call.__name__ = method
+        call.__doc__ = getattr(getattr(self._service, method), '__doc__', None)
+        return call
+
+    def _invalidating_method(self, method: str):
+        target = getattr(self._service, method)
+
+        async def call(*args, **kwargs):
+            try:
+                result = target(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            finally:
+                for cached in self._invalidate_hooks[method]:
+                    self.invalidate(cached)
+        call.__name__ = method
+        return call
+
+    async def _get(self, method: str, args: tuple, kwargs: dict):
+        """キャッシュを引き、なければ元のメソッドを呼び出す"""
+        stats = self._stats[method]
+        key = _make_key(method, args, kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > self._clock():
+                self._entries.move_to_end(key)
+                stats.hits += 1
+                return entry.value
+            self._discard(key)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            stats.coalesced += 1
+        else:
+            stats.misses += 1
+            task = asyncio.ensure_future(self._load(method, key, args, kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, key=key: self._load_done(key, t))
+        # 待っている呼び出し元がキャンセルされても、他の呼び出し元の分は取得を続ける
+        return await asyncio.shield(task)
+
+    async def _load(self, method: str, key: Tuple, args: tuple, kwargs: dict):
+        result = getattr(self._service, method)(*args, **kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        # 取得中に invalidate() された結果はキャッシュしない
+        if self._in_flight.get(key) is asyncio.current_task():
+            self._store(key, result, self._ttls[method])
+        return result
+
+    def _load_done(self, key: Tuple, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # 呼び出し元が全員キャンセルされていても「例外が取得されなかった」警告を出さない
+            task.exception()
+
+    def _store(self, key: Tuple, value, ttl: float):
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.debug(f"{key[0]}: 上限より大きいためキャッシュしません（{size} bytes）")
+            return
+        self._discard(key)
+        self._entries[key] = _Entry(value, self._clock() + ttl, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self._stats[oldest[0]].evictions += 1
+
+    def _discard(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def invalidate(self, method: Optional[str] = None, *args, **kwargs) -> int:
+        """キャッシュを捨てる
+
+        引数を指定した場合はその呼び出しの結果だけを、method だけを指定した場合は
+        そのメソッドの結果をすべて、何も指定しない場合はキャッシュ全体を捨てます。
+        取得中の呼び出しの結果もキャッシュされなくなります。
+
+        Args:
+            method: メソッド名
+            *args, **kwargs: 捨てる呼び出しの引数
+
+        Returns:
+            捨てた件数
+
+        Raises:
+            ValueError: method がキャッシュするメソッド（ttls）にない場合
+        """
+        if method is not None:
+            self._check_cached(method)
+        if method is not None and (args or kwargs):
+            keys = [_make_key(method, args, kwargs)]
+        else:
+            keys = [key for key in list(self._entries) + list(self._in_flight)
+                    if method is None or key[0] == method]
+
+        count = 0
+        for key in set(keys):
+            if key in self._entries:
+                self._discard(key)
+                count += 1
+            self._in_flight.pop(key, None)
+            self._stats[key[0]].invalidations += 1
+        for listener in self._listeners:
+            try:
+                listener(method, args, kwargs)
+            except Exception as e:
+                logger.warning(f"invalidate のリスナーでエラーが発生しました: {e}")
+        return count
+
+    def invalidate_on(self, method: str, cached_methods: Iterable[str]):
+        """書き込み系のメソッドが呼ばれたら、指定したメソッドのキャッシュを捨てる
+
+        Args:
+            method: 元の data_service の書き込み系のメソッド名
+            cached_methods: キャッシュを捨てるメソッド名
+
+        Raises:
+            ValueError: method がキャッシュするメソッドの場合、cached_methods に
+                キャッシュしないメソッドが含まれる場合
+        """
+        if method in self._ttls:
+            raise ValueError(f"キャッシュするメソッドは指定できません: {method}")
+        cached_methods = tuple(cached_methods)
+        for cached in cached_methods:
+            self._check_cached(cached)
+        self._invalidate_hooks[method] = cached_methods
+
+    def _check_cached(self, method: str):
+        if method not in self._ttls:
+            raise ValueError(f"キャッシュしていないメソッドです（ttls にありません）: {method}")
+
+    def add_invalidation_listener(self, listener: Callable[[Optional[str], tuple, dict], None]):
+        """invalidate() のたびに呼ばれる関数を登録する（他プロセスへの通知など）"""
+        self._listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        """メソッドごとのヒット・ミスの件数とキャッシュの大きさを返す"""
+        return {
+            'methods': {method: dict(vars(stats)) for method, stats in self._stats.items()},
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'in_flight': len(self._in_flight),
+        }
@@ -0,0 +1,109 @@
+// ギャラリーデータのバンドル読み込み（scripts/build_gallery_bundle.py が生成）
+// 全シリーズを1回の取得で読み込み、作品は必要になったときに元の形式へ戻す
+class GalleryBundle {
+    constructor(data) {
+        if (data.version !== 1) {
+            throw new Error(`Unsupported gallery bundle version: ${data.version}`);
+        }
+        this.data = data;
+        this.columns = data.works;
+        this.cache = new Map();
+        this.tagIndex = new Map(data.tags.map((tag, i) => [tag, i]));
+        this.idIndex = new Map(this.columns.id.map((id, i) => [id, i]));
+    }
+
+    static async load(url = '/gallery/data/bundle.json') {
+        if (!GalleryBundle.pending) {
+            GalleryBundle.pending = fetch(url).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Bundle load failed: ${response.status}`);
+                }
+                return response.json();
+            }).then(data => new GalleryBundle(data));
+        }
+        return GalleryBundle.pending;
+    }
+
+    get size() {
+        return this.columns.id.length;
+    }
+
+    static ordinalToDate(value) {
+        if (typeof value !== 'number') return value;
+        return new Date(value * 86400000).toISOString().slice(0, 10);
+    }
+
+    work(index) {
+        if (this.cache.has(index)) {
+            return this.cache.get(index);
+        }
+
+        const c = this.columns;
+        const work = { id: c.id[index] };
+        if (c.path[index] !== null) {
+            work.path = c.path[index] === 0 ? `/gallery/image-page/${work.id}.html` : c.path[index];
+        }
+        if (c.imageName[index] !== null) {
+            const dir = c.imageDir[index];
+            work.image_path = dir === null ? c.imageName[index] : `${this.data.dirs[dir]}/${c.imageName[index]}`;
+        }
+        if (c.date[index] !== null) {
+            work.date = GalleryBundle.ordinalToDate(c.date[index]);
+        }
+        if (c.series[index] !== null) {
+            work.series = this.data.series[c.series[index]];
+        }
+        if (c.tags[index] !== null) {
+            work.tags = c.tags[index].map(number => this.data.tags[number]);
+        }
+        Object.assign(work, this.data.extra[String(index)] || {});
+
+        this.cache.set(index, work);
+        return work;
+    }
+
+    allWorks() {
+        return this.columns.id.map((_, index) => this.work(index));
+    }
+
+    findWorkById(id) {
+        const index = this.idIndex.get(id);
+        return index === undefined ? null : this.work(index);
+    }
+
+    // ポスティングリストを使い、全作品を走査せずにタグの作品を返す
+    worksWithTag(tag) {
+        const number = this.tagIndex.get(tag);
+        if (number === undefined) return [];
+        return this.data.postings[number].map(index => this.work(index));
+    }
+
+    tagCount(tag) {
+        const number = this.tagIndex.get(tag);
+        return number === undefined ? 0 : this.data.postings[number].length;
+    }
+
+    // シリーズのJSONがバンドルに含まれているか
+    hasSeries(name) {
+        return this.data.files.some(file => file.name === name);
+    }
+
+    // シリーズのJSONの mainSeries（なければシリーズ名）
+    mainSeries(name) {
+        const file = this.data.files.find(file => file.name === name);
+        return file ? (file.mainSeries || file.name) : name;
+    }
+
+    // シリーズのJSON（data/<name>.json の <name>_series）と同じ配列
+    seriesData(name) {
+        const fileIndex = this.data.files.findIndex(file => file.name === name);
+        if (fileIndex === -1) return [];
+        return this.columns.file
+            .map((file, index) => file === fileIndex ? this.work(index) : null)
+            .filter(work => work !== null);
+    }
+}
+
+if (typeof window !== 'undefined') {
+    window.GalleryBundle = GalleryBundle;
+}
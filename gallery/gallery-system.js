@@ -237,6 +237,34 @@ class MultiSeriesDataManager {
         galleryConfig.debugLog('Loading all series data...');
         
         const seriesConfigs = galleryConfig.getAllSeriesConfigs();
+        
+        // build_gallery_bundle.py のバンドル（コミット済みの生成物）を1回の取得で読み込む
+        // 読み込めない場合や、config.json のシリーズが含まれていない場合はシリーズのJSONを読み込む
+        if (typeof GalleryBundle !== 'undefined') {
+            try {
+                const bundle = await GalleryBundle.load(galleryConfig.get('paths.dataBase', '/gallery/data/') + 'bundle.json');
+                const missing = Object.keys(seriesConfigs).filter(seriesName => !bundle.hasSeries(seriesName));
+                if (missing.length > 0) {
+                    throw new Error(`Bundle is out of date (missing: ${missing.join(', ')})`);
+                }
+                Object.keys(seriesConfigs).forEach(seriesName => {
+                    const mainSeries = bundle.mainSeries(seriesName);
+                    const seriesData = bundle.seriesData(seriesName);
+                    if (seriesData.length > 0) {
+                        this.allSeriesData.set(seriesName, seriesData.map(item => ({ ...item, mainSeries })));
+                    }
+                });
+                
+                this.flattenAllData();
+                this.isLoaded = true;
+                galleryConfig.debugLog(`Loaded ${this.flattenedData.length} works from bundle`);
+                return this.flattenedData;
+            } catch (error) {
+                galleryConfig.debugLog('Bundle load failed, loading series files:', error);
+                this.allSeriesData.clear();
+            }
+        }
+        
         const loadPromises = [];
         
         Object.entries(seriesConfigs).forEach(([seriesName, config]) => {
@@ -342,6 +370,7 @@ class RelatedWorksManager {
     constructor() {
         this.currentData = null;
         this.allData = null;
+        this.precomputed = null;
         this.isLoading = false;
     }
 
@@ -401,7 +430,7 @@ class RelatedWorksManager {
         item.setAttribute('data-id', data.id);
         item.setAttribute('data-series', data.series);
 
-        if (data.tags && data.tags.includes('nsfw')) {
+        if (data.nsfw || (data.tags && data.tags.includes('nsfw'))) {
             item.classList.add('nsfw');
         }
         
@@ -409,7 +438,12 @@ class RelatedWorksManager {
         imageLink.href = data.path;
         
         const img = clone.querySelector('img');
-        img.src = data.image_path;
+        // build_images.py --update-gallery で追加された縮小版があれば使う
+        img.src = data.thumbnail || data.image_path;
+        if (data.srcset) {
+            img.srcset = data.srcset;
+            img.sizes = '320px';
+        }
         img.alt = `${data.id} (${data.series})`;
         
         const titleLink = clone.querySelector('.title-link');
@@ -473,6 +507,16 @@ class RelatedWorksManager {
         });
 
         try {
+            // build_gallery_index.py が生成した関連作品があれば、それだけを読み込む
+            this.precomputed = await this.loadPrecomputed(galleryConfig.getCurrentId());
+            if (this.precomputed) {
+                this.currentData = this.precomputed;
+                galleryConfig.debugLog('Precomputed related works loaded:', this.precomputed);
+                this.renderContent();
+                this.isLoading = false;
+                return;
+            }
+            
             await multiSeriesDataManager.loadAllSeriesData();
             
             this.allData = multiSeriesDataManager.getAllData();
@@ -499,12 +543,31 @@ class RelatedWorksManager {
         }
     }
 
+    async loadPrecomputed(id) {
+        const dataBase = galleryConfig.get('paths.dataBase', '/gallery/data/');
+        const url = `${dataBase}related/${encodeURIComponent(id)}.json`;
+        
+        try {
+            const response = await fetch(url);
+            if (!response.ok) {
+                galleryConfig.debugLog(`No precomputed related works (${response.status}), calculating in browser`);
+                return null;
+            }
+            
+            const data = await response.json();
+            return data.version === 1 && data.related ? data : null;
+        } catch (error) {
+            galleryConfig.debugLog('Precomputed related works load failed:', error);
+            return null;
+        }
+    }
+
     renderContent() {
         galleryConfig.debugLog('Starting content render with multi-series data...');
         
         this.renderTags(this.currentData.tags);
         
-        const relatedWorks = this.getRelatedWorks();
+        const relatedWorks = this.precomputed ? this.precomputed.related : this.getRelatedWorks();
         galleryConfig.debugLog('Multi-series related works calculated', relatedWorks);
 
         Object.keys(relatedWorks).forEach(category => {
@@ -705,7 +768,9 @@ class RelatedWorksManager {
             }
         }
 
-        const topTags = this.getTopTwoFrequentTags(this.currentData, this.allData);
+        const topTags = this.precomputed
+            ? { first: this.precomputed.topTags[0], second: this.precomputed.topTags[1] }
+            : this.getTopTwoFrequentTags(this.currentData, this.allData);
         
         const tagLink1 = document.querySelector('[data-tag-link-1]');
         if (tagLink1 && topTags.first) {
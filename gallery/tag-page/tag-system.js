@@ -3,11 +3,13 @@ class TagPageSystem {
         this.targetTag = null;
         this.allWorks = [];
         this.filteredWorks = [];
+        this.bundle = null;
         this.config = null;
         this.currentSort = 'date-desc';
         this.currentSeriesFilter = '';
         this.currentTagFilter = '';
         this.headingFeaturesInitialized = false;
+        this.prerendered = false;
     }
     
     async initialize(targetTag) {
@@ -15,18 +17,30 @@ class TagPageSystem {
         
         this.targetTag = targetTag;
         
+        // build_gallery_tags.py で作品カードを書き出したページは、データを取得せずにカードをそのまま使う
+        const container = document.getElementById('works-container');
+        this.prerendered = !!(container && container.hasAttribute('data-prerendered'));
+        
         try {
-            // ローディング表示を開始
-            this.showLoadingIndicator();
-            
-            await this.loadConfig();
-            await this.loadAllWorksData();
-            this.filterWorksByTag();
-            this.setupControls();
-            this.renderWorks();
-            
-            // ローディング表示を隠す
-            this.hideLoadingIndicator();
+            if (this.prerendered) {
+                this.loadPrerenderedWorks();
+                this.filterWorksByTag();
+                this.setupControls();
+                this.initializeLightbox();
+                this.reinitializeHeadingFeatures();
+            } else {
+                // ローディング表示を開始
+                this.showLoadingIndicator();
+                
+                await this.loadConfig();
+                await this.loadAllWorksData();
+                this.filterWorksByTag();
+                this.setupControls();
+                this.renderWorks();
+                
+                // ローディング表示を隠す
+                this.hideLoadingIndicator();
+            }
             
             // タイトル更新
             document.title = `#${targetTag} の作品一覧 - 100%health`;
@@ -34,11 +48,33 @@ class TagPageSystem {
             console.log(`Tag page initialized: ${this.filteredWorks.length} works found`);
         } catch (error) {
             console.error('Tag page initialization failed:', error);
-            this.showError('初期化に失敗しました');
+            if (!this.prerendered) {
+                this.showError('初期化に失敗しました');
+            }
             this.hideLoadingIndicator();
         }
     }
     
+    // 書き出し済みのカードの data 属性から作品一覧を作る（element は並び替え・絞り込みで動かすカード）
+    loadPrerenderedWorks() {
+        const pageConfig = window.TagPageConfig || {};
+        this.config = {
+            tags: {
+                excludeFromDisplay: pageConfig.excludeTags,
+                seriesTags: pageConfig.seriesTags
+            }
+        };
+        
+        const cards = document.querySelectorAll('#works-container .works-grid > .card');
+        this.allWorks = Array.from(cards, card => ({
+            date: card.dataset.date,
+            series: card.dataset.series,
+            tags: JSON.parse(card.dataset.tags || '[]'),
+            element: card
+        }));
+        console.log(`Pre-rendered works: ${this.allWorks.length}`);
+    }
+    
     async loadConfig() {
         try {
             const response = await fetch('/gallery/data/config.json');
@@ -63,6 +99,26 @@ class TagPageSystem {
     }
     
     async loadAllWorksData() {
+        // build_gallery_bundle.py のバンドル（コミット済みの生成物）を1回の取得で読み込む
+        // 読み込めない場合や、config.json のシリーズが含まれていない場合はシリーズのJSONを読み込む
+        if (typeof GalleryBundle !== 'undefined') {
+            try {
+                this.updateLoadingStatus('ギャラリーデータを読み込み中...', 10);
+                this.bundle = await GalleryBundle.load();
+                const missing = Object.keys(this.config.series).filter(seriesName => !this.bundle.hasSeries(seriesName));
+                if (missing.length > 0) {
+                    throw new Error(`Bundle is out of date (missing: ${missing.join(', ')})`);
+                }
+                this.allWorks = this.bundle.allWorks();
+                this.updateLoadingStatus('全データの統合完了', 90);
+                console.log(`Total works loaded from bundle: ${this.allWorks.length}`);
+                return;
+            } catch (error) {
+                console.warn('Bundle load failed, loading series files:', error);
+                this.bundle = null;
+            }
+        }
+        
         console.log('Loading all series data...');
         this.updateLoadingStatus('シリーズ設定を確認中...', 5);
         
@@ -124,10 +180,18 @@ class TagPageSystem {
         }
     }
     
-    filterWorksByTag() {
-        this.filteredWorks = this.allWorks.filter(work => 
+    // 対象タグの作品（バンドルがあればポスティングリストから取得）
+    getTargetTagWorks() {
+        if (this.bundle) {
+            return this.bundle.worksWithTag(this.targetTag);
+        }
+        return this.allWorks.filter(work => 
             work.tags && work.tags.includes(this.targetTag)
         );
+    }
+    
+    filterWorksByTag() {
+        this.filteredWorks = this.getTargetTagWorks();
         
         // シリーズフィルター適用
         if (this.currentSeriesFilter) {
@@ -185,6 +249,14 @@ class TagPageSystem {
             return;
         }
         
+        if (this.prerendered) {
+            this.updatePrerenderedWorks(container);
+            this.initializeLightbox();
+            this.headingFeaturesInitialized = false;
+            this.reinitializeHeadingFeatures();
+            return;
+        }
+        
         container.innerHTML = '';
         
         if (this.filteredWorks.length === 0) {
@@ -225,6 +297,26 @@ class TagPageSystem {
         this.reinitializeHeadingFeatures();
     }
     
+    // 書き出し済みのカードを並べ替え、条件に合わないカードを隠す（カードは作り直さない）
+    updatePrerenderedWorks(container) {
+        const worksGrid = container.querySelector('.works-grid');
+        const visible = new Set(this.filteredWorks.map(work => work.element));
+        
+        this.allWorks.forEach(work => {
+            work.element.hidden = !visible.has(work.element);
+        });
+        this.filteredWorks.forEach(work => worksGrid.appendChild(work.element));
+        
+        const countInfo = container.querySelector('.works-count');
+        if (countInfo) {
+            countInfo.textContent = this.filteredWorks.length > 0
+                ? `${this.filteredWorks.length}件の作品が見つかりました`
+                : `♥ タグ「${this.targetTag}」の作品が見つかりませんでした ♥`;
+        }
+        
+        console.log(`Updated ${this.filteredWorks.length} pre-rendered works`);
+    }
+    
     initializeLightbox() {
         // 既存のLuminousGalleryインスタンスがあれば破棄
         if (window.luminousGallery) {
@@ -236,7 +328,8 @@ class TagPageSystem {
         }
         
         // 新しい画像リンクを対象にライトボックスを初期化
-        const imageLinks = document.querySelectorAll('#works-container a[href$=jpg], #works-container a[href$=png], #works-container a[href$=gif], #works-container a[href$=webp], #works-container a[href$=avif]');
+        const imageLinks = Array.from(document.querySelectorAll('#works-container a[href$=jpg], #works-container a[href$=png], #works-container a[href$=gif], #works-container a[href$=webp], #works-container a[href$=avif]'))
+            .filter(link => !link.closest('[hidden]'));
         
         if (imageLinks.length > 0 && typeof LuminousGallery !== 'undefined') {
             window.luminousGallery = new LuminousGallery(imageLinks);
@@ -267,7 +360,7 @@ class TagPageSystem {
                     <a href="${work.path}">${work.id}</a>
                 </h2>
                 <a href="${work.image_path}">
-                    <img src="${work.image_path}" alt="${work.id}" loading="lazy">
+                    <img src="${work.thumbnail || work.image_path}"${work.srcset ? ` srcset="${work.srcset}" sizes="(max-width: 640px) 100vw, 640px"` : ''} alt="${work.id}" loading="lazy">
                 </a>
                 <p class="date"><time datetime="${work.date}">${work.date}</time></p>
                 <div class="series-info">${work.series}</div>
@@ -299,7 +392,7 @@ class TagPageSystem {
         }
         
         return visibleTags.map(tag => {
-            return `<a href="/gallery/tag-page/${tag}.html" class="tag-link">#${tag}</a>`;
+            return `<a href="/gallery/tag-page/${encodeURIComponent(tag)}.html" class="tag-link">#${tag}</a>`;
         }).join(' ');
     }
     
@@ -390,9 +483,7 @@ class TagPageSystem {
         
         // 現在のタグに含まれるシリーズを取得
         const availableSeries = [...new Set(
-            this.allWorks
-                .filter(work => work.tags && work.tags.includes(this.targetTag))
-                .map(work => work.series)
+            this.getTargetTagWorks().map(work => work.series)
         )].sort();
         
         // 選択肢をクリア
@@ -412,9 +503,7 @@ class TagPageSystem {
         if (!tagFilter) return;
         
         // 現在の条件（メインタグ + シリーズフィルター）に該当する作品を取得
-        let candidateWorks = this.allWorks.filter(work => 
-            work.tags && work.tags.includes(this.targetTag)
-        );
+        let candidateWorks = this.getTargetTagWorks();
         
         if (this.currentSeriesFilter) {
             candidateWorks = candidateWorks.filter(work => 
@@ -158,6 +158,9 @@ function handleDataFileSelect(e) {
         try {
             state.partsData = JSON.parse(event.target.result);
             
+            // 別のアトラスから切り出した画像が残らないようにキャッシュを消す
+            Object.keys(imageCache).forEach(key => delete imageCache[key]);
+            
             // キャンバスサイズを設定
             if (state.partsData.meta) {
                 elements.previewCanvas.width = state.partsData.meta.canvasWidth || 800;
@@ -990,6 +993,39 @@ function loadImage(src) {
     });
 }
 
+// パーツ画像をスプライトアトラスから読み込む
+// （scripts/build_charamake_atlas.py が parts-data.json の meta.atlas に書き込む）
+// アトラスから元の画像と同じ大きさのキャンバスを作るため、描画処理は元の画像と同じ
+// アトラスにない画像・アトラスの読み込みに失敗した場合は元の画像を読み込む
+function loadLayerImage(file) {
+    const atlas = state.partsData && state.partsData.meta && state.partsData.meta.atlas;
+    const sprite = atlas && atlas.version === 1 && atlas.sprites ? atlas.sprites[file] : null;
+    if (!sprite) {
+        return loadImage(file);
+    }
+    if (imageCache[file]) {
+        return Promise.resolve(imageCache[file]);
+    }
+    
+    const page = sprite.page !== undefined ? atlas.categories[sprite.category].pages[sprite.page] : null;
+    return (page ? loadImage(page.file) : Promise.resolve(null)).then(pageImage => {
+        if (page && !pageImage) {
+            return loadImage(file);
+        }
+        const canvas = document.createElement('canvas');
+        canvas.width = sprite.width;
+        canvas.height = sprite.height;
+        if (pageImage) {
+            canvas.getContext('2d').drawImage(
+                pageImage, sprite.x, sprite.y, sprite.w, sprite.h,
+                sprite.dx, sprite.dy, sprite.w, sprite.h
+            );
+        }
+        imageCache[file] = canvas;
+        return canvas;
+    });
+}
+
 // レイヤーを描画（エディタと同じロジック）
 function drawLayers(ctx, layers) {
     const validLayers = layers.filter(l => l.file);
@@ -1010,7 +1046,7 @@ function drawLayers(ctx, layers) {
     
     const sortedLayers = [...validLayers].sort((a, b) => a.zIndex - b.zIndex);
     
-    Promise.all(sortedLayers.map(layer => loadImage(layer.file).then(img => ({ img, layer }))))
+    Promise.all(sortedLayers.map(layer => loadLayerImage(layer.file).then(img => ({ img, layer }))))
         .then(items => {
             offCtx.clearRect(0, 0, offscreen.width, offscreen.height);
             
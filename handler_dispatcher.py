@@ -0,0 +1,287 @@
+"""
+ハンドラーのディスパッチャー
+
+_parse_command() から返されるコマンドを、登録されたハンドラー（BaseHandler のサブクラス）に
+振り分けて asyncio 上で並行に実行します。
+ハンドラーごとに待ち行列と同時実行数を持つため、遅いハンドラーが詰まっても
+他のハンドラーのコマンドは待たされません。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from base_handler import BaseHandler
+
+logger = logging.getLogger(__name__)
+
+# 待ち行列があふれたときの扱い
+OVERFLOW_BLOCK = 'block'              # 空きが出るまで dispatch() を待たせる（背圧）
+OVERFLOW_DROP_NEW = 'drop_new'        # 新しいコマンドを捨てる
+OVERFLOW_DROP_OLDEST = 'drop_oldest'  # 最も古い待機中のコマンドを捨てて入れ替える
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEW, OVERFLOW_DROP_OLDEST)
+
+
+@dataclass
+class HandlerLimits:
+    """ハンドラーごとの実行制限
+
+    Attributes:
+        concurrency: 同時に実行するコマンド数の上限
+        queue_size: 実行待ちのコマンド数の上限
+        overflow: 待ち行列があふれたときの扱い（OVERFLOW_POLICIES のいずれか）
+        timeout: 1コマンドのタイムアウト秒数（None で無制限）
+    """
+    concurrency: int = 1
+    queue_size: int = 100
+    overflow: str = OVERFLOW_BLOCK
+    timeout: Optional[float] = 30.0
+
+    def __post_init__(self):
+        if self.concurrency < 1:
+            raise ValueError("concurrency は1以上を指定してください")
+        if self.queue_size < 1:
+            raise ValueError("queue_size は1以上を指定してください")
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"不明な overflow です: {self.overflow}")
+
+
+@dataclass
+class HandlerStats:
+    """ハンドラーごとの処理件数"""
+    dispatched: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class _Route:
+    """登録されたハンドラーと、その待ち行列・ワーカー"""
+    name: str
+    handler: BaseHandler
+    limits: HandlerLimits
+    queue: asyncio.Queue
+    semaphore: asyncio.Semaphore
+    stats: HandlerStats = field(default_factory=HandlerStats)
+    workers: List[asyncio.Task] = field(default_factory=list)
+
+
+class HandlerDispatcher:
+    """コマンドをハンドラーに振り分けて並行に実行するディスパッチャー
+
+    使い方:
+        dispatcher = HandlerDispatcher(max_in_flight=16)
+        dispatcher.register('omikuji', OmikujiHandler(config, database, data_service, bot_client))
+        dispatcher.register(['weather', 'forecast'], WeatherHandler(...),
+                            HandlerLimits(concurrency=4, overflow=OVERFLOW_DROP_OLDEST, timeout=10))
+        # 同じクラスを別の設定で登録する場合は name で stats() の名前を分けられる
+        dispatcher.register('news', FeedHandler(..., feed='news'), name='feed-news')
+        await dispatcher.start()
+        await dispatcher.dispatch(note, command)   # command は _parse_command() の戻り値
+        await dispatcher.stop()
+
+    ハンドラーは bot_client を通してのみ外部とやり取りするため、
+    テストでは偽の bot_client を渡したハンドラーをそのまま登録できます。
+    """
+
+    def __init__(self, max_in_flight: int = 16, default_limits: Optional[HandlerLimits] = None,
+                 command_key: Union[str, Callable[[Dict[str, Any]], Optional[str]]] = 'type'):
+        """ディスパッチャーの初期化
+
+        Args:
+            max_in_flight: 全ハンドラー合計で同時に実行するコマンド数の上限
+            default_limits: register() で制限を省略したときの制限
+            command_key: コマンドの種類を表すキー、またはコマンドから種類を返す関数
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight は1以上を指定してください")
+        self.max_in_flight = max_in_flight
+        self.default_limits = default_limits or HandlerLimits()
+        self.command_key = command_key
+        self._routes: Dict[str, _Route] = {}       # コマンドの種類 → ルート
+        self._handlers: Dict[int, _Route] = {}     # id(handler) → ルート
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._running = False
+        self.unrouted = 0
+
+    def register(self, command_types: Union[str, Iterable[str]], handler: BaseHandler,
+                 limits: Optional[HandlerLimits] = None, name: Optional[str] = None):
+        """ハンドラーを登録する
+
+        同じハンドラーを複数のコマンドの種類に登録した場合、待ち行列と制限は共有されます。
+
+        Args:
+            command_types: 担当するコマンドの種類（1つまたは複数）
+            handler: BaseHandler のサブクラスのインスタンス
+            limits: 実行制限（省略時は default_limits）
+            name: stats() やログに使う名前（省略時はクラス名。同じクラスの2つ目以降は
+                "クラス名#2" のように番号をつける）
+
+        Raises:
+            TypeError: handler が BaseHandler でない場合
+            ValueError: コマンドの種類・名前が既に登録されている場合
+        """
+        if not isinstance(handler, BaseHandler):
+            raise TypeError(f"BaseHandler のサブクラスではありません: {type(handler).__name__}")
+        if isinstance(command_types, str):
+            command_types = [command_types]
+        command_types = list(command_types)
+        for command_type in command_types:
+            if command_type in self._routes:
+                raise ValueError(f"コマンドの種類 '{command_type}' は既に登録されています")
+
+        route = self._handlers.get(id(handler))
+        if route is not None and name is not None and name != route.name:
+            raise ValueError(f"このハンドラーは '{route.name}' として登録されています")
+        if route is None:
+            names = {registered.name for registered in self._handlers.values()}
+            if name is None:
+                name = base = type(handler).__name__
+                number = 1
+                while name in names:
+                    number += 1
+                    name = f"{base}#{number}"
+            elif name in names:
+                raise ValueError(f"ハンドラーの名前 '{name}' は既に使われています")
+            limits = limits or self.default_limits
+            route = _Route(
+                name=name,
+                handler=handler,
+                limits=limits,
+                queue=asyncio.Queue(maxsize=limits.queue_size),
+                semaphore=asyncio.Semaphore(limits.concurrency),
+            )
+            self._handlers[id(handler)] = route
+            if self._running:
+                self._start_workers(route)
+
+        for command_type in command_types:
+            self._routes[command_type] = route
+
+    async def start(self):
+        """ワーカーを起動する（実行中のイベントループ内で呼び出す）"""
+        if self._running:
+            return
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._running = True
+        for route in self._handlers.values():
+            self._start_workers(route)
+        logger.info(f"ディスパッチャーを起動しました（ハンドラー {len(self._handlers)}件）")
+
+    def _start_workers(self, route: _Route):
+        for index in range(route.limits.concurrency):
+            route.workers.append(asyncio.create_task(
+                self._worker(route), name=f"{route.name}-worker-{index}"
+            ))
+
+    def _command_type(self, command: Dict[str, Any]) -> Optional[str]:
+        if callable(self.command_key):
+            return self.command_key(command)
+        return command.get(self.command_key) if command else None
+
+    async def dispatch(self, note, command: Dict[str, Any]) -> bool:
+        """コマンドを担当ハンドラーの待ち行列に入れる
+
+        overflow が OVERFLOW_BLOCK のハンドラーは、待ち行列に空きが出るまで待ちます。
+
+        Args:
+            note: Misskeyのnoteオブジェクト
+            command: _parse_command()から返されるコマンド情報
+
+        Returns:
+            待ち行列に入れた場合は True、担当ハンドラーがない・捨てた場合は False
+        """
+        if not self._running:
+            raise RuntimeError("start() を呼び出してから dispatch() してください")
+
+        command_type = self._command_type(command)
+        route = self._routes.get(command_type)
+        if route is None:
+            self.unrouted += 1
+            logger.debug(f"担当ハンドラーのないコマンドです: {command_type}")
+            return False
+
+        item = (note, command)
+        if route.queue.full():
+            policy = route.limits.overflow
+            if policy == OVERFLOW_DROP_NEW:
+                route.stats.dropped += 1
+                logger.warning(f"{route.name}: 待ち行列が満杯のため新しいコマンドを捨てました")
+                return False
+            if policy == OVERFLOW_DROP_OLDEST:
+                route.queue.get_nowait()
+                route.queue.task_done()
+                route.stats.dropped += 1
+                logger.warning(f"{route.name}: 待ち行列が満杯のため最も古いコマンドを捨てました")
+
+        await route.queue.put(item)
+        route.stats.dispatched += 1
+        return True
+
+    async def _worker(self, route: _Route):
+        """ハンドラーの待ち行列からコマンドを取り出して実行する"""
+        while True:
+            note, command = await route.queue.get()
+            try:
+                async with route.semaphore, self._in_flight:
+                    await self._run(route, note, command)
+            finally:
+                route.queue.task_done()
+
+    async def _run(self, route: _Route, note, command: Dict[str, Any]):
+        """1コマンドを実行する（例外・タイムアウトはログに記録して続行）"""
+        try:
+            if route.limits.timeout is None:
+                await route.handler.handle(note, command)
+            else:
+                await asyncio.wait_for(route.handler.handle(note, command), route.limits.timeout)
+            route.stats.completed += 1
+        except asyncio.TimeoutError:
+            route.stats.timed_out += 1
+            logger.warning(f"{route.name}: {route.limits.timeout}秒以内に完了しませんでした")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            route.stats.failed += 1
+            logger.exception(f"{route.name}: コマンドの処理中にエラーが発生しました: {e}")
+
+    async def join(self):
+        """待ち行列のコマンドがすべて処理されるまで待つ"""
+        await asyncio.gather(*(route.queue.join() for route in self._handlers.values()))
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """ワーカーを停止する
+
+        Args:
+            drain: 待ち行列のコマンドを処理し終えてから停止するかどうか
+            timeout: drain の待ち時間の上限（秒、None で無制限）
+        """
+        if not self._running:
+            return
+        if drain:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("待ち行列を処理しきれないまま停止します")
+
+        workers = [task for route in self._handlers.values() for task in route.workers]
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for route in self._handlers.values():
+            route.workers.clear()
+        self._running = False
+        logger.info("ディスパッチャーを停止しました")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """ハンドラーごとの処理件数と待ち行列の長さを返す（キーは register() の名前）"""
+        result = {}
+        for route in self._handlers.values():
+            result[route.name] = {
+                **route.stats.__dict__,
+                'queued': route.queue.qsize(),
+            }
+        return result
@@ -1,53 +1,517 @@
-import requests
-import os
+import argparse
+import glob
+import hashlib
+import json
 import re
+import sqlite3
+import sys
+import time
+from collections import defaultdict, deque
+from html import escape
+from html.parser import HTMLParser
+from pathlib import Path
+
 import spacy
-from bs4 import BeautifulSoup
-
-def extract_named_entities(text, nlp):
-    named_entities = set()
-    text_blocks = [text[i:i + 15000] for i in range(0, len(text), 15000)]
-    for block in text_blocks:
-        doc = nlp(block)
-        for ent in doc.ents:
-            if ent.label_ == "PERSON":
-                named_entities.add(ent.text)
-    return named_entities
-
-def save_html(html, output_path):
+
+# requests は --url 指定時のみ必要（オプショナル）
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+URL = "https://yuinoid.neocities.org/txt/my_dsns_timeline"
+DEFAULT_INPUTS = [str(PROJECT_ROOT / "txt" / "my_dsns_timeline.html")]
+OUTPUT_NAME = "named_entities_index"
+MODEL_NAME = "ja_core_news_sm"
+MAX_UNIT_CHARS = 2000
+PAGE_SIZE = 200
+CACHE_PATH = PROJECT_ROOT / ".ner_cache.sqlite"
+
+# テキスト単位の区切りとなる要素（年表の <li>、見出し、段落、ブロック要素など）
+UNIT_TAGS = {
+    "li", "p", "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd", "blockquote", "td", "th", "pre", "summary",
+    "title", "div", "section", "article", "header", "footer", "nav", "main", "ul", "ol", "dl", "table", "tr", "details",
+}
+SKIP_TAGS = {"script", "style", "template", "noscript"}
+SENTENCE_END = re.compile(r"[。！？!?]+")
+
+
+class TextUnitParser(HTMLParser):
+    """
+    HTMLを逐次パースし、NERに渡すテキスト単位を組み立てる
+
+    - <li> や見出し・段落の開始/終了で単位を区切る
+    - class="year" の見出しは年のコンテキストとして保持する（単位としては出さない）
+    - 直前に現れた id 属性をアンカーとして記録する
+    - 完成した単位は self.units に溜まるので、feed() のたびに取り出す
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.units = deque()
+        self.year = None
+        self.anchor = None
+        self._skip_depth = 0
+        self._in_year = False
+        self._year_text = []
+        self._parts = []
+        self._start = None
+        self._unit_anchor = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+        if tag in UNIT_TAGS:
+            self._flush()
+            if "year" in (attrs.get("class") or "").split():
+                self._in_year = True
+                self._year_text = []
+        if attrs.get("id"):
+            self.anchor = attrs["id"]
+        if tag == "br":
+            self._append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            return
+        if tag in UNIT_TAGS:
+            if self._in_year:
+                match = re.search(r"\d+", "".join(self._year_text))
+                self.year = match.group() if match else self.year
+                self._in_year = False
+                self._parts = []
+                self._start = None
+                return
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._in_year:
+            self._year_text.append(data)
+            return
+        self._append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _append(self, data):
+        if self._start is None:
+            if not data.strip():
+                return
+            self._start = self.getpos()
+            self._unit_anchor = self.anchor
+        self._parts.append(data)
+
+    def _flush(self):
+        if self._start is not None:
+            text = re.sub(r"\s+", " ", "".join(self._parts)).strip()
+            if text:
+                line, col = self._start
+                self.units.append({
+                    "text": text,
+                    "year": self.year,
+                    "anchor": self._unit_anchor,
+                    "line": line,
+                    "col": col,
+                    "offset": 0,
+                })
+        self._parts = []
+        self._start = None
+
+
+def split_sentences(unit, max_chars=MAX_UNIT_CHARS):
+    """
+    長すぎる単位を文末（。！？）で max_chars 以下に分割する
+
+    分割後の各単位は元の単位内での開始位置を offset に持つ
+    """
+    text = unit["text"]
+    if len(text) <= max_chars:
+        yield unit
+        return
+
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            cut = None
+            for match in SENTENCE_END.finditer(text, start, end):
+                cut = match.end()
+            if cut:
+                end = cut
+        yield dict(unit, text=text[start:end], offset=unit["offset"] + start)
+        start = end
+
+
+def iter_text_units(chunks, max_chars=MAX_UNIT_CHARS):
+    """
+    HTMLの断片列からテキスト単位を順に生成する
+
+    文書全体のテキストを保持せず、パーサーに溜まった単位をその都度吐き出す
+    """
+    parser = TextUnitParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        while parser.units:
+            yield from split_sentences(parser.units.popleft(), max_chars)
+    parser.close()
+    while parser.units:
+        yield from split_sentences(parser.units.popleft(), max_chars)
+
+
+def load_nlp(model_name):
+    """
+    固有表現抽出に必要なコンポーネントだけを有効にしてモデルを読み込む
+
+    ner が tok2vec を共有している場合のみ tok2vec を残し、
+    morphologizer / parser / attribute_ruler などは無効化する
+    """
+    nlp = spacy.load(model_name)
+    enabled = ["ner"]
+    if "tok2vec" in nlp.pipe_names and "ner" in nlp.get_pipe("tok2vec").listening_components:
+        enabled.insert(0, "tok2vec")
+    nlp.select_pipes(enable=enabled)
+    return nlp
+
+
+def model_key(nlp):
+    """
+    キャッシュのキーに使うモデル識別子（モデル名・バージョン・有効なコンポーネント）
+    """
+    meta = nlp.meta
+    return f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}/spacy-{spacy.__version__}/{'+'.join(nlp.pipe_names)}"
+
+
+class EntityCache:
+    """
+    テキスト単位ごとのNER結果を保存するSQLiteキャッシュ
+
+    キーは (モデル識別子, テキストのSHA-256)。値は単位内の全エンティティ
+    [text, label, start, end] のJSON。ラベルで絞り込む前の結果を保存するので、
+    抽出対象のラベルを変えてもキャッシュはそのまま使える
+    """
+
+    def __init__(self, path, model, commit_every=500):
+        self.model = model
+        self.commit_every = commit_every
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " entities TEXT NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._pending = []
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        row = self.conn.execute(
+            "SELECT entities FROM entities WHERE model = ? AND hash = ?",
+            (self.model, self.text_hash(text)),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, text, entities):
+        self._pending.append((self.model, self.text_hash(text), json.dumps(entities, ensure_ascii=False)))
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.conn.executemany("INSERT OR REPLACE INTO entities VALUES (?, ?, ?)", self._pending)
+            self.conn.commit()
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def extract_named_entities(units, nlp, batch_size=64, n_process=1, stats=None, cache=None):
+    """
+    テキスト単位の列から人名を抽出する
+
+    cache が指定された場合、キャッシュにある単位は spaCy に渡さず結果を再利用し、
+    新規・変更された単位だけを nlp.pipe で処理する
+
+    Returns:
+        dict: {entity: [{page, year, anchor, line, col, start, end}, ...]}
+    """
+    if stats is None:
+        stats = {}
+    for key in ("chars", "units", "cached", "ner_chars"):
+        stats.setdefault(key, 0)
+
+    named_entities = defaultdict(list)
+
+    def add(unit, entities):
+        for text, label, start, end in entities:
+            if label == "PERSON":
+                named_entities[text].append({
+                    "page": unit.get("page"),
+                    "year": unit["year"],
+                    "anchor": unit["anchor"],
+                    "line": unit["line"],
+                    "col": unit["col"],
+                    "start": unit["offset"] + start,
+                    "end": unit["offset"] + end,
+                })
+
+    def pending():
+        for unit in units:
+            stats["chars"] += len(unit["text"])
+            stats["units"] += 1
+            if cache is not None:
+                cached = cache.get(unit["text"])
+                if cached is not None:
+                    stats["cached"] += 1
+                    add(unit, cached)
+                    continue
+            stats["ner_chars"] += len(unit["text"])
+            yield unit["text"], unit
+
+    for doc, unit in nlp.pipe(pending(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+        entities = [[ent.text, ent.label_, ent.start_char, ent.end_char] for ent in doc.ents]
+        if cache is not None:
+            cache.put(unit["text"], entities)
+        add(unit, entities)
+
+    if cache is not None:
+        cache.flush()
+    return dict(named_entities)
+
+
+def fetch_chunks(url, chunk_size=65536):
+    if not REQUESTS_AVAILABLE:
+        print("Error: requests is not installed. Install with: pip install requests")
+        sys.exit(1)
+    response = requests.get(url, stream=True)
+    if response.status_code != 200:
+        print(f"Error: Unable to fetch data from {url}")
+        sys.exit(1)
+    response.encoding = response.encoding or "utf-8"
+    yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+
+
+def read_chunks(path, chunk_size=65536):
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def expand_inputs(patterns):
+    """
+    ファイルパス・globパターンのリストを重複なしのファイルリストに展開する
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if not path.is_file():
+                print(f"Warning: File not found: {match}")
+                continue
+            resolved = path.resolve()
+            if resolved not in seen:
+                seen.add(resolved)
+                paths.append(resolved)
+    return paths
+
+
+def page_name(path):
+    """
+    ファイルパスをサイト内のURLパス（例: /txt/my_dsns_timeline.html）に変換する
+    """
+    try:
+        return "/" + path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def iter_page_units(paths, max_chars=MAX_UNIT_CHARS):
+    for path in paths:
+        page = page_name(path)
+        for unit in iter_text_units(read_chunks(path), max_chars):
+            unit["page"] = page
+            yield unit
+
+
+def build_entity_index(named_entities):
+    """
+    出現位置のリストを エンティティ → [[page, anchor, count], ...] の転置インデックスにまとめる
+    """
+    index = {}
+    for entity in sorted(named_entities):
+        counts = defaultdict(int)
+        for occurrence in named_entities[entity]:
+            counts[(occurrence["page"] or "", occurrence["anchor"] or "")] += 1
+        index[entity] = [[page, anchor, count] for (page, anchor), count in sorted(counts.items())]
+    return index
+
+
+def write_index_json(index, output_path):
+    """
+    転置インデックスをJSONとして1エンティティずつ書き出す
+    """
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+        f.write("{")
+        for i, (entity, refs) in enumerate(index.items()):
+            f.write("," if i else "")
+            f.write(f"\n{json.dumps(entity, ensure_ascii=False)}: {json.dumps(refs, ensure_ascii=False)}")
+        f.write("\n}\n")
+
+
+def listing_filename(page_number):
+    return f"{OUTPUT_NAME}.html" if page_number == 1 else f"{OUTPUT_NAME}_{page_number}.html"
+
+
+def write_index_html(index, output_dir, page_size=PAGE_SIZE):
+    """
+    転置インデックスをページ分割したHTML一覧として書き出す
+
+    Returns:
+        list: 書き出したファイルのパス
+    """
+    entities = list(index)
+    total_pages = max((len(entities) + page_size - 1) // page_size, 1)
+    written = []
+
+    for page_number in range(1, total_pages + 1):
+        output_path = Path(output_dir) / listing_filename(page_number)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write('<!DOCTYPE html><html lang="ja"><head><meta charset="UTF-8">'
+                    f'<title>Named Entities ({page_number}/{total_pages})</title></head>'
+                    f'<body><h1>Named Entities</h1><p>{len(entities)} entities</p><ul>')
+            for entity in entities[(page_number - 1) * page_size:page_number * page_size]:
+                refs = index[entity]
+                total = sum(count for _, _, count in refs)
+                f.write(f"<li>{escape(entity)} <small>({total})</small><ul>")
+                for page, anchor, count in refs:
+                    href = f"{page}#{anchor}" if anchor else page
+                    label = f"{page}#{anchor}" if anchor else page
+                    f.write(f'<li><a href="{escape(href)}">{escape(label)}</a> ({count})</li>')
+                f.write("</ul></li>")
+            f.write("</ul><nav>")
+            if page_number > 1:
+                f.write(f'<a href="{listing_filename(page_number - 1)}">&lt; prev</a> ')
+            f.write(f"{page_number}/{total_pages}")
+            if page_number < total_pages:
+                f.write(f' <a href="{listing_filename(page_number + 1)}">next &gt;</a>')
+            f.write("</nav></body></html>")
+        written.append(output_path)
+
+    return written
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="サイト内のHTMLから人名を抽出し、エンティティ→ページの索引を生成",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+例:
+  # 年表ページ（デフォルト）
+  python html_named_entities.py
 
-url = "https://yuinoid.neocities.org/txt/my_dsns_timeline"
+  # txt 以下のページと雑記の日別ページ
+  python html_named_entities.py "txt/*.html" "txt/zakki/*/*/days/*.html" --jobs 4
 
-response = requests.get(url)
+  # 公開中のページを取得して処理
+  python html_named_entities.py --url
+""",
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="入力HTMLファイルまたはglobパターン（デフォルト: txt/my_dsns_timeline.html）")
+    parser.add_argument("--url", nargs="?", const=URL, default=None,
+                        help=f"ローカルファイルの代わりにURLから取得する（値省略時: {URL}）")
+    parser.add_argument("--output-dir", default=str(PROJECT_ROOT),
+                        help=f"{OUTPUT_NAME}.json / .html の出力先（デフォルト: プロジェクトルート）")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help=f"HTML一覧の1ページあたりのエンティティ数（デフォルト: {PAGE_SIZE}）")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="spaCy のワーカープロセス数（デフォルト: 1）")
+    parser.add_argument("--batch-size", type=int, default=64,
+                        help="nlp.pipe に渡すバッチサイズ（デフォルト: 64）")
+    parser.add_argument("--max-chars", type=int, default=MAX_UNIT_CHARS,
+                        help=f"1単位の最大文字数。超える場合は文末で分割（デフォルト: {MAX_UNIT_CHARS}）")
+    parser.add_argument("--model", default=MODEL_NAME,
+                        help=f"spaCy モデル名（デフォルト: {MODEL_NAME}）")
+    parser.add_argument("--cache", default=str(CACHE_PATH),
+                        help=f"NER結果キャッシュ（SQLite）のパス（デフォルト: {CACHE_PATH}）")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="キャッシュを使わずに全単位を処理する")
+    return parser.parse_args()
 
-if response.status_code == 200:
-    text = response.text
-else:
-    print(f"Error: Unable to fetch data from {url}")
 
-soup = BeautifulSoup(text, "html.parser")
+def main():
+    args = parse_arguments()
 
-# Remove scripts and styles
-for script in soup(["script", "style"]):
-    script.decompose()
+    if args.url:
+        units = iter_text_units(fetch_chunks(args.url), max_chars=args.max_chars)
+        units = (dict(unit, page=args.url) for unit in units)
+        print(f"Input: {args.url}")
+    else:
+        paths = expand_inputs(args.inputs or DEFAULT_INPUTS)
+        if not paths:
+            print("Error: No input files found")
+            sys.exit(1)
+        units = iter_page_units(paths, max_chars=args.max_chars)
+        print(f"Input: {len(paths)} file(s)")
 
-text = soup.get_text()
+    nlp = load_nlp(args.model)
+    print(f"Pipeline: {', '.join(nlp.pipe_names)} (jobs={args.jobs}, batch_size={args.batch_size})")
 
-# Remove extra newlines and spaces
-text = re.sub(r'\n+', '\n', text).strip()
+    cache = None if args.no_cache else EntityCache(args.cache, model_key(nlp))
 
-nlp = spacy.load("ja_core_news_sm")
-named_entities = extract_named_entities(text, nlp)
+    stats = {}
+    started = time.perf_counter()
+    try:
+        named_entities = extract_named_entities(
+            units, nlp,
+            batch_size=args.batch_size,
+            n_process=args.jobs,
+            stats=stats,
+            cache=cache,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - started
+    print(f"Processed {stats['units']} units / {stats['chars']} chars in {elapsed:.1f}s "
+          f"({stats['chars'] / max(elapsed, 1e-9):,.0f} chars/s)")
+    if cache is not None:
+        print(f"Cache: {stats['cached']} hit(s), {stats['units'] - stats['cached']} unit(s) "
+              f"/ {stats['ner_chars']} chars sent to NER")
+    print(f"Found {len(named_entities)} named entities")
 
-html_index = '<!DOCTYPE html><html lang="ja"><head><meta charset="UTF-8"><title>Named Entities</title></head><body><h1>Named Entities</h1><ul>'
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index = build_entity_index(named_entities)
 
-for ne in sorted(named_entities):
-    html_index += f'<li>{ne}</li>'
+    json_path = output_dir / f"{OUTPUT_NAME}.json"
+    write_index_json(index, json_path)
+    print(f"✓ Saved: {json_path}")
 
-html_index += '</ul></body></html>'
+    html_paths = write_index_html(index, output_dir, page_size=args.page_size)
+    print(f"✓ Saved: {html_paths[0]} ({len(html_paths)} page(s))")
 
-output_path = "D:/web/100percent-health/named_entities_index.html"
 
-save_html(html_index, output_path)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+/**
+ * 埋め込みプレーヤーのファサード（scripts/embed_utils.py が生成）
+ * ボタンが押されたら <template> の中の iframe に差し替える。
+ * タグページは並べ替えで記事を作り直すため、document でまとめて受け取る。
+ */
+(function () {
+  function autoplaySrc(src) {
+    // YouTube は1回のクリックで再生が始まるようにする
+    if (!/youtube(-nocookie)?\.com\/embed\//.test(src)) return src;
+    return src + (src.indexOf('?') === -1 ? '?' : '&') + 'autoplay=1';
+  }
+
+  document.addEventListener('click', function (event) {
+    const button = event.target.closest('.embed-facade-button');
+    if (!button) return;
+
+    const facade = button.closest('.embed-facade');
+    const template = facade && facade.querySelector('template');
+    if (!template) return;
+
+    const content = template.content.cloneNode(true);
+    const iframe = content.querySelector('iframe');
+    if (iframe) {
+      iframe.src = autoplaySrc(iframe.getAttribute('src') || '');
+      iframe.removeAttribute('loading');
+    }
+    facade.replaceWith(content);
+  });
+})();
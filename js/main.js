@@ -732,6 +732,15 @@ function getHeadingTextWithoutRuby(element) {
   return clone.textContent.trim();
 }
 
+// サービスワーカー（共通アセット・最近のページを事前キャッシュ、/sw.js）
+if ('serviceWorker' in navigator) {
+  window.addEventListener('load', () => {
+    navigator.serviceWorker.register('/sw.js').catch((e) => {
+      console.error('[ServiceWorker] 登録に失敗:', e);
+    });
+  });
+}
+
 // GoatCounter アクセス解析
 !function() {
   const script = document.createElement('script');
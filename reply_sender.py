@@ -0,0 +1,387 @@
+"""
+リプライ送信キュー
+
+全ハンドラーで共有する、Misskey API へのリプライ送信処理です。
+送信はトークンバケットでレート制限し、直接のリプライをタイムライン向けの投稿より
+優先して送ります。429・5xx と、サーバーに接続できなかった場合は指数バックオフで再送し、
+送信待ちの同一内容のリプライは1回の送信にまとめます。HTTP 接続は1つのセッションで使い回します。
+
+notes/create は冪等ではないため、タイムアウトや送信後の切断など、投稿が作られたかどうか
+分からないエラーは再送しません（再送すると同じリプライが二重に投稿されるため）。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 送信の優先度（小さいほど先に送る）
+PRIORITY_DIRECT = 0   # メンション・コマンドへの直接のリプライ
+PRIORITY_NORMAL = 1   # タイムライン向けの投稿など
+
+
+class ReplyError(Exception):
+    """リプライの送信に失敗した（再送の上限に達した・再送しないエラー）"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """トークンバケットによるレート制限
+
+    rate 件/秒の速度でトークンが貯まり、最大 capacity 件までまとめて送れます。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: 1秒あたりに補充するトークン数
+            capacity: バケットの容量（連続して送れる件数）
+        """
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate は0より大きく、capacity は1以上を指定してください")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """トークンを1つ取得する（なければ補充されるまで待つ）"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """サーバーからレート制限を受けたとき、指定秒数の間送信を止める"""
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = 0
+        self._paused_until = max(self._paused_until, now + seconds)
+
+
+@dataclass
+class _Request:
+    """送信待ちの API リクエスト"""
+    endpoint: str
+    payload: Dict[str, Any]
+    priority: int
+    key: str
+    future: asyncio.Future
+    sequence: int
+    attempt: int = 0
+    queued: bool = False   # 送信待ちの列に入っているか（送信中・再送待ちは False）
+
+
+class ReplySender:
+    """レート制限・優先度・再送つきのリプライ送信キュー
+
+    使い方:
+        sender = ReplySender('https://misskey.example', token, rate=1.0, burst=5)
+        await sender.start()
+        await sender.reply(note, 'こんにちは')           # 直接のリプライ（優先）
+        await sender.post('定期投稿', priority=PRIORITY_NORMAL)
+        await sender.close()
+
+    送信待ちのリプライに上限はなく、キューから捨てられることはありません。
+    再送の上限に達したリプライは ReplyError として呼び出し元に返ります。
+    """
+
+    def __init__(self, host: str, token: str, rate: float = 1.0, burst: int = 5,
+                 max_concurrency: int = 4, max_retries: int = 8,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 timeout: float = 30.0, session=None):
+        """送信キューの初期化
+
+        Args:
+            host: Misskey サーバーの URL（例: https://misskey.io）
+            token: API のアクセストークン
+            rate: 1秒あたりの送信件数の上限（サーバーのレート制限に合わせて調整）
+            burst: 連続して送れる件数
+            max_concurrency: 同時に送信中にできるリクエスト数（接続プールの大きさ）
+            max_retries: 429・5xx・通信エラー時の再送回数の上限
+            backoff_base: 再送の待ち時間の基準（秒、再送のたびに倍になる）
+            backoff_max: 再送の待ち時間の上限（秒）
+            timeout: 1リクエストのタイムアウト（秒）
+            session: 使い回す aiohttp.ClientSession（省略時は start() で作成）
+        """
+        if session is None and not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp がインストールされていません: pip install aiohttp")
+        self.host = host.rstrip('/')
+        self.token = token
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self._session = session
+        self._owns_session = session is None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[str, _Request] = {}   # 重複判定のキー → 送信待ち・送信中のリクエスト
+        self._sequence = itertools.count()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._idle: Optional[asyncio.Event] = None
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0, 'coalesced': 0}
+
+    async def start(self):
+        """送信ループを起動する（実行中のイベントループ内で呼び出す）"""
+        if self._loop_task is not None:
+            return
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        self._queue = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._loop_task = asyncio.create_task(self._send_loop(), name='reply-sender')
+
+    async def reply(self, note, text: str, priority: int = PRIORITY_DIRECT, **params) -> Optional[Dict[str, Any]]:
+        """note へのリプライを送信する
+
+        公開範囲は元の note に合わせ、ダイレクト（specified）の場合は投稿者を宛先にします。
+
+        Args:
+            note: Misskeyのnoteオブジェクト
+            text: 本文
+            priority: 送信の優先度
+            **params: notes/create に渡す追加のパラメータ（cw など）
+
+        Returns:
+            作成された note
+        """
+        payload = {'text': text, 'replyId': _note_field(note, 'id')}
+        visibility = _note_field(note, 'visibility')
+        if visibility:
+            payload['visibility'] = visibility
+            if visibility == 'specified' and _note_field(note, 'userId'):
+                payload['visibleUserIds'] = [_note_field(note, 'userId')]
+        payload.update(params)
+        result = await self.request('notes/create', payload, priority)
+        return result.get('createdNote') if isinstance(result, dict) else result
+
+    async def post(self, text: str, priority: int = PRIORITY_NORMAL, **params) -> Optional[Dict[str, Any]]:
+        """リプライではない投稿を送信する
+
+        Returns:
+            作成された note
+        """
+        result = await self.request('notes/create', {'text': text, **params}, priority)
+        return result.get('createdNote') if isinstance(result, dict) else result
+
+    async def request(self, endpoint: str, payload: Dict[str, Any], priority: int = PRIORITY_NORMAL):
+        """API リクエストを送信キューに入れ、結果を待つ
+
+        送信待ち・送信中に同じ内容のリクエストがあれば、新たに送らずその結果を共有します。
+
+        Args:
+            endpoint: API のエンドポイント（例: notes/create）
+            payload: リクエストの本文（トークンは自動で付与）
+            priority: 送信の優先度
+
+        Returns:
+            API のレスポンス（本文がない場合は None）
+
+        Raises:
+            ReplyError: 送信に失敗した場合
+        """
+        if self._loop_task is None:
+            raise RuntimeError("start() を呼び出してから送信してください")
+
+        key = endpoint + '\n' + json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        request = self._pending.get(key)
+        if request is not None:
+            self.stats['coalesced'] += 1
+            if priority < request.priority and request.queued:
+                # 優先度の高い呼び出しが来たら、送信待ちの順番を繰り上げる
+                request.priority = priority
+                self._enqueue(request)
+        else:
+            request = _Request(endpoint, payload, priority, key,
+                               asyncio.get_running_loop().create_future(), next(self._sequence))
+            self._pending[key] = request
+            self._idle.clear()
+            self._enqueue(request)
+        return await asyncio.shield(request.future)
+
+    def _enqueue(self, request: _Request):
+        request.queued = True
+        self._queue.put_nowait((request.priority, request.sequence, request))
+
+    async def _next_request(self) -> _Request:
+        """優先度の最も高い送信待ちのリクエストを取り出す（繰り上げで残った古いエントリは読み飛ばす）"""
+        while True:
+            _, _, request = await self._queue.get()
+            if request.queued and not request.future.done():
+                request.queued = False
+                return request
+
+    async def _send_loop(self):
+        """トークンが取れるたびに、その時点で最も優先度の高いリクエストを送る"""
+        while True:
+            request = await self._next_request()
+            await self.bucket.acquire()
+            # 待っている間により優先度の高いリクエストが来ていれば、そちらを先に送る
+            self._enqueue(request)
+            request = await self._next_request()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._send(request))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, request: _Request):
+        """1リクエストを送信し、失敗したら再送を予約する"""
+        try:
+            status, body, retry_after = await self._post(request)
+        except aiohttp.ClientConnectorError as e:
+            # 接続できなかった（リクエストはサーバーに届いていない）ので、再送しても二重に投稿されない
+            status, body, retry_after = None, str(e), None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # 投稿が作られた後で応答だけが失われた可能性があるため再送しない
+            self.stats['failed'] += 1
+            logger.error(f"{request.endpoint} の応答を受け取れませんでした（再送しません）: {e!r}")
+            self._finish(request, error=ReplyError(f"{request.endpoint}: {e!r}"))
+            return
+        except Exception as e:
+            # 想定外のエラーは再送せず、待っている呼び出し元に返す
+            self.stats['failed'] += 1
+            logger.exception(f"{request.endpoint} の送信中にエラーが発生しました: {e}")
+            self._finish(request, error=e)
+            return
+        finally:
+            self._slots.release()
+
+        if status is not None and status < 400:
+            self._finish(request, result=body)
+            self.stats['sent'] += 1
+            return
+
+        retryable = status is None or status == 429 or status >= 500
+        if not retryable or request.attempt >= self.max_retries:
+            self.stats['failed'] += 1
+            logger.error(f"{request.endpoint} の送信に失敗しました（status={status}）: {body}")
+            self._finish(request, error=ReplyError(f"{request.endpoint}: {body}", status))
+            return
+
+        delay = min(self.backoff_max, self.backoff_base * (2 ** request.attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if status == 429:
+            # 他のリクエストも一緒に止める
+            self.bucket.pause(delay)
+        request.attempt += 1
+        self.stats['retried'] += 1
+        logger.warning(f"{request.endpoint} を {delay:.1f}秒後に再送します"
+                       f"（status={status}、{request.attempt}/{self.max_retries}回目）")
+        asyncio.get_running_loop().call_later(delay, self._enqueue, request)
+
+    async def _post(self, request: _Request):
+        """API を呼び出す
+
+        Returns:
+            (ステータスコード, レスポンス, Retry-After の秒数)
+        """
+        url = f"{self.host}/api/{request.endpoint}"
+        async with self._session.post(url, json={**request.payload, 'i': self.token}) as response:
+            text = await response.text()
+            retry_after = None
+            if response.headers.get('Retry-After'):
+                try:
+                    retry_after = float(response.headers['Retry-After'])
+                except ValueError:
+                    pass
+            if response.status < 400 and text:
+                try:
+                    return response.status, json.loads(text), retry_after
+                except ValueError:
+                    pass
+            return response.status, text or None, retry_after
+
+    def _finish(self, request: _Request, result=None, error: Optional[Exception] = None):
+        if self._pending.get(request.key) is request:
+            del self._pending[request.key]
+        if not request.future.done():
+            if error is not None:
+                request.future.set_exception(error)
+                # 呼び出し元が先にキャンセルされていても「例外が取得されなかった」警告を出さない
+                request.future.exception()
+            else:
+                request.future.set_result(result)
+        if not self._pending:
+            self._idle.set()
+
+    async def flush(self):
+        """送信待ちのリクエストがすべて送信（または失敗）されるまで待つ"""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def close(self, drain: bool = True, timeout: Optional[float] = None):
+        """送信ループを停止し、セッションを閉じる
+
+        Args:
+            drain: 送信待ちのリクエストを送り終えてから停止するかどうか
+            timeout: drain の待ち時間の上限（秒、None で無制限）
+        """
+        if self._loop_task is None:
+            return
+        if drain:
+            try:
+                await asyncio.wait_for(self.flush(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"送信待ちのリクエスト {len(self._pending)}件を残して停止します")
+
+        self._loop_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(self._loop_task, *self._tasks, return_exceptions=True)
+        for request in list(self._pending.values()):
+            self._finish(request, error=ReplyError(f"{request.endpoint}: 送信前に停止しました"))
+        self._loop_task = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def queued(self) -> int:
+        """送信待ち・送信中のリクエスト数"""
+        return len(self._pending)
+
+
+def _note_field(note, name: str):
+    """note（辞書またはオブジェクト）から値を取り出す"""
+    if isinstance(note, dict):
+        return note.get(name)
+    return getattr(note, name, None)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静的アセットのURL解決モジュール
+
+build_assets.py が生成したマニフェスト（scripts/asset-manifest.json）を参照し、
+CSS・JavaScript などのパスをハッシュ付きのファイル名に変換します。
+各ビルドスクリプトはアセットのURLをすべて asset_url() 経由で出力します。
+
+画像については build_images.py のマニフェスト（img/variants/manifest.json）を参照し、
+縮小版の srcset を image_srcset() で返します。
+
+マニフェストがない場合や、登録されていないパスはそのまま返すため、
+build_assets.py を実行していない環境でも従来どおりのページが生成されます。
+"""
+
+from pathlib import Path
+import json
+from typing import Dict, Optional
+
+MANIFEST_PATH = Path(__file__).resolve().parent / 'asset-manifest.json'
+IMAGE_MANIFEST_PATH = Path(__file__).resolve().parent.parent / 'img' / 'variants' / 'manifest.json'
+
+_manifest: Optional[Dict[str, str]] = None
+_image_manifest: Optional[Dict[str, dict]] = None
+
+
+def load_asset_manifest(reload: bool = False) -> Dict[str, str]:
+    """
+    マニフェストを読み込む（2回目以降はキャッシュを返す）
+
+    Args:
+        reload: キャッシュを使わずに読み直すかどうか
+
+    Returns:
+        {元のURL: ハッシュ付きのURL} の辞書
+    """
+    global _manifest
+    if _manifest is None or reload:
+        _manifest = {}
+        if MANIFEST_PATH.exists():
+            try:
+                with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                    _manifest = json.load(f).get('assets', {})
+            except (OSError, ValueError) as e:
+                print(f'Warning: Could not read asset manifest: {e}')
+    return _manifest
+
+
+def asset_url(path: str) -> str:
+    """
+    アセットのURLをハッシュ付きのURLに変換
+
+    Args:
+        path: サイトルートからのURL（例: '/js/main.js'）
+
+    Returns:
+        ハッシュ付きのURL（例: '/js/main.3f9a2c1d.js'）。未登録ならそのまま
+    """
+    return load_asset_manifest().get(path, path)
+
+
+def load_image_manifest(reload: bool = False) -> Dict[str, dict]:
+    """
+    画像のマニフェストを読み込む（2回目以降はキャッシュを返す）
+
+    Returns:
+        {元画像のURL: {'width', 'height', 'variants': {形式: [[幅, URL], ...]}}} の辞書
+    """
+    global _image_manifest
+    if _image_manifest is None or reload:
+        _image_manifest = {}
+        if IMAGE_MANIFEST_PATH.exists():
+            try:
+                with open(IMAGE_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+                    _image_manifest = json.load(f).get('images', {})
+            except (OSError, ValueError) as e:
+                print(f'Warning: Could not read image manifest: {e}')
+    return _image_manifest
+
+
+def image_srcset(path: str, fmt: str = 'webp') -> Optional[str]:
+    """
+    画像の縮小版の srcset を返す
+
+    Args:
+        path: 元画像のサイトルートからのURL（例: '/img/original/ao-chan.jpg'）
+        fmt: 形式（'webp' / 'avif' / 'png' / 'jpg'）
+
+    Returns:
+        srcset の値（例: '/img/variants/original/ao-chan.1a2b3c4d.320w.webp 320w, ...'）。
+        縮小版がなければ None
+    """
+    entry = load_image_manifest().get(path)
+    variants = entry['variants'].get(fmt) if entry else None
+    if not variants:
+        return None
+    return ', '.join(f'{url} {width}w' for width, url in variants)
@@ -295,6 +295,12 @@ def parse_arguments():
         help='バックアップを作成しない'
     )
     
+    parser.add_argument(
+        '--embed-facades',
+        action='store_true',
+        help='埋め込みプレーヤーをクリックで読み込むファサードに置き換える'
+    )
+    
     parser.add_argument(
         '--stop-on-error',
         action='store_true',
@@ -326,6 +332,9 @@ def main():
     if args.no_backup:
         config['create_backup'] = False
     
+    if args.embed_facades:
+        config['embed_facades'] = True
+    
     continue_on_error = not args.stop_on_error
     
     # 実行情報を表示
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静的アセットのフィンガープリント生成スクリプト
+
+ビルドスクリプトが参照するCSS・JavaScriptなどを、内容のハッシュを含む
+ファイル名（例: js/main.js → js/main.3f9a2c1d.js）で同じディレクトリにコピーし、
+対応表を scripts/asset-manifest.json に書き出します。
+
+各ビルドスクリプト（build_month.py / build_year.py / build_tags.py）は
+asset_utils.asset_url() でこの対応表を参照し、ハッシュ付きのURLを出力します。
+URLが内容ごとに変わるため、ブラウザは長期間キャッシュでき、
+再訪問時の再検証リクエストが不要になります。
+
+手順:
+    1. python build_assets.py
+    2. 月別・年別・タグページを再生成
+
+古いハッシュのファイルは、どのHTMLからも参照されなくなってから
+--prune で削除します（再生成していないページが参照している可能性があるため）。
+
+Usage:
+    python build_assets.py [options]
+
+Example:
+    python build_assets.py
+    python build_assets.py --prune
+"""
+
+from pathlib import Path
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+from asset_utils import MANIFEST_PATH
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# フィンガープリントを付けるアセット（サイトルートからのURL）
+DEFAULT_ASSETS = [
+    '/1column.css',
+    '/favicon.svg',
+    '/js/jquery-3.6.0.min.js',
+    '/js/main.js',
+    '/js/mouse.js',
+    '/js/embed-facade.js',
+    '/luminous-basic.min.css',
+    '/Luminous.min.js',
+    '/txt/zakki/zakki-month.css',
+    '/txt/zakki/zakki-year.css',
+    '/txt/zakki/zakki-style.css',
+    '/txt/zakki/tag-style.css',
+    '/txt/zakki/tag/tag-controls.css',
+]
+
+HASH_LENGTH = 8
+
+
+def fingerprint_name(url: str, digest: str) -> str:
+    """
+    URLにハッシュを挿入（/js/main.js → /js/main.<hash>.js）
+    """
+    path = Path(url)
+    return (path.parent / f'{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}').as_posix()
+
+
+def load_manifest():
+    if MANIFEST_PATH.exists():
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def build_assets(root: Path, assets, debug=False):
+    """
+    アセットをハッシュ付きの名前でコピーし、マニフェストを更新
+
+    Args:
+        root: プロジェクトルート
+        assets: アセットのURLのリスト
+        debug: デバッグモード
+
+    Returns:
+        更新後のマニフェスト
+    """
+    manifest = load_manifest()
+    mapping = {}
+    history = manifest.get('history', {})
+    changed = 0
+
+    for url in assets:
+        source = root / url.lstrip('/')
+        if not source.exists():
+            print(f'Warning: Asset not found: {url}')
+            continue
+
+        digest = hashlib.sha256(source.read_bytes()).hexdigest()
+        hashed_url = fingerprint_name(url, digest)
+        target = root / hashed_url.lstrip('/')
+        mapping[url] = hashed_url
+
+        if not target.exists():
+            shutil.copy2(source, target)
+            changed += 1
+            print(f'  ✓ {url} → {hashed_url}')
+        elif debug:
+            print(f'  {url} → {hashed_url} (up to date)')
+
+        versions = history.setdefault(url, [])
+        if hashed_url not in versions:
+            versions.append(hashed_url)
+
+    manifest = {'assets': mapping, 'history': history}
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print(f'✓ {len(mapping)} asset(s), {changed} new fingerprinted file(s)')
+    print(f'✓ Manifest: {MANIFEST_PATH}')
+    return manifest
+
+
+def prune_assets(root: Path, manifest, debug=False):
+    """
+    どのHTMLからも参照されていない古いハッシュのファイルを削除
+
+    Args:
+        root: プロジェクトルート
+        manifest: build_assets() の結果
+    """
+    current = set(manifest.get('assets', {}).values())
+    stale = [
+        url
+        for versions in manifest.get('history', {}).values()
+        for url in versions
+        if url not in current
+    ]
+    if not stale:
+        print('✓ No stale assets')
+        return
+
+    referenced = set()
+    for html_path in root.rglob('*.html'):
+        if 'node_modules' in html_path.parts:
+            continue
+        text = html_path.read_text(encoding='utf-8', errors='replace')
+        for url in stale:
+            if url in text:
+                referenced.add(url)
+
+    removed = 0
+    for url in stale:
+        if url in referenced:
+            if debug:
+                print(f'  Keeping {url} (still referenced)')
+            continue
+        target = root / url.lstrip('/')
+        if target.exists():
+            target.unlink()
+        for versions in manifest['history'].values():
+            if url in versions:
+                versions.remove(url)
+        removed += 1
+        print(f'  ✓ Removed {url}')
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    print(f'✓ Removed {removed} stale asset(s), kept {len(referenced)} still referenced')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='静的アセットのフィンガープリント生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # ハッシュ付きのファイルとマニフェストを生成
+  python build_assets.py
+
+  # 参照されなくなった古いハッシュのファイルを削除
+  python build_assets.py --prune
+        '''
+    )
+
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help='どのHTMLからも参照されていない古いハッシュのファイルを削除'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('静的アセットのフィンガープリント生成スクリプト')
+    print('=' * 60)
+
+    manifest = build_assets(project_root, DEFAULT_ASSETS, debug=args.debug)
+    if args.prune:
+        prune_assets(project_root, manifest, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
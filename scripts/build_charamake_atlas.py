@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キャラメイクのパーツ画像のスプライトアトラス生成スクリプト
+
+game/charamake/parts-data.json が参照するパーツ画像を、カテゴリごとに
+数枚のアトラス画像（game/charamake/atlas/<カテゴリ>-<番号>.<ハッシュ>.png）にまとめます。
+各画像は透明な余白を切り詰めてから MaxRects 法（Best Short Side Fit）で詰め込み、
+アトラス上の位置と切り詰めた量（元の画像での位置）を
+parts-data.json の meta.atlas に書き込みます。
+
+game.js はアトラスがあるパーツをアトラスから切り出して描画するため、
+カテゴリを切り替えたときの画像の取得がレイヤーごとではなくカテゴリごとになります。
+元の画像と各レイヤーの file はそのまま残し、アトラスにないパーツ
+（GIFアニメ・PNG 以外・大きすぎる画像）は従来どおり読み込みます。
+
+カテゴリごとに元の画像の内容のハッシュを記録し、画像が変わったカテゴリだけを作り直します。
+パーツ画像を追加・変更したら、エディタでの編集後に再実行してください。
+
+Pillow が必要です。
+
+Usage:
+    python build_charamake_atlas.py [options]
+
+Example:
+    python build_charamake_atlas.py
+    python build_charamake_atlas.py --max-size 4096 --force
+"""
+
+from pathlib import Path
+import io
+import sys
+import json
+import hashlib
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+# Pillow は必須ではない（アトラスの生成時のみ必要）
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+CHARAMAKE_DIR = 'game/charamake'
+PARTS_DATA_FILENAME = 'parts-data.json'
+ATLAS_DIRNAME = 'atlas'
+
+# アトラス1枚の最大の幅・高さ（これより大きいパーツはアトラスに入れない）
+DEFAULT_MAX_SIZE = 2048
+
+# 画像の間の余白（隣の画像が描画に混ざらないように）
+PADDING = 2
+
+# アトラスの形式を変えたら上げる（全カテゴリを作り直す）
+ATLAS_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class MaxRectsBin:
+    """
+    MaxRects 法による長方形の詰め込み（Best Short Side Fit）
+
+    空き領域を重なりを許した長方形の集合として持ち、置いた長方形と重なる
+    空き領域を分割していきます。
+
+    Example:
+        packer = MaxRectsBin(2048, 2048)
+        position = packer.insert(120, 80)  # (x, y)。入らなければ None
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.free: List[Tuple[int, int, int, int]] = [(0, 0, width, height)]
+
+    def find_position(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        """余りの短い辺が最も小さくなる空き領域の左上を返す"""
+        best = None
+        best_score = None
+        for x, y, free_width, free_height in self.free:
+            if width > free_width or height > free_height:
+                continue
+            leftover_x = free_width - width
+            leftover_y = free_height - height
+            score = (min(leftover_x, leftover_y), max(leftover_x, leftover_y), y, x)
+            if best_score is None or score < best_score:
+                best, best_score = (x, y), score
+        return best
+
+    def insert(self, width: int, height: int) -> Optional[Tuple[int, int]]:
+        position = self.find_position(width, height)
+        if position is None:
+            return None
+        placed = (position[0], position[1], width, height)
+
+        free = []
+        for rect in self.free:
+            free.extend(self._split(rect, placed))
+        self.free = self._prune(free)
+        return position
+
+    @staticmethod
+    def _split(rect, placed):
+        """空き領域のうち、置いた長方形と重ならない部分（最大4つ）"""
+        x, y, width, height = rect
+        px, py, pw, ph = placed
+        if px >= x + width or px + pw <= x or py >= y + height or py + ph <= y:
+            return [rect]
+        pieces = []
+        if px > x:
+            pieces.append((x, y, px - x, height))
+        if px + pw < x + width:
+            pieces.append((px + pw, y, x + width - px - pw, height))
+        if py > y:
+            pieces.append((x, y, width, py - y))
+        if py + ph < y + height:
+            pieces.append((x, py + ph, width, y + height - py - ph))
+        return pieces
+
+    @staticmethod
+    def _prune(rects):
+        """他の空き領域に含まれる空き領域を削除"""
+        rects = sorted(set(rects), key=lambda r: r[2] * r[3], reverse=True)
+        kept = []
+        for x, y, width, height in rects:
+            if not any(kx <= x and ky <= y and x + width <= kx + kw and y + height <= ky + kh
+                       for kx, ky, kw, kh in kept):
+                kept.append((x, y, width, height))
+        return kept
+
+
+def pack_rects(sizes: Dict[str, Tuple[int, int]], max_size: int) -> List[Dict[str, Tuple[int, int]]]:
+    """
+    長方形を必要な枚数のページに詰め込む
+
+    Args:
+        sizes: {名前: (幅, 高さ)}（max_size 以下であること）
+        max_size: ページの最大の幅・高さ
+
+    Returns:
+        ページごとの {名前: (x, y)} のリスト
+    """
+    # 大きい順に置くと隙間が少なくなる
+    order = sorted(sizes, key=lambda name: (max(sizes[name]), sizes[name][0] * sizes[name][1], name), reverse=True)
+    pages: List[Tuple[MaxRectsBin, Dict[str, Tuple[int, int]]]] = []
+    for name in order:
+        width, height = sizes[name]
+        for packer, positions in pages:
+            position = packer.insert(width + PADDING, height + PADDING)
+            if position is not None:
+                positions[name] = position
+                break
+        else:
+            packer = MaxRectsBin(max_size + PADDING, max_size + PADDING)
+            pages.append((packer, {name: packer.insert(width + PADDING, height + PADDING)}))
+    return [positions for _, positions in pages]
+
+
+def collect_category_files(parts_data: dict) -> Dict[str, List[str]]:
+    """
+    カテゴリごとのパーツ画像の一覧
+
+    複数のカテゴリで使われている画像は、parts の中で最初に使われたカテゴリに入れます。
+    GIFアニメ（animated: true）と PNG 以外の画像は含めません（元の画像のまま読み込む）。
+
+    Returns:
+        {カテゴリID: [file, ...]}
+    """
+    categories: Dict[str, List[str]] = {}
+    seen = set()
+    for part in parts_data.get('parts', []):
+        for layer in part.get('layers') or []:
+            file = layer.get('file')
+            if not file or file in seen or layer.get('animated') or not file.lower().endswith('.png'):
+                continue
+            seen.add(file)
+            categories.setdefault(part.get('category', ''), []).append(file)
+    return categories
+
+
+def load_trimmed(path: Path):
+    """
+    画像を読み込み、透明な余白を切り詰める
+
+    Returns:
+        (切り詰めた画像または None（全面透明）, 元の幅, 元の高さ, 左の余白, 上の余白)
+    """
+    with Image.open(path) as image:
+        image = image.convert('RGBA')
+    bbox = image.getchannel('A').getbbox()
+    if bbox is None:
+        return None, image.width, image.height, 0, 0
+    return image.crop(bbox), image.width, image.height, bbox[0], bbox[1]
+
+
+def build_category(base_dir: Path, category: str, files: List[str], max_size: int, debug=False):
+    """
+    1カテゴリ分のアトラスを生成
+
+    Returns:
+        ({'pages': [{file, width, height}]}, {file: スプライト})
+    """
+    atlas_dir = base_dir / ATLAS_DIRNAME
+    images = {}
+    sprites = {}
+    for file in files:
+        trimmed, width, height, left, top = load_trimmed(base_dir / file)
+        sprite = {'width': width, 'height': height}
+        if trimmed is None:
+            # 全面透明（parts/none.png など）は画像を取得せずに描画できる
+            sprites[file] = sprite
+        elif trimmed.width > max_size or trimmed.height > max_size:
+            print(f'  Warning: {file} ({trimmed.width}x{trimmed.height}) is larger than the atlas; kept as a file')
+        else:
+            images[file] = trimmed
+            sprite.update({'dx': left, 'dy': top, 'w': trimmed.width, 'h': trimmed.height})
+            sprites[file] = sprite
+
+    pages = []
+    layout = pack_rects({file: image.size for file, image in images.items()}, max_size)
+    for number, positions in enumerate(layout):
+        page_width = max(x + images[file].width for file, (x, _) in positions.items())
+        page_height = max(y + images[file].height for file, (_, y) in positions.items())
+        page = Image.new('RGBA', (page_width, page_height), (0, 0, 0, 0))
+        for file, (x, y) in positions.items():
+            page.paste(images[file], (x, y))
+            sprites[file].update({'category': category, 'page': number, 'x': x, 'y': y})
+
+        buffer = io.BytesIO()
+        page.save(buffer, 'PNG', optimize=True)
+        data = buffer.getvalue()
+        name = f'{category}-{number}.{hashlib.sha256(data).hexdigest()[:8]}.png'
+        atlas_dir.mkdir(parents=True, exist_ok=True)
+        (atlas_dir / name).write_bytes(data)
+        pages.append({'file': f'{ATLAS_DIRNAME}/{name}', 'width': page_width, 'height': page_height})
+
+        if debug:
+            used = sum(images[file].width * images[file].height for file in positions)
+            print(f'    {name}: {len(positions)} image(s), {page_width}x{page_height}, '
+                  f'{used * 100 // (page_width * page_height)}% used')
+
+    return {'pages': pages}, sprites
+
+
+def build_charamake_atlas(root: Path, max_size=DEFAULT_MAX_SIZE, force=False, debug=False):
+    """
+    アトラスを生成して parts-data.json の meta.atlas を更新
+
+    Args:
+        root: プロジェクトルート
+        max_size: アトラス1枚の最大の幅・高さ
+        force: 変更がないカテゴリも作り直すかどうか
+        debug: デバッグモード
+    """
+    if not PIL_AVAILABLE:
+        print('Error: Pillow is not installed. Install with: pip install Pillow')
+        sys.exit(1)
+
+    base_dir = root / CHARAMAKE_DIR
+    data_path = base_dir / PARTS_DATA_FILENAME
+    if not data_path.exists():
+        print(f'Error: {data_path} not found')
+        sys.exit(1)
+    source_text = data_path.read_text(encoding='utf-8')
+    parts_data = json.loads(source_text)
+    meta = parts_data.setdefault('meta', {})
+
+    previous = meta.get('atlas') or {}
+    if force or previous.get('version') != ATLAS_VERSION or previous.get('maxSize') != max_size:
+        previous = {}
+    previous_categories = previous.get('categories', {})
+    previous_sprites = previous.get('sprites', {})
+
+    category_files = collect_category_files(parts_data)
+    print(f'Found {sum(len(f) for f in category_files.values())} image(s) in {len(category_files)} categor(ies)')
+
+    categories = {}
+    sprites = {}
+    rebuilt = 0
+    for category, files in category_files.items():
+        missing = [file for file in files if not (base_dir / file).exists()]
+        for file in missing:
+            print(f'  Warning: {file} not found; kept as a file')
+        files = [file for file in files if file not in missing]
+        if not files:
+            continue
+
+        digest = hashlib.sha256(json.dumps(
+            [[file, file_hash(base_dir / file)] for file in files]
+        ).encode('utf-8')).hexdigest()
+        old = previous_categories.get(category)
+        if old and old.get('hash') == digest and all(
+            (base_dir / page['file']).exists() for page in old['pages']
+        ) and all(file in previous_sprites for file in files):
+            categories[category] = old
+            sprites.update({file: previous_sprites[file] for file in files})
+            continue
+
+        print(f'  Packing {category}: {len(files)} image(s)')
+        entry, category_sprites = build_category(base_dir, category, files, max_size, debug)
+        categories[category] = {'hash': digest, **entry}
+        sprites.update(category_sprites)
+        rebuilt += 1
+
+    meta['atlas'] = {
+        'version': ATLAS_VERSION,
+        'maxSize': max_size,
+        'categories': categories,
+        'sprites': dict(sorted(sprites.items())),
+    }
+
+    # 使われなくなったアトラス画像を削除
+    referenced = {page['file'] for entry in categories.values() for page in entry['pages']}
+    removed = 0
+    atlas_dir = base_dir / ATLAS_DIRNAME
+    if atlas_dir.exists():
+        for path in atlas_dir.glob('*.png'):
+            if f'{ATLAS_DIRNAME}/{path.name}' not in referenced:
+                path.unlink()
+                removed += 1
+
+    # エディタの「JSON出力」と同じ形式（インデント2、末尾の改行なし）
+    text = json.dumps(parts_data, ensure_ascii=False, indent=2)
+    if text != source_text:
+        data_path.write_text(text, encoding='utf-8')
+        print(f'✓ Updated: {data_path}')
+
+    page_count = sum(len(entry['pages']) for entry in categories.values())
+    packed = sum(1 for sprite in sprites.values() if 'page' in sprite)
+    print(f'\n✓ {packed} image(s) in {page_count} atlas page(s) '
+          f'({rebuilt} categor(ies) rebuilt, {len(categories) - rebuilt} unchanged, {removed} old page(s) removed)')
+    print(f'✓ Output: {atlas_dir}')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='キャラメイクのパーツ画像のスプライトアトラス生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 画像が変わったカテゴリのアトラスを作り直す
+  python build_charamake_atlas.py
+
+  # アトラス1枚の大きさを 4096px までにして全カテゴリを作り直す
+  python build_charamake_atlas.py --max-size 4096 --force
+        '''
+    )
+
+    parser.add_argument(
+        '--max-size',
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+        help=f'アトラス1枚の最大の幅・高さ（デフォルト: {DEFAULT_MAX_SIZE}）'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='変更がないカテゴリも作り直す'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('キャラメイクのパーツ画像のスプライトアトラス生成スクリプト')
+    print('=' * 60)
+
+    build_charamake_atlas(project_root, max_size=args.max_size, force=args.force, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
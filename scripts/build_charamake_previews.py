@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キャラメイクのプリセットのプレビュー画像生成スクリプト
+
+game.js がブラウザで行っているレイヤーの合成（zIndex 順の重ね合わせ・色設定・色相回転・
+レイヤーの合成モード）を NumPy で再現し、キャラクターの完成画像を事前に生成します。
+
+対象のキャラクター:
+- デフォルト（game.js の初期選択: 各カテゴリの最初のパーツ）
+- game/charamake/presets/*.json（ゲームの「キャラクター保存」で保存した character.json と同じ形式。
+  "name" があれば表示名に使う）
+
+出力（game/charamake/previews/）:
+- <ハッシュ>.png / <ハッシュ>.webp: キャンバスと同じ大きさのプレビュー
+- <ハッシュ>.thumb.png / <ハッシュ>.thumb.webp: サムネイル
+- index.json: プリセットごとの画像の一覧
+
+ファイル名は合成するレイヤーの一覧（画像の内容のハッシュ・zIndex・色設定など）のハッシュで、
+同じハッシュの画像が既にあれば合成しません。合成は複数プロセスで並列に行います。
+
+NumPy と Pillow が必要です。
+
+Usage:
+    python build_charamake_previews.py [options]
+
+Example:
+    python build_charamake_previews.py
+    python build_charamake_previews.py --jobs 4 --thumbnail-width 160
+"""
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import json
+import hashlib
+import argparse
+from typing import List, Optional
+
+# NumPy と Pillow は必須ではない（プレビューの生成時のみ必要）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+CHARAMAKE_DIR = 'game/charamake'
+PARTS_DATA_FILENAME = 'parts-data.json'
+PRESETS_DIRNAME = 'presets'
+PREVIEWS_DIRNAME = 'previews'
+DEFAULT_PRESET_ID = 'default'
+
+DEFAULT_THUMBNAIL_WIDTH = 200
+WEBP_QUALITY = 85
+
+# 合成の内容を変えたら上げる（全プレビューを作り直す）
+RENDER_VERSION = 1
+
+SEPARABLE_MODES = {
+    'multiply', 'screen', 'overlay', 'darken', 'lighten', 'color-dodge', 'color-burn',
+    'hard-light', 'soft-light', 'difference', 'exclusion',
+}
+NON_SEPARABLE_MODES = {'hue', 'saturation', 'color', 'luminosity'}
+
+
+# ------------------------------------------------------------
+# パーツの選択（game.js と同じ処理）
+# ------------------------------------------------------------
+
+def find_category(parts_data: dict, category_id: str) -> Optional[dict]:
+    return next((c for c in parts_data.get('categories', []) if c.get('id') == category_id), None)
+
+
+def find_part(parts_data: dict, part_id: str) -> Optional[dict]:
+    return next((p for p in parts_data.get('parts', []) if p.get('id') == part_id), None)
+
+
+def default_selection(parts_data: dict) -> dict:
+    """initializeDefaultSelections(): hidden でない各カテゴリの最初のパーツ"""
+    state = {'selected': {}, 'colors': {}, 'custom': {}, 'side': {}}
+    for category in parts_data.get('categories', []):
+        if category.get('hidden'):
+            continue
+        first = next((p for p in parts_data.get('parts', []) if p.get('category') == category['id']), None)
+        if first:
+            if category.get('selectionMode') == 'multiple':
+                state['selected'][category['id']] = [first['id']]
+            else:
+                state['selected'][category['id']] = first['id']
+                state['colors'][first['id']] = 'normal'
+    return state
+
+
+def character_selection(parts_data: dict, character: dict) -> dict:
+    """handleCharacterFileSelect(): character.json の選択を復元"""
+    state = {'selected': {}, 'colors': {}, 'custom': {}, 'side': {}}
+    for category_id, info in character.items():
+        category = find_category(parts_data, category_id)
+        if category and category.get('selectionMode') == 'multiple':
+            state['selected'][category_id] = info
+        elif isinstance(info, str):
+            state['selected'][category_id] = info
+            state['colors'][info] = 'normal'
+        else:
+            part_id = info.get('id')
+            state['selected'][category_id] = part_id
+            if info.get('side'):
+                state['side'][part_id] = info['side']
+            if info.get('color') == 'custom':
+                state['colors'][part_id] = 'custom'
+                state['custom'][part_id] = {
+                    'blend': info.get('blend'),
+                    'color': info.get('colorValue'),
+                    'opacity': info.get('opacity'),
+                    'hueShift': info.get('hueShift') or 0,
+                    'hueOpacity': info.get('hueOpacity') or 0,
+                }
+            else:
+                state['colors'][part_id] = info.get('color') or 'normal'
+    return state
+
+
+def selected_part_ids(parts_data: dict, selected: dict) -> List[str]:
+    ids = []
+    for category_id, selection in selected.items():
+        category = find_category(parts_data, category_id)
+        if category and category.get('selectionMode') == 'multiple':
+            ids.extend(selection)
+        elif selection:
+            ids.append(selection)
+    return ids
+
+
+def process_dependencies(parts_data: dict, state: dict):
+    """processDependencies(): unlocks / hides を反映（新しく解放されたカテゴリは最初のパーツを選択）"""
+    unlocked = set()
+    hidden_by_parts = set()
+    for part_id in selected_part_ids(parts_data, state['selected']):
+        part = find_part(parts_data, part_id)
+        if not part:
+            continue
+        unlocked.update(part.get('unlocks') or [])
+        hidden_by_parts.update(part.get('hides') or [])
+    hidden_by_parts -= unlocked
+
+    for category_id in unlocked:
+        category = find_category(parts_data, category_id)
+        if not category:
+            continue
+        selection = state['selected'].get(category_id)
+        if selection:
+            continue
+        first = next((p for p in parts_data.get('parts', []) if p.get('category') == category_id), None)
+        if first:
+            if category.get('selectionMode') == 'multiple':
+                state['selected'][category_id] = [first['id']]
+            else:
+                state['selected'][category_id] = first['id']
+                state['colors'][first['id']] = 'normal'
+    state['hidden_by_parts'] = hidden_by_parts
+
+
+def is_category_visible(parts_data: dict, state: dict, category: dict) -> bool:
+    """isCategoryVisible()"""
+    if category['id'] in state.get('hidden_by_parts', set()):
+        return False
+    if category.get('hidden'):
+        return any(
+            category['id'] in ((find_part(parts_data, part_id) or {}).get('unlocks') or [])
+            for part_id in selected_part_ids(parts_data, state['selected'])
+        )
+    return True
+
+
+def color_settings(part: dict, state: dict) -> Optional[dict]:
+    """getColorSettings()"""
+    selected = state['colors'].get(part['id'])
+    if not selected or selected == 'normal':
+        return None
+    if selected == 'custom':
+        return state['custom'].get(part['id'])
+    return (part.get('colors') or {}).get(selected)
+
+
+def collect_layers(parts_data: dict, state: dict) -> List[dict]:
+    """collectAllLayers(): 描画するレイヤー（zIndex 順、同じ zIndex は選択の順）"""
+    layers = []
+    for category_id, selection in state['selected'].items():
+        category = find_category(parts_data, category_id)
+        if not category or not is_category_visible(parts_data, state, category):
+            continue
+        part_ids = selection if category.get('selectionMode') == 'multiple' else [selection]
+        for part_id in part_ids:
+            part = find_part(parts_data, part_id)
+            if not part or not part.get('layers'):
+                continue
+            settings = color_settings(part, state)
+            side = state['side'].get(part_id, 'both')
+            for layer in part['layers']:
+                if layer.get('side') and side != 'both' and layer['side'] != side:
+                    continue
+                if not layer.get('file'):
+                    continue
+                layers.append({
+                    'file': layer['file'],
+                    'zIndex': layer.get('zIndex') or part.get('zIndex', 0),
+                    'blendMode': layer.get('blendMode') or 'source-over',
+                    'colorSettings': settings,
+                })
+    return sorted(layers, key=lambda layer: layer['zIndex'])
+
+
+# ------------------------------------------------------------
+# 合成（Canvas 2D の globalCompositeOperation と同じ計算）
+# ------------------------------------------------------------
+
+def parse_color(value: str):
+    """'#rrggbb' / '#rgb' を 0〜1 の RGB に変換（それ以外は None）"""
+    if not isinstance(value, str) or not value.startswith('#'):
+        return None
+    digits = value[1:]
+    if len(digits) == 3:
+        digits = ''.join(c * 2 for c in digits)
+    if len(digits) != 6:
+        return None
+    try:
+        return np.array([int(digits[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float32) / 255
+    except ValueError:
+        return None
+
+
+def _lum(c):
+    return c[..., 0] * 0.3 + c[..., 1] * 0.59 + c[..., 2] * 0.11
+
+
+def _clip_color(c):
+    lum = _lum(c)[..., None]
+    low = c.min(axis=-1, keepdims=True)
+    high = c.max(axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = np.where(low < 0, lum + (c - lum) * lum / (lum - low), c)
+        c = np.where(high > 1, lum + (c - lum) * (1 - lum) / (high - lum), c)
+    return np.nan_to_num(c)
+
+
+def _set_lum(c, lum):
+    return _clip_color(c + lum - _lum(c)[..., None])
+
+
+def _sat(c):
+    return c.max(axis=-1) - c.min(axis=-1)
+
+
+def _set_sat(c, sat):
+    order = np.argsort(c, axis=-1)
+    ordered = np.take_along_axis(c, order, axis=-1)
+    low, mid, high = ordered[..., 0], ordered[..., 1], ordered[..., 2]
+    span = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_mid = np.where(span > 0, (mid - low) * sat / span, 0)
+    new_high = np.where(span > 0, sat, 0)
+    result = np.empty_like(c)
+    np.put_along_axis(result, order, np.stack([np.zeros_like(low), new_mid, new_high], axis=-1), axis=-1)
+    return result
+
+
+def blend(mode: str, cb, cs):
+    """合成モードの B(Cb, Cs)（W3C Compositing and Blending）"""
+    cs = np.broadcast_to(cs, cb.shape)
+    if mode == 'multiply':
+        return cb * cs
+    if mode == 'screen':
+        return cb + cs - cb * cs
+    if mode == 'overlay':
+        return blend('hard-light', cs, cb)
+    if mode == 'darken':
+        return np.minimum(cb, cs)
+    if mode == 'lighten':
+        return np.maximum(cb, cs)
+    if mode == 'color-dodge':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.minimum(1, cb / (1 - cs))
+        return np.where(cb == 0, 0, np.where(cs >= 1, 1, result))
+    if mode == 'color-burn':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = 1 - np.minimum(1, (1 - cb) / cs)
+        return np.where(cb >= 1, 1, np.where(cs <= 0, 0, result))
+    if mode == 'hard-light':
+        return np.where(cs <= 0.5, cb * 2 * cs, blend('screen', cb, 2 * cs - 1))
+    if mode == 'soft-light':
+        d = np.where(cb <= 0.25, ((16 * cb - 12) * cb + 4) * cb, np.sqrt(cb))
+        return np.where(cs <= 0.5, cb - (1 - 2 * cs) * cb * (1 - cb), cb + (2 * cs - 1) * (d - cb))
+    if mode == 'difference':
+        return np.abs(cb - cs)
+    if mode == 'exclusion':
+        return cb + cs - 2 * cb * cs
+    if mode == 'hue':
+        return _set_lum(_set_sat(cs, _sat(cb)), _lum(cb)[..., None])
+    if mode == 'saturation':
+        return _set_lum(_set_sat(cb, _sat(cs)), _lum(cb)[..., None])
+    if mode == 'color':
+        return _set_lum(cs, _lum(cb)[..., None])
+    if mode == 'luminosity':
+        return _set_lum(cb, _lum(cs)[..., None])
+    return cs
+
+
+def composite(dst, src, mode: str = 'source-over', alpha: float = 1.0):
+    """
+    src を dst に重ねる（RGBA、0〜1、乗算済みでない値）
+
+    mode が合成モード（multiply など）の場合は source-over で重ねる前に色を混ぜる。
+    source-atop は dst の不透明度を保ったまま重ねる。
+    """
+    cb, ab = dst[..., :3], dst[..., 3:]
+    cs, as_ = src[..., :3], src[..., 3:] * alpha
+
+    if mode == 'source-atop':
+        ao = ab
+        co = as_ * cs * ab + ab * cb * (1 - as_)
+    else:
+        if mode in SEPARABLE_MODES or mode in NON_SEPARABLE_MODES:
+            cs = (1 - ab) * cs + ab * blend(mode, cb, cs)
+        ao = as_ + ab * (1 - as_)
+        co = as_ * cs + ab * cb * (1 - as_)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        color = np.where(ao > 0, co / ao, 0)
+    return np.concatenate([color, ao], axis=-1)
+
+
+def quantize(image):
+    """Canvas と同じく 8bit に丸める"""
+    return np.round(np.clip(image, 0, 1) * 255) / 255
+
+
+def apply_hue_shift(image, hue_shift: float, hue_opacity: float):
+    """applyHueShift(): 不透明度が0でない画素の色相を回転して元の色と混ぜる"""
+    rgb = image[..., :3]
+    high = rgb.max(axis=-1)
+    low = rgb.min(axis=-1)
+    lightness = (high + low) / 2
+    d = high - low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        saturation = np.where(d == 0, 0, np.where(lightness > 0.5, d / (2 - high - low), d / (high + low)))
+        r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+        hue = np.where(
+            high == r, ((g - b) / d + np.where(g < b, 6, 0)) / 6,
+            np.where(high == g, ((b - r) / d + 2) / 6, ((r - g) / d + 4) / 6)
+        )
+    hue = np.where(d == 0, 0, hue)
+    hue = np.mod(hue + hue_shift / 360, 1.0)
+
+    q = np.where(lightness < 0.5, lightness * (1 + saturation), lightness + saturation - lightness * saturation)
+    p = 2 * lightness - q
+
+    def hue_to_rgb(t):
+        t = np.where(t < 0, t + 1, np.where(t > 1, t - 1, t))
+        return np.where(t < 1 / 6, p + (q - p) * 6 * t,
+                        np.where(t < 1 / 2, q, np.where(t < 2 / 3, p + (q - p) * (2 / 3 - t) * 6, p)))
+
+    shifted = np.stack([hue_to_rgb(hue + 1 / 3), hue_to_rgb(hue), hue_to_rgb(hue - 1 / 3)], axis=-1)
+    shifted = np.where((saturation == 0)[..., None], lightness[..., None], shifted)
+    mixed = np.round((rgb + (shifted - rgb) * hue_opacity) * 255) / 255
+    visible = (image[..., 3:] > 0)
+    return np.concatenate([np.where(visible, mixed, rgb), image[..., 3:]], axis=-1)
+
+
+def load_layer(path: Path, width: int, height: int):
+    """画像をキャンバスの大きさ（左上基準、はみ出しは切り捨て）の配列として読み込む"""
+    with Image.open(path) as image:
+        image = image.convert('RGBA')
+    canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    canvas.paste(image, (0, 0))
+    return np.asarray(canvas, dtype=np.float32) / 255
+
+
+def render_layers(base_dir: Path, layers: List[dict], width: int, height: int):
+    """drawLayers(): レイヤーを順に重ねた画像（RGBA、0〜1）"""
+    result = np.zeros((height, width, 4), dtype=np.float32)
+    for layer in layers:
+        path = base_dir / layer['file']
+        if not path.exists():
+            continue
+        image = load_layer(path, width, height)
+        settings = layer.get('colorSettings') or {}
+        color = parse_color(settings.get('color')) if settings.get('blend') else None
+        has_hue = settings.get('hueShift') not in (None, 0) and (settings.get('hueOpacity') or 0) > 0
+
+        if color is not None:
+            # 白背景で不透明にしてから色を混ぜ、元の不透明度のまま不透明度 opacity で重ねる
+            white = np.ones_like(image)
+            opaque = composite(white, image)
+            fill = np.concatenate([np.broadcast_to(color, image.shape[:2] + (3,)),
+                                   np.ones(image.shape[:2] + (1,), dtype=np.float32)], axis=-1)
+            opaque = quantize(composite(opaque, fill, settings['blend']))
+            opacity = settings.get('opacity')
+            image = quantize(composite(image, opaque, 'source-atop', 1.0 if opacity is None else opacity))
+        if has_hue:
+            image = apply_hue_shift(quantize(image), settings['hueShift'], settings['hueOpacity'])
+
+        result = quantize(composite(result, image, layer.get('blendMode') or 'source-over'))
+    return result
+
+
+def render_preview(task):
+    """
+    1キャラクター分のプレビューとサムネイルを書き出す（プロセスプールで実行）
+
+    Args:
+        task: (キャラメイクのディレクトリ, レイヤー, 幅, 高さ, 出力先のディレクトリ, ハッシュ, サムネイルの幅)
+
+    Returns:
+        サムネイルの (幅, 高さ)
+    """
+    base_dir, layers, width, height, output_dir, digest, thumbnail_width = task
+    pixels = render_layers(Path(base_dir), layers, width, height)
+    image = Image.fromarray(np.round(pixels * 255).astype(np.uint8), 'RGBA')
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    image.save(output_dir / f'{digest}.png', 'PNG', optimize=True)
+    image.save(output_dir / f'{digest}.webp', 'WEBP', quality=WEBP_QUALITY, method=6)
+
+    thumbnail_height = max(1, round(height * thumbnail_width / width))
+    thumbnail = image.resize((thumbnail_width, thumbnail_height), Image.LANCZOS)
+    thumbnail.save(output_dir / f'{digest}.thumb.png', 'PNG', optimize=True)
+    thumbnail.save(output_dir / f'{digest}.thumb.webp', 'WEBP', quality=WEBP_QUALITY, method=6)
+    return thumbnail.size
+
+
+# ------------------------------------------------------------
+# ビルド
+# ------------------------------------------------------------
+
+def file_hash(path: Path) -> Optional[str]:
+    return hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+
+
+def layers_hash(base_dir: Path, layers: List[dict], width: int, height: int, thumbnail_width: int) -> str:
+    """レイヤーの一覧（画像の内容を含む）から出力のファイル名に使うハッシュを作る"""
+    key = [RENDER_VERSION, width, height, thumbnail_width, [
+        [layer['file'], file_hash(base_dir / layer['file']), layer['zIndex'],
+         layer['blendMode'], layer['colorSettings']]
+        for layer in layers
+    ]]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def load_presets(parts_data: dict, presets_dir: Path) -> List[dict]:
+    """
+    プレビューを作るキャラクターの一覧
+
+    Returns:
+        [{'id', 'name', 'source', 'state'}, ...]
+    """
+    presets = [{
+        'id': DEFAULT_PRESET_ID,
+        'name': 'デフォルト',
+        'source': None,
+        'state': default_selection(parts_data),
+    }]
+    for path in sorted(presets_dir.glob('*.json')) if presets_dir.exists() else []:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f'  Warning: Could not read {path.name}: {e}')
+            continue
+        if not isinstance(data.get('character'), dict):
+            print(f'  Warning: {path.name} has no "character" object; skipped')
+            continue
+        presets.append({
+            'id': path.stem,
+            'name': data.get('name') or path.stem,
+            'source': f'{PRESETS_DIRNAME}/{path.name}',
+            'state': character_selection(parts_data, data['character']),
+        })
+    return presets
+
+
+def build_charamake_previews(root: Path, config):
+    """
+    プレビューを生成して previews/index.json を書き出す
+
+    Args:
+        root: プロジェクトルート
+        config: 設定辞書（jobs, thumbnail_width, force, debug）
+    """
+    if not NUMPY_AVAILABLE:
+        print('Error: NumPy is not installed. Install with: pip install numpy')
+        sys.exit(1)
+    if not PIL_AVAILABLE:
+        print('Error: Pillow is not installed. Install with: pip install Pillow')
+        sys.exit(1)
+
+    base_dir = root / CHARAMAKE_DIR
+    data_path = base_dir / PARTS_DATA_FILENAME
+    if not data_path.exists():
+        print(f'Error: {data_path} not found')
+        sys.exit(1)
+    with open(data_path, 'r', encoding='utf-8') as f:
+        parts_data = json.load(f)
+
+    meta = parts_data.get('meta', {})
+    width = meta.get('canvasWidth') or 800
+    height = meta.get('canvasHeight') or 900
+    thumbnail_width = config.get('thumbnail_width', DEFAULT_THUMBNAIL_WIDTH)
+    output_dir = base_dir / PREVIEWS_DIRNAME
+    index_path = output_dir / 'index.json'
+
+    previous = {}
+    if index_path.exists() and not config.get('force'):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                previous = {entry['hash']: entry for entry in json.load(f).get('presets', [])}
+        except (OSError, ValueError, KeyError) as e:
+            print(f'Warning: Could not read {index_path}: {e}')
+
+    presets = load_presets(parts_data, base_dir / PRESETS_DIRNAME)
+    print(f'Found {len(presets)} character(s) ({width}x{height})')
+
+    entries = []
+    tasks = {}
+    for preset in presets:
+        process_dependencies(parts_data, preset['state'])
+        layers = collect_layers(parts_data, preset['state'])
+        digest = layers_hash(base_dir, layers, width, height, thumbnail_width)
+        entry = {
+            'id': preset['id'],
+            'name': preset['name'],
+            'hash': digest,
+            'layers': len(layers),
+            'png': f'{PREVIEWS_DIRNAME}/{digest}.png',
+            'webp': f'{PREVIEWS_DIRNAME}/{digest}.webp',
+            'thumbnail': {
+                'png': f'{PREVIEWS_DIRNAME}/{digest}.thumb.png',
+                'webp': f'{PREVIEWS_DIRNAME}/{digest}.thumb.webp',
+            },
+        }
+        if preset['source']:
+            entry['source'] = preset['source']
+        entries.append(entry)
+
+        old = previous.get(digest)
+        outputs = [entry['png'], entry['webp'], entry['thumbnail']['png'], entry['thumbnail']['webp']]
+        if old and all((base_dir / output).exists() for output in outputs):
+            entry['thumbnail'].update({k: old['thumbnail'][k] for k in ('width', 'height')})
+            continue
+        tasks.setdefault(digest, (str(base_dir), layers, width, height, str(output_dir), digest, thumbnail_width))
+
+    print(f'Rendering {len(tasks)} preview(s) ({len(entries) - len(tasks)} unchanged)')
+
+    failed = set()
+    sizes = {}
+    if tasks:
+        with ProcessPoolExecutor(max_workers=config.get('jobs')) as executor:
+            futures = {digest: executor.submit(render_preview, task) for digest, task in tasks.items()}
+            for digest, future in futures.items():
+                try:
+                    sizes[digest] = future.result()
+                except Exception as e:
+                    failed.add(digest)
+                    print(f'  Error rendering {digest}: {e}')
+
+    index = []
+    for entry in entries:
+        if entry['hash'] in failed:
+            continue
+        if entry['hash'] in sizes:
+            entry['thumbnail']['width'], entry['thumbnail']['height'] = sizes[entry['hash']]
+            if config.get('debug'):
+                print(f'  ✓ {entry["id"]}: {entry["layers"]} layer(s) -> {entry["png"]}')
+        index.append(entry)
+
+    # 使われなくなった画像を削除
+    referenced = {Path(entry[key]).name for entry in index for key in ('png', 'webp')}
+    referenced |= {Path(entry['thumbnail'][key]).name for entry in index for key in ('png', 'webp')}
+    removed = 0
+    if output_dir.exists():
+        for path in output_dir.iterdir():
+            if path.suffix in ('.png', '.webp') and path.name not in referenced:
+                path.unlink()
+                removed += 1
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': RENDER_VERSION,
+            'width': width,
+            'height': height,
+            'presets': index,
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f'\n✓ {len(index)} preview(s), {len(sizes)} rendered, {removed} old file(s) removed')
+    print(f'✓ Index: {index_path}')
+    if failed:
+        print(f'Warning: {len(failed)} preview(s) failed')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='キャラメイクのプリセットのプレビュー画像生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 変わったキャラクターのプレビューだけ生成
+  python build_charamake_previews.py
+
+  # 4プロセスで、幅160pxのサムネイルを生成
+  python build_charamake_previews.py --jobs 4 --thumbnail-width 160
+        '''
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='並列に処理するプロセス数（デフォルト: CPU数）'
+    )
+
+    parser.add_argument(
+        '--thumbnail-width',
+        type=int,
+        default=DEFAULT_THUMBNAIL_WIDTH,
+        help=f'サムネイルの幅（デフォルト: {DEFAULT_THUMBNAIL_WIDTH}）'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='変更がないプレビューも作り直す'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    config = {
+        'jobs': args.jobs,
+        'thumbnail_width': args.thumbnail_width,
+        'force': args.force,
+        'debug': args.debug,
+    }
+
+    print('=' * 60)
+    print('キャラメイクのプリセットのプレビュー画像生成スクリプト')
+    print('=' * 60)
+
+    build_charamake_previews(project_root, config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+クリティカルCSSのインライン化スクリプト
+
+公開用ディレクトリ（dist/）のページ（日別・月別・年別・タグ・タグ一覧）の <head> にあるCSSのうち、
+実際のマークアップに一致するルールだけを <style data-critical> として埋め込み、
+元の <link rel="stylesheet"> は非同期読み込み（media="print" → onload で切り替え）に変えます。
+最初の描画が 1column.css などのCSS全体のダウンロードを待たなくなります。
+編集するソース（リポジトリ内のファイル）は変更しません。
+
+- セレクタの判定は css_utils の簡易マッチングで行います（判定は広めに一致する側に倒れます）
+- 判定結果はページ種別とCSSの組み合わせごとに scripts/.build_cache/critical_css.json に
+  保存します。要素の「形」（祖先のタグ名・ID・クラス・属性名）単位で記録するため、
+  新しい形の要素が出てきたときだけセレクタを判定し直します
+- 同じ種別のページには同じクリティカルCSSを埋め込みます
+- 何度実行しても結果は同じです（前回埋め込んだ内容は取り除いてから作り直します）
+- 書き換えたページの .gz / .br は作り直します
+
+build_minify.py の後（build_service_worker.py・deploy.py の前）に実行してください。
+
+Usage:
+    python build_critical_css.py [options]
+
+Example:
+    python build_critical_css.py
+    python build_critical_css.py --type month --type tag
+    python build_critical_css.py --output-dir ../dist --dry-run --debug
+"""
+
+from bs4 import BeautifulSoup
+from pathlib import Path
+from urllib.parse import urlparse
+import sys
+import re
+import json
+import hashlib
+import argparse
+from css_utils import flatten_stylesheet, parse_selector, element_path, matches_path
+from build_minify import minify_css, compress_file, BROTLI_AVAILABLE
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# キャッシュの形式が変わったら上げる（古いキャッシュは使わない）
+CACHE_VERSION = 1
+
+# ページ種別 → 対象のHTML（公開用ディレクトリからの glob）
+PAGE_TYPES = {
+    'day': ['txt/zakki/*/*/days/*.html'],
+    'month': ['txt/zakki/*/*/????-??.html'],
+    'year': ['txt/zakki/*/????.html'],
+    'tag': ['txt/zakki/tag/*.html'],
+    'tag_main': ['txt/zakki/tag/tag_main.html'],
+}
+
+# 種別の glob に一致しても対象外にするファイル（公開用ディレクトリからの相対パス）
+EXCLUDE_PAGES = {
+    'tag': ['txt/zakki/tag/tag_main.html'],
+}
+
+HEAD_PATTERN = re.compile(r'<head\b[^>]*>.*?</head\s*>', re.S | re.I)
+LINK_PATTERN = re.compile(r'<link\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.I)
+ATTR_PATTERN = re.compile(r'([\w:-]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+CRITICAL_STYLE_PATTERN = re.compile(r'[ \t]*<style data-critical>.*?</style>\n?', re.S)
+CRITICAL_NOSCRIPT_PATTERN = re.compile(r'<noscript data-critical>.*?</noscript>', re.S)
+ASYNC_MEDIA_PATTERN = re.compile(r"this\.media='([^']*)'")
+URL_PATTERN = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+
+# 形を記録しない要素（描画されない）
+SKIP_ELEMENTS = ('head', 'script', 'style', 'template', 'noscript')
+
+# 内容に関係なく常にクリティカルとみなす @ルール（名前で参照されるもの）
+REFERENCED_AT_RULES = ('@font-face', '@keyframes', '@-webkit-keyframes', '@property', '@counter-style')
+
+
+def expand_page_type(root: Path, page_type: str):
+    """
+    ページ種別の対象HTMLを列挙
+    """
+    excluded = {root / p for p in EXCLUDE_PAGES.get(page_type, [])}
+    paths = set()
+    for pattern in PAGE_TYPES[page_type]:
+        for path in root.glob(pattern):
+            if path.is_file() and path not in excluded:
+                paths.add(path)
+    return sorted(paths)
+
+
+def parse_attrs(attrs: str) -> dict:
+    """
+    タグの属性文字列を {name: value} に変換（値のない属性は空文字列）
+    """
+    result = {}
+    for match in ATTR_PATTERN.finditer(attrs):
+        name = match.group(1).lower()
+        value = next((g for g in match.groups()[1:] if g is not None), '')
+        result[name] = value
+    return result
+
+
+def strip_critical(html: str) -> str:
+    """
+    前回埋め込んだクリティカルCSSを取り除き、<link> を元の形に戻す
+    """
+    html = CRITICAL_STYLE_PATTERN.sub('', html)
+    html = CRITICAL_NOSCRIPT_PATTERN.sub('', html)
+
+    def restore(match):
+        attrs = parse_attrs(match.group(1))
+        if 'data-critical' not in attrs:
+            return match.group(0)
+        media = ASYNC_MEDIA_PATTERN.search(attrs.get('onload', ''))
+        media_attr = f' media="{media.group(1)}"' if media and media.group(1) != 'all' else ''
+        return f'<link rel="stylesheet" href="{attrs.get("href", "")}"{media_attr}>'
+
+    return LINK_PATTERN.sub(restore, html)
+
+
+def resolve_local(href: str, page_path: Path, root: Path):
+    """
+    href をローカルのファイルパスに変換（外部URLは None）
+    """
+    parsed = urlparse(href)
+    if parsed.scheme or parsed.netloc:
+        return None
+    if parsed.path.startswith('/'):
+        return root / parsed.path.lstrip('/')
+    return (page_path.parent / parsed.path).resolve()
+
+
+def find_stylesheets(html: str, page_path: Path, root: Path):
+    """
+    <head> 内のローカルのCSSへのリンクを列挙
+
+    Returns:
+        [((開始位置, 終了位置), href, media, CSSファイルのパス), ...]（文書順、位置はHTML全体での位置）
+    """
+    head = HEAD_PATTERN.search(html)
+    if not head:
+        return []
+    links = []
+    for match in LINK_PATTERN.finditer(html, head.start(), head.end()):
+        attrs = parse_attrs(match.group(1))
+        if 'stylesheet' not in attrs.get('rel', '').lower().split() or not attrs.get('href'):
+            continue
+        css_path = resolve_local(attrs['href'], page_path, root)
+        if css_path and css_path.is_file():
+            links.append((match.span(), attrs['href'], attrs.get('media', 'all') or 'all', css_path))
+    return links
+
+
+def absolutize_urls(body: str, css_url: str) -> str:
+    """
+    CSS内の相対URLを、インライン化しても同じファイルを指すようにサイトルートからのURLに変換
+    """
+    base = css_url.rsplit('/', 1)[0]
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if urlparse(url).scheme or url.startswith(('/', '#')):
+            return match.group(0)
+        parts = []
+        for part in f'{base}/{url}'.split('/'):
+            if part == '..':
+                if parts:
+                    parts.pop()
+            elif part != '.':
+                parts.append(part)
+        return f'url({quote}{"/".join(parts)}{quote})'
+
+    return URL_PATTERN.sub(replace, body)
+
+
+class StylesheetSet:
+    """
+    ページがリンクしているCSSの組み合わせ（平坦化したブロックとセレクタの解析結果）
+    """
+
+    def __init__(self, links, root: Path):
+        self.blocks = []
+        digest = hashlib.sha256(f'v{CACHE_VERSION}'.encode('utf-8'))
+        for _, href, media, css_path in links:
+            css = css_path.read_text(encoding='utf-8', errors='replace')
+            digest.update(f'\0{href}\0{media}\0'.encode('utf-8'))
+            digest.update(css.encode('utf-8'))
+            css_url = '/' + css_path.relative_to(root).as_posix() if css_path.is_relative_to(root) else href
+            for block in flatten_stylesheet(css):
+                block = dict(block, body=absolutize_urls(block['body'], css_url))
+                if media != 'all':
+                    block['conditions'] = [f'@media {media}'] + block['conditions']
+                block['compounds'] = [parse_selector(s) for s in block['selectors']]
+                self.blocks.append(block)
+        self.key = digest.hexdigest()[:16]
+
+
+def path_signature(path) -> str:
+    """
+    element_path() の結果を短い文字列にする（キャッシュに保存する形）
+    """
+    return hashlib.sha1(repr(path).encode('utf-8')).hexdigest()[:16]
+
+
+def collect_paths(html: str):
+    """
+    ページ内の描画される要素の形を列挙
+
+    Returns:
+        {signature: element_path()}
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    paths = {}
+
+    def walk(element):
+        path = element_path(element)
+        paths.setdefault(path_signature(path), path)
+        for child in element.children:
+            if child.name is not None and child.name not in SKIP_ELEMENTS:
+                walk(child)
+
+    if soup.html:
+        walk(soup.html)
+    return paths
+
+
+def match_new_paths(stylesheets: StylesheetSet, entry: dict, paths: dict) -> int:
+    """
+    新しい形の要素だけを、まだ一致していないセレクタと照合して entry を更新
+
+    Args:
+        stylesheets: StylesheetSet
+        entry: キャッシュのエントリ {'paths': [...], 'matched': {block順: [セレクタ番号]}}
+        paths: collect_paths() の結果
+
+    Returns:
+        新しく照合した形の数
+    """
+    known = set(entry['paths'])
+    new_paths = [path for signature, path in paths.items() if signature not in known]
+    if not new_paths:
+        return 0
+
+    matched = {int(k): set(v) for k, v in entry['matched'].items()}
+    for index, block in enumerate(stylesheets.blocks):
+        if block['at_rule']:
+            continue
+        done = matched.get(index, set())
+        for number, compounds in enumerate(block['compounds']):
+            if number in done:
+                continue
+            # 疑似クラスだけのセレクタ（:root など）は常に一致とみなす
+            if not compounds or any(matches_path(path, compounds) for path in new_paths):
+                matched.setdefault(index, set()).add(number)
+
+    entry['paths'] = sorted(known | set(paths))
+    entry['matched'] = {str(k): sorted(v) for k, v in sorted(matched.items())}
+    return len(new_paths)
+
+
+def build_critical_css(stylesheets: StylesheetSet, entry: dict) -> str:
+    """
+    一致したルールからクリティカルCSSのテキストを組み立てる
+    """
+    matched = {int(k): v for k, v in entry['matched'].items()}
+    rules = []
+    for index, block in enumerate(stylesheets.blocks):
+        if index in matched:
+            selectors = ', '.join(block['selectors'][n] for n in matched[index])
+            rules.append((block['conditions'], f'{selectors}{{{block["body"]}}}'))
+    critical_text = ''.join(text for _, text in rules)
+
+    # フォントやアニメーションは、クリティカルなルールから名前で参照されているものだけ含める
+    for index, block in enumerate(stylesheets.blocks):
+        if not block['at_rule'] or not block['at_rule'].lower().startswith(REFERENCED_AT_RULES):
+            continue
+        if block['at_rule'].lower().startswith('@font-face'):
+            family = re.search(r'font-family\s*:\s*([^;]+)', block['body'])
+            name = family.group(1).strip().strip('"\'') if family else ''
+        else:
+            name = block['at_rule'].split(None, 1)[-1]
+        rule = (block['conditions'], f'{block["at_rule"]}{{{block["body"]}}}')
+        if name and name.lower() in critical_text.lower() and rule not in rules:
+            rules.append(rule)
+
+    css = []
+    for conditions, text in rules:
+        for condition in reversed(conditions):
+            text = f'{condition}{{{text}}}'
+        css.append(text)
+    return minify_css(''.join(css))
+
+
+def inline_critical(html: str, links, critical: str) -> str:
+    """
+    <head> にクリティカルCSSを埋め込み、CSSのリンクを非同期読み込みに変える
+
+    Args:
+        html: strip_critical() 済みのHTML
+        links: find_stylesheets() の結果
+        critical: クリティカルCSS
+    """
+    parts = []
+    pos = 0
+    for index, ((start, end), href, media, _) in enumerate(links):
+        parts.append(html[pos:start])
+        if index == 0 and critical:
+            indent = re.search(r'[ \t]*$', html[:start]).group(0)
+            parts.append(f'<style data-critical>{critical}</style>\n{indent}')
+        parts.append(
+            f'<link rel="stylesheet" href="{href}" media="print" '
+            f'onload="this.media=\'{media}\'" data-critical>'
+            f'<noscript data-critical>{html[start:end]}</noscript>'
+        )
+        pos = end
+    parts.append(html[pos:])
+    return ''.join(parts)
+
+
+def load_cache(cache_path: Path) -> dict:
+    """
+    キャッシュを読み込む（形式が違えば空にする）
+    """
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError) as e:
+            print(f'Warning: Could not read cache: {e}')
+    return {'version': CACHE_VERSION, 'types': {}, 'pages': {}}
+
+
+def write_page(page: Path, html: str):
+    """
+    ページを書き出し、build_minify.py が書き出した .gz / .br があれば作り直す
+    """
+    data = html.encode('utf-8')
+    page.write_bytes(data)
+    gz_path = page.with_name(page.name + '.gz')
+    br_path = page.with_name(page.name + '.br')
+    if gz_path.exists() or br_path.exists():
+        compress_file(page, data, BROTLI_AVAILABLE)
+
+
+def process_page_type(root: Path, page_type: str, cache: dict, config) -> int:
+    """
+    1つのページ種別のクリティカルCSSを求めて各ページに埋め込む
+
+    Args:
+        root: 公開用ディレクトリ
+
+    Returns:
+        書き換えたページ数
+    """
+    debug = config.get('debug', False)
+    pages = expand_page_type(root, page_type)
+    print(f'\n[{page_type}] {len(pages)} page(s)')
+    if not pages:
+        return 0
+
+    type_cache = cache['types'].setdefault(page_type, {})
+    stylesheet_sets = {}
+    prepared = []
+
+    # 1. 全ページの要素の形を集め、新しい形だけを照合する
+    for page in pages:
+        rel = page.relative_to(root).as_posix()
+        original = page.read_text(encoding='utf-8', errors='replace')
+        html = strip_critical(original)
+        links = find_stylesheets(html, page, root)
+        if not links:
+            if debug:
+                print(f'  {rel}: no local stylesheets, skipped')
+            continue
+
+        set_id = tuple(str(css_path) for _, _, _, css_path in links) + tuple(m for _, _, m, _ in links)
+        if set_id not in stylesheet_sets:
+            stylesheet_sets[set_id] = StylesheetSet(links, root)
+        stylesheets = stylesheet_sets[set_id]
+        entry = type_cache.setdefault(stylesheets.key, {'paths': [], 'matched': {}})
+
+        # 前回と同じ内容のページは形の収集を省く
+        page_hash = hashlib.sha256(html.encode('utf-8')).hexdigest()[:16]
+        cached_page = cache['pages'].get(rel)
+        if config.get('force') or cached_page != [page_hash, stylesheets.key]:
+            count = match_new_paths(stylesheets, entry, collect_paths(html))
+            cache['pages'][rel] = [page_hash, stylesheets.key]
+            if debug:
+                print(f'  {rel}: {count} new element shape(s)')
+        prepared.append((page, rel, original, html, links, stylesheets, entry))
+
+    # 2. 種別ごとに同じクリティカルCSSを埋め込む
+    written = 0
+    critical_cache = {}
+    for page, rel, original, html, links, stylesheets, entry in prepared:
+        if stylesheets.key not in critical_cache:
+            critical = build_critical_css(stylesheets, entry)
+            critical_cache[stylesheets.key] = critical
+            full_size = sum(css_path.stat().st_size for _, _, _, css_path in links)
+            print(f'  Critical CSS: {len(critical.encode("utf-8")):,} bytes '
+                  f'(linked stylesheets: {full_size:,} bytes, {len(entry["paths"])} element shape(s))')
+        updated = inline_critical(html, links, critical_cache[stylesheets.key])
+        if updated == original:
+            continue
+        if not config.get('dry_run'):
+            write_page(page, updated)
+        written += 1
+        if debug:
+            print(f'  ✓ {rel}')
+
+    # 使われなくなったCSSの組み合わせのエントリを削除
+    used_keys = {stylesheets.key for stylesheets in stylesheet_sets.values()}
+    for key in list(type_cache):
+        if key not in used_keys:
+            del type_cache[key]
+
+    print(f'  ✓ {written} page(s) updated')
+    return written
+
+
+def run(root: Path, config):
+    """
+    指定された種別のページにクリティカルCSSを埋め込む
+
+    Args:
+        root: 公開用ディレクトリ（build_minify.py の出力先）
+        config: 設定辞書
+            types, cache_path, force, dry_run, debug
+    """
+    if not root.is_dir():
+        print(f'Error: {root} not found. Run build_minify.py first.')
+        sys.exit(1)
+
+    cache_path = Path(config['cache_path'])
+    cache = load_cache(cache_path)
+    if config.get('force'):
+        cache = {'version': CACHE_VERSION, 'types': {}, 'pages': {}}
+
+    total = 0
+    for page_type in config.get('types') or list(PAGE_TYPES):
+        total += process_page_type(root, page_type, cache, config)
+
+    # 存在しなくなったページの記録を削除
+    cache['pages'] = {rel: value for rel, value in cache['pages'].items() if (root / rel).exists()}
+
+    if not config.get('dry_run'):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+
+    print(f'\n✓ {"Would update" if config.get("dry_run") else "Updated"} {total} page(s)')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='クリティカルCSSのインライン化スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # build_minify.py の後に実行（dist/ のページを処理）
+  python build_critical_css.py
+
+  # 月別ページとタグページだけを処理
+  python build_critical_css.py --type month --type tag
+
+  # キャッシュを使わずに判定し直す
+  python build_critical_css.py --force
+
+  # 書き換えずに結果だけ表示
+  python build_critical_css.py --dry-run --debug
+        '''
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='公開用ディレクトリ（デフォルト: dist/）'
+    )
+
+    parser.add_argument(
+        '--type',
+        dest='types',
+        action='append',
+        choices=list(PAGE_TYPES),
+        help='処理するページ種別（複数指定可、デフォルト: すべて）'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='キャッシュを使わずにすべてのセレクタを判定し直す'
+    )
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='ファイルを書き換えずに結果だけ表示'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('クリティカルCSSのインライン化スクリプト')
+    print('=' * 60)
+
+    output_dir = Path(args.output_dir).resolve() if args.output_dir else project_root / 'dist'
+    config = {
+        'types': args.types,
+        'cache_path': script_dir / '.build_cache' / 'critical_css.json',
+        'force': args.force,
+        'dry_run': args.dry_run,
+        'debug': args.debug,
+    }
+    run(output_dir, config)
+
+
+if __name__ == '__main__':
+    main()
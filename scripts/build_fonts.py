@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+フォントサブセット生成スクリプト
+
+サイトのHTML（雑記・txt・トップ階層のページ）を走査し、各フォントファミリーが
+実際に適用されている文字だけを集めてサブセット woff2 を生成します。
+あわせて、CSS内の該当する @font-face 宣言をサブセット版に書き換えます。
+
+- どの文字にどのフォントが当たるかは、CSSの font-family 宣言とセレクタを
+  簡易的に評価して判定します（継承を考慮、判定は広めに一致する側に倒れます）
+- 前回から文字集合が増えたフォントだけを作り直します（文字集合は減らしません）
+- --split を指定すると unicode-range ごとにファイルを分割します
+
+Usage:
+    python build_fonts.py [options]
+
+Example:
+    python build_fonts.py
+    python build_fonts.py --split --debug
+    python build_fonts.py --dry-run
+"""
+
+from bs4 import BeautifulSoup
+from pathlib import Path
+from collections import defaultdict
+from urllib.parse import urlparse
+import io
+import sys
+import re
+import json
+import hashlib
+import argparse
+from build_minify import EXCLUDE_DIRS
+from css_utils import (
+    parse_stylesheet,
+    parse_selector,
+    parse_font_family,
+    specificity,
+    matches
+)
+
+# fontTools は必須ではない（サブセット生成時のみ必要）
+try:
+    from fontTools import subset as ft_subset
+    from fontTools.ttLib import TTFont
+    FONTTOOLS_AVAILABLE = True
+except ImportError:
+    FONTTOOLS_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# 管理対象のフォント: ファミリー名（小文字） → {weight: 元フォント（プロジェクトルートからの相対パス）}
+FONT_SOURCES = {
+    'saitamaar': {'400': 'Saitamaar.ttf'},
+    'udev gothic hsnflg': {
+        '400': 'txt/UDEVGothicHSNFLG-Regular.woff2',
+        '700': 'txt/UDEVGothicHSNFLG-Bold.woff2',
+    },
+    'dotgothic16': {'400': 'dotgothic16.ttf'},
+}
+
+# @font-face に書くファミリー名（既存のCSSの表記に合わせる）
+FONT_NAMES = {
+    'saitamaar': 'saitamaar',
+    'udev gothic hsnflg': 'UDEV Gothic HSNFLG',
+    'dotgothic16': 'DotGothic16',
+}
+
+# 走査するHTML（プロジェクトルートからの glob）
+# 書き換える CSS（1column.css など）はサイト全体から読み込まれるため、公開する全ページを走査する
+DEFAULT_PAGES = ['**/*.html']
+
+# 走査するCSS（@font-face を書き換える対象）
+DEFAULT_STYLESHEETS = ['*.css', 'txt/**/*.css', 'gallery/**/*.css']
+
+# JavaScript で動的に挿入される文字のために、常に含める文字
+BASELINE_RANGES = [
+    (0x0020, 0x007E),  # ASCII
+    (0x3000, 0x303F),  # CJK 記号・句読点
+    (0x3040, 0x309F),  # ひらがな
+    (0x30A0, 0x30FF),  # カタカナ
+    (0xFF01, 0xFF5E),  # 全角英数・記号
+]
+
+# --split 指定時の unicode-range 分割
+SPLIT_RANGES = {
+    'latin': [(0x0000, 0x024F), (0x2000, 0x206F), (0x20A0, 0x20CF), (0x2100, 0x218F)],
+    'kana': [(0x3000, 0x30FF), (0x31F0, 0x31FF), (0xFF00, 0xFFEF)],
+    'kanji': [(0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)],
+}
+
+MARKER_START = '/* build_fonts: {family} */'
+MARKER_END = '/* /build_fonts: {family} */'
+
+
+def expand_globs(root: Path, patterns):
+    """
+    プロジェクトルートからの glob パターンを展開（公開しないディレクトリは除外）
+    """
+    paths = set()
+    for pattern in patterns:
+        for path in root.glob(pattern):
+            parts = path.relative_to(root).parts[:-1]
+            if path.is_file() and not any(p in EXCLUDE_DIRS or p.startswith('.') for p in parts):
+                paths.add(path)
+    return sorted(paths)
+
+
+def linked_stylesheets(page_path: Path, root: Path):
+    """
+    ページがリンクしているローカルのCSSファイルを返す
+    """
+    with open(page_path, 'r', encoding='utf-8', errors='replace') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    result = set()
+    for node in soup.find_all('link', href=True):
+        if 'stylesheet' in (node.get('rel') or []):
+            css_path = resolve_local(node['href'], page_path, root)
+            if css_path:
+                result.add(css_path.resolve())
+    return result
+
+
+def resolve_local(href: str, page_path: Path, root: Path):
+    """
+    href をローカルのファイルパスに変換（外部URLは None）
+    """
+    parsed = urlparse(href)
+    if parsed.scheme or parsed.netloc:
+        return None
+    if parsed.path.startswith('/'):
+        return root / parsed.path.lstrip('/')
+    return (page_path.parent / parsed.path).resolve()
+
+
+class StylesheetCache:
+    """
+    パース済みCSSのキャッシュ（同じCSSを何度もパースしない）
+    """
+
+    def __init__(self):
+        self._rules = {}
+
+    def font_rules(self, path: Path):
+        """
+        CSSファイルから、管理対象フォントを指定しているルールだけを返す
+        """
+        if path not in self._rules:
+            try:
+                css = path.read_text(encoding='utf-8')
+            except (OSError, UnicodeDecodeError):
+                css = ''
+            self._rules[path] = font_rules_from_css(css)
+        return self._rules[path]
+
+
+def font_rules_from_css(css: str):
+    """
+    CSSテキストから font-family を持つルールを抽出
+
+    Returns:
+        [(compounds, specificity, families), ...]
+        families は管理対象フォントのファミリー名（該当なしなら空 = 継承を打ち切る）
+    """
+    rules, _ = parse_stylesheet(css)
+    result = []
+    for rule in rules:
+        value = rule['declarations'].get('font-family')
+        if not value or value.strip().lower() in ('inherit', 'unset', 'initial') or 'var(' in value:
+            continue
+        families = [f for f in parse_font_family(value) if f in FONT_SOURCES]
+        result.append((parse_selector(rule['selector']), specificity(rule['selector']), families))
+    return result
+
+
+def collect_page_codepoints(page_path: Path, root: Path, stylesheets: StylesheetCache, usage, debug=False):
+    """
+    1ページを解析し、フォントファミリーごとの使用文字を usage に追加
+
+    Args:
+        page_path: HTMLファイルのパス
+        root: プロジェクトルート
+        stylesheets: StylesheetCache
+        usage: {family: set(codepoint)}
+    """
+    with open(page_path, 'r', encoding='utf-8', errors='replace') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+
+    # リンクされたCSSとインラインの <style> を文書順に集める
+    rules = []
+    for node in soup.find_all(['link', 'style']):
+        if node.name == 'link':
+            rel = node.get('rel') or []
+            href = node.get('href')
+            if 'stylesheet' in rel and href:
+                css_path = resolve_local(href, page_path, root)
+                if css_path and css_path.exists():
+                    rules.extend(stylesheets.font_rules(css_path))
+        else:
+            rules.extend(font_rules_from_css(node.get_text()))
+
+    if not rules:
+        return
+
+    def walk(element, inherited):
+        families = inherited
+        best = None
+        for order, (compounds, spec, rule_families) in enumerate(rules):
+            if matches(element, compounds):
+                key = (spec, order)
+                if best is None or key >= best[0]:
+                    best = (key, rule_families)
+        if best is not None:
+            families = best[1]
+        style = element.get('style') or ''
+        inline = re.search(r'font-family\s*:\s*([^;]+)', style)
+        if inline:
+            families = [f for f in parse_font_family(inline.group(1)) if f in FONT_SOURCES]
+
+        for child in element.children:
+            if child.name is None:
+                if families:
+                    text = str(child)
+                    for family in families:
+                        usage[family].update(ord(ch) for ch in text if not ch.isspace())
+            elif child.name not in ('script', 'style', 'template'):
+                walk(child, families)
+
+    walk(soup.html or soup, [])
+
+    if debug:
+        print(f'  {page_path.relative_to(root)}: ' + ', '.join(f'{f}={len(c)}' for f, c in usage.items()))
+
+
+def baseline_codepoints():
+    codepoints = set()
+    for start, end in BASELINE_RANGES:
+        codepoints.update(range(start, end + 1))
+    return codepoints
+
+
+def split_codepoints(codepoints):
+    """
+    文字集合を SPLIT_RANGES に従って分割（どこにも属さない文字は 'misc'）
+    """
+    groups = defaultdict(set)
+    for cp in codepoints:
+        for name, ranges in SPLIT_RANGES.items():
+            if any(start <= cp <= end for start, end in ranges):
+                groups[name].add(cp)
+                break
+        else:
+            groups['misc'].add(cp)
+    return dict(groups)
+
+
+def format_unicode_range(codepoints):
+    """
+    文字集合を unicode-range の値（連続区間をまとめる）に変換
+    """
+    ranges = []
+    for cp in sorted(codepoints):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ', '.join(f'U+{a:X}' if a == b else f'U+{a:X}-{b:X}' for a, b in ranges)
+
+
+def family_slug(family: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', family).strip('-')
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def load_source_font(source: Path) -> bytes:
+    """
+    元フォントを非圧縮の sfnt として読み込む
+
+    woff2 の展開は重いため、分割生成時に何度も展開しないよう一度だけ行う
+    """
+    font = TTFont(str(source))
+    font.flavor = None
+    buffer = io.BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+def subset_font(source_data: bytes, output: Path, codepoints):
+    """
+    fontTools で woff2 サブセットを生成
+
+    Args:
+        source_data: load_source_font() の結果
+        output: 出力先
+        codepoints: 含める文字（コードポイントの集合）
+    """
+    options = ft_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    font = ft_subset.load_font(io.BytesIO(source_data), options)
+    subsetter = ft_subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(codepoints))
+    subsetter.subset(font)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    ft_subset.save_font(font, str(output), options)
+
+
+def css_family_name(family_name: str) -> str:
+    """
+    @font-face に書くファミリー名（1つの識別子で書ける名前は引用符で囲まない）
+    """
+    if re.fullmatch(r'-?[A-Za-z_][A-Za-z0-9_-]*', family_name):
+        return family_name
+    return f'"{family_name}"'
+
+
+def build_font_face_css(family_name: str, faces) -> str:
+    """
+    サブセット用の @font-face 宣言を生成
+
+    Args:
+        family_name: CSSに書くファミリー名
+        faces: [(weight, url, unicode_range or None), ...]
+    """
+    blocks = []
+    for weight, url, unicode_range in faces:
+        lines = [
+            '@font-face {',
+            f'  font-family: {css_family_name(family_name)};',
+            f'  src: url("{url}") format("woff2");',
+            f'  font-weight: {weight};',
+            '  font-style: normal;',
+            '  font-display: swap;',
+        ]
+        if unicode_range:
+            lines.append(f'  unicode-range: {unicode_range};')
+        lines.append('}')
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+
+def rewrite_font_faces(css_path: Path, family: str, declaration: str) -> bool:
+    """
+    CSSファイル内の該当ファミリーの @font-face をサブセット版に置き換える
+
+    2回目以降はマーカーコメントで囲まれた部分だけを更新します。
+    削除するブロックの前の空行も一緒に削除し、前後の空行の数は変えません。
+    宣言のインデント（タブ・スペース）は元の @font-face に合わせます。
+
+    Returns:
+        書き換えたかどうか
+    """
+    css = css_path.read_text(encoding='utf-8')
+    start_marker = MARKER_START.format(family=family)
+    end_marker = MARKER_END.format(family=family)
+
+    def with_markers(original: str) -> str:
+        indent = re.search(r'\{[^\S\n]*\n([ \t]+)\S', original)
+        body = declaration.replace('\n  ', '\n' + indent.group(1)) if indent else declaration
+        return f'{start_marker}\n{body}\n{end_marker}'
+
+    if start_marker in css and end_marker in css:
+        pattern = re.escape(start_marker) + r'.*?' + re.escape(end_marker)
+        updated = re.sub(pattern, lambda m: with_markers(m.group()), css, count=1, flags=re.DOTALL)
+    else:
+        blocks = []
+        for match in re.finditer(r'@font-face\s*\{[^}]*\}', css):
+            value = re.search(r'font-family\s*:\s*([^;]+)', match.group())
+            if value and family in parse_font_family(value.group(1)):
+                blocks.append(match)
+        if not blocks:
+            return False
+        # 最初のブロックの位置に差し込み、残りは削除
+        pieces = []
+        last = 0
+        for i, match in enumerate(blocks):
+            if i == 0:
+                pieces.append(css[last:match.start()])
+                pieces.append(with_markers(match.group()))
+            else:
+                pieces.append(css[last:match.start()].rstrip())
+            last = match.end()
+        pieces.append(css[last:])
+        updated = ''.join(pieces)
+
+    if updated == css:
+        return False
+
+    with open(css_path, 'w', encoding='utf-8') as f:
+        f.write(updated)
+    return True
+
+
+def build_fonts(root: Path, config):
+    """
+    サブセットフォントを生成し、@font-face を書き換える
+
+    Args:
+        root: プロジェクトルート
+        config: 設定辞書
+            pages, stylesheets, output_dir, state_path, split, dry_run, force, debug
+    """
+    debug = config.get('debug', False)
+    output_dir = Path(config['output_dir'])
+    state_path = Path(config['state_path'])
+
+    pages = expand_globs(root, config.get('pages', DEFAULT_PAGES))
+    print(f'Scanning {len(pages)} page(s)...')
+
+    usage = defaultdict(set)
+    stylesheets = StylesheetCache()
+    for page in pages:
+        try:
+            collect_page_codepoints(page, root, stylesheets, usage, debug=debug)
+        except Exception as e:
+            print(f'  Error reading {page}: {e}')
+
+    state = {}
+    if state_path.exists():
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+    baseline = baseline_codepoints()
+    css_files = expand_globs(root, config.get('stylesheets', DEFAULT_STYLESHEETS))
+
+    # 走査していないページから読み込まれるCSSは、足りない文字が出るので書き換えない
+    unscanned = set(expand_globs(root, DEFAULT_PAGES)) - set(pages)
+    if unscanned:
+        shared = set()
+        for page in unscanned:
+            shared |= linked_stylesheets(page, root)
+        for css_path in [p for p in css_files if p.resolve() in shared]:
+            print(f'Warning: {css_path.relative_to(root)} is linked from unscanned pages, not rewritten')
+        css_files = [p for p in css_files if p.resolve() not in shared]
+    summary = []
+
+    for family, weights in FONT_SOURCES.items():
+        used = usage.get(family, set())
+        if not used:
+            print(f'- {family}: not used, skipped')
+            continue
+
+        previous = state.get(family, {})
+        codepoints = set(previous.get('codepoints', [])) | used | baseline
+        sources = {w: root / p for w, p in weights.items() if (root / p).exists()}
+        source_hashes = {w: file_hash(p) for w, p in sources.items()}
+
+        unchanged = (
+            not config.get('force')
+            and previous.get('split') == config.get('split', False)
+            and previous.get('sources') == source_hashes
+            and codepoints <= set(previous.get('codepoints', []))
+        )
+        new_count = len(codepoints - set(previous.get('codepoints', [])))
+        print(f'- {family}: {len(used)} used / {len(codepoints)} subset code points'
+              + (' (up to date)' if unchanged else f' (+{new_count})'))
+        if unchanged or config.get('dry_run'):
+            continue
+
+        if not FONTTOOLS_AVAILABLE:
+            print('Error: fontTools is not installed. Install with: pip install fonttools brotli')
+            sys.exit(1)
+
+        groups = split_codepoints(codepoints) if config.get('split') else {'': codepoints}
+        faces = []
+        for weight, source in sources.items():
+            source_data = load_source_font(source)
+            for group_name, group in sorted(groups.items()):
+                suffix = f'-{group_name}' if group_name else ''
+                output = output_dir / f'{family_slug(family)}-{weight}{suffix}.woff2'
+                subset_font(source_data, output, group)
+                url = '/' + output.relative_to(root).as_posix()
+                faces.append((weight, url, format_unicode_range(group) if group_name else None))
+                size = output.stat().st_size
+                summary.append((source, size))
+                print(f'  ✓ {output.relative_to(root)} ({len(group)} glyphs, {source.stat().st_size:,} → {size:,} bytes)')
+
+        declaration = build_font_face_css(FONT_NAMES.get(family, family), faces)
+        for css_path in css_files:
+            if rewrite_font_faces(css_path, family, declaration):
+                print(f'  ✓ Rewrote @font-face in {css_path.relative_to(root)}')
+
+        state[family] = {
+            'codepoints': sorted(codepoints),
+            'sources': source_hashes,
+            'split': config.get('split', False),
+        }
+
+    if not config.get('dry_run'):
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    if summary:
+        before = sum(source.stat().st_size for source in {source for source, _ in summary})
+        after = sum(size for _, size in summary)
+        print(f'\n✓ Generated {len(summary)} subset file(s): {before:,} → {after:,} bytes')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='フォントサブセット生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 文字集合が増えたフォントだけサブセットを作り直す
+  python build_fonts.py
+
+  # unicode-range ごとに分割
+  python build_fonts.py --split
+
+  # 集計だけ行い、ファイルは書き換えない
+  python build_fonts.py --dry-run --debug
+        '''
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='サブセットフォントの出力先（デフォルト: fonts/）'
+    )
+
+    parser.add_argument(
+        '--split',
+        action='store_true',
+        help='unicode-range（latin / kana / kanji / misc）ごとにファイルを分割'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='文字集合が変わっていなくても作り直す'
+    )
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='使用文字の集計だけを行う'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化（ページごとの集計を表示）'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    config = {
+        'pages': DEFAULT_PAGES,
+        'stylesheets': DEFAULT_STYLESHEETS,
+        'output_dir': Path(args.output_dir) if args.output_dir else project_root / 'fonts',
+        'state_path': script_dir / '.build_cache' / 'fonts.json',
+        'split': args.split,
+        'force': args.force,
+        'dry_run': args.dry_run,
+        'debug': args.debug,
+    }
+
+    print('=' * 60)
+    print('フォントサブセット生成スクリプト')
+    print('=' * 60)
+
+    build_fonts(project_root, config)
+
+
+if __name__ == '__main__':
+    main()
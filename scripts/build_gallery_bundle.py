@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ギャラリーデータのバンドル生成スクリプト
+
+gallery/data/ の全シリーズのJSONを1つのファイル（gallery/data/bundle.json）にまとめます。
+タグページ（tag-system.js）と画像ページ（gallery-system.js）は、
+シリーズごとのJSONを順に取得する代わりにこのファイルを1回だけ取得します。
+形式の詳細は gallery_bundle.py を参照してください。
+
+書き出す前に、バンドルから復元したデータが元のJSONと一致することを確認します
+（一致しない場合は書き出さずに終了します）。
+
+ブラウザは常にバンドルを先に読み込むため、bundle.json はコミットする生成物です。
+シリーズのJSONを編集したら実行し、bundle.json も一緒にコミットしてください。
+--check はバンドルが古いかどうかだけを確認します（古ければ終了コード 1）。
+
+Usage:
+    python build_gallery_bundle.py [options]
+
+Example:
+    python build_gallery_bundle.py
+    python build_gallery_bundle.py --check
+"""
+
+from pathlib import Path
+import sys
+import json
+import gzip
+import argparse
+from gallery_bundle import (
+    BUNDLE_FILENAME,
+    GalleryBundle,
+    bundle_is_current,
+    load_series_files,
+    pack_gallery,
+    unpack_bundle
+)
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+def verify_bundle(series_files, bundle):
+    """
+    バンドルから復元したデータが元のJSONと一致するかを確認
+
+    Returns:
+        問題の説明のリスト（一致すれば空）
+    """
+    problems = []
+    restored = dict(unpack_bundle(json.loads(json.dumps(bundle))))
+    for name, data in series_files:
+        if restored.get(name) != data:
+            problems.append(f'{name}.json does not round-trip')
+
+    # ポスティングリストがタグの一覧と一致するか
+    reader = GalleryBundle(bundle)
+    for tag in bundle['tags']:
+        expected = [work['id'] for name, data in series_files
+                    for work in data.get(f'{name}_series', []) if tag in (work.get('tags') or [])]
+        actual = [work['id'] for work in reader.works_with_tag(tag)]
+        if expected != actual:
+            problems.append(f'posting list for "{tag}" does not match')
+    return problems
+
+
+def build_gallery_bundle(root: Path, debug=False):
+    """
+    バンドルを生成して gallery/data/bundle.json に書き出す
+
+    Args:
+        root: プロジェクトルート
+        debug: デバッグモード
+    """
+    data_dir = root / 'gallery' / 'data'
+    series_files = load_series_files(data_dir)
+    if not series_files:
+        print(f'Error: No series data found in {data_dir}')
+        sys.exit(1)
+
+    bundle = pack_gallery(series_files)
+    problems = verify_bundle(series_files, bundle)
+    if problems:
+        for problem in problems:
+            print(f'Error: {problem}')
+        sys.exit(1)
+
+    text = json.dumps(bundle, ensure_ascii=False, separators=(',', ':')) + '\n'
+    output_path = data_dir / BUNDLE_FILENAME
+    if output_path.exists() and output_path.read_text(encoding='utf-8') == text:
+        print(f'✓ {output_path.relative_to(root)} is up to date')
+        return
+    output_path.write_text(text, encoding='utf-8')
+
+    # 元のJSONとの大きさの比較
+    source_bytes = b''.join(
+        (data_dir / f'{name}.json').read_bytes() for name, _ in series_files
+    )
+    bundle_bytes = text.encode('utf-8')
+    print(f'✓ {len(bundle["works"]["id"])} work(s), {len(bundle["tags"])} tag(s) from {len(series_files)} series')
+    print(f'  Source: {len(source_bytes):,} bytes in {len(series_files)} file(s) '
+          f'(gzip {len(gzip.compress(source_bytes)):,})')
+    print(f'  Bundle: {len(bundle_bytes):,} bytes in 1 file '
+          f'(gzip {len(gzip.compress(bundle_bytes)):,})')
+    if debug:
+        for name, data in series_files:
+            print(f'  {name}: {len(data.get(f"{name}_series", []))} work(s)')
+    print(f'\n✓ Successfully generated: {output_path}')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='ギャラリーデータのバンドル生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # gallery/data/bundle.json を生成
+  python build_gallery_bundle.py
+
+  # バンドルがシリーズのJSONと一致しているかだけを確認
+  python build_gallery_bundle.py --check
+        '''
+    )
+
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='書き出さずに、バンドルが古くないかを確認（古ければ終了コード 1）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('ギャラリーデータのバンドル生成スクリプト')
+    print('=' * 60)
+
+    if args.check:
+        bundle_path = project_root / 'gallery' / 'data' / BUNDLE_FILENAME
+        if not bundle_is_current(bundle_path.parent):
+            print(f'Error: {bundle_path.relative_to(project_root)} is out of date; run build_gallery_bundle.py')
+            sys.exit(1)
+        print(f'✓ {bundle_path.relative_to(project_root)} is up to date')
+        return
+
+    build_gallery_bundle(project_root, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
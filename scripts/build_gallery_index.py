@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ギャラリーの関連作品インデックス生成スクリプト
+
+gallery/data/*.json の全シリーズを一度だけ読み込み、作品×タグの疎行列から
+各作品の関連作品（同シリーズ・同年制作・共通タグ2種）をまとめて計算して、
+作品ごとの小さなJSON（gallery/data/related/<ID>.json）に書き出します。
+
+画像ページ（gallery-system.js の RelatedWorksManager）はこのファイルだけを読み込み、
+全シリーズのデータを取得して毎回計算する処理を省略します。
+ファイルがない作品は従来どおりブラウザ側で計算します。
+
+- 候補の選び方は gallery-system.js と同じ（上位タグの選択・シリーズの偏りの制限）
+- 候補の並びはタグのコサイン類似度の順。config.json の diversity.randomize が true の場合は
+  類似度で重み付けしたランダムな順（--seed で固定できるため、ビルドごとの差分が出ない）
+- 内容が変わらないファイルは書き換えない
+
+NumPy が必要です（SciPy があれば疎行列で計算します）。
+
+Usage:
+    python build_gallery_index.py [options]
+
+Example:
+    python build_gallery_index.py
+    python build_gallery_index.py --seed 42 --debug
+"""
+
+from pathlib import Path
+import sys
+import json
+import argparse
+
+# NumPy は必須ではない（インデックスの生成時のみ必要）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# SciPy がなければ密行列で計算する
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+CATEGORIES = ['same-series', 'same-period', 'common-tags-1', 'common-tags-2']
+RELATED_DIRNAME = 'related'
+INDEX_VERSION = 1
+
+# 関連作品として出力する項目（gallery-system.js の createRelatedItem が使うもの）
+ITEM_FIELDS = ('id', 'path', 'image_path', 'series', 'thumbnail', 'srcset')
+
+
+def load_gallery(data_dir: Path):
+    """
+    config.json と全シリーズのデータを読み込む
+
+    Returns:
+        (config, 作品のリスト)。作品には mainSeries を追加する
+    """
+    with open(data_dir / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    works = []
+    seen = set()
+    for series_name in config.get('series', {}):
+        json_path = data_dir / f'{series_name}.json'
+        if not json_path.exists():
+            print(f'Warning: Series data not found: {json_path.name}')
+            continue
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        main_series = data.get('mainSeries') or series_name
+        for work in data.get(f'{series_name}_series', []):
+            if work.get('id') in seen:
+                print(f'Warning: Duplicate work id: {work.get("id")} ({json_path.name})')
+                continue
+            seen.add(work.get('id'))
+            works.append({**work, 'mainSeries': main_series})
+    return config, works
+
+
+def build_tag_matrix(works):
+    """
+    作品×タグの0/1行列を作る
+
+    Returns:
+        (行列, タグのリスト, {タグ: 列番号})。SciPy があれば CSR 形式の疎行列
+    """
+    tags = sorted({tag for work in works for tag in work.get('tags', [])})
+    tag_index = {tag: i for i, tag in enumerate(tags)}
+    rows, cols = [], []
+    for row, work in enumerate(works):
+        for tag in set(work.get('tags', [])):
+            rows.append(row)
+            cols.append(tag_index[tag])
+
+    shape = (len(works), len(tags))
+    values = np.ones(len(rows), dtype=np.float32)
+    if SCIPY_AVAILABLE:
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape)
+    else:
+        matrix = np.zeros(shape, dtype=np.float32)
+        matrix[rows, cols] = 1
+    return matrix, tags, tag_index
+
+
+def select_top_tags(work, frequency, tag_index, exclude_tags):
+    """
+    共通タグの見出しに使う2つのタグを選ぶ（gallery-system.js の getTopTwoFrequentTags と同じ規則）
+
+    出現数の多い順に並べ、1・2位を避けて3〜8位から選ぶ（足りなければ上位から）
+
+    Args:
+        frequency: タグごとの出現作品数（全作品）
+    """
+    candidates = [tag for tag in work.get('tags', []) if tag not in exclude_tags]
+    counts = {tag: int(frequency[tag_index[tag]]) - 1 for tag in candidates}
+    ranked = sorted((tag for tag in candidates if counts[tag] > 0), key=lambda tag: -counts[tag])
+    if not ranked:
+        return None, None
+
+    selectable = ranked[2:8]
+    first = selectable[0] if selectable else ranked[0]
+    if len(selectable) > 1:
+        second = selectable[1]
+    else:
+        second = ranked[1] if len(ranked) > 1 else None
+    return first, second
+
+
+def balance_series(order, series_codes, max_items, max_ratio):
+    """
+    同じシリーズの作品が偏らないように選ぶ（gallery-system.js の balanceSeriesDistribution と同じ規則）
+
+    Args:
+        order: 候補の作品番号（優先順）
+        series_codes: 作品番号ごとのシリーズ番号（作品の series）
+    """
+    if len(order) <= max_items:
+        return list(order)
+
+    limit = int(np.ceil(max_items * max_ratio))
+    counts = {}
+    result = []
+    for index in order:
+        series = series_codes[index]
+        if counts.get(series, 0) < limit and len(result) < max_items:
+            result.append(index)
+            counts[series] = counts.get(series, 0) + 1
+
+    if len(result) < max_items:
+        chosen = set(result)
+        for index in order:
+            if index not in chosen and len(result) < max_items:
+                result.append(index)
+    return result
+
+
+def top_k(keys, k):
+    """
+    キーの大きい順に k 件の位置を返す（同じキーは位置の小さい順）
+
+    np.partition で k 番目の値を求め、それ以上のものだけを並べ替えます。
+    """
+    if k >= len(keys):
+        return np.lexsort((np.arange(len(keys)), -keys))
+    threshold = np.partition(keys, len(keys) - k)[len(keys) - k]
+    above = np.flatnonzero(keys > threshold)
+    ties = np.flatnonzero(keys == threshold)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -keys[chosen]))]
+
+
+def rank_candidates(candidates, keys, series_codes, max_items, diversity):
+    """
+    候補を並べて max_items 件を選ぶ
+
+    シリーズの偏りを制限する場合も、上位だけを並べて balance_series() で選び、
+    上限に達しなかったときだけ並べる件数を増やします（全候補を並べた場合と同じ結果）。
+
+    Args:
+        candidates: 候補の作品番号
+        keys: 候補ごとの並び順のキー（大きいほど先）
+    """
+    if not diversity.get('seriesBalance', True):
+        return list(candidates[top_k(keys, max_items)])
+
+    max_ratio = diversity.get('maxSameSeriesRatio', 0.6)
+    limit = int(np.ceil(max_items * max_ratio))
+    k = max_items * 4
+    while True:
+        order = candidates[top_k(keys, k)]
+        if k >= len(candidates):
+            return balance_series(order, series_codes, max_items, max_ratio)
+        # 上位 k 件の中でシリーズの上限内の作品が max_items 件そろえば、残りの候補は結果に影響しない
+        counts = {}
+        picked = 0
+        for index in order:
+            series = series_codes[index]
+            if counts.get(series, 0) < limit:
+                counts[series] = counts.get(series, 0) + 1
+                picked += 1
+                if picked == max_items:
+                    return balance_series(order, series_codes, max_items, max_ratio)
+        k *= 4
+
+
+def compute_related(works, config, seed=0):
+    """
+    全作品の関連作品をまとめて計算
+
+    類似度は作品×作品の疎行列（CSR）のまま扱い、作品ごとに候補の行だけを取り出して
+    上位を選びます（作品数×作品数の密行列は作りません）。
+
+    Args:
+        works: load_gallery() の作品のリスト
+        config: config.json の内容
+        seed: diversity.randomize が有効な場合の乱数のシード
+
+    Returns:
+        {作品ID: {'topTags': [...], 'related': {カテゴリ: [作品番号, ...]}}}
+    """
+    max_items = config.get('ui', {}).get('itemsPerCategory', 3)
+    diversity = config.get('diversity', {})
+    exclude_tags = set(config.get('tags', {}).get('seriesTags', []))
+
+    matrix, tags, tag_index = build_tag_matrix(works)
+    frequency = np.asarray(matrix.sum(axis=0)).ravel()
+
+    # 共通タグ数（作品×作品）。SciPy があれば CSR の疎行列のまま
+    shared = matrix @ matrix.T
+    if SCIPY_AVAILABLE:
+        shared = shared.tocsr()
+        shared.sort_indices()
+        norms = np.sqrt(shared.diagonal())
+    else:
+        norms = np.sqrt(np.diag(shared))
+    norms[norms == 0] = 1
+
+    def similarity_row(i):
+        """作品 i とタグを共有する作品の番号（昇順）とコサイン類似度"""
+        if SCIPY_AVAILABLE:
+            start, end = shared.indptr[i], shared.indptr[i + 1]
+            indices, values = shared.indices[start:end], shared.data[start:end]
+        else:
+            indices = np.flatnonzero(shared[i])
+            values = shared[i, indices]
+        return indices, values / norms[i] / norms[indices]
+
+    # 各カテゴリの候補のグループ（シリーズ・制作年・タグごとの作品番号）
+    series_names = sorted({work['mainSeries'] for work in works})
+    series_codes = np.array([series_names.index(work['mainSeries']) for work in works])
+    # 偏りの制限は gallery-system.js と同じく作品ごとの series（oc1, oc2 など）で数える
+    _, balance_codes = np.unique([str(work.get('series', '')) for work in works], return_inverse=True)
+    years = [str(work.get('date', '')).split('-')[0] for work in works]
+    by_series = {code: np.flatnonzero(series_codes == code) for code in set(series_codes.tolist())}
+    by_year = {}
+    for i, year in enumerate(years):
+        by_year.setdefault(year, []).append(i)
+    by_year = {year: np.array(members) for year, members in by_year.items()}
+    by_tag = matrix.T.tocsr() if SCIPY_AVAILABLE else matrix.T
+
+    def tag_members(tag):
+        column = tag_index[tag]
+        if SCIPY_AVAILABLE:
+            return by_tag.indices[by_tag.indptr[column]:by_tag.indptr[column + 1]]
+        return np.flatnonzero(by_tag[column])
+
+    top_tags = [select_top_tags(work, frequency, tag_index, exclude_tags) for work in works]
+
+    # 候補の並び順: 類似度順、randomize の場合は類似度で重み付けしたランダム順（Gumbel-top-k）
+    rng = np.random.default_rng(seed)
+    related = {work['id']: {'topTags': list(top_tags[i]), 'related': {}} for i, work in enumerate(works)}
+    for i, work in enumerate(works):
+        neighbors, similarity = similarity_row(i)
+        groups = {
+            'same-series': by_series[series_codes[i]],
+            'same-period': by_year[years[i]],
+            'common-tags-1': tag_members(top_tags[i][0]) if top_tags[i][0] else np.zeros(0, dtype=int),
+            'common-tags-2': tag_members(top_tags[i][1]) if top_tags[i][1] else np.zeros(0, dtype=int),
+        }
+        for category in CATEGORIES:
+            candidates = groups[category]
+            candidates = candidates[candidates != i]
+            # 候補の類似度（タグを共有しない作品は 0）
+            position = np.minimum(np.searchsorted(neighbors, candidates), max(len(neighbors) - 1, 0))
+            if len(neighbors):
+                keys = np.where(neighbors[position] == candidates, similarity[position], 0.0)
+            else:
+                keys = np.zeros(len(candidates))
+            if diversity.get('randomize', False):
+                keys = np.log(keys + 1e-3) - np.log(-np.log(rng.random(len(candidates))))
+            chosen = rank_candidates(candidates, keys, balance_codes, max_items, diversity)
+            related[work['id']]['related'][category] = [int(index) for index in chosen]
+    return related
+
+
+def related_item(work):
+    """関連作品1件分の出力（表示に使う項目だけ）"""
+    item = {field: work[field] for field in ITEM_FIELDS if work.get(field)}
+    if 'nsfw' in work.get('tags', []):
+        item['nsfw'] = True
+    return item
+
+
+def write_if_changed(path: Path, data) -> bool:
+    """内容が変わった場合だけ書き込む（デプロイの差分を小さくするため）"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return True
+
+
+def build_gallery_index(root: Path, seed=0, debug=False):
+    """
+    関連作品インデックスを生成
+
+    Args:
+        root: プロジェクトルート
+        seed: 乱数のシード
+        debug: デバッグモード
+    """
+    if not NUMPY_AVAILABLE:
+        print('Error: NumPy is not installed. Install with: pip install numpy')
+        sys.exit(1)
+
+    data_dir = root / 'gallery' / 'data'
+    output_dir = data_dir / RELATED_DIRNAME
+    config, works = load_gallery(data_dir)
+    if not works:
+        print('Warning: No works found')
+        return
+    print(f'Loaded {len(works)} work(s) from {len(config.get("series", {}))} series')
+    if not SCIPY_AVAILABLE:
+        print('Warning: SciPy is not installed; using a dense matrix (pip install scipy)')
+
+    related = compute_related(works, config, seed)
+
+    written = 0
+    for work in works:
+        entry = related[work['id']]
+        data = {
+            'version': INDEX_VERSION,
+            'id': work['id'],
+            'series': work.get('series'),
+            'mainSeries': work['mainSeries'],
+            'date': work.get('date', ''),
+            'tags': work.get('tags', []),
+            'topTags': entry['topTags'],
+            'related': {
+                category: [related_item(works[index]) for index in indexes]
+                for category, indexes in entry['related'].items()
+            },
+        }
+        if write_if_changed(output_dir / f'{work["id"]}.json', data):
+            written += 1
+            if debug:
+                counts = ', '.join(f'{c}={len(v)}' for c, v in entry['related'].items())
+                print(f'  {work["id"]}: {counts}')
+
+    # 削除された作品のファイルを削除
+    ids = {work['id'] for work in works}
+    removed = 0
+    for path in output_dir.glob('*.json'):
+        if path.stem not in ids:
+            path.unlink()
+            removed += 1
+
+    print(f'\n✓ Wrote {written} file(s), {len(works) - written} unchanged, {removed} removed')
+    print(f'✓ Output: {output_dir}')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='ギャラリーの関連作品インデックス生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # インデックスを生成
+  python build_gallery_index.py
+
+  # ランダムな並びのシードを変える（config.json の diversity.randomize が true の場合）
+  python build_gallery_index.py --seed 42
+        '''
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='ランダムな並びのシード（デフォルト: 0）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('ギャラリーの関連作品インデックス生成スクリプト')
+    print('=' * 60)
+
+    build_gallery_index(project_root, seed=args.seed, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
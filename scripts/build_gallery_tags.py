@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ギャラリーのタグページ生成スクリプト
+
+gallery/data/ の全シリーズのJSONを1回だけ読み込み、
+gallery/tag-page/ にタグごとのページ（<タグ>.html）と
+件数付きのタグ一覧（tags.html）を書き出します。
+
+作品カードはHTMLに書き出し済みのため、ページを開いた時点で一覧が表示されます。
+並び替え・絞り込みは tag-system.js が、ギャラリーのデータを取得せずに
+カードの data 属性（日付・シリーズ・タグ）を使って書き出し済みのカードに対して行います。
+
+前回の生成時の内容（タグの作品とその表示項目）のハッシュを
+scripts/.build_cache/gallery_tags.json に保存し、
+作品が変わったタグのページだけを書き直します。
+
+Usage:
+    python build_gallery_tags.py [options]
+
+Example:
+    python build_gallery_tags.py
+    python build_gallery_tags.py --force
+"""
+
+from pathlib import Path
+import sys
+import json
+import html
+import hashlib
+from urllib.parse import quote
+import argparse
+from typing import Dict, List
+from build_utils import generate_html_head, generate_html_footer
+from gallery_bundle import load_series_files
+from image_utils import add_image_attributes
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+CACHE_PATH = Path(__file__).resolve().parent / '.build_cache' / 'gallery_tags.json'
+TAG_PAGE_DIR = 'gallery/tag-page'
+TAG_LIST_NAME = 'tags'
+TAG_SYSTEM_CSS = f'/{TAG_PAGE_DIR}/tag-system.css'
+
+# テンプレートを変更した場合は上げる（全ページを書き直す）
+PAGE_VERSION = 2
+
+# 作品カードに使う項目（これらが変わったタグだけ書き直す）
+CARD_FIELDS = ('id', 'path', 'image_path', 'date', 'series', 'tags', 'thumbnail', 'srcset')
+
+# タグ一覧の文字の大きさの段階数
+CLOUD_LEVELS = 5
+
+
+def collect_tags(series_files):
+    """
+    タグごとの作品を集計
+
+    Args:
+        series_files: load_series_files() の結果
+
+    Returns:
+        {タグ: [作品, ...]}（作品は config.json のシリーズ順・JSON内の順）
+    """
+    tags: Dict[str, List[dict]] = {}
+    for name, data in series_files:
+        for work in data.get(f'{name}_series', []):
+            for tag in dict.fromkeys(work.get('tags') or []):
+                tags.setdefault(tag, []).append(work)
+    return tags
+
+
+def membership_hash(tag: str, works: List[dict], template: str) -> str:
+    """タグの作品と表示項目、ページの共通部分から変更判定用のハッシュを作る"""
+    cards = [{field: work.get(field) for field in CARD_FIELDS} for work in works]
+    source = json.dumps([PAGE_VERSION, tag, cards, template], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def tag_page_url(tag: str) -> str:
+    """タグページのURL（タグ名はURLエンコードする）"""
+    return f'/{TAG_PAGE_DIR}/{quote(tag, safe="")}.html'
+
+
+def sort_works(works: List[dict]) -> List[dict]:
+    """tag-system.js の初期表示（新しい順）と同じ並び"""
+    return sorted(works, key=lambda work: work.get('date', ''), reverse=True)
+
+
+def generate_tags_html(tags: List[str], exclude_tags: List[str]) -> str:
+    """作品カードのタグ一覧（tag-system.js の createTagsHtml と同じ）"""
+    if not tags:
+        return '<span class="no-tags">タグなし</span>'
+    visible_tags = [tag for tag in tags if tag not in exclude_tags]
+    if not visible_tags:
+        return '<span class="no-tags">表示可能なタグがありません</span>'
+    return ' '.join(
+        f'<a href="{html.escape(tag_page_url(tag))}" class="tag-link">#{html.escape(tag)}</a>'
+        for tag in visible_tags
+    )
+
+
+def generate_work_card(work: dict, exclude_tags: List[str]) -> str:
+    """作品カード（tag-system.js の createWorkCard と同じ）"""
+    tags = work.get('tags') or []
+    piccard_class = 'piccard nsfw' if 'nsfw' in tags else 'piccard'
+    work_id = html.escape(work.get('id', ''))
+    image_path = html.escape(work.get('image_path', ''))
+    src = html.escape(work.get('thumbnail') or work.get('image_path', ''))
+    srcset = ''
+    if work.get('srcset'):
+        srcset = f' srcset="{html.escape(work["srcset"])}" sizes="(max-width: 640px) 100vw, 640px"'
+    date = html.escape(work.get('date', ''))
+    series = html.escape(work.get('series', ''))
+    # tag-system.js が並び替え・絞り込みに使う
+    data_tags = html.escape(json.dumps(tags, ensure_ascii=False))
+
+    return f'''<section class="card" data-date="{date}" data-series="{series}" data-tags="{data_tags}">
+              <div class="{piccard_class}">
+                <h2 class="title">
+                  <a href="{html.escape(work.get('path', ''))}">{work_id}</a>
+                </h2>
+                <a href="{image_path}">
+                  <img src="{src}"{srcset} alt="{work_id}">
+                </a>
+                <p class="date"><time datetime="{date}">{date}</time></p>
+                <div class="series-info">{series}</div>
+                <nav class="tags-section" aria-label="作品タグ">
+                  <div class="tags-title">tags:</div>
+                  <div class="tags-list">
+                    {generate_tags_html(tags, exclude_tags)}
+                  </div>
+                </nav>
+              </div>
+            </section>'''
+
+
+def generate_breadcrumb(items) -> str:
+    """ギャラリーのパンくずナビゲーション（最後の項目が現在のページ）"""
+    lines = []
+    for i, (text, url) in enumerate(items):
+        current = ' aria-current="page"' if i == len(items) - 1 else ''
+        lines.append(f'<li{current}><a href="{url}">{html.escape(text)}</a></li>')
+    return '<ol class="breadcrumb">\n            ' + '\n            '.join(lines) + '\n          </ol>'
+
+
+def generate_page(title: str, breadcrumb: str, main_html: str, scripts: str = '') -> str:
+    """ページ全体のHTML（<head> とフッターは build_utils と共通）"""
+    head = generate_html_head(title, additional_css=[TAG_SYSTEM_CSS], txt_lists=False)
+    return f'''<!DOCTYPE html>
+<html lang="ja">
+
+{head}
+
+<body>
+  <div id="wrapper">
+    <header id="header">
+      <div id="header-flex">
+        <nav id="back" aria-label="戻るナビゲーション">
+          <a id="backicon" href="/index.html">
+            &lt;
+          </a>
+        </nav>
+        <nav id="address" class="addressbar" aria-label="パンくずナビゲーション">
+          {breadcrumb}
+        </nav>
+      </div>
+    </header>
+    <main id="main">
+{main_html}
+    </main>
+{generate_html_footer(['galleryhtml'])}
+{scripts}</body>
+
+</html>
+'''
+
+
+def generate_tag_page(tag: str, works: List[dict], exclude_tags: List[str], series_tags: List[str]) -> str:
+    """
+    タグページのHTMLを生成
+
+    Args:
+        tag: タグ名
+        works: タグの作品
+        exclude_tags: カードのタグ一覧に表示しないタグ
+        series_tags: 追加タグの選択肢に出さないシリーズのタグ
+
+    Returns:
+        ページのHTML
+    """
+    escaped_tag = html.escape(tag)
+    breadcrumb = generate_breadcrumb([
+        ('100%health', '/index.html'),
+        ('gallery', '../gallery_main.html'),
+        ('tags', f'{TAG_LIST_NAME}.html'),
+        (tag, html.escape(tag_page_url(tag))),
+    ])
+    cards = '\n            '.join(generate_work_card(work, exclude_tags) for work in sort_works(works))
+
+    main_html = f'''      <div id="galleryspace">
+        <div class="tag-header">
+          <h1 class="title">#{escaped_tag} の作品一覧</h1>
+          <div class="tag-controls">
+            <div class="filter-row">
+              <select id="sort-select" aria-label="並び替え">
+                <option value="date-desc">新しい順</option>
+                <option value="date-asc">古い順</option>
+                <option value="series">シリーズ別</option>
+              </select>
+
+              <select id="series-filter" aria-label="シリーズ別">
+                <option value="">全シリーズ</option>
+                <!-- 動的生成 -->
+              </select>
+
+              <select id="tag-filter" aria-label="追加タグ">
+                <option value="">追加タグなし</option>
+                <!-- 動的生成 -->
+              </select>
+
+              <!-- リセットボタン -->
+              <button id="reset-filters" type="button" class="reset-btn">
+                リセット
+              </button>
+            </div>
+          </div>
+        </div>
+        <!-- build_gallery_tags.py で生成（並び替え・絞り込みは tag-system.js） -->
+        <div id="works-container" data-prerendered>
+          <div class="works-count">{len(works)}件の作品が見つかりました</div>
+          <div class="works-grid">
+            {cards}
+          </div>
+        </div>
+      </div>'''
+
+    scripts = f'''  <script src="tag-system.js"></script>
+  <script>
+    // ページ固有設定
+    window.TagPageConfig = {{
+      targetTag: {script_json(tag)},
+      excludeTags: {script_json(exclude_tags)},
+      seriesTags: {script_json(series_tags)},
+      debug: false
+    }};
+  </script>
+'''
+    return generate_page(f'#{escaped_tag} - 100%health', breadcrumb, main_html, scripts)
+
+
+def script_json(value) -> str:
+    """<script> 内に埋め込むJSON（</script> で閉じられないようにする）"""
+    return json.dumps(value, ensure_ascii=False).replace('</', '<\\/')
+
+
+def generate_tag_list_page(tags: Dict[str, List[dict]]) -> str:
+    """
+    件数付きのタグ一覧（tags.html）を生成
+
+    件数の多い順に並べ、件数に応じて文字の大きさを CLOUD_LEVELS 段階に分けます。
+    """
+    counts = sorted(((tag, len(works)) for tag, works in tags.items()), key=lambda item: (-item[1], item[0]))
+    max_count = counts[0][1] if counts else 1
+    items = []
+    for tag, count in counts:
+        level = 1 + (count - 1) * (CLOUD_LEVELS - 1) // max(max_count - 1, 1)
+        escaped_tag = html.escape(tag)
+        items.append(
+            f'<a href="{html.escape(tag_page_url(tag))}" class="tag-item tag-level-{level}" '
+            f'data-tag="{escaped_tag}" data-count="{count}">#{escaped_tag} ({count})</a>'
+        )
+
+    breadcrumb = generate_breadcrumb([
+        ('100%health', '/index.html'),
+        ('gallery', '../gallery_main.html'),
+        ('tags', f'{TAG_LIST_NAME}.html'),
+    ])
+    item_html = '\n            '.join(items)
+    main_html = f'''      <header id="category-header">
+        <nav aria-label="ページカテゴリナビゲーション">
+          <ol class="main-category">
+            <li><a href="/aboutme.html">about</a></li>
+            <li><a href="/gallery/gallery_main.html">gallery</a></li>
+            <li><a href="/works/works_main.html">works</a></li>
+            <li><a href="/txt/txt_main.html">txt</a></li>
+            <li><a href="/links/links_main.html">links</a></li>
+            <li><a href="/misc/index.html">misc</a></li>
+          </ol>
+          <ol class="sub-category">
+            <li><a href="/gallery/gallery_main.html">gallery</a></li>
+            <li><a href="/gallery/gallery_index.html">index</a></li>
+            <li><a href="/gallery/tag-page/tags.html">tags</a></li>
+            <li><a href="/gallery/gallery_graph.html">graph</a></li>
+          </ol>
+        </nav>
+      </header>
+      <div id="galleryspace">
+        <h1 class="title">タグ<ruby>一覧<rt>いちらん</rt></ruby> / <small title="tag index page" lang="en">tag_list</small></h1>
+        <section>
+          <h2>タグ<ruby>一覧<rt>いちらん</rt></ruby></h2>
+          <!-- build_gallery_tags.py で生成 -->
+          <div id="popular-tags" class="tag-list">
+            {item_html}
+          </div>
+        </section>
+      </div>'''
+
+    return generate_page('tags - 100%health', breadcrumb, main_html)
+
+
+def load_cache(cache_path: Path) -> Dict[str, str]:
+    """前回生成したタグとハッシュを読み込む"""
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('tags', {})
+    except (OSError, ValueError) as e:
+        print(f'Warning: Could not read cache: {e}')
+        return {}
+
+
+def save_cache(cache_path: Path, hashes: Dict[str, str]):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': PAGE_VERSION, 'tags': hashes}, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def build_gallery_tags(root: Path, force=False, debug=False):
+    """
+    タグページとタグ一覧を生成
+
+    Args:
+        root: プロジェクトルート
+        force: 変更がないタグも書き直すかどうか
+        debug: デバッグモード
+    """
+    data_dir = root / 'gallery' / 'data'
+    output_dir = root / TAG_PAGE_DIR
+    series_files = load_series_files(data_dir)
+    if not series_files:
+        print(f'Error: No series data found in {data_dir}')
+        sys.exit(1)
+
+    with open(data_dir / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    exclude_tags = config.get('tags', {}).get('excludeFromDisplay', ['nsfw'])
+    series_tags = config.get('tags', {}).get('seriesTags', ['fanart', 'original', 'works', 'commission'])
+
+    tags = collect_tags(series_files)
+    if TAG_LIST_NAME in tags:
+        print(f'Warning: Tag "{TAG_LIST_NAME}" conflicts with the tag list page; skipped')
+        del tags[TAG_LIST_NAME]
+    print(f'Loaded {sum(len(d.get(f"{n}_series", [])) for n, d in series_files)} work(s), {len(tags)} tag(s)')
+
+    # アセットのURL（ハッシュ付きのファイル名）やタグの設定が変わった場合も書き直す
+    template = generate_page('', '', '') + json.dumps([exclude_tags, series_tags], ensure_ascii=False)
+
+    previous = {} if force else load_cache(CACHE_PATH)
+    hashes = {}
+    written = 0
+    for tag, works in sorted(tags.items()):
+        hashes[tag] = membership_hash(tag, works, template)
+        output_path = output_dir / f'{tag}.html'
+        if previous.get(tag) == hashes[tag] and output_path.exists():
+            continue
+        # 画像の寸法と遅延読み込み（先頭の作品以外）の属性を追加
+        page_html = add_image_attributes(generate_tag_page(tag, works, exclude_tags, series_tags), output_path, root)
+        output_path.write_text(page_html, encoding='utf-8')
+        written += 1
+        if debug:
+            print(f'  {tag}: {len(works)} work(s)')
+
+    # 以前生成したタグのうち、作品がなくなったもののページを削除
+    removed = 0
+    for tag in previous:
+        if tag not in tags:
+            output_path = output_dir / f'{tag}.html'
+            if output_path.exists():
+                output_path.unlink()
+                removed += 1
+                print(f'  Removed: {output_path.relative_to(root)}')
+
+    tag_list_path = output_dir / f'{TAG_LIST_NAME}.html'
+    tag_list_html = generate_tag_list_page(tags)
+    if not tag_list_path.exists() or tag_list_path.read_text(encoding='utf-8') != tag_list_html:
+        tag_list_path.write_text(tag_list_html, encoding='utf-8')
+        print(f'✓ Updated: {tag_list_path.relative_to(root)}')
+
+    save_cache(CACHE_PATH, hashes)
+    print(f'\n✓ Wrote {written} tag page(s), {len(tags) - written} unchanged, {removed} removed')
+    print(f'✓ Output: {output_dir}')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='ギャラリーのタグページ生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 作品が変わったタグのページとタグ一覧を生成
+  python build_gallery_tags.py
+
+  # すべてのタグのページを書き直す
+  python build_gallery_tags.py --force
+        '''
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='変更がないタグのページも書き直す'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('ギャラリーのタグページ生成スクリプト')
+    print('=' * 60)
+
+    build_gallery_tags(project_root, force=args.force, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
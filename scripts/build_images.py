@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+画像の最適化・レスポンシブ画像生成スクリプト
+
+img/ 以下の画像から、サムネイル・表示用サイズの縮小版と WebP / AVIF 版を生成し、
+srcset 用のマニフェスト（img/variants/manifest.json）を書き出します。
+元の画像は変更しません（Luminous で開く原寸画像はそのまま）。
+
+- 複数プロセスで並列に処理
+- 内容のハッシュが前回と同じ画像はスキップ（出力ファイル名にもハッシュを含む）
+- アニメーション GIF / WebP は変換せず、寸法だけを記録
+- --update-gallery で gallery/data/*.json の各作品に thumbnail / srcset / width / height を追加
+  （ギャラリーのタグページ・関連作品はこれを使って縮小版を表示する。
+  JSON の書式は変えず、追加・変更したフィールドだけを書き込む）
+
+Pillow が必要です。AVIF は Pillow が対応している場合
+（Pillow 11.2 以降、または pillow-avif-plugin）のみ生成します。
+
+Usage:
+    python build_images.py [options]
+
+Example:
+    python build_images.py
+    python build_images.py --update-gallery
+    python build_images.py --jobs 8 --formats webp,avif
+"""
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+
+# Pillow は必須ではない（画像の変換時のみ必要）
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# AVIF は Pillow 本体か pillow-avif-plugin が対応している場合のみ
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+AVIF_AVAILABLE = PIL_AVAILABLE and '.avif' in Image.registered_extensions()
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# 生成する幅（元画像より小さいものだけ生成し、元の幅の版も必ず生成する）
+THUMBNAIL_WIDTH = 320
+DISPLAY_WIDTHS = [640, 1280]
+
+SOURCE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.webp'}
+VARIANTS_DIRNAME = 'variants'
+
+QUALITY = {
+    'webp': 80,
+    'avif': 50,
+    'jpg': 82,
+}
+
+# 変換の内容を変えたら上げる（全画像を作り直す）
+IMAGES_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def fallback_format(suffix: str) -> str:
+    """
+    WebP / AVIF に対応していないブラウザ向けの形式（元の形式に合わせる）
+    """
+    return 'jpg' if suffix in ('.jpg', '.jpeg') else 'png'
+
+
+def save_variant(image, path: Path, fmt: str):
+    """
+    画像を指定の形式で保存
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=QUALITY['webp'], method=6)
+    elif fmt == 'avif':
+        image.save(path, 'AVIF', quality=QUALITY['avif'])
+    elif fmt == 'jpg':
+        image.convert('RGB').save(path, 'JPEG', quality=QUALITY['jpg'], optimize=True, progressive=True)
+    else:
+        image.save(path, 'PNG', optimize=True)
+
+
+def process_image(task):
+    """
+    1枚の画像から縮小版・各形式の版を生成（ワーカープロセスで実行）
+
+    Args:
+        task: (元画像のパス, 出力ディレクトリ, サイトルートからのURLの接頭辞, ハッシュ, 形式のリスト)
+
+    Returns:
+        マニフェストのエントリ
+        {'width', 'height', 'hash', 'animated', 'variants': {形式: [[幅, URL], ...]}}
+    """
+    source, output_dir, url_prefix, digest, formats = task
+    source = Path(source)
+    output_dir = Path(output_dir)
+
+    with Image.open(source) as opened:
+        animated = getattr(opened, 'n_frames', 1) > 1
+        image = ImageOps.exif_transpose(opened)
+        width, height = image.size
+        entry = {
+            'width': width,
+            'height': height,
+            'hash': digest,
+            'animated': animated,
+            'variants': {},
+        }
+        if animated:
+            return entry
+
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+        widths = sorted({w for w in [THUMBNAIL_WIDTH] + DISPLAY_WIDTHS if w < width} | {width})
+        all_formats = list(formats) + [fallback_format(source.suffix.lower())]
+        for target_width in widths:
+            if target_width == width:
+                resized = image
+            else:
+                target_height = max(1, round(height * target_width / width))
+                resized = image.resize((target_width, target_height), Image.LANCZOS)
+            for fmt in all_formats:
+                name = f'{source.stem}.{digest[:8]}.{target_width}w.{fmt}'
+                save_variant(resized, output_dir / name, fmt)
+                entry['variants'].setdefault(fmt, []).append([target_width, f'{url_prefix}/{name}'])
+
+    return entry
+
+
+def collect_sources(img_root: Path):
+    """
+    変換対象の画像を列挙（variants ディレクトリ自身は除外）
+    """
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(img_root):
+        dirnames[:] = sorted(d for d in dirnames if d != VARIANTS_DIRNAME)
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix.lower() in SOURCE_SUFFIXES:
+                sources.append(path)
+    return sources
+
+
+def remove_variants(root: Path, entry):
+    for variants in entry.get('variants', {}).values():
+        for _, url in variants:
+            path = root / url.lstrip('/')
+            if path.exists():
+                path.unlink()
+
+
+def build_images(root: Path, config):
+    """
+    img/ 以下の画像を変換し、マニフェストを書き出す
+
+    Args:
+        root: プロジェクトルート
+        config: 設定辞書（formats, jobs, force, debug）
+
+    Returns:
+        マニフェスト
+    """
+    if not PIL_AVAILABLE:
+        print('Error: Pillow is not installed. Install with: pip install Pillow')
+        sys.exit(1)
+
+    formats = [fmt for fmt in config.get('formats', ['webp', 'avif'])]
+    if 'avif' in formats and not AVIF_AVAILABLE:
+        print('Warning: This Pillow build cannot write AVIF; skipping AVIF (pip install pillow-avif-plugin)')
+        formats.remove('avif')
+
+    img_root = root / 'img'
+    variants_root = img_root / VARIANTS_DIRNAME
+    manifest_path = variants_root / 'manifest.json'
+
+    previous = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == IMAGES_VERSION and data.get('formats') == formats and not config.get('force'):
+            previous = data.get('images', {})
+
+    sources = collect_sources(img_root)
+    print(f'Found {len(sources)} image(s) in {img_root}')
+
+    images = {}
+    tasks = []
+    for source in sources:
+        url = '/' + source.relative_to(root).as_posix()
+        digest = file_hash(source)
+        old = previous.get(url)
+        if old and old.get('hash') == digest and all(
+            (root / u.lstrip('/')).exists() for variants in old['variants'].values() for _, u in variants
+        ):
+            images[url] = old
+            continue
+        if old:
+            remove_variants(root, old)
+        rel_dir = source.parent.relative_to(img_root).as_posix()
+        output_dir = variants_root / rel_dir if rel_dir != '.' else variants_root
+        url_prefix = '/' + output_dir.relative_to(root).as_posix()
+        tasks.append((url, (str(source), str(output_dir), url_prefix, digest, formats)))
+
+    # 元画像が削除されたものは縮小版も削除
+    source_urls = {'/' + source.relative_to(root).as_posix() for source in sources}
+    for url, entry in previous.items():
+        if url not in source_urls:
+            remove_variants(root, entry)
+
+    print(f'Processing {len(tasks)} changed image(s) ({len(images)} unchanged)')
+
+    failed = 0
+    if tasks:
+        with ProcessPoolExecutor(max_workers=config.get('jobs')) as executor:
+            futures = [(url, executor.submit(process_image, task)) for url, task in tasks]
+            for url, future in futures:
+                try:
+                    images[url] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f'  Error processing {url}: {e}')
+                    continue
+                if config.get('debug'):
+                    count = sum(len(v) for v in images[url]['variants'].values())
+                    print(f'  ✓ {url} ({count} variant(s))')
+
+    variants_root.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        'version': IMAGES_VERSION,
+        'formats': formats,
+        'images': dict(sorted(images.items())),
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    original = sum((root / url.lstrip('/')).stat().st_size for url in images)
+    smallest = 0
+    for url, entry in images.items():
+        variants = [v for fmt_variants in entry['variants'].values() for v in fmt_variants]
+        display = [u for w, u in variants if w <= max(DISPLAY_WIDTHS)]
+        sizes = [(root / u.lstrip('/')).stat().st_size for u in display]
+        smallest += min(sizes) if sizes else (root / url.lstrip('/')).stat().st_size
+
+    print(f'✓ Manifest: {manifest_path}')
+    print(f'  Originals: {original:,} bytes / smallest display variants: {smallest:,} bytes')
+    if failed:
+        print(f'Warning: {failed} image(s) failed')
+    return manifest
+
+
+def resolve_image_url(image_path: str, page_path: str) -> str:
+    """
+    gallery/data の image_path（作品ページからの相対パスの場合あり）をサイトルートからのURLに変換
+    """
+    if image_path.startswith('/'):
+        return image_path
+    parts = []
+    for segment in (Path(page_path.lstrip('/')).parent / image_path).as_posix().split('/'):
+        if segment == '..':
+            if parts:
+                parts.pop()
+        elif segment not in ('', '.'):
+            parts.append(segment)
+    return '/' + '/'.join(parts)
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def scan_json_objects(text: str, pos: int = 0, depth: int = 0, objects=None):
+    """
+    JSON テキスト中のオブジェクトの位置を記録しながら読み進める
+
+    書式を変えずにフィールドだけを書き換えるために使います。
+
+    Args:
+        text: JSON テキスト（正しい JSON であること）
+        pos: 読み始める位置
+        depth: pos の値の入れ子の深さ（オブジェクト・配列の数）
+        objects: 見つけたオブジェクトを追加するリスト
+            （(開始位置, 終了位置, 深さ, [(キー, キーの開始位置, キーの終了位置, 値の開始位置, 値の終了位置), ...])）
+
+    Returns:
+        値の終了位置
+    """
+    if objects is None:
+        objects = []
+    pos = _JSON_WHITESPACE.match(text, pos).end()
+    if text[pos] == '{':
+        start = pos
+        members = []
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        while text[pos] != '}':
+            key, key_end = _JSON_DECODER.raw_decode(text, pos)
+            colon = _JSON_WHITESPACE.match(text, key_end).end()
+            value_start = _JSON_WHITESPACE.match(text, colon + 1).end()
+            value_end = scan_json_objects(text, value_start, depth + 1, objects)
+            members.append((key, pos, key_end, value_start, value_end))
+            pos = _JSON_WHITESPACE.match(text, value_end).end()
+            if text[pos] == ',':
+                pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        objects.append((start, pos + 1, depth, members))
+        return pos + 1
+    if text[pos] == '[':
+        pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        while text[pos] != ']':
+            pos = scan_json_objects(text, pos, depth + 1, objects)
+            pos = _JSON_WHITESPACE.match(text, pos).end()
+            if text[pos] == ',':
+                pos = _JSON_WHITESPACE.match(text, pos + 1).end()
+        return pos + 1
+    return _JSON_DECODER.raw_decode(text, pos)[1]
+
+
+def set_json_fields(text: str, members, fields) -> list:
+    """
+    オブジェクトのフィールドを書き換える・追加する編集の一覧を作る
+
+    既存のフィールドは値だけを置き換え、新しいフィールドは最後のフィールドの後に、
+    そのオブジェクトのインデント・キーと値の区切りに合わせて追加します。
+
+    Args:
+        text: JSON テキスト
+        members: scan_json_objects() で見つけたオブジェクトのフィールド
+        fields: 書き込むフィールド（キー → 値）
+
+    Returns:
+        (開始位置, 終了位置, 置き換える文字列) のリスト
+    """
+    edits = []
+    existing = {member[0]: member for member in members}
+    _, first_key, first_key_end, first_value, _ = members[0]
+    if len(members) > 1:
+        separator = text[members[-2][4]:members[-1][1]]
+    else:
+        indent = text[text.rfind('{', 0, first_key) + 1:first_key]
+        separator = ',' + indent
+    colon = text[first_key_end:first_value]
+
+    added = ''
+    for key, value in fields.items():
+        encoded = json.dumps(value, ensure_ascii=False)
+        if key in existing:
+            _, _, _, value_start, value_end = existing[key]
+            if text[value_start:value_end] != encoded:
+                edits.append((value_start, value_end, encoded))
+        else:
+            added += f'{separator}{json.dumps(key, ensure_ascii=False)}{colon}{encoded}'
+    if added:
+        last_end = members[-1][4]
+        edits.append((last_end, last_end, added))
+    return edits
+
+
+def update_gallery_data(root: Path, manifest, fmt='webp', debug=False):
+    """
+    gallery/data/*.json の各作品に thumbnail・srcset・width・height を追加
+
+    JSON は書き直さず、追加・変更したフィールドだけを元のテキストに書き込みます
+    （インデント・末尾の改行など、手で書いたファイルの書式はそのまま残ります）。
+
+    Args:
+        root: プロジェクトルート
+        manifest: build_images() の結果
+        fmt: srcset に使う形式
+    """
+    images = manifest['images']
+    for json_path in sorted((root / 'gallery' / 'data').glob('*.json')):
+        if json_path.name == 'config.json':
+            continue
+        with open(json_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+        # ルートのオブジェクト → 作品の配列 → 作品（深さ 2）
+        objects = []
+        scan_json_objects(text, 0, 0, objects)
+        works = sorted((start, end, members) for start, end, depth, members in objects if depth == 2)
+
+        edits = []
+        changed = 0
+        for start, end, members in works:
+            work = json.loads(text[start:end])
+            if not members or not work.get('image_path'):
+                continue
+            url = resolve_image_url(work['image_path'], work.get('path', '/'))
+            entry = images.get(url)
+            variants = entry['variants'].get(fmt) if entry else None
+            if not variants:
+                continue
+            fields = {
+                'thumbnail': variants[0][1],
+                'srcset': ', '.join(f'{u} {w}w' for w, u in variants),
+                'width': entry['width'],
+                'height': entry['height'],
+            }
+            work_edits = set_json_fields(text, members, fields)
+            if work_edits:
+                edits.extend(work_edits)
+                changed += 1
+
+        if changed:
+            for start, end, replacement in sorted(edits, reverse=True):
+                text = text[:start] + replacement + text[end:]
+            with open(json_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f'  ✓ Updated {changed} work(s) in {json_path.relative_to(root)}')
+        elif debug:
+            print(f'  {json_path.relative_to(root)}: up to date')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='画像の最適化・レスポンシブ画像生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 変更された画像だけ変換
+  python build_images.py
+
+  # ギャラリーのデータに thumbnail / srcset / width / height を追加
+  python build_images.py --update-gallery
+
+  # WebP だけを生成
+  python build_images.py --formats webp
+        '''
+    )
+
+    parser.add_argument(
+        '--formats',
+        default='webp,avif',
+        help='生成する形式（カンマ区切り、デフォルト: webp,avif）'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='並列に処理するプロセス数（デフォルト: CPU数）'
+    )
+
+    parser.add_argument(
+        '--update-gallery',
+        action='store_true',
+        help='gallery/data/*.json に thumbnail / srcset / width / height を追加'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='変更がない画像も作り直す'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in ('webp', 'avif')]
+    if unknown:
+        print(f'Error: Unsupported format(s): {", ".join(unknown)} (webp, avif)')
+        sys.exit(1)
+
+    config = {
+        'formats': formats,
+        'jobs': args.jobs,
+        'force': args.force,
+        'debug': args.debug,
+    }
+
+    print('=' * 60)
+    print('画像の最適化・レスポンシブ画像生成スクリプト')
+    print('=' * 60)
+
+    manifest = build_images(project_root, config)
+    if args.update_gallery:
+        update_gallery_data(project_root, manifest, debug=args.debug)
+
+
+if __name__ == '__main__':
+    main()
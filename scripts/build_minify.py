@@ -0,0 +1,798 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公開用ファイルの最小化・事前圧縮スクリプト
+
+サイトのファイルを公開用ディレクトリ（デフォルト: dist/）にコピーし、
+その際に HTML / CSS / JavaScript を最小化して .gz / .br を併せて書き出します。
+編集するソース（リポジトリ内のファイル）は変更しません。
+
+- HTML: 空白の圧縮（<pre>・<textarea>・white-space: pre 系の要素は保持）、
+  コメントの削除、インラインの <style> / <script> の最小化
+- CSS: コメント・余分な空白の削除
+- JavaScript: コメント・インデントの削除（改行は ASI に影響しない位置だけ削除）
+- 内容のハッシュが前回と同じファイルは処理しません
+
+Usage:
+    python build_minify.py [options]
+
+Example:
+    python build_minify.py
+    python build_minify.py --output-dir ../dist --jobs 8
+    python build_minify.py --force --no-compress
+"""
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+from css_utils import parse_stylesheet
+
+# brotli は必須ではない（.br を書き出す場合のみ必要）
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# 最小化の処理内容を変えたら上げる（全ファイルを作り直す）
+MINIFY_VERSION = 2
+
+# 公開用ディレクトリにコピーしないもの
+EXCLUDE_DIRS = {'.git', 'node_modules', 'scripts', '__pycache__', 'dist', '.build_cache'}
+EXCLUDE_NAMES = {
+    'package.json', 'package-lock.json', 'requests.jsonl', 'rss-generator.js',
+    'update-rss.bat', '.gitignore', '.ner_cache.sqlite',
+}
+EXCLUDE_SUFFIXES = {'.py', '.pyc', '.md', '.bak', '.yaml', '.example'}
+
+# 事前圧縮の対象
+COMPRESS_SUFFIXES = {'.html', '.css', '.js', '.json', '.svg', '.xml', '.txt'}
+
+# 空白のみのテキストを削除してよい（前後にあっても表示に影響しない）タグ
+# iframe・video・audio・select・picture などのインライン要素・置換要素は含めない
+# （隣の空白は削除せず、1つの空白に詰める）
+BLOCK_TAGS = {
+    'html', 'head', 'body', 'title', 'meta', 'link', 'script', 'style', 'base', 'noscript',
+    'div', 'section', 'article', 'aside', 'header', 'footer', 'nav', 'main', 'figure',
+    'figcaption', 'p', 'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'table', 'thead', 'tbody',
+    'tfoot', 'tr', 'td', 'th', 'caption', 'colgroup', 'col', 'form', 'fieldset', 'legend',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'br', 'blockquote', 'details', 'summary',
+    'source', 'template', 'pre',
+}
+
+# 中身をそのまま保持する要素
+RAW_TEXT_TAGS = {'script', 'style', 'textarea'}
+PRESERVE_TAGS = {'pre', 'textarea', 'xmp', 'plaintext'}
+WHITESPACE_PRESERVE_PATTERN = re.compile(r'white-space\s*:\s*(pre|pre-wrap|pre-line|break-spaces)', re.I)
+
+HTML_TOKEN_PATTERN = re.compile(
+    r'<!--.*?-->'
+    r'|<![^>]*>'
+    r'|<\?.*?\?>'
+    r'|<(/?)([a-zA-Z][\w:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.S
+)
+HTML_SPACE_PATTERN = re.compile(r'[ \t\n\r\f]+')
+ATTR_QUOTED_PATTERN = re.compile(r'("[^"]*"|\'[^\']*\')')
+CLASS_ATTR_PATTERN = re.compile(r'\bclass\s*=\s*("([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+ID_ATTR_PATTERN = re.compile(r'\bid\s*=\s*("([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+STYLE_ATTR_PATTERN = re.compile(r'\bstyle\s*=\s*("([^"]*)"|\'([^\']*)\')', re.I)
+SCRIPT_TYPE_PATTERN = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.I)
+
+JS_ID_CHARS = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\')
+JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+    'void', 'throw', 'instanceof', 'yield', 'await',
+}
+JS_UNSAFE_JOINS = {'++', '--', '+-', '-+', '//', '/*', '*/', '<!', '->'}
+
+
+# =============================================================================
+# CSS
+# =============================================================================
+
+def minify_css(css: str) -> str:
+    """
+    CSSを最小化（コメント・余分な空白・最後のセミコロンを削除）
+
+    「/*! ... */」のコメントは残します。文字列の中身は変更しません。
+
+    Args:
+        css: CSSテキスト
+
+    Returns:
+        最小化したCSS
+    """
+    result = []
+    i = 0
+    n = len(css)
+    pending_space = False
+
+    while i < n:
+        ch = css[i]
+        if ch == '/' and css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if css.startswith('/*!', i):
+                result.append(css[i:end])
+            i = end
+            continue
+        if ch in '"\'':
+            j = i + 1
+            while j < n and css[j] != ch:
+                j += 2 if css[j] == '\\' else 1
+            token = css[i:j + 1]
+            i = j + 1
+        elif ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        else:
+            token = ch
+            i += 1
+
+        if pending_space and result:
+            prev = result[-1][-1]
+            # 「a :hover」のように空白の有無で意味が変わる位置（: の前）は残す
+            if prev not in '{};,>:' and token[0] not in '{};,>)':
+                result.append(' ')
+        pending_space = False
+        if token == '}' and result and result[-1] == ';':
+            result.pop()
+        result.append(token)
+
+    return ''.join(result).strip()
+
+
+def collect_preserve_selectors(css_texts):
+    """
+    white-space: pre 系が指定されているセレクタ（最後の複合セレクタ）を集める
+
+    Args:
+        css_texts: CSSテキストのリスト
+
+    Returns:
+        {'tags': set, 'classes': set, 'ids': set}
+    """
+    preserve = {'tags': set(), 'classes': set(), 'ids': set()}
+    for css in css_texts:
+        rules, _ = parse_stylesheet(css)
+        for rule in rules:
+            value = rule['declarations'].get('white-space', '')
+            if not WHITESPACE_PRESERVE_PATTERN.search(f'white-space: {value}'):
+                continue
+            last = re.split(r'[\s>+~]+', rule['selector'].strip())[-1]
+            last = re.sub(r'::?[\w-]+(\([^)]*\))?', '', last)
+            classes = re.findall(r'\.([\w-]+)', last)
+            ids = re.findall(r'#([\w-]+)', last)
+            tag = re.match(r'[a-zA-Z][\w-]*', last)
+            if classes:
+                preserve['classes'].update(classes)
+            elif ids:
+                preserve['ids'].update(ids)
+            elif tag:
+                preserve['tags'].add(tag.group().lower())
+    return preserve
+
+
+# =============================================================================
+# JavaScript
+# =============================================================================
+
+def _scan_string(js: str, i: int) -> int:
+    """文字列リテラルの終わり（閉じ引用符の次）の位置を返す"""
+    quote = js[i]
+    i += 1
+    while i < len(js):
+        if js[i] == '\\':
+            i += 2
+            continue
+        if js[i] == quote or js[i] == '\n':
+            return i + 1
+        i += 1
+    return i
+
+
+def _scan_template(js: str, i: int) -> int:
+    """テンプレートリテラルの終わりの位置を返す（${...} の入れ子に対応）"""
+    i += 1
+    while i < len(js):
+        ch = js[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '`':
+            return i + 1
+        if js.startswith('${', i):
+            i += 2
+            depth = 1
+            while i < len(js) and depth:
+                ch = js[i]
+                if ch in '"\'':
+                    i = _scan_string(js, i)
+                    continue
+                if ch == '`':
+                    i = _scan_template(js, i)
+                    continue
+                if ch == '{':
+                    depth += 1
+                elif ch == '}':
+                    depth -= 1
+                i += 1
+            continue
+        i += 1
+    return i
+
+
+def _scan_regex(js: str, i: int) -> int:
+    """正規表現リテラルの終わり（フラグを含む）の位置を返す"""
+    i += 1
+    in_class = False
+    while i < len(js):
+        ch = js[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '\n':
+            return i
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(js) and (js[i].isalnum() or js[i] in '_$'):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _is_id_char(ch: str) -> bool:
+    return ch in JS_ID_CHARS or ord(ch) > 127
+
+
+def minify_js(js: str) -> str:
+    """
+    JavaScriptを保守的に最小化
+
+    コメントとインデント・余分な空白を削除します。改行は、削除しても
+    自動セミコロン挿入（ASI）の結果が変わらない位置でだけ削除します。
+    識別子の短縮などは行いません。
+
+    Args:
+        js: JavaScriptのソース
+
+    Returns:
+        最小化したソース
+    """
+    out = []
+    i = 0
+    n = len(js)
+    pending_space = False
+    pending_newline = False
+    last_token = ''
+
+    while i < n:
+        ch = js[i]
+
+        if ch in ' \t\r\f\v\u00a0\ufeff':
+            pending_space = True
+            i += 1
+            continue
+        if ch == '\n':
+            pending_newline = True
+            i += 1
+            continue
+        if js.startswith('//', i):
+            end = js.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if js.startswith('/*', i) and not js.startswith('/*!', i):
+            end = js.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if '\n' in js[i:end]:
+                pending_newline = True
+            else:
+                pending_space = True
+            i = end
+            continue
+
+        if ch in '"\'':
+            end = _scan_string(js, i)
+        elif ch == '`':
+            end = _scan_template(js, i)
+        elif js.startswith('/*!', i):
+            end = js.find('*/', i + 3)
+            end = n if end == -1 else end + 2
+        elif ch == '/' and (not last_token or last_token[-1] in JS_REGEX_PRECEDERS
+                            or last_token in JS_REGEX_KEYWORDS or last_token == '}'):
+            end = _scan_regex(js, i)
+        elif _is_id_char(ch):
+            end = i + 1
+            while end < n and _is_id_char(js[end]):
+                end += 1
+        else:
+            end = i + 1
+        token = js[i:end]
+        i = end
+
+        if out and (pending_space or pending_newline):
+            prev = out[-1][-1]
+            first = token[0]
+            if pending_newline and not (prev in '{;,([' or first in '})]'):
+                out.append('\n')
+            elif ((_is_id_char(prev) and _is_id_char(first))
+                  or prev + first in JS_UNSAFE_JOINS
+                  or (prev.isdigit() and first == '.')):
+                out.append(' ')
+        pending_space = pending_newline = False
+
+        out.append(token)
+        last_token = token
+
+    return ''.join(out).strip()
+
+
+# =============================================================================
+# HTML
+# =============================================================================
+
+def _attr_value(pattern, attrs: str) -> str:
+    match = pattern.search(attrs)
+    if not match:
+        return ''
+    return next((g for g in match.groups()[1:] if g is not None), '')
+
+
+def _minify_tag(tag: str) -> str:
+    """タグ内の属性間の空白を詰める（引用符内は変更しない）"""
+    parts = ATTR_QUOTED_PATTERN.split(tag)
+    for index in range(0, len(parts), 2):
+        parts[index] = HTML_SPACE_PATTERN.sub(' ', parts[index])
+    tag = ''.join(parts)
+    tag = re.sub(r'\s+(/?>)$', r'\1', tag)
+    return re.sub(r'^<\s+', '<', tag)
+
+
+def _is_preserved(name: str, attrs: str, preserve) -> bool:
+    """要素の中の空白を保持する必要があるか"""
+    if name in PRESERVE_TAGS or name in preserve['tags']:
+        return True
+    classes = _attr_value(CLASS_ATTR_PATTERN, attrs).split()
+    if any(cls in preserve['classes'] for cls in classes):
+        return True
+    if _attr_value(ID_ATTR_PATTERN, attrs) in preserve['ids']:
+        return True
+    return bool(WHITESPACE_PRESERVE_PATTERN.search(_attr_value(STYLE_ATTR_PATTERN, attrs)))
+
+
+def _minify_raw(name: str, attrs: str, content: str) -> str:
+    """<script> / <style> の中身を最小化"""
+    if name == 'style':
+        return minify_css(content)
+    if name == 'script':
+        match = SCRIPT_TYPE_PATTERN.search(attrs)
+        script_type = match.group(1).lower() if match else ''
+        if script_type in ('', 'text/javascript', 'module', 'application/javascript'):
+            return minify_js(content)
+        if script_type.endswith('json'):
+            return content.strip()
+    return content
+
+
+def minify_html(html: str, preserve=None) -> str:
+    """
+    HTMLを最小化
+
+    空白の連続を1つに詰め、ブロック要素の間の空白のみのテキストを削除します。
+    <pre>・<textarea> と、CSSで white-space: pre 系が指定された要素の中身は変更しません。
+
+    Args:
+        html: HTMLテキスト
+        preserve: collect_preserve_selectors() の結果
+
+    Returns:
+        最小化したHTML
+    """
+    if preserve is None:
+        preserve = {'tags': set(), 'classes': set(), 'ids': set()}
+
+    # ページ内の <style> で指定された white-space: pre も対象にする
+    inline_css = re.findall(r'<style[^>]*>(.*?)</style\s*>', html, re.S | re.I)
+    if inline_css:
+        page_preserve = collect_preserve_selectors(inline_css)
+        preserve = {key: preserve[key] | page_preserve[key] for key in preserve}
+
+    # (種類, 内容, タグ名) のリストに分解
+    tokens = []
+    pos = 0
+    length = len(html)
+    while pos < length:
+        match = HTML_TOKEN_PATTERN.search(html, pos)
+        if not match:
+            tokens.append(('text', html[pos:], None))
+            break
+        if match.start() > pos:
+            tokens.append(('text', html[pos:match.start()], None))
+        pos = match.end()
+
+        token = match.group(0)
+        if token.startswith('<!--'):
+            tokens.append(('comment', token, None))
+            continue
+        if match.group(2) is None:
+            tokens.append(('raw', token, None))
+            continue
+
+        closing = match.group(1) == '/'
+        name = match.group(2).lower()
+        attrs = match.group(3) or ''
+        tokens.append(('close' if closing else 'open', token, name, attrs))
+
+        if not closing and name in RAW_TEXT_TAGS and not token.endswith('/>'):
+            close = re.compile(r'</' + name + r'\s*>', re.I).search(html, pos)
+            end = close.start() if close else length
+            content = html[pos:end]
+            if name != 'textarea':
+                content = _minify_raw(name, attrs, content)
+            tokens.append(('raw', content, None))
+            pos = end
+
+    out = []
+    preserve_stack = []  # [タグ名, 入れ子の深さ]
+
+    def neighbour_tag(index, step):
+        index += step
+        while 0 <= index < len(tokens) and (
+                tokens[index][0] == 'comment'
+                or (tokens[index][0] == 'text' and not tokens[index][1].strip(' \t\n\r\f'))):
+            index += step
+        if 0 <= index < len(tokens) and tokens[index][0] in ('open', 'close'):
+            return tokens[index][2]
+        return None
+
+    for index, token in enumerate(tokens):
+        kind, value = token[0], token[1]
+
+        if preserve_stack:
+            out.append(value)
+            if kind in ('open', 'close') and token[2] == preserve_stack[-1][0]:
+                preserve_stack[-1][1] += 1 if kind == 'open' else -1
+                if preserve_stack[-1][1] == 0:
+                    preserve_stack.pop()
+            continue
+
+        if kind == 'comment':
+            if value.startswith('<!--[if') or value.startswith('<!--<!'):
+                out.append(value)
+            continue
+        if kind == 'text':
+            if not value.strip(' \t\n\r\f'):
+                if neighbour_tag(index, -1) in BLOCK_TAGS or neighbour_tag(index, 1) in BLOCK_TAGS:
+                    continue
+            out.append(HTML_SPACE_PATTERN.sub(' ', value))
+            continue
+        if kind == 'open':
+            out.append(_minify_tag(value))
+            if not value.endswith('/>') and _is_preserved(token[2], token[3], preserve):
+                preserve_stack.append([token[2], 1])
+            continue
+        out.append(_minify_tag(value) if kind == 'close' else value)
+
+    return ''.join(out).strip() + '\n'
+
+
+# =============================================================================
+# ファイル処理
+# =============================================================================
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def compress_file(path: Path, data: bytes, use_brotli: bool):
+    """
+    .gz / .br を書き出す（元より小さくならない場合は書き出さない）
+
+    Returns:
+        (gz のサイズ, br のサイズ)（書き出さなかった場合は None）
+    """
+    sizes = []
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    variants = [('.gz', gz_data)]
+    if use_brotli:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        target = path.with_name(path.name + suffix)
+        if len(compressed) < len(data):
+            target.write_bytes(compressed)
+            sizes.append(len(compressed))
+        else:
+            if target.exists():
+                target.unlink()
+            sizes.append(None)
+    if not use_brotli:
+        sizes.append(None)
+    return tuple(sizes)
+
+
+def process_file(task):
+    """
+    1ファイルを最小化・圧縮して公開用ディレクトリに書き出す（ワーカープロセスで実行）
+
+    Args:
+        task: (元ファイル, 出力先, preserve, compress, use_brotli)
+
+    Returns:
+        (元のサイズ, 最小化後のサイズ, gz のサイズ, br のサイズ)
+    """
+    source, target, preserve, compress, use_brotli = task
+    source = Path(source)
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    data = source.read_bytes()
+    suffix = source.suffix.lower()
+    output = data
+    if suffix in ('.html', '.css', '.js') and not source.name.endswith('.min.js'):
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = None
+        if text is not None:
+            if suffix == '.html':
+                text = minify_html(text, preserve)
+            elif suffix == '.css':
+                text = minify_css(text)
+            else:
+                text = minify_js(text)
+            output = text.encode('utf-8')
+
+    if output is data:
+        shutil.copy2(source, target)
+    else:
+        target.write_bytes(output)
+
+    gz_size = br_size = None
+    if compress and suffix in COMPRESS_SUFFIXES:
+        gz_size, br_size = compress_file(target, output, use_brotli)
+    return len(data), len(output), gz_size, br_size
+
+
+def collect_site_files(root: Path, output_dir: Path):
+    """
+    公開対象のファイルを列挙（除外ディレクトリ・ファイルはスキップ）
+
+    Returns:
+        プロジェクトルートからの相対パス（POSIX形式）のリスト
+    """
+    files = []
+    output_dir = output_dir.resolve()
+    for dirpath, dirnames, filenames in os.walk(root):
+        current = Path(dirpath)
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if d not in EXCLUDE_DIRS and not d.startswith('.') and (current / d).resolve() != output_dir
+        )
+        for filename in sorted(filenames):
+            path = current / filename
+            if filename in EXCLUDE_NAMES or path.suffix.lower() in EXCLUDE_SUFFIXES:
+                continue
+            files.append(path.relative_to(root).as_posix())
+    return files
+
+
+def is_site_path(rel: str) -> bool:
+    """
+    相対パス（POSIX形式）が collect_site_files() の公開対象に含まれるか
+    """
+    parts = rel.split('/')
+    if any(d in EXCLUDE_DIRS or d.startswith('.') for d in parts[:-1]):
+        return False
+    return parts[-1] not in EXCLUDE_NAMES and Path(parts[-1]).suffix.lower() not in EXCLUDE_SUFFIXES
+
+
+def remove_output(target: Path):
+    for path in (target, target.with_name(target.name + '.gz'), target.with_name(target.name + '.br')):
+        if path.exists():
+            path.unlink()
+
+
+def build_minify(root: Path, config):
+    """
+    サイト全体を公開用ディレクトリに書き出す
+
+    Args:
+        root: プロジェクトルート
+        config: 設定辞書
+            output_dir, state_path, jobs, compress, force, debug
+    """
+    output_dir = Path(config['output_dir'])
+    state_path = Path(config['state_path'])
+    debug = config.get('debug', False)
+    compress = config.get('compress', True)
+    use_brotli = compress and BROTLI_AVAILABLE
+
+    if compress and not BROTLI_AVAILABLE:
+        print('Warning: brotli is not installed; only .gz files will be written (pip install brotli)')
+
+    files = collect_site_files(root, output_dir)
+    print(f'Found {len(files)} file(s)')
+
+    # white-space: pre 系のセレクタをサイトのCSSから集める
+    css_texts = []
+    for rel in files:
+        if rel.endswith('.css'):
+            css_texts.append((root / rel).read_text(encoding='utf-8', errors='replace'))
+    preserve = collect_preserve_selectors(css_texts)
+    preserve = {key: sorted(values) for key, values in preserve.items()}
+
+    settings = hashlib.sha256(json.dumps(
+        [MINIFY_VERSION, preserve, compress, use_brotli], sort_keys=True
+    ).encode('utf-8')).hexdigest()
+    preserve = {key: set(values) for key, values in preserve.items()}
+
+    state = {}
+    if state_path.exists():
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    previous = state.get('files', {}) if state.get('settings') == settings and not config.get('force') else {}
+
+    hashes = {}
+    tasks = []
+    for rel in files:
+        source = root / rel
+        target = output_dir / rel
+        digest = file_hash(source)
+        hashes[rel] = digest
+        if previous.get(rel) == digest and target.exists():
+            continue
+        tasks.append((rel, (str(source), str(target), preserve, compress, use_brotli)))
+
+    # 元ファイルが削除されたものは公開用ディレクトリからも削除
+    removed = 0
+    for rel in state.get('files', {}):
+        if rel not in hashes:
+            remove_output(output_dir / rel)
+            removed += 1
+
+    print(f'Processing {len(tasks)} changed file(s) ({len(files) - len(tasks)} unchanged, {removed} removed)')
+
+    totals = [0, 0, 0, 0]
+    failed = set()
+    if tasks:
+        with ProcessPoolExecutor(max_workers=config.get('jobs')) as executor:
+            futures = [(rel, executor.submit(process_file, task)) for rel, task in tasks]
+            for rel, future in futures:
+                try:
+                    original, minified, gz_size, br_size = future.result()
+                except Exception as e:
+                    print(f'  Error processing {rel}: {e}')
+                    failed.add(rel)
+                    continue
+                totals[0] += original
+                totals[1] += minified
+                totals[2] += gz_size if gz_size is not None else minified
+                totals[3] += br_size if br_size is not None else minified
+                if debug and original != minified:
+                    print(f'  {rel}: {original:,} → {minified:,} bytes'
+                          + (f' (gz {gz_size:,})' if gz_size else ''))
+
+    state = {
+        'settings': settings,
+        'files': {rel: digest for rel, digest in hashes.items() if rel not in failed},
+    }
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+
+    if tasks:
+        print(f'✓ Written to {output_dir}')
+        print(f'  Original: {totals[0]:,} bytes')
+        print(f'  Minified: {totals[1]:,} bytes')
+        if compress:
+            print(f'  gzip:     {totals[2]:,} bytes')
+            if use_brotli:
+                print(f'  brotli:   {totals[3]:,} bytes')
+    else:
+        print('✓ Everything is up to date')
+
+    if failed:
+        print(f'Warning: {len(failed)} file(s) failed')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='公開用ファイルの最小化・事前圧縮スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # dist/ に書き出す（変更のあったファイルだけ処理）
+  python build_minify.py
+
+  # 出力先と並列数を指定
+  python build_minify.py --output-dir ../dist --jobs 8
+
+  # すべて作り直す
+  python build_minify.py --force
+        '''
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='公開用ディレクトリ（デフォルト: dist/）'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='並列に処理するプロセス数（デフォルト: CPU数）'
+    )
+
+    parser.add_argument(
+        '--no-compress',
+        action='store_true',
+        help='.gz / .br を書き出さない'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='変更がないファイルも処理し直す'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化（ファイルごとのサイズを表示）'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    config = {
+        'output_dir': Path(args.output_dir).resolve() if args.output_dir else project_root / 'dist',
+        'state_path': script_dir / '.build_cache' / 'minify.json',
+        'jobs': args.jobs,
+        'compress': not args.no_compress,
+        'force': args.force,
+        'debug': args.debug,
+    }
+
+    print('=' * 60)
+    print('公開用ファイルの最小化・事前圧縮スクリプト')
+    print('=' * 60)
+
+    build_minify(project_root, config)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,8 +23,11 @@ from build_utils import (
     find_adjacent_months,
     generate_html_head,
     generate_html_footer,
-    generate_breadcrumb
+    generate_breadcrumb,
+    asset_url
 )
+from image_utils import add_image_attributes
+from embed_utils import add_embed_facades
 
 # UTF-8で出力（Windows対応）
 if sys.stdout.encoding != 'utf-8':
@@ -308,15 +311,49 @@ def process_element(element, config):
     return {'element': cloned, 'chars': estimated_chars}
 
 
-def build_month_page(year, month, days_dir, config=None):
+def load_day_article(html_file, year, month, truncate_config):
     """
-    日別記事を統合して月別ページを生成
+    日別HTMLを読み込み、省略処理をした <article> のHTMLを返す
+    
+    Args:
+        html_file: 日別HTMLファイルのパス
+        year: 年
+        month: 月
+        truncate_config: 省略処理の設定
+    
+    Returns:
+        省略処理済みの記事のHTML（<article> がない・読み込めない場合は None）
+    """
+    try:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+        
+        # <article>要素を取得
+        article = soup.find('article')
+        if article:
+            # 高度な省略処理を適用（JavaScriptと同等）
+            return advanced_truncate_article(article, year, month, truncate_config)
+        print(f'  Warning: No <article> found in {html_file.name}')
+    except Exception as e:
+        print(f'  Error reading {html_file.name}: {e}')
+    return None
+
+
+def render_month_page(year, month, days_dir, config=None, load_article=None, save_image_cache=True):
+    """
+    日別記事を統合して月別ページのHTMLを組み立てる（ファイルには書き出さない）
     
     Args:
         year: 年（例: "2025"）
         month: 月（例: "12"）
         days_dir: 日別HTMLファイルが格納されているディレクトリパス
         config: 設定辞書（省略時はデフォルト設定）
+        load_article: 日別HTMLのパスと省略処理の設定から記事のHTMLを返す関数
+            （省略時は load_day_article、serve.py は解析済みの記事を返す）
+        save_image_cache: 画像の寸法のキャッシュを保存するかどうか
+    
+    Returns:
+        (月別ページのHTML, 出力先のパス, 記事数)
     """
     # デフォルト設定を使用
     if config is None:
@@ -356,24 +393,14 @@ def build_month_page(year, month, days_dir, config=None):
     truncate_config = config.get('truncate', {})
     truncate_config['debug'] = config.get('debug', False)
     
+    if load_article is None:
+        load_article = lambda path, options: load_day_article(path, year, month, options)
+    
     for html_file in html_files:
         print(f'Processing: {html_file.name}')
-        
-        try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-                
-                # <article>要素を取得
-                article = soup.find('article')
-                if article:
-                    # 高度な省略処理を適用（JavaScriptと同等）
-                    truncated_html = advanced_truncate_article(article, year, month, truncate_config)
-                    articles_html.append(truncated_html)
-                else:
-                    print(f'  Warning: No <article> found in {html_file.name}')
-        except Exception as e:
-            print(f'  Error reading {html_file.name}: {e}')
-            continue
+        truncated_html = load_article(html_file, truncate_config)
+        if truncated_html is not None:
+            articles_html.append(truncated_html)
     
     # ナビゲーションリンクの生成
     if prev_year and prev_month:
@@ -402,19 +429,19 @@ def build_month_page(year, month, days_dir, config=None):
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>{year}-{month} - 100%health</title>
-  <link rel="stylesheet" href="/1column.css">
-  <link rel="icon" type="image/svg+xml" href="/favicon.svg">
-  <script src="/js/jquery-3.6.0.min.js"></script>
-  <script src="/js/main.js"></script>
-  <script src="/js/mouse.js"></script>
+  <link rel="stylesheet" href="{asset_url('/1column.css')}">
+  <link rel="icon" type="image/svg+xml" href="{asset_url('/favicon.svg')}">
+  <script src="{asset_url('/js/jquery-3.6.0.min.js')}"></script>
+  <script src="{asset_url('/js/main.js')}"></script>
+  <script src="{asset_url('/js/mouse.js')}"></script>
   <script>
     $(function () {{
       $("#zakkihtml").load("/txt/txt_main.html #zakki-list");
       $("#taghtml").load("/txt/txt_main.html #tag-list");
     }});
   </script>
-  <link rel="stylesheet" href="/txt/zakki/zakki-month.css">
-  <link rel="stylesheet" href="/txt/zakki/tag-style.css">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/zakki-month.css')}">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/tag-style.css')}">
 </head>
 
 <body>
@@ -478,8 +505,8 @@ def build_month_page(year, month, days_dir, config=None):
 
   </div>
   <div id="lightbox">
-    <link rel="stylesheet" href="/luminous-basic.min.css">
-    <script src="/Luminous.min.js" defer></script>
+    <link rel="stylesheet" href="{asset_url('/luminous-basic.min.css')}">
+    <script src="{asset_url('/Luminous.min.js')}" defer></script>
     <script>
       // LuminousGalleryが読み込まれてから実行
       if (typeof LuminousGallery !== 'undefined') {{
@@ -495,6 +522,31 @@ def build_month_page(year, month, days_dir, config=None):
     output_dir = days_path.parent
     output_path = output_dir / f'{year}-{month}.html'
     
+    # 埋め込みプレーヤーをファサードに置き換え（オプション）
+    month_html = add_embed_facades(month_html, convert=config.get('embed_facades', False))
+    
+    # 画像に寸法と遅延読み込みの属性を追加
+    month_html = add_image_attributes(month_html, output_path, save=save_image_cache)
+    
+    return month_html, output_path, len(articles_html)
+
+
+def build_month_page(year, month, days_dir, config=None):
+    """
+    日別記事を統合して月別ページを生成
+    
+    Args:
+        year: 年（例: "2025"）
+        month: 月（例: "12"）
+        days_dir: 日別HTMLファイルが格納されているディレクトリパス
+        config: 設定辞書（省略時はデフォルト設定）
+    """
+    # デフォルト設定を使用
+    if config is None:
+        config = load_config()
+    
+    month_html, output_path, article_count = render_month_page(year, month, days_dir, config)
+    
     # バックアップの作成
     create_backup(output_path, config.get('create_backup', True))
     
@@ -504,7 +556,7 @@ def build_month_page(year, month, days_dir, config=None):
             f.write(month_html)
         
         print(f'\n✓ Successfully generated: {output_path}')
-        print(f'✓ Articles included: {len(articles_html)}')
+        print(f'✓ Articles included: {article_count}')
         print(f'\nYou can now open the file in your browser!')
         
     except Exception as e:
@@ -536,6 +588,9 @@ def parse_arguments():
   # カスタム設定ファイル使用
   python build_month.py 2025 12 ./txt/zakki/2025/12/days --config custom.yaml
   
+  # 埋め込みプレーヤーをクリックで読み込む
+  python build_month.py 2025 12 ./txt/zakki/2025/12/days --embed-facades
+  
   # 複数のオプション指定
   python build_month.py 2025 12 ./txt/zakki/2025/12/days --sort-order asc --max-chars 500 --debug
         '''
@@ -573,6 +628,12 @@ def parse_arguments():
         help='バックアップを作成しない'
     )
     
+    parser.add_argument(
+        '--embed-facades',
+        action='store_true',
+        help='埋め込みプレーヤーをクリックで読み込むファサードに置き換える'
+    )
+    
     # 省略処理のパラメータ
     parser.add_argument(
         '--max-chars',
@@ -628,6 +689,9 @@ def main():
     if args.no_backup:
         config['create_backup'] = False
     
+    if args.embed_facades:
+        config['embed_facades'] = True
+    
     # truncate 設定の上書き
     if args.max_chars:
         config['truncate']['max_chars'] = args.max_chars
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+サービスワーカーの事前キャッシュ一覧生成スクリプト
+
+公開用ディレクトリ（dist/）に precache-manifest.json を書き出します。
+サービスワーカー（/sw.js、js/main.js で登録）はこの一覧を読み込み、
+一覧のファイルをキャッシュから返します。2回目以降の遷移では、共通のアセットや
+フッターの断片（txt_main.html など）を取得し直しません。
+
+一覧に含めるもの:
+- 共通アセット（build_assets.py のハッシュ付きのURL）と、CSSの @font-face が参照するフォント
+- main.js が読み込むフッター・サイドバーの断片（include/*.html、txt/txt_main.html）
+- 最近の月別ページ（--months で件数を指定）とタグページ
+
+各エントリの revision は build_minify.py が記録した元ファイルのハッシュ
+（scripts/.build_cache/minify.json）をそのまま使います。サービスワーカーは
+revision が変わったエントリだけを取得し直し、一覧から消えたエントリは削除します。
+
+build_minify.py の後に実行してください。
+
+Usage:
+    python build_service_worker.py [options]
+
+Example:
+    python build_service_worker.py
+    python build_service_worker.py --months 12 --output-dir ../dist
+"""
+
+from pathlib import Path
+import sys
+import re
+import json
+import hashlib
+import argparse
+from asset_utils import load_asset_manifest
+from css_utils import parse_stylesheet
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+MANIFEST_FILENAME = 'precache-manifest.json'
+MANIFEST_VERSION = 1
+
+# 共通アセット（サイトルートからのURL、build_assets.py の対応表があればハッシュ付きのURLに変換）
+SHELL_ASSETS = [
+    '/1column.css',
+    '/favicon.svg',
+    '/js/jquery-3.6.0.min.js',
+    '/js/main.js',
+    '/js/mouse.js',
+    '/txt/zakki/zakki-month.css',
+    '/txt/zakki/zakki-style.css',
+    '/txt/zakki/tag-style.css',
+    '/txt/zakki/tag/tag-controls.css',
+]
+
+# main.js が読み込む断片（プロジェクトルートからの glob）
+FRAGMENT_PAGES = ['include/*.html', 'txt/txt_main.html']
+
+# 月別ページ・タグページ（プロジェクトルートからの glob）
+MONTH_PAGES = 'txt/zakki/*/*/????-??.html'
+TAG_PAGES = 'txt/zakki/tag/*.html'
+
+DEFAULT_MONTHS = 6
+
+URL_PATTERN = re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)')
+
+
+def load_minify_state(state_path: Path):
+    """
+    build_minify.py が記録したファイルのハッシュを読み込む
+
+    Returns:
+        {プロジェクトルートからの相対パス: sha256}
+    """
+    if not state_path.exists():
+        print(f'Error: {state_path} not found. Run build_minify.py first.')
+        sys.exit(1)
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('files', {})
+
+
+def font_urls(root: Path, css_urls):
+    """
+    CSSの @font-face が参照するローカルのフォントのURLを列挙
+    """
+    urls = []
+    for css_url in css_urls:
+        css_path = root / css_url.lstrip('/')
+        if not css_path.exists():
+            continue
+        _, font_faces = parse_stylesheet(css_path.read_text(encoding='utf-8', errors='replace'))
+        base = css_url.rsplit('/', 1)[0]
+        for face in font_faces:
+            for url in URL_PATTERN.findall(face.get('src', '')):
+                if url.startswith(('data:', 'http:', 'https:', '//')):
+                    continue
+                url = url if url.startswith('/') else f'{base}/{url}'
+                if url not in urls:
+                    urls.append(url)
+    return urls
+
+
+def recent_month_pages(root: Path, months: int):
+    """
+    新しい順に months 件の月別ページのURLを返す
+    """
+    pages = sorted(root.glob(MONTH_PAGES), key=lambda p: p.stem, reverse=True)
+    return ['/' + p.relative_to(root).as_posix() for p in pages[:months]]
+
+
+def collect_urls(root: Path, months: int):
+    """
+    事前キャッシュするURLを種類ごとに列挙
+
+    Returns:
+        [(種類, [URL, ...]), ...]
+    """
+    assets = load_asset_manifest()
+    shell = [assets.get(url, url) for url in SHELL_ASSETS]
+    fonts = font_urls(root, shell)
+    fragments = sorted(
+        '/' + p.relative_to(root).as_posix()
+        for pattern in FRAGMENT_PAGES for p in root.glob(pattern) if p.is_file()
+    )
+    tags = sorted('/' + p.relative_to(root).as_posix() for p in root.glob(TAG_PAGES))
+    return [
+        ('shell', shell),
+        ('fonts', fonts),
+        ('fragments', fragments),
+        ('months', recent_month_pages(root, months)),
+        ('tags', tags),
+    ]
+
+
+def build_manifest(groups, hashes, debug=False):
+    """
+    URLの一覧と build_minify.py のハッシュから事前キャッシュ一覧を作る
+
+    Args:
+        groups: collect_urls() の結果
+        hashes: load_minify_state() の結果
+
+    Returns:
+        {'version', 'revision', 'entries': [{'url', 'revision'}, ...]}
+    """
+    entries = []
+    seen = set()
+    for kind, urls in groups:
+        count = 0
+        for url in urls:
+            if url in seen:
+                continue
+            digest = hashes.get(url.lstrip('/'))
+            if digest is None:
+                print(f'Warning: {url} is not in the minify state (not published?), skipped')
+                continue
+            seen.add(url)
+            entries.append({'url': url, 'revision': digest[:16]})
+            count += 1
+        print(f'- {kind}: {count} file(s)')
+        if debug:
+            for url in urls:
+                print(f'    {url}')
+
+    revision = hashlib.sha256(
+        json.dumps(entries, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16]
+    return {'version': MANIFEST_VERSION, 'revision': revision, 'entries': entries}
+
+
+def summarize_diff(previous, manifest):
+    """
+    前回の一覧との差分（追加・変更・削除の件数）を表示
+    """
+    old = {entry['url']: entry['revision'] for entry in previous.get('entries', [])}
+    new = {entry['url']: entry['revision'] for entry in manifest['entries']}
+    added = [url for url in new if url not in old]
+    changed = [url for url in new if url in old and old[url] != new[url]]
+    removed = [url for url in old if url not in new]
+    print(f'  {len(added)} added, {len(changed)} changed, {len(removed)} removed '
+          f'(clients re-download {len(added) + len(changed)} of {len(new)} file(s))')
+    for label, urls in (('+', added), ('*', changed), ('-', removed)):
+        for url in urls:
+            print(f'    {label} {url}')
+
+
+def build_service_worker(root: Path, config):
+    """
+    事前キャッシュ一覧を公開用ディレクトリに書き出す
+
+    Args:
+        root: プロジェクトルート
+        config: 設定辞書
+            output_dir, state_path, months, debug
+    """
+    output_dir = Path(config['output_dir'])
+    if not (output_dir / 'sw.js').exists():
+        print(f'Warning: {output_dir / "sw.js"} not found. Run build_minify.py to publish it.')
+
+    hashes = load_minify_state(Path(config['state_path']))
+    groups = collect_urls(root, config.get('months', DEFAULT_MONTHS))
+    manifest = build_manifest(groups, hashes, debug=config.get('debug', False))
+
+    output_path = output_dir / MANIFEST_FILENAME
+    previous = {}
+    if output_path.exists():
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+
+    if previous.get('revision') == manifest['revision']:
+        print(f'\n✓ {output_path} is up to date ({len(manifest["entries"])} entries)')
+        return
+
+    summarize_diff(previous, manifest)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    print(f'\n✓ Successfully generated: {output_path} ({len(manifest["entries"])} entries, '
+          f'revision {manifest["revision"]})')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='サービスワーカーの事前キャッシュ一覧生成スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # build_minify.py の後に実行（dist/precache-manifest.json を生成）
+  python build_service_worker.py
+
+  # 最近12か月分の月別ページを含める
+  python build_service_worker.py --months 12
+        '''
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='公開用ディレクトリ（デフォルト: dist/）'
+    )
+
+    parser.add_argument(
+        '--months',
+        type=int,
+        default=DEFAULT_MONTHS,
+        help=f'事前キャッシュする月別ページの件数（デフォルト: {DEFAULT_MONTHS}）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化（URLの一覧を表示）'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    config = {
+        'output_dir': Path(args.output_dir).resolve() if args.output_dir else project_root / 'dist',
+        'state_path': script_dir / '.build_cache' / 'minify.json',
+        'months': args.months,
+        'debug': args.debug,
+    }
+
+    print('=' * 60)
+    print('サービスワーカーの事前キャッシュ一覧生成スクリプト')
+    print('=' * 60)
+
+    build_service_worker(project_root, config)
+
+
+if __name__ == '__main__':
+    main()
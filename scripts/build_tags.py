@@ -18,6 +18,9 @@ import sys
 import argparse
 import json
 from collections import defaultdict
+from asset_utils import asset_url
+from image_utils import add_image_attributes
+from embed_utils import add_embed_facades
 
 # PyYAMLは必須ではない（オプショナル）
 try:
@@ -140,6 +143,55 @@ def parse_data_tags(data_tags_str):
     return tags
 
 
+def scan_day_file(html_file, year, month, debug=False):
+    """
+    日別HTMLからタグ付きのセクションを収集
+    
+    Args:
+        html_file: 日別HTMLファイルのパス
+        year: 年
+        month: 月
+        debug: デバッグモード
+    
+    Returns:
+        list: [(tagName, section_data), ...]（読み込めない場合は空）
+    """
+    html_file = Path(html_file)
+    date = html_file.stem  # ファイル名から日付を取得（例: 2024-12-13）
+    results = []
+    
+    try:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+        
+        # data-tags属性を持つすべてのsectionを検索
+        sections = soup.find_all('section', attrs={'data-tags': True})
+        
+        for section in sections:
+            data_tags = section.get('data-tags', '')
+            parsed_tags = parse_data_tags(data_tags)
+            
+            if debug and parsed_tags:
+                print(f'    Found section with tags: {list(parsed_tags.keys())}')
+            
+            # 各タグについてセクション情報を保存
+            for tag_name, relevance in parsed_tags.items():
+                section_data = {
+                    'date': date,
+                    'year': year,
+                    'month': month,
+                    'section_html': str(section),
+                    'relevance': relevance,
+                    'file_path': str(html_file)
+                }
+                results.append((tag_name, section_data))
+    
+    except Exception as e:
+        print(f'  Error reading {html_file.name}: {e}')
+    
+    return results
+
+
 def scan_zakki_directory(zakki_root, debug=False):
     """
     zakki ディレクトリを走査して全タグとセクションを収集
@@ -178,41 +230,13 @@ def scan_zakki_directory(zakki_root, debug=False):
             # 日別HTMLファイルを走査
             for html_file in sorted(days_dir.glob('*.html')):
                 total_files += 1
-                date = html_file.stem  # ファイル名から日付を取得（例: 2024-12-13）
                 
                 if debug:
                     print(f'  Reading: {html_file.name}')
                 
-                try:
-                    with open(html_file, 'r', encoding='utf-8') as f:
-                        soup = BeautifulSoup(f.read(), 'html.parser')
-                        
-                        # data-tags属性を持つすべてのsectionを検索
-                        sections = soup.find_all('section', attrs={'data-tags': True})
-                        
-                        for section in sections:
-                            data_tags = section.get('data-tags', '')
-                            parsed_tags = parse_data_tags(data_tags)
-                            
-                            if debug and parsed_tags:
-                                print(f'    Found section with tags: {list(parsed_tags.keys())}')
-                            
-                            # 各タグについてセクション情報を保存
-                            for tag_name, relevance in parsed_tags.items():
-                                section_data = {
-                                    'date': date,
-                                    'year': year,
-                                    'month': month,
-                                    'section_html': str(section),
-                                    'relevance': relevance,
-                                    'file_path': str(html_file)
-                                }
-                                tags_data[tag_name].append(section_data)
-                                total_sections += 1
-                
-                except Exception as e:
-                    print(f'  Error reading {html_file.name}: {e}')
-                    continue
+                for tag_name, section_data in scan_day_file(html_file, year, month, debug=debug):
+                    tags_data[tag_name].append(section_data)
+                    total_sections += 1
     
     print(f'\nScan complete:')
     print(f'  Files processed: {total_files}')
@@ -437,11 +461,11 @@ def generate_tag_page_html(tag_name, sections, sort_by='date-desc', description=
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>tag: {tag_name} - 100%health</title>
-  <link rel="stylesheet" href="/1column.css">
-  <link rel="icon" type="image/svg+xml" href="/favicon.svg">
-  <script src="/js/jquery-3.6.0.min.js"></script>
-  <script src="/js/main.js"></script>
-  <script src="/js/mouse.js"></script>
+  <link rel="stylesheet" href="{asset_url('/1column.css')}">
+  <link rel="icon" type="image/svg+xml" href="{asset_url('/favicon.svg')}">
+  <script src="{asset_url('/js/jquery-3.6.0.min.js')}"></script>
+  <script src="{asset_url('/js/main.js')}"></script>
+  <script src="{asset_url('/js/mouse.js')}"></script>
   <style>
     /* タグページ用スタイル */
     article.tag-article {{
@@ -496,9 +520,9 @@ def generate_tag_page_html(tag_name, sections, sort_by='date-desc', description=
       $("#taghtml").load("/txt/txt_main.html #tag-list");
     }});
   </script>
-  <link rel="stylesheet" href="/txt/zakki/zakki-style.css">
-  <link rel="stylesheet" href="/txt/zakki/tag-style.css">
-  <link rel="stylesheet" href="/txt/zakki/tag/tag-controls.css">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/zakki-style.css')}">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/tag-style.css')}">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/tag/tag-controls.css')}">
 </head>
 
 <body>
@@ -595,7 +619,48 @@ def generate_tag_page_html(tag_name, sections, sort_by='date-desc', description=
     return html_content
 
 
-def build_tag_pages(zakki_root, output_dir, tag_filter=None, sort_by='date-desc', tag_configs=None, debug=False):
+def render_tag_page(tag_name, sections, output_file, tag_config=None, sort_by='date-desc', embed_facades=False, debug=False, save_image_cache=True):
+    """
+    タグページのHTMLを組み立てる（ファイルには書き出さない）
+    
+    Args:
+        tag_name: タグ名
+        sections: タグのセクションのリスト
+        output_file: 出力先のパス（相対パスの画像の解決に使う）
+        tag_config: タグ別設定（sort / description）
+        sort_by: タグ別設定がない場合のソート方法
+        embed_facades: 埋め込みプレーヤーをファサードに置き換えるかどうか
+        debug: デバッグモード
+        save_image_cache: 画像の寸法のキャッシュを保存するかどうか
+    
+    Returns:
+        str: タグページのHTML
+    """
+    # タグ別設定を取得
+    tag_config = tag_config or {}
+    tag_sort = tag_config.get('sort', sort_by)
+    tag_description = tag_config.get('description', '')
+    
+    if debug and tag_config:
+        print(f'  Using config: sort={tag_sort}, description="{tag_description}"')
+    
+    html_content = generate_tag_page_html(
+        tag_name, 
+        sections, 
+        sort_by=tag_sort,
+        description=tag_description,
+        debug=debug
+    )
+    
+    # 埋め込みプレーヤーをファサードに置き換え（オプション）
+    if embed_facades:
+        html_content = add_embed_facades(html_content)
+    
+    # 画像に寸法と遅延読み込みの属性を追加
+    return add_image_attributes(html_content, output_file, save=save_image_cache)
+
+
+def build_tag_pages(zakki_root, output_dir, tag_filter=None, sort_by='date-desc', tag_configs=None, embed_facades=False, debug=False):
     """
     タグページを生成
     
@@ -605,6 +670,7 @@ def build_tag_pages(zakki_root, output_dir, tag_filter=None, sort_by='date-desc'
         tag_filter: 生成するタグのリスト（None の場合は全タグ）
         sort_by: ソート方法（'date-desc', 'date-asc', 'relevance-desc', 'relevance-asc'）
         tag_configs: タグ別設定の辞書（設定ファイルから読み込まれる）
+        embed_facades: 埋め込みプレーヤーをファサードに置き換えるかどうか
         debug: デバッグモード
     """
     if tag_configs is None:
@@ -643,23 +709,17 @@ def build_tag_pages(zakki_root, output_dir, tag_filter=None, sort_by='date-desc'
     for tag_name, sections in sorted(tags_to_generate.items()):
         print(f'Generating: {tag_name}.html ({len(sections)} sections)')
         
-        # タグ別設定を取得
-        tag_config = tag_configs.get(tag_name, {})
-        tag_sort = tag_config.get('sort', sort_by)
-        tag_description = tag_config.get('description', '')
-        
-        if debug and tag_config:
-            print(f'  Using config: sort={tag_sort}, description="{tag_description}"')
-        
         try:
-            html_content = generate_tag_page_html(
-                tag_name, 
-                sections, 
-                sort_by=tag_sort,
-                description=tag_description,
+            output_file = output_path / f'{tag_name}.html'
+            html_content = render_tag_page(
+                tag_name,
+                sections,
+                output_file,
+                tag_config=tag_configs.get(tag_name, {}),
+                sort_by=sort_by,
+                embed_facades=embed_facades,
                 debug=debug
             )
-            output_file = output_path / f'{tag_name}.html'
             
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(html_content)
@@ -677,23 +737,21 @@ def build_tag_pages(zakki_root, output_dir, tag_filter=None, sort_by='date-desc'
     return tags_to_generate
 
 
-def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False):
+def render_tag_main_html(tags_data, tag_configs=None, debug=False):
     """
-    タグ一覧ページ（tag_main.html）を生成
+    タグ一覧ページ（tag_main.html）のHTMLを組み立てる（ファイルには書き出さない）
     
     Args:
         tags_data: {tag_name: sections} の辞書
-        output_dir: 出力先ディレクトリ
         tag_configs: タグ別設定の辞書（設定ファイルから読み込まれる）
         debug: デバッグモード
+    
+    Returns:
+        str: タグ一覧ページのHTML
     """
     if tag_configs is None:
         tag_configs = {}
     
-    if not tags_data:
-        print('No tags to generate tag_main.html')
-        return
-    
     if debug:
         print('\nGenerating tag_main.html...')
     
@@ -750,11 +808,11 @@ def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False)
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>タグ一覧 - 100%health</title>
-  <link rel="stylesheet" href="/1column.css">
-  <link rel="icon" type="image/svg+xml" href="/favicon.svg">
-  <script src="/js/jquery-3.6.0.min.js"></script>
-  <script src="/js/main.js"></script>
-  <script src="/js/mouse.js"></script>
+  <link rel="stylesheet" href="{asset_url('/1column.css')}">
+  <link rel="icon" type="image/svg+xml" href="{asset_url('/favicon.svg')}">
+  <script src="{asset_url('/js/jquery-3.6.0.min.js')}"></script>
+  <script src="{asset_url('/js/main.js')}"></script>
+  <script src="{asset_url('/js/mouse.js')}"></script>
   <style>
     /* タグ一覧ページ用スタイル */
     .tag-list {{
@@ -827,8 +885,8 @@ def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False)
       $("#taghtml").load("/txt/txt_main.html #tag-list");
     }});
   </script>
-  <link rel="stylesheet" href="/txt/zakki/zakki-style.css">
-  <link rel="stylesheet" href="/txt/zakki/tag-style.css">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/zakki-style.css')}">
+  <link rel="stylesheet" href="{asset_url('/txt/zakki/tag-style.css')}">
 </head>
 
 <body>
@@ -876,6 +934,25 @@ def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False)
 
 </html>'''
     
+    return html_content
+
+
+def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False):
+    """
+    タグ一覧ページ（tag_main.html）を生成
+    
+    Args:
+        tags_data: {tag_name: sections} の辞書
+        output_dir: 出力先ディレクトリ
+        tag_configs: タグ別設定の辞書（設定ファイルから読み込まれる）
+        debug: デバッグモード
+    """
+    if not tags_data:
+        print('No tags to generate tag_main.html')
+        return
+    
+    html_content = render_tag_main_html(tags_data, tag_configs, debug=debug)
+    
     # ファイルに書き出し
     output_path = Path(output_dir) / 'tag_main.html'
     try:
@@ -884,8 +961,8 @@ def generate_tag_main_page(tags_data, output_dir, tag_configs=None, debug=False)
         
         print(f'\nOK Generated tag_main.html: {output_path}')
         if debug:
-            print(f'  Total tags: {len(tag_info_list)}')
-            print(f'  Total sections: {sum(info["count"] for info in tag_info_list)}')
+            print(f'  Total tags: {len(tags_data)}')
+            print(f'  Total sections: {sum(len(sections) for sections in tags_data.values())}')
         
     except Exception as e:
         print(f'\nERROR: Failed to generate tag_main.html: {e}')
@@ -986,6 +1063,7 @@ Examples:
   python build_tags.py timeline music     # 特定のタグのみ生成
   python build_tags.py --debug            # デバッグモード
   python build_tags.py --config my_config.yaml  # 設定ファイル指定
+  python build_tags.py music --embed-facades  # 埋め込みプレーヤーをクリックで読み込む
 '''
     )
     
@@ -1020,6 +1098,12 @@ Examples:
         help='設定ファイルのパス（デフォルト: 自動検出）'
     )
     
+    parser.add_argument(
+        '--embed-facades',
+        action='store_true',
+        help='埋め込みプレーヤーをクリックで読み込むファサードに置き換える'
+    )
+    
     parser.add_argument(
         '--debug',
         action='store_true',
@@ -1035,6 +1119,7 @@ Examples:
     zakki_root = args.zakki_root or config.get('zakki_root') or str(default_zakki_root)
     output_dir = args.output_dir or config.get('output_dir')
     sort_by = args.sort_by or config.get('default_sort') or 'date-desc'
+    embed_facades = args.embed_facades or config.get('embed_facades', False)
     
     # zakki-root からの相対パスで output-dir を決定
     zakki_root = Path(zakki_root)
@@ -1081,6 +1166,7 @@ Examples:
         tag_filter=args.tags if args.tags else None,
         sort_by=sort_by,
         tag_configs=tag_configs,
+        embed_facades=embed_facades,
         debug=args.debug
     )
     
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+年表ページ分割スクリプト
+
+手書きで管理している年表ページ（txt/my_dsns_timeline.html）を一度だけパースし、
+公開用ディレクトリ（dist/）に以下を生成します:
+- 年ごとのフラグメント（<li> 群）: dist/txt/timeline/<year>.html
+- 列指向のJSONインデックス: dist/txt/timeline/index.json
+  （項目ID・年・日付・カテゴリのビットマスク）
+- 検索用インデックス: dist/txt/timeline/search.json
+  （index.json と同じ並びの正規化済み検索文字列。検索時にだけ読み込まれる）
+- ヘッダー部分だけを持つシェルページ: dist/txt/my_dsns_timeline.html
+  （build_minify.py が書き出した全体版を同じURLで置き換える。
+  年のフラグメントは txt/timeline-loader.js が必要に応じて読み込む）
+
+編集するソース（リポジトリ内の年表ページ）は変更しません。公開されるページのURLは
+変わらないため、サイト内のリンクや ?search= などのパラメータはそのまま使えます。
+
+build_minify.py の後（deploy.py の前）に実行してください。
+年表ページを編集したら build_minify.py と続けて実行し直します。
+
+Usage:
+    python build_timeline.py [source] [options]
+
+Example:
+    python build_timeline.py
+    python build_timeline.py ../txt/my_dsns_timeline.html --output-dir ../dist
+"""
+
+from bs4 import BeautifulSoup
+from pathlib import Path
+import sys
+import os
+import re
+import json
+import argparse
+import unicodedata
+from build_minify import compress_file, BROTLI_AVAILABLE, COMPRESS_SUFFIXES
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+INDEX_VERSION = 1
+LOADER_SCRIPT = 'timeline-loader.js'
+DATE_PATTERN = re.compile(r'^\s*(\d{1,2}|\?\?)月(?:(\d{1,2}|\?\?)日)?')
+
+
+def get_categories(soup):
+    """
+    サイドバーのチェックボックスからカテゴリ一覧を取得（ビットマスクのビット順）
+
+    Args:
+        soup: 年表ページの BeautifulSoup
+
+    Returns:
+        カテゴリ名のリスト（-- で始まる検索キーワードは除外）
+    """
+    categories = []
+    for checkbox in soup.find_all('input', attrs={'type': 'checkbox', 'name': 'class'}):
+        value = (checkbox.get('value') or '').strip()
+        if value and not value.startswith('--') and value not in categories:
+            categories.append(value)
+    return categories
+
+
+def parse_entry_date(text):
+    """
+    項目先頭の「MM月DD日」を "MM-DD" 形式に変換（不明な部分は ??）
+
+    Args:
+        text: 項目のテキスト
+
+    Returns:
+        "MM-DD" 形式の文字列（日付がない場合は空文字列）
+    """
+    match = DATE_PATTERN.match(text)
+    if not match:
+        return ''
+    month = match.group(1).zfill(2)
+    day = (match.group(2) or '??').zfill(2)
+    return f'{month}-{day}'
+
+
+def normalize_search_text(text):
+    """
+    検索用にテキストを正規化（NFKC・小文字化・空白の圧縮）
+
+    Args:
+        text: 元のテキスト
+
+    Returns:
+        正規化された文字列
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def write_output(path: Path, text: str, compress=True):
+    """
+    公開用ディレクトリにファイルを書き出し、.gz / .br も作る（build_minify.py と同じ）
+    """
+    data = text.encode('utf-8')
+    path.write_bytes(data)
+    if compress and path.suffix.lower() in COMPRESS_SUFFIXES:
+        compress_file(path, data, BROTLI_AVAILABLE)
+
+
+def build_timeline(source_path, output_dir, shell_path, config=None):
+    """
+    年表ページを年ごとのフラグメント・JSONインデックス・シェルページに分割
+
+    Args:
+        source_path: 年表ページのパス
+        output_dir: フラグメントとインデックスの出力先
+        shell_path: シェルページの出力先（公開時は年表ページと同じURLになる場所）
+        config: 設定辞書（debug, compress）
+    """
+    if config is None:
+        config = {}
+    debug = config.get('debug', False)
+    compress = config.get('compress', True)
+
+    source_path = Path(source_path)
+    output_dir = Path(output_dir)
+    shell_path = Path(shell_path)
+
+    if not source_path.exists():
+        print(f'Error: File not found: {source_path}')
+        sys.exit(1)
+
+    print(f'Parsing: {source_path}')
+    with open(source_path, 'r', encoding='utf-8') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+
+    layout = soup.find(id='timeline_layout')
+    if not layout:
+        print(f'Error: #timeline_layout not found in {source_path}')
+        sys.exit(1)
+
+    categories = get_categories(soup)
+    if len(categories) > 31:
+        print(f'Warning: {len(categories)} categories exceed the 31-bit mask used by the loader')
+    bits = {name: 1 << i for i, name in enumerate(categories)}
+    print(f'✓ Categories: {len(categories)}')
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    years = []
+    columns = {'id': [], 'year': [], 'date': [], 'mask': []}
+    search_strings = []
+    written = 0
+
+    for year_div in layout.find_all('div', recursive=False):
+        year_id = year_div.get('id')
+        year_list = year_div.find('ul')
+        if not year_id or not year_list:
+            continue
+
+        heading = year_div.find(class_='year')
+        label = heading.get_text(strip=True) if heading else year_id
+        year_index = len(years)
+
+        entries = year_list.find_all('li', recursive=False)
+        for n, li in enumerate(entries, 1):
+            entry_id = f'{year_id}-{n}'
+            li['data-entry'] = entry_id
+
+            classes = li.get('class', [])
+            mask = 0
+            for cls in classes:
+                mask |= bits.get(cls, 0)
+            text = li.get_text(' ')
+
+            columns['id'].append(entry_id)
+            columns['year'].append(year_index)
+            columns['date'].append(parse_entry_date(text))
+            columns['mask'].append(mask)
+            search_strings.append(normalize_search_text(f'{text} {" ".join(classes)}'))
+
+        # フラグメントの書き出し（内容が変わらなければ書き換えない）
+        fragment_name = f'{year_id}.html'
+        fragment_html = year_list.decode_contents().strip() + '\n'
+        fragment_path = output_dir / fragment_name
+        if not fragment_path.exists() or fragment_path.read_text(encoding='utf-8') != fragment_html:
+            write_output(fragment_path, fragment_html, compress)
+            written += 1
+            if debug:
+                print(f'  Wrote {fragment_name} ({len(entries)} entries)')
+
+        years.append({
+            'id': year_id,
+            'label': label,
+            'count': len(entries),
+            'fragment': fragment_name,
+        })
+
+        # シェルページでは <li> を取り除き、読み込み先だけを残す
+        year_list.clear()
+        year_list['data-timeline-fragment'] = year_id
+
+    index = {
+        'version': INDEX_VERSION,
+        'categories': categories,
+        'years': years,
+        'entries': columns,
+        'search': 'search.json',
+    }
+    index_path = output_dir / 'index.json'
+    write_output(index_path, json.dumps(index, ensure_ascii=False, separators=(',', ':')), compress)
+
+    search_path = output_dir / 'search.json'
+    write_output(search_path, json.dumps(search_strings, ensure_ascii=False, separators=(',', ':')), compress)
+
+    print(f'✓ Years: {len(years)} ({written} fragment(s) updated)')
+    print(f'✓ Entries: {len(columns["id"])}')
+    print(f'✓ Index: {index_path} ({index_path.stat().st_size:,} bytes)')
+    print(f'✓ Search index: {search_path} ({search_path.stat().st_size:,} bytes)')
+
+    # シェルページ: インデックスの場所とローダーを埋め込む
+    shell_dir = shell_path.parent
+    layout['data-timeline-index'] = Path(os.path.relpath(index_path, shell_dir)).as_posix()
+    layout['data-timeline-base'] = Path(os.path.relpath(output_dir, shell_dir)).as_posix() + '/'
+
+    # ローダーは年表ページと同じディレクトリにある（シェルページは年表ページと同じ場所で公開される）
+    loader_src = LOADER_SCRIPT
+    filter_script = soup.find('script', src=re.compile(r'dtimeline\.js$'))
+    if not soup.find('script', src=re.compile(re.escape(LOADER_SCRIPT) + '$')):
+        loader_tag = soup.new_tag('script', src=loader_src)
+        if filter_script:
+            filter_script.insert_before(loader_tag)
+        else:
+            soup.body.append(loader_tag)
+
+    shell_dir.mkdir(parents=True, exist_ok=True)
+    write_output(shell_path, str(soup), compress)
+
+    print(f'✓ Shell page: {shell_path} ({shell_path.stat().st_size:,} bytes, source {source_path.stat().st_size:,} bytes)')
+
+
+def parse_arguments(project_root):
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='年表ページ分割スクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # デフォルト（txt/my_dsns_timeline.html → dist/txt/my_dsns_timeline.html・dist/txt/timeline/）
+  python build_minify.py
+  python build_timeline.py
+
+  # 入力・公開用ディレクトリを指定
+  python build_timeline.py ../txt/my_dsns_timeline.html --output-dir ../dist
+        '''
+    )
+
+    parser.add_argument(
+        'source',
+        nargs='?',
+        default=str(project_root / 'txt' / 'my_dsns_timeline.html'),
+        help='年表ページのパス（デフォルト: txt/my_dsns_timeline.html）'
+    )
+
+    parser.add_argument(
+        '--output-dir',
+        default=None,
+        help='公開用ディレクトリ（デフォルト: dist/）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    parser.add_argument(
+        '--no-compress',
+        action='store_true',
+        help='.gz / .br を書き出さない'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+    args = parse_arguments(project_root)
+
+    output_dir = Path(args.output_dir).resolve() if args.output_dir else project_root / 'dist'
+    if not output_dir.is_dir():
+        print(f'Error: {output_dir} not found. Run build_minify.py first.')
+        sys.exit(1)
+
+    # シェルページは年表ページと同じURLで公開する
+    source_path = Path(args.source).resolve()
+    try:
+        rel = source_path.relative_to(project_root)
+    except ValueError:
+        rel = Path('txt') / source_path.name
+    shell_path = output_dir / rel
+    fragments_dir = shell_path.parent / 'timeline'
+
+    config = {
+        'debug': args.debug,
+        'compress': not args.no_compress,
+    }
+
+    print('=' * 60)
+    print('年表ページ分割スクリプト')
+    print('=' * 60)
+
+    build_timeline(source_path, fragments_dir, shell_path, config)
+
+
+if __name__ == '__main__':
+    main()
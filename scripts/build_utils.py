@@ -15,6 +15,7 @@ import yaml
 import shutil
 import sys
 from typing import Dict, Any, Tuple, Optional, List
+from asset_utils import asset_url
 
 # UTF-8で出力（Windows対応）
 if sys.stdout.encoding != 'utf-8':
@@ -47,6 +48,7 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
         },
         'debug': False,
         'create_backup': True,
+        'embed_facades': False,
         'adjacent_month_search_range': 24,
         'adjacent_year_search_range': 10,  # 年別ページ用
     }
@@ -282,7 +284,8 @@ def count_articles_in_month(year: str, month: str, zakki_root: Path) -> int:
 def generate_html_head(
     title: str,
     additional_css: Optional[List[str]] = None,
-    additional_js: Optional[List[str]] = None
+    additional_js: Optional[List[str]] = None,
+    txt_lists: bool = True
 ) -> str:
     """
     HTML <head> セクションを生成
@@ -291,6 +294,7 @@ def generate_html_head(
         title: ページタイトル
         additional_css: 追加のCSSファイルパスのリスト
         additional_js: 追加のJavaScriptファイルパスのリスト
+        txt_lists: フッターに雑記・タグ一覧を読み込むかどうか（雑記以外のページは False）
     
     Returns:
         HTML <head> セクションの文字列
@@ -298,23 +302,26 @@ def generate_html_head(
     css_links = additional_css or []
     js_scripts = additional_js or []
     
-    css_html = '\n  '.join([f'<link rel="stylesheet" href="{css}">' for css in css_links])
-    js_html = '\n  '.join([f'<script src="{js}"></script>' for js in js_scripts])
+    css_html = '\n  '.join([f'<link rel="stylesheet" href="{asset_url(css)}">' for css in css_links])
+    js_html = '\n  '.join([f'<script src="{asset_url(js)}"></script>' for js in js_scripts])
     
     head = f'''<head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>{title}</title>
-  <link rel="stylesheet" href="/1column.css">
-  <link rel="icon" type="image/svg+xml" href="/favicon.svg">
-  <script src="/js/jquery-3.6.0.min.js"></script>
-  <script src="/js/main.js"></script>
-  <script src="/js/mouse.js"></script>
+  <link rel="stylesheet" href="{asset_url('/1column.css')}">
+  <link rel="icon" type="image/svg+xml" href="{asset_url('/favicon.svg')}">
+  <script src="{asset_url('/js/jquery-3.6.0.min.js')}"></script>
+  <script src="{asset_url('/js/main.js')}"></script>
+  <script src="{asset_url('/js/mouse.js')}"></script>'''
+    
+    if txt_lists:
+        head += '''
   <script>
-    $(function () {{
+    $(function () {
       $("#zakkihtml").load("/txt/txt_main.html #zakki-list");
       $("#taghtml").load("/txt/txt_main.html #tag-list");
-    }});
+    });
   </script>'''
     
     if css_html:
@@ -327,29 +334,35 @@ def generate_html_head(
     return head
 
 
-def generate_html_footer() -> str:
+def generate_html_footer(includes: Optional[List[str]] = None) -> str:
     """
     HTML フッターセクションを生成
     
+    Args:
+        includes: フッターに置く読み込み先の要素IDのリスト
+                  （None の場合は雑記・タグ一覧の 'zakkihtml', 'taghtml'）
+    
     Returns:
         HTML フッターの文字列
     """
-    return '''  <footer id="main-footer">
-    <div id="zakkihtml"></div>
-    <div id="taghtml"></div>
+    if includes is None:
+        includes = ['zakkihtml', 'taghtml']
+    include_html = ''.join(f'\n    <div id="{element_id}"></div>' for element_id in includes)
+    
+    return f'''  <footer id="main-footer">{include_html}
     <!-- main.jsから#footerへfooter.htmlの挿入 -->
     <div id="footerhtml"></div>
   </footer>
 
 </div>
 <div id="lightbox">
-  <link rel="stylesheet" href="/luminous-basic.min.css">
-  <script src="/Luminous.min.js" defer></script>
+  <link rel="stylesheet" href="{asset_url('/luminous-basic.min.css')}">
+  <script src="{asset_url('/Luminous.min.js')}" defer></script>
   <script>
     // LuminousGalleryが読み込まれてから実行
-    if (typeof LuminousGallery !== 'undefined') {
+    if (typeof LuminousGallery !== 'undefined') {{
       new LuminousGallery(document.querySelectorAll('a[href$=jpg],a[href$=png],a[href$=gif]'));
-    }
+    }}
   </script>
 </div>'''
 
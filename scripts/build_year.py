@@ -26,6 +26,8 @@ from build_utils import (
     generate_html_footer,
     generate_breadcrumb
 )
+from image_utils import add_image_attributes
+from embed_utils import add_embed_facades
 
 # UTF-8で出力（Windows対応）
 if sys.stdout.encoding != 'utf-8':
@@ -35,14 +37,20 @@ if sys.stdout.encoding != 'utf-8':
         pass
 
 
-def build_year_page(year: str, zakki_root: str, config=None):
+def render_year_page(year: str, zakki_root: str, config=None, load_month_html=None, save_image_cache=True):
     """
-    月別記事を統合して年別ページを生成
+    月別記事を統合して年別ページのHTMLを組み立てる（ファイルには書き出さない）
     
     Args:
         year: 年（例: "2025"）
         zakki_root: zakki ディレクトリのルートパス
         config: 設定辞書（省略時はデフォルト設定）
+        load_month_html: 月別ページのパスからHTMLを返す関数
+            （省略時はファイルを読み込む、serve.py はメモリ上で生成した月別ページを返す）
+        save_image_cache: 画像の寸法のキャッシュを保存するかどうか
+    
+    Returns:
+        (年別ページのHTML, 出力先のパス, 月数, 記事数)
     """
     # デフォルト設定を使用
     if config is None:
@@ -111,13 +119,16 @@ def build_year_page(year: str, zakki_root: str, config=None):
         # 月別HTMLファイルを読み込む
         month_html_path = zakki_path / year / month / f'{year}-{month}.html'
         
-        if not month_html_path.exists():
+        if load_month_html is None and not month_html_path.exists():
             print(f'  Warning: Month HTML not found: {month_html_path}')
             continue
         
         try:
-            with open(month_html_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
+            if load_month_html:
+                soup = BeautifulSoup(load_month_html(month_html_path), 'html.parser')
+            else:
+                with open(month_html_path, 'r', encoding='utf-8') as f:
+                    soup = BeautifulSoup(f.read(), 'html.parser')
             
             # zakki{月} の div を探す
             month_div = soup.find('div', id=f'zakki{month}')
@@ -245,6 +256,31 @@ def build_year_page(year: str, zakki_root: str, config=None):
     # 出力先を決定
     output_path = year_dir / f'{year}.html'
     
+    # 埋め込みプレーヤーをファサードに置き換え（オプション）
+    # 取り込んだ月別ページが既にファサードを含む場合もスクリプトを追加する
+    year_html = add_embed_facades(year_html, convert=config.get('embed_facades', False))
+    
+    # 画像に寸法と遅延読み込みの属性を追加
+    year_html = add_image_attributes(year_html, output_path, save=save_image_cache)
+    
+    return year_html, output_path, len(month_sections), total_articles
+
+
+def build_year_page(year: str, zakki_root: str, config=None):
+    """
+    月別記事を統合して年別ページを生成
+    
+    Args:
+        year: 年（例: "2025"）
+        zakki_root: zakki ディレクトリのルートパス
+        config: 設定辞書（省略時はデフォルト設定）
+    """
+    # デフォルト設定を使用
+    if config is None:
+        config = load_config()
+    
+    year_html, output_path, month_count, total_articles = render_year_page(year, zakki_root, config)
+    
     # バックアップの作成
     create_backup(output_path, config.get('create_backup', True))
     
@@ -254,7 +290,7 @@ def build_year_page(year: str, zakki_root: str, config=None):
             f.write(year_html)
         
         print(f'\n✓ Successfully generated: {output_path}')
-        print(f'✓ Months included: {len(month_sections)}')
+        print(f'✓ Months included: {month_count}')
         print(f'✓ Total articles: {total_articles}')
         print(f'\nYou can now open the file in your browser!')
         
@@ -286,6 +322,9 @@ def parse_arguments():
   
   # カスタム設定ファイル使用
   python build_year.py 2025 ./txt/zakki --config custom.yaml
+  
+  # 埋め込みプレーヤーをクリックで読み込む
+  python build_year.py 2025 ./txt/zakki --embed-facades
         '''
     )
     
@@ -320,6 +359,12 @@ def parse_arguments():
         help='バックアップを作成しない'
     )
     
+    parser.add_argument(
+        '--embed-facades',
+        action='store_true',
+        help='埋め込みプレーヤーをクリックで読み込むファサードに置き換える'
+    )
+    
     return parser.parse_args()
 
 
@@ -342,6 +387,9 @@ def main():
     if args.no_backup:
         config['create_backup'] = False
     
+    if args.embed_facades:
+        config['embed_facades'] = True
+    
     # 実行情報を表示
     print(f'Building year page for {year}...')
     print(f'Configuration:')
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+サイト内リンクチェックスクリプト
+
+サイト内のファイルとアンカー（id / name）の一覧をメモリ上に一度だけ作り、
+すべてのHTMLと gallery/data/*.json のリンクがそれを指しているかを確認します。
+HTTPリクエストは一切行いません（外部リンクは対象外）。
+
+- HTMLは正規表現ベースの軽量なトークナイザで走査（<script> / <style> の中身は無視）
+- ファイルの走査は複数プロセスで並列に実行
+- 結果はリンク元のページごとにまとめて表示
+
+Usage:
+    python check_links.py [paths...] [options]
+
+Example:
+    python check_links.py
+    python check_links.py ../txt/zakki --no-anchors
+    python check_links.py --jobs 8
+"""
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from urllib.parse import urlsplit, unquote
+from bisect import bisect_right
+import os
+import sys
+import re
+import json
+import html
+import argparse
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+# サイトに含めないディレクトリ
+EXCLUDE_DIRS = {'.git', 'node_modules', 'scripts', '__pycache__', 'dist', '.build_cache'}
+
+# リンクとして扱う属性
+LINK_ATTRS = {'href', 'src', 'poster', 'data-src'}
+
+# チェックしないURL
+SKIP_SCHEMES = ('http:', 'https:', 'mailto:', 'javascript:', 'data:', 'tel:', 'blob:', 'about:')
+
+TOKEN_PATTERN = re.compile(
+    r'<!--.*?-->'
+    r'|<(script|style)\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>.*?</\1\s*>'
+    r'|<([a-zA-Z][\w-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.S | re.I
+)
+ATTR_PATTERN = re.compile(
+    r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))'
+)
+
+
+def line_offsets(text: str):
+    """各行の開始位置（行番号の計算用）"""
+    offsets = [0]
+    for match in re.finditer('\n', text):
+        offsets.append(match.end())
+    return offsets
+
+
+def scan_html(path_str: str, root_str: str):
+    """
+    1ファイルからリンクとアンカーを抽出（ワーカープロセスで実行）
+
+    Args:
+        path_str: HTMLファイルのパス
+        root_str: サイトのルート
+
+    Returns:
+        (相対パス, アンカーの集合, [(行番号, タグ, 属性, URL), ...])
+    """
+    path = Path(path_str)
+    rel = path.relative_to(root_str).as_posix()
+    try:
+        text = path.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return rel, set(), []
+
+    offsets = line_offsets(text)
+    anchors = set()
+    links = []
+
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group(1):
+            tag = match.group(1).lower()
+            attrs = match.group(2)
+        elif match.group(3):
+            tag = match.group(3).lower()
+            attrs = match.group(4)
+        else:
+            continue
+        if not attrs:
+            continue
+
+        for attr_match in ATTR_PATTERN.finditer(attrs):
+            name = attr_match.group(1).lower()
+            value = next(g for g in attr_match.groups()[1:] if g is not None)
+            value = html.unescape(value).strip()
+            if name == 'id' or (name == 'name' and tag == 'a'):
+                anchors.add(value)
+            elif name in LINK_ATTRS or name == 'srcset':
+                if tag == 'link' and name == 'href' and re.search(r'preconnect|dns-prefetch', attrs):
+                    continue
+                urls = [part.strip().split()[0] for part in value.split(',') if part.strip()] if name == 'srcset' else [value]
+                line = bisect_right(offsets, match.start())
+                for url in urls:
+                    links.append((line, tag, name, url))
+
+    return rel, anchors, links
+
+
+def scan_gallery_data(root: Path):
+    """
+    gallery/data/*.json の path / image_path を抽出
+
+    image_path は作品ページ（path）からの相対パスとして解決する
+
+    Returns:
+        {相対パス: [(行番号, 種類, キー, URL, 基準となるページ), ...]}
+    """
+    results = defaultdict(list)
+    for json_path in sorted((root / 'gallery' / 'data').glob('*.json')):
+        rel = json_path.relative_to(root).as_posix()
+        try:
+            text = json_path.read_text(encoding='utf-8')
+            data = json.loads(text)
+        except (OSError, ValueError) as e:
+            results[rel].append((0, 'json', 'parse', str(e), None))
+            continue
+
+        offsets = line_offsets(text)
+        for key, works in data.items():
+            if not isinstance(works, list):
+                continue
+            for work in works:
+                if not isinstance(work, dict):
+                    continue
+                page = work.get('path')
+                for field in ('path', 'image_path'):
+                    url = work.get(field)
+                    if not url:
+                        continue
+                    position = text.find(json.dumps(url, ensure_ascii=False))
+                    line = bisect_right(offsets, position) if position >= 0 else 0
+                    base = page.lstrip('/') if field == 'image_path' and page else None
+                    results[rel].append((line, 'json', field, url, base))
+    return results
+
+
+def collect_site_paths(root: Path):
+    """
+    サイト内のすべてのファイルとディレクトリの相対パスを集める
+    """
+    files = set()
+    directories = {''}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+        current = Path(dirpath).relative_to(root).as_posix()
+        current = '' if current == '.' else current
+        for d in dirnames:
+            directories.add(f'{current}/{d}'.lstrip('/'))
+        for filename in filenames:
+            files.add(f'{current}/{filename}'.lstrip('/'))
+    return files, directories
+
+
+def resolve_link(url: str, source_rel: str):
+    """
+    URLをサイトルートからの相対パスとアンカーに変換
+
+    Returns:
+        (相対パス, アンカー)。チェック対象外のURLは None
+    """
+    if not url or url.startswith(SKIP_SCHEMES) or url.startswith('//'):
+        return None
+    if '${' in url or '{{' in url or url.startswith(('<', '+', "'")):
+        return None  # テンプレート内の式
+    parts = urlsplit(url)
+    if parts.scheme:
+        return None
+
+    fragment = unquote(parts.fragment)
+    path = unquote(parts.path)
+    if not path:
+        return source_rel, fragment
+
+    if path.startswith('/'):
+        target = path.lstrip('/')
+    else:
+        target = (Path(source_rel).parent / path).as_posix()
+
+    # ../ と ./ を正規化（ルートより上には出ない）
+    stack = []
+    for segment in target.split('/'):
+        if segment in ('', '.'):
+            continue
+        if segment == '..':
+            if stack:
+                stack.pop()
+            continue
+        stack.append(segment)
+    normalized = '/'.join(stack)
+    if path.endswith('/') and normalized:
+        normalized += '/'
+    return normalized, fragment
+
+
+def check_target(target: str, fragment: str, files, directories, anchors, check_anchors=True, lowered=None):
+    """
+    リンク先が存在するかを確認
+
+    Args:
+        lowered: {小文字のパス: 実際のパス}（大文字・小文字の違いの指摘用）
+
+    Returns:
+        問題の説明（問題がなければ None）
+    """
+    page = target
+    if target.endswith('/') or target in directories:
+        page = target.rstrip('/') + '/index.html' if target.rstrip('/') else 'index.html'
+        if page not in files:
+            return 'directory without index.html'
+    elif target not in files:
+        actual = (lowered or {}).get(target.lower())
+        if actual:
+            return f'missing file (case differs: {actual})'
+        return 'missing file'
+
+    if check_anchors and fragment and page.endswith('.html'):
+        page_anchors = anchors.get(page)
+        if page_anchors is not None and fragment not in page_anchors:
+            return f'missing anchor #{fragment}'
+    return None
+
+
+def check_links(root: Path, sources=None, config=None):
+    """
+    サイト内リンクをチェックし、リンク元ページごとに結果を表示
+
+    Args:
+        root: サイトのルート
+        sources: チェックするHTMLファイル・ディレクトリ（None の場合はサイト全体）
+        config: 設定辞書（jobs, anchors, gallery）
+
+    Returns:
+        壊れたリンクの数
+    """
+    if config is None:
+        config = {}
+
+    files, directories = collect_site_paths(root)
+    lowered = {f.lower(): f for f in files}
+    html_files = sorted(rel for rel in files if rel.endswith('.html'))
+    print(f'Site: {len(files)} file(s), {len(html_files)} HTML page(s)')
+
+    # アンカーの確認のため、リンク元に関係なく全ページを走査する
+    anchors = {}
+    page_links = {}
+    with ProcessPoolExecutor(max_workers=config.get('jobs')) as executor:
+        paths = [str(root / rel) for rel in html_files]
+        for rel, page_anchors, links in executor.map(scan_html, paths, [str(root)] * len(paths), chunksize=16):
+            anchors[rel] = page_anchors
+            page_links[rel] = links
+
+    if sources:
+        selected = set()
+        for source in sources:
+            source = Path(source).resolve()
+            rel = source.relative_to(root).as_posix() if source != root else ''
+            selected.update(
+                page for page in html_files
+                if page == rel or not rel or page.startswith(rel.rstrip('/') + '/')
+            )
+    else:
+        selected = set(html_files)
+
+    report = defaultdict(list)
+    checked = 0
+    for rel in sorted(selected):
+        for line, tag, attr, url in page_links.get(rel, []):
+            resolved = resolve_link(url, rel)
+            if resolved is None:
+                continue
+            checked += 1
+            problem = check_target(*resolved, files, directories, anchors, config.get('anchors', True), lowered)
+            if problem:
+                report[rel].append((line, f'<{tag} {attr}>', url, problem))
+
+    if config.get('gallery', True) and not sources:
+        for rel, entries in scan_gallery_data(root).items():
+            for line, kind, field, url, base in entries:
+                if field == 'parse':
+                    report[rel].append((line, kind, '', f'invalid JSON: {url}'))
+                    continue
+                resolved = resolve_link(url, base or '')
+                if resolved is None:
+                    continue
+                checked += 1
+                problem = check_target(*resolved, files, directories, anchors, False, lowered)
+                if problem:
+                    report[rel].append((line, field, url, problem))
+
+    broken = sum(len(entries) for entries in report.values())
+    for rel in sorted(report):
+        print(f'\n{rel}')
+        for line, where, url, problem in sorted(report[rel]):
+            print(f'  L{line}: {where} {url} → {problem}')
+
+    print(f'\n✓ Checked {checked} link(s) in {len(selected)} page(s)')
+    if broken:
+        print(f'✗ {broken} broken link(s) in {len(report)} file(s)')
+    else:
+        print('✓ No broken links')
+    return broken
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='サイト内リンクチェックスクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # サイト全体をチェック
+  python check_links.py
+
+  # 雑記のページだけ、アンカーは確認しない
+  python check_links.py ../txt/zakki --no-anchors
+        '''
+    )
+
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        help='チェックするHTMLファイル・ディレクトリ（デフォルト: サイト全体）'
+    )
+
+    parser.add_argument(
+        '--root',
+        default=None,
+        help='サイトのルート（デフォルト: プロジェクトルート）'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=None,
+        help='並列に処理するプロセス数（デフォルト: CPU数）'
+    )
+
+    parser.add_argument(
+        '--no-anchors',
+        action='store_true',
+        help='#アンカーの存在を確認しない'
+    )
+
+    parser.add_argument(
+        '--no-gallery',
+        action='store_true',
+        help='gallery/data/*.json の path / image_path を確認しない'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    root = Path(args.root).resolve() if args.root else script_dir.parent
+
+    print('=' * 60)
+    print('サイト内リンクチェックスクリプト')
+    print('=' * 60)
+
+    config = {
+        'jobs': args.jobs,
+        'anchors': not args.no_anchors,
+        'gallery': not args.no_gallery,
+    }
+    broken = check_links(root, args.paths, config)
+    if broken:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ビルドスクリプト用のCSSユーティリティモジュール
+
+このモジュールは以下の機能を提供します:
+- CSSの簡易パース（ネストしたルール・@media の展開、@font-face の抽出）
+- CSSの平坦化（ネストを展開し、宣言を元のテキストのまま保持）
+- セレクタの簡易マッチング（BeautifulSoup の要素、または要素の祖先の形に対して）
+- 詳細度の計算
+
+完全なCSSエンジンではありません。疑似クラス・疑似要素は無視し、
+子・兄弟結合子は子孫結合子として扱うため、判定は「広めに一致する」側に倒れます。
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+PSEUDO_PATTERN = re.compile(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?')
+COMPOUND_PATTERN = re.compile(r'([#.]?[\w-]+|\*|\[[^\]]*\])')
+GROUPING_AT_RULES = ('@media', '@supports', '@layer', '@container', '@document')
+
+
+def strip_comments(css: str) -> str:
+    """
+    CSSコメントを取り除く
+    """
+    return COMMENT_PATTERN.sub('', css)
+
+
+def _find_block_end(css: str, start: int) -> int:
+    """
+    start 位置の '{' に対応する '}' の位置を返す（文字列内の括弧は無視）
+    """
+    depth = 0
+    quote = None
+    i = start
+    while i < len(css):
+        ch = css[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return len(css)
+
+
+def _combine_selectors(parents: List[str], selector_text: str) -> List[str]:
+    """
+    ネストしたルールのセレクタを親セレクタと結合する
+    """
+    children = split_selector_list(selector_text)
+    if not parents:
+        return [c.replace('&', '').strip() for c in children]
+    combined = []
+    for parent in parents:
+        for child in children:
+            if '&' in child:
+                combined.append(child.replace('&', parent))
+            else:
+                combined.append(f'{parent} {child}')
+    return combined
+
+
+def split_selector_list(selector_text: str) -> List[str]:
+    """
+    カンマ区切りのセレクタリストを分割（括弧内のカンマは分割しない）
+    """
+    parts = []
+    depth = 0
+    current = []
+    for ch in selector_text:
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    parts.append(''.join(current).strip())
+    return [p for p in parts if p]
+
+
+def parse_declarations(text: str) -> Dict[str, str]:
+    """
+    宣言ブロックの中身を {property: value} に変換
+    """
+    declarations = {}
+    for item in text.split(';'):
+        if ':' not in item:
+            continue
+        prop, value = item.split(':', 1)
+        prop = prop.strip().lower()
+        if prop:
+            declarations[prop] = value.replace('!important', '').strip()
+    return declarations
+
+
+def parse_stylesheet(css: str) -> Tuple[List[Dict[str, object]], List[Dict[str, str]]]:
+    """
+    CSSをフラットなルールのリストに変換
+
+    Args:
+        css: CSSテキスト
+
+    Returns:
+        (rules, font_faces)
+        rules: [{'selector', 'declarations', 'media', 'order'}, ...]
+        font_faces: [{property: value}, ...]
+    """
+    css = strip_comments(css)
+    rules = []
+    font_faces = []
+
+    def walk(text: str, parents: List[str], media: Optional[str]):
+        pos = 0
+        own_declarations = []
+        while pos < len(text):
+            brace = text.find('{', pos)
+            semicolon = text.find(';', pos)
+            if brace == -1:
+                own_declarations.append(text[pos:])
+                break
+            if semicolon != -1 and semicolon < brace:
+                own_declarations.append(text[pos:semicolon + 1])
+                pos = semicolon + 1
+                continue
+
+            prelude = text[pos:brace].strip()
+            end = _find_block_end(text, brace)
+            body = text[brace + 1:end]
+            pos = end + 1
+
+            lowered = prelude.lower()
+            if lowered.startswith('@font-face'):
+                font_faces.append(parse_declarations(body))
+            elif lowered.startswith(GROUPING_AT_RULES):
+                walk(body, parents, prelude if lowered.startswith('@media') else media)
+            elif lowered.startswith('@'):
+                continue  # @keyframes などは対象外
+            elif prelude:
+                walk(body, _combine_selectors(parents, prelude), media)
+
+        if parents:
+            declarations = parse_declarations(''.join(own_declarations))
+            if declarations:
+                for selector in parents:
+                    rules.append({
+                        'selector': selector,
+                        'declarations': declarations,
+                        'media': media,
+                        'order': len(rules),
+                    })
+
+    walk(css, [], None)
+    return rules, font_faces
+
+
+def flatten_stylesheet(css: str) -> List[Dict[str, object]]:
+    """
+    CSSをネストのないブロックのリストに変換（出力し直すための形式）
+
+    parse_stylesheet() と異なり、宣言は元のテキスト（!important を含む）のまま保持し、
+    ブロックは文書順（親の宣言 → ネストしたルール）に並べます。
+
+    Args:
+        css: CSSテキスト
+
+    Returns:
+        [{'selectors', 'body', 'conditions', 'at_rule', 'order'}, ...]
+        selectors: 展開したセレクタのリスト（@ルールのブロックでは空）
+        body: 宣言ブロックの中身
+        conditions: 外側の @media / @supports などの条件（外から順）
+        at_rule: @font-face / @keyframes などのプレリュード（通常のルールでは None）
+    """
+    css = strip_comments(css)
+    blocks = []
+
+    def add(selectors, body, conditions, at_rule=None):
+        body = re.sub(r'\s*\n\s*', ' ', body).strip()
+        if body:
+            blocks.append({
+                'selectors': selectors,
+                'body': body,
+                'conditions': conditions,
+                'at_rule': at_rule,
+                'order': len(blocks),
+            })
+
+    def walk(text: str, parents: List[str], conditions: List[str]):
+        pos = 0
+        own_declarations = []
+        nested = []
+        while pos < len(text):
+            brace = text.find('{', pos)
+            semicolon = text.find(';', pos)
+            if brace == -1:
+                own_declarations.append(text[pos:])
+                break
+            if semicolon != -1 and semicolon < brace:
+                own_declarations.append(text[pos:semicolon + 1])
+                pos = semicolon + 1
+                continue
+
+            prelude = ' '.join(text[pos:brace].split())
+            end = _find_block_end(text, brace)
+            nested.append((prelude, text[brace + 1:end]))
+            pos = end + 1
+
+        # 親の宣言を先に出力する（ネストしたルールより前に適用される）
+        if parents:
+            add(parents, ''.join(own_declarations), conditions)
+
+        for prelude, body in nested:
+            lowered = prelude.lower()
+            if lowered.startswith(GROUPING_AT_RULES):
+                walk(body, parents, conditions + [prelude])
+            elif lowered.startswith(('@font-face', '@keyframes', '@-webkit-keyframes', '@property', '@counter-style')):
+                add([], body, conditions, at_rule=prelude)
+            elif lowered.startswith('@'):
+                continue  # @import・@page などは対象外
+            elif prelude:
+                walk(body, _combine_selectors(parents, prelude), conditions)
+
+    walk(css, [], [])
+    return blocks
+
+
+def parse_selector(selector: str) -> List[Dict[str, object]]:
+    """
+    セレクタを複合セレクタのリスト（左から右）に分解
+
+    疑似クラス・疑似要素は取り除き、結合子（> + ~）は子孫結合子として扱う
+
+    Returns:
+        [{'tag', 'id', 'classes', 'attrs'}, ...]
+    """
+    cleaned = PSEUDO_PATTERN.sub('', selector)
+    cleaned = re.sub(r'\s*[>+~]\s*', ' ', cleaned)
+    compounds = []
+    for token in cleaned.split():
+        compound = {'tag': None, 'id': None, 'classes': [], 'attrs': []}
+        for part in COMPOUND_PATTERN.findall(token):
+            if part.startswith('#'):
+                compound['id'] = part[1:]
+            elif part.startswith('.'):
+                compound['classes'].append(part[1:])
+            elif part.startswith('['):
+                compound['attrs'].append(re.split(r'[~|^$*]?=', part[1:-1], 1)[0].strip())
+            elif part != '*':
+                compound['tag'] = part.lower()
+        compounds.append(compound)
+    return compounds
+
+
+def specificity(selector: str) -> Tuple[int, int, int]:
+    """
+    セレクタの詳細度 (id, class/属性, 要素) を計算
+    """
+    ids = classes = tags = 0
+    for compound in parse_selector(selector):
+        ids += 1 if compound['id'] else 0
+        classes += len(compound['classes']) + len(compound['attrs'])
+        tags += 1 if compound['tag'] else 0
+    return ids, classes, tags
+
+
+def _matches_compound(element, compound: Dict[str, object]) -> bool:
+    if compound['tag'] and element.name != compound['tag']:
+        return False
+    if compound['id'] and element.get('id') != compound['id']:
+        return False
+    if compound['classes']:
+        element_classes = element.get('class') or []
+        if any(cls not in element_classes for cls in compound['classes']):
+            return False
+    for attr in compound['attrs']:
+        if not element.has_attr(attr):
+            return False
+    return True
+
+
+def matches(element, compounds: List[Dict[str, object]]) -> bool:
+    """
+    要素がパース済みセレクタに一致するかを判定（子孫結合子のみ）
+
+    Args:
+        element: BeautifulSoup の Tag
+        compounds: parse_selector() の結果
+    """
+    if not compounds or not _matches_compound(element, compounds[-1]):
+        return False
+    remaining = compounds[:-1]
+    ancestor = element.parent
+    while remaining and ancestor is not None and getattr(ancestor, 'name', None) not in (None, '[document]'):
+        if _matches_compound(ancestor, remaining[-1]):
+            remaining = remaining[:-1]
+        ancestor = ancestor.parent
+    return not remaining
+
+
+def element_path(element) -> Tuple[Tuple[object, ...], ...]:
+    """
+    要素の祖先を含む「形」を返す（matches_path() で判定に使う部分だけ）
+
+    タグ名・ID・クラス・属性名が同じ祖先を持つ要素は、どのセレクタに対しても
+    matches() の結果が同じになるため、この値をキャッシュのキーに使えます。
+
+    Returns:
+        ((tag, id, classes, attrs), ...) のタプル（ルートから要素まで）
+    """
+    path = []
+    node = element
+    while node is not None and getattr(node, 'name', None) not in (None, '[document]'):
+        classes = node.get('class') or []
+        path.append((
+            node.name,
+            node.get('id'),
+            tuple(sorted(set(classes))),
+            tuple(sorted(attr for attr in node.attrs if attr not in ('class', 'id'))),
+        ))
+        node = node.parent
+    return tuple(reversed(path))
+
+
+def _matches_shape(shape, compound: Dict[str, object]) -> bool:
+    name, element_id, classes, attrs = shape
+    if compound['tag'] and name != compound['tag']:
+        return False
+    if compound['id'] and element_id != compound['id']:
+        return False
+    if any(cls not in classes for cls in compound['classes']):
+        return False
+    for attr in compound['attrs']:
+        if attr not in attrs and not (attr == 'class' and classes) and not (attr == 'id' and element_id):
+            return False
+    return True
+
+
+def matches_path(path, compounds: List[Dict[str, object]]) -> bool:
+    """
+    element_path() の結果がパース済みセレクタに一致するかを判定（matches() と同じ規則）
+
+    Args:
+        path: element_path() の結果
+        compounds: parse_selector() の結果
+    """
+    if not path or not compounds or not _matches_shape(path[-1], compounds[-1]):
+        return False
+    remaining = compounds[:-1]
+    for shape in reversed(path[:-1]):
+        if not remaining:
+            break
+        if _matches_shape(shape, remaining[-1]):
+            remaining = remaining[:-1]
+    return not remaining
+
+
+def parse_font_family(value: str) -> List[str]:
+    """
+    font-family の値をファミリー名のリスト（小文字・引用符なし）に変換
+    """
+    families = []
+    for name in value.split(','):
+        name = name.strip().strip('"\'').strip().lower()
+        if name:
+            families.append(name)
+    return families
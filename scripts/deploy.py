@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+差分デプロイスクリプト
+
+公開するファイルツリー全体について「パス → 内容のハッシュ」のマニフェストを作り、
+前回デプロイ時のマニフェストと比較して、変更・追加されたファイルだけを
+アップロードし、削除されたファイルはサーバーからも削除します。
+
+- アップロード先は差し替え可能（Neocities API / ローカルディレクトリ）
+- 複数のリクエストを並列に送信し、429・5xx・通信エラーは間隔を空けて再試行
+- 一部のファイルが失敗しても、成功したファイルだけをマニフェストに記録する
+  （次回の実行で失敗したファイルだけが再送される）
+- ハッシュは Neocities の /api/list と同じ SHA-1 を使うため、
+  --sync-remote でサーバーの状態からマニフェストを作り直せる
+  （公開対象外のファイルは記録しないため、--delete で消されることはない）
+- デフォルトでは build_minify.py が書き出した dist/ をデプロイする
+- ギャラリーのバンドル（gallery/data/bundle.json）がシリーズのJSONと一致しない場合はデプロイしない
+
+API キーは環境変数 NEOCITIES_API_KEY か --api-key で指定します。
+
+Usage:
+    python deploy.py [options]
+
+Example:
+    python deploy.py --dry-run
+    python deploy.py --source ..
+    python deploy.py --sync-remote
+    python deploy.py --target local --local-dir /tmp/site-mirror
+"""
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from urllib import request, parse, error
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import http.client
+from build_minify import collect_site_files, is_site_path
+from gallery_bundle import BUNDLE_FILENAME, bundle_is_current
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+NEOCITIES_ENDPOINT = 'https://neocities.org/api'
+
+# 事前圧縮ファイルは静的ホスティングでは使われないためアップロードしない
+SKIP_SUFFIXES = {'.gz', '.br'}
+
+# 再試行の対象になる HTTP ステータス
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    """
+    アップロード・削除の失敗
+
+    retryable が True のものは再試行される
+    """
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# =============================================================================
+# アップロード先
+# =============================================================================
+
+class Uploader:
+    """
+    アップロード先の基底クラス
+
+    新しいアップロード先を追加する場合は、このクラスを継承して
+    upload() と delete() を実装してください。
+    """
+
+    def upload(self, remote_path: str, data: bytes):
+        """
+        1ファイルをアップロード
+
+        Args:
+            remote_path: サイトルートからの相対パス（例: 'txt/txt_main.html'）
+            data: ファイルの内容
+
+        Raises:
+            UploadError: アップロードに失敗した場合
+        """
+        raise NotImplementedError
+
+    def delete(self, remote_paths):
+        """
+        ファイルを削除
+
+        Args:
+            remote_paths: サイトルートからの相対パスのリスト
+
+        Raises:
+            UploadError: 削除に失敗した場合
+        """
+        raise NotImplementedError
+
+    def list_files(self):
+        """
+        サーバー上のファイル一覧を取得
+
+        Returns:
+            {相対パス: SHA-1} の辞書
+        """
+        raise NotImplementedError
+
+
+class NeocitiesUploader(Uploader):
+    """
+    Neocities API（https://neocities.org/api）へのアップロード
+
+    endpoint を変えれば、同じ形式の API を持つローカルのテスト用サーバーにも送信できる
+    """
+
+    def __init__(self, api_key: str, endpoint: str = NEOCITIES_ENDPOINT, timeout: float = 60):
+        self.api_key = api_key
+        self.endpoint = endpoint.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: bytes = None, content_type: str = None):
+        req = request.Request(f'{self.endpoint}/{path}', data=body, method=method)
+        req.add_header('Authorization', f'Bearer {self.api_key}')
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        try:
+            with request.urlopen(req, timeout=self.timeout) as response:
+                payload = response.read()
+        except error.HTTPError as e:
+            detail = e.read().decode('utf-8', errors='replace')[:200]
+            raise UploadError(f'HTTP {e.code}: {detail}', retryable=e.code in RETRY_STATUSES)
+        except (error.URLError, TimeoutError, ConnectionError, http.client.HTTPException) as e:
+            raise UploadError(f'Connection error: {e}', retryable=True)
+
+        try:
+            result = json.loads(payload.decode('utf-8'))
+        except ValueError:
+            raise UploadError(f'Invalid response: {payload[:200]!r}', retryable=True)
+        if result.get('result') != 'success':
+            raise UploadError(result.get('message', 'Unknown error'))
+        return result
+
+    def upload(self, remote_path: str, data: bytes):
+        boundary = uuid.uuid4().hex
+        filename = remote_path.replace('"', '%22')
+        body = b''.join([
+            f'--{boundary}\r\n'.encode('utf-8'),
+            f'Content-Disposition: form-data; name="{filename}"; filename="{filename}"\r\n'.encode('utf-8'),
+            b'Content-Type: application/octet-stream\r\n\r\n',
+            data,
+            f'\r\n--{boundary}--\r\n'.encode('utf-8'),
+        ])
+        self._request('POST', 'upload', body, f'multipart/form-data; boundary={boundary}')
+
+    def delete(self, remote_paths):
+        body = parse.urlencode([('filenames[]', path) for path in remote_paths]).encode('utf-8')
+        self._request('POST', 'delete', body, 'application/x-www-form-urlencoded')
+
+    def list_files(self):
+        result = self._request('GET', 'list')
+        return {
+            item['path']: item['sha1_hash']
+            for item in result.get('files', [])
+            if not item.get('is_directory')
+        }
+
+
+class LocalUploader(Uploader):
+    """
+    ローカルディレクトリへのコピー（デプロイ結果の確認用）
+    """
+
+    def __init__(self, target_dir: Path):
+        self.target_dir = Path(target_dir)
+
+    def upload(self, remote_path: str, data: bytes):
+        target = self.target_dir / remote_path
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+        except OSError as e:
+            raise UploadError(str(e))
+
+    def delete(self, remote_paths):
+        for remote_path in remote_paths:
+            target = self.target_dir / remote_path
+            if target.exists():
+                target.unlink()
+
+    def list_files(self):
+        if not self.target_dir.exists():
+            return {}
+        return build_manifest(self.target_dir, collect_site_files(self.target_dir, self.target_dir))
+
+
+# =============================================================================
+# マニフェスト
+# =============================================================================
+
+def file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(source: Path, files):
+    """
+    {相対パス: SHA-1} のマニフェストを作成
+
+    Args:
+        source: 公開するファイルツリーのルート
+        files: 相対パスのリスト
+    """
+    return {rel: file_sha1(source / rel) for rel in files}
+
+
+def is_deployable(rel: str) -> bool:
+    """公開対象のファイルか（deploy() がアップロード・削除の対象にするもの）"""
+    return is_site_path(rel) and Path(rel).suffix.lower() not in SKIP_SUFFIXES
+
+
+def compute_delta(local, deployed):
+    """
+    ローカルと前回デプロイ時のマニフェストの差分
+
+    Returns:
+        (アップロードするパスのリスト, 削除するパスのリスト)
+    """
+    uploads = sorted(rel for rel, digest in local.items() if deployed.get(rel) != digest)
+    deletions = sorted(rel for rel in deployed if rel not in local)
+    return uploads, deletions
+
+
+def load_deployed_manifest(path: Path):
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    return {}
+
+
+def save_deployed_manifest(path: Path, files):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'updated': time.strftime('%Y-%m-%dT%H:%M:%S'), 'files': files}, f, ensure_ascii=False, indent=0)
+    os.replace(tmp_path, path)
+
+
+# =============================================================================
+# デプロイ
+# =============================================================================
+
+def with_retries(action, retries: int, base_delay: float):
+    """
+    再試行可能なエラーの間、指数バックオフ（ジッター付き）で action を繰り返す
+    """
+    attempt = 0
+    while True:
+        try:
+            return action()
+        except UploadError as e:
+            if not e.retryable or attempt >= retries:
+                raise
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            time.sleep(delay)
+
+
+def deploy(source: Path, uploader: Uploader, manifest_path: Path, config):
+    """
+    差分をアップロードし、成功したものをマニフェストに記録
+
+    Args:
+        source: 公開するファイルツリーのルート
+        uploader: Uploader
+        manifest_path: 前回デプロイ時のマニフェストの保存先
+        config: 設定辞書
+            jobs, retries, retry_delay, dry_run, delete, debug
+
+    Returns:
+        失敗したファイルがなければ True
+    """
+    debug = config.get('debug', False)
+    files = [rel for rel in collect_site_files(source, source) if is_deployable(rel)]
+    local = build_manifest(source, files)
+    deployed = load_deployed_manifest(manifest_path)
+    uploads, deletions = compute_delta(local, deployed)
+    if not config.get('delete', True):
+        deletions = []
+
+    total_bytes = sum((source / rel).stat().st_size for rel in uploads)
+    print(f'Local files: {len(local)} / last deployed: {len(deployed)}')
+    print(f'To upload: {len(uploads)} file(s), {total_bytes:,} bytes')
+    print(f'To delete: {len(deletions)} file(s)')
+
+    if config.get('dry_run'):
+        for rel in uploads:
+            print(f'  + {rel}')
+        for rel in deletions:
+            print(f'  - {rel}')
+        return True
+
+    retries = config.get('retries', 4)
+    retry_delay = config.get('retry_delay', 1.0)
+    state = dict(deployed)
+    failed = []
+    done = 0
+    deleted = 0
+
+    def upload_one(rel):
+        data = (source / rel).read_bytes()
+        with_retries(lambda: uploader.upload(rel, data), retries, retry_delay)
+        return rel
+
+    # 途中で中断されても、成功した分は次回送らずに済むように必ず記録する
+    try:
+        if uploads:
+            with ThreadPoolExecutor(max_workers=config.get('jobs', 4)) as executor:
+                futures = [(rel, executor.submit(upload_one, rel)) for rel in uploads]
+                for rel, future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed.append(rel)
+                        print(f'  Error uploading {rel}: {e}')
+                        continue
+                    state[rel] = local[rel]
+                    done += 1
+                    if debug:
+                        print(f'  ✓ {rel}')
+                    if done % 50 == 0:
+                        save_deployed_manifest(manifest_path, state)
+
+        if deletions:
+            try:
+                with_retries(lambda: uploader.delete(deletions), retries, retry_delay)
+                deleted = len(deletions)
+                for rel in deletions:
+                    state.pop(rel, None)
+                    if debug:
+                        print(f'  ✓ Deleted {rel}')
+            except Exception as e:
+                failed.extend(deletions)
+                print(f'  Error deleting {len(deletions)} file(s): {e}')
+    finally:
+        save_deployed_manifest(manifest_path, state)
+
+    print(f'✓ Uploaded {done} file(s), deleted {deleted} file(s)')
+    if failed:
+        print(f'Warning: {len(failed)} operation(s) failed; run again to retry them')
+        return False
+    return True
+
+
+def sync_remote_manifest(uploader: Uploader, manifest_path: Path, retries: int):
+    """
+    サーバーのファイル一覧から前回デプロイのマニフェストを作り直す
+
+    公開対象外のファイル（collect_site_files() が除外するもの）は記録しません。
+    記録すると、ローカルにないファイルとして次回のデプロイで削除されるためです。
+
+    Returns:
+        (記録したファイル数, 除外したファイル数)
+    """
+    remote = with_retries(uploader.list_files, retries, 1.0)
+    files = {rel: digest for rel, digest in remote.items() if is_deployable(rel)}
+    save_deployed_manifest(manifest_path, files)
+    return len(files), len(remote) - len(files)
+
+
+def parse_arguments(project_root):
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='差分デプロイスクリプト',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # 送信するファイルを確認するだけ
+  python deploy.py --dry-run
+
+  # 最小化していないプロジェクトルートをデプロイ
+  python deploy.py --source ..
+
+  # サーバーの状態から前回デプロイのマニフェストを作り直す
+  python deploy.py --sync-remote
+
+  # ローカルディレクトリに書き出して確認
+  python deploy.py --target local --local-dir /tmp/site-mirror
+        '''
+    )
+
+    parser.add_argument(
+        '--source',
+        default=str(project_root / 'dist'),
+        help='公開するファイルツリー（デフォルト: build_minify.py が書き出す dist/）'
+    )
+
+    parser.add_argument(
+        '--target',
+        choices=['neocities', 'local'],
+        default='neocities',
+        help='アップロード先（デフォルト: neocities）'
+    )
+
+    parser.add_argument(
+        '--api-key',
+        default=os.environ.get('NEOCITIES_API_KEY'),
+        help='Neocities の API キー（デフォルト: 環境変数 NEOCITIES_API_KEY）'
+    )
+
+    parser.add_argument(
+        '--endpoint',
+        default=NEOCITIES_ENDPOINT,
+        help=f'API のエンドポイント（デフォルト: {NEOCITIES_ENDPOINT}）'
+    )
+
+    parser.add_argument(
+        '--local-dir',
+        default=None,
+        help='--target local の書き出し先'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=4,
+        help='並列に送信するリクエスト数（デフォルト: 4）'
+    )
+
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=4,
+        help='1ファイルあたりの再試行回数（デフォルト: 4）'
+    )
+
+    parser.add_argument(
+        '--no-delete',
+        action='store_true',
+        help='ローカルで削除されたファイルをサーバーから削除しない'
+    )
+
+    parser.add_argument(
+        '--sync-remote',
+        action='store_true',
+        help='サーバーのファイル一覧から前回デプロイのマニフェストを作り直す'
+    )
+
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='差分の表示だけを行う'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+    args = parse_arguments(project_root)
+
+    source = Path(args.source).resolve()
+    if not source.is_dir():
+        print(f'Error: Directory not found: {source}')
+        if source == project_root / 'dist':
+            print('Run build_minify.py first, or specify --source')
+        sys.exit(1)
+
+    if args.target == 'local':
+        if not args.local_dir:
+            print('Error: --local-dir is required for --target local')
+            sys.exit(1)
+        uploader = LocalUploader(Path(args.local_dir))
+        manifest_name = 'deploy-local.json'
+    else:
+        if not args.api_key and not args.dry_run:
+            print('Error: API key is required (set NEOCITIES_API_KEY or use --api-key)')
+            sys.exit(1)
+        uploader = NeocitiesUploader(args.api_key or '', args.endpoint)
+        manifest_name = 'deploy-neocities.json'
+    manifest_path = script_dir / '.build_cache' / manifest_name
+
+    print('=' * 60)
+    print('差分デプロイスクリプト')
+    print('=' * 60)
+
+    # ブラウザはバンドルを優先して読み込むため、古いバンドルは公開しない
+    if not bundle_is_current(source / 'gallery' / 'data'):
+        print(f'Error: gallery/data/{BUNDLE_FILENAME} is out of date; run build_gallery_bundle.py (and build_minify.py)')
+        sys.exit(1)
+
+    if args.sync_remote:
+        try:
+            synced, skipped = sync_remote_manifest(uploader, manifest_path, args.retries)
+        except UploadError as e:
+            print(f'Error: Could not list remote files: {e}')
+            sys.exit(1)
+        print(f'✓ Synced {synced} remote file(s) to {manifest_path} ({skipped} not deployable, ignored)')
+
+    config = {
+        'jobs': args.jobs,
+        'retries': args.retries,
+        'dry_run': args.dry_run,
+        'delete': not args.no_delete,
+        'debug': args.debug,
+    }
+    if not deploy(source, uploader, manifest_path, config):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
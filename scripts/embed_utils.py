@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+埋め込みプレーヤーのファサード（クリックで読み込み）モジュール
+
+月別・年別・タグページの YouTube / ニコニコ動画 / Bandcamp / SoundCloud の
+<iframe> を、サムネイルとタイトルだけの軽いボタンに置き換えます。
+元の <iframe> は <template> に入れておき、クリックされたときに
+js/embed-facade.js が差し替えるため、押されるまでプレーヤーは読み込まれません。
+
+サムネイルはローカルにある場合のみ使用します（img/embed/<サービス>/<ID>.webp など）。
+"""
+
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+import html
+import re
+from typing import Optional, Tuple
+
+from asset_utils import asset_url
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+THUMBNAIL_DIR = 'img/embed'
+THUMBNAIL_SUFFIXES = ('.webp', '.jpg', '.png')
+FACADE_SCRIPT = '/js/embed-facade.js'
+
+# ファサードに置き換えるサービス（ホスト名: (サービスID, 表示名)）
+EMBED_PROVIDERS = {
+    'www.youtube.com': ('youtube', 'YouTube'),
+    'youtube.com': ('youtube', 'YouTube'),
+    'www.youtube-nocookie.com': ('youtube', 'YouTube'),
+    'embed.nicovideo.jp': ('niconico', 'ニコニコ動画'),
+    'ext.nicovideo.jp': ('niconico', 'ニコニコ動画'),
+    'bandcamp.com': ('bandcamp', 'Bandcamp'),
+    'w.soundcloud.com': ('soundcloud', 'SoundCloud'),
+}
+
+# <template> / <script> / コメントの中は置き換えない（2回目以降の実行で二重にしないため）
+TOKEN_PATTERN = re.compile(
+    r'<!--.*?-->'
+    r'|<(template|script)\b[^>]*>.*?</\1\s*>'
+    r'|<iframe\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>(.*?)</iframe\s*>',
+    re.S | re.I
+)
+ATTR_PATTERN = re.compile(
+    r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))'
+)
+
+
+def parse_attributes(attrs: str) -> dict:
+    """タグの属性文字列を辞書に変換（値はエスケープを戻す）"""
+    result = {}
+    for match in ATTR_PATTERN.finditer(attrs):
+        value = next(g for g in match.groups()[1:] if g is not None)
+        result[match.group(1).lower()] = html.unescape(value)
+    return result
+
+
+def identify_embed(src: str) -> Optional[Tuple[str, str, str]]:
+    """
+    iframe の src から埋め込みの種類を判定
+
+    Args:
+        src: iframe の src
+
+    Returns:
+        (サービスID, 表示名, 動画・楽曲のID)。対象外のURLは None
+    """
+    parts = urlsplit(src if not src.startswith('//') else 'https:' + src)
+    host = parts.netloc.lower()
+    if host not in EMBED_PROVIDERS:
+        return None
+    provider, label = EMBED_PROVIDERS[host]
+    path = unquote(parts.path)
+    query = parse_qs(parts.query)
+
+    media_id = ''
+    if provider == 'youtube':
+        match = re.match(r'/embed/([\w-]+)', path)
+        if match and match.group(1) != 'videoseries':
+            media_id = match.group(1)
+        elif query.get('list'):
+            media_id = query['list'][0]
+    elif provider == 'niconico':
+        match = re.search(r'/(?:watch|thumb_mylist|thumb)/(\w+)', path)
+        media_id = match.group(1) if match else ''
+    elif provider == 'bandcamp':
+        match = re.search(r'/(album|track)=(\d+)', path)
+        media_id = f'{match.group(1)}-{match.group(2)}' if match else ''
+    elif provider == 'soundcloud':
+        match = re.search(r'/(tracks|playlists)/(\d+)', ''.join(query.get('url', [])))
+        media_id = f'{match.group(1)}-{match.group(2)}' if match else ''
+    return provider, label, media_id
+
+
+def find_thumbnail(provider: str, media_id: str, root: Path = PROJECT_ROOT) -> Optional[str]:
+    """
+    ローカルのサムネイルを探す
+
+    Returns:
+        サイトルートからのURL（例: '/img/embed/youtube/HDajKZ3ytdY.webp'）。なければ None
+    """
+    if not media_id:
+        return None
+    for suffix in THUMBNAIL_SUFFIXES:
+        rel = f'{THUMBNAIL_DIR}/{provider}/{media_id}{suffix}'
+        if (root / rel).exists():
+            return '/' + rel
+    return None
+
+
+def build_facade(iframe_html: str, attrs: dict, inner: str, root: Path = PROJECT_ROOT) -> Optional[str]:
+    """
+    1つの iframe をファサードのHTMLに変換
+
+    Args:
+        iframe_html: 元の <iframe>...</iframe>
+        attrs: iframe の属性
+        inner: iframe の中身（Bandcamp はリンクのテキストをタイトルに使う）
+        root: サイトのルート
+
+    Returns:
+        ファサードのHTML。対象外の iframe は None
+    """
+    embed = identify_embed(attrs.get('src', ''))
+    if embed is None:
+        return None
+    provider, label, media_id = embed
+
+    # 「YouTube video player」のような汎用のタイトルは表示しない
+    inner_text = html.unescape(re.sub(r'<[^>]+>', '', inner)).strip()
+    title = attrs.get('title') or attrs.get('aria-label') or inner_text
+    if title and (title.endswith('video player') or title == label):
+        title = ''
+
+    # iframe と同じ大きさの箱を作る
+    styles = []
+    width, height = attrs.get('width', ''), attrs.get('height', '')
+    if width.isdigit() and height.isdigit():
+        styles.append(f'aspect-ratio: {width} / {height}')
+        styles.append(f'max-width: {width}px')
+    if attrs.get('style'):
+        styles.append(attrs['style'].strip().rstrip(';'))
+    style_attr = f' style="{html.escape("; ".join(styles))}"' if styles else ''
+
+    thumbnail = find_thumbnail(provider, media_id, root)
+    thumbnail_html = f'<img class="embed-facade-thumbnail" src="{thumbnail}" alt="">' if thumbnail else ''
+
+    escaped_label = html.escape(label)
+    aria_label = f'{escaped_label}を再生: {html.escape(title)}' if title else f'{escaped_label}を再生'
+    title_html = f'<span class="embed-facade-title">{html.escape(title)}</span>' if title else ''
+    return (
+        f'<div class="embed-facade embed-facade-{provider}"{style_attr}>'
+        f'<button type="button" class="embed-facade-button" aria-label="{aria_label}">'
+        f'{thumbnail_html}'
+        f'{title_html}'
+        f'<span class="embed-facade-provider">▶ {escaped_label}</span>'
+        f'</button>'
+        f'<template>{iframe_html}</template>'
+        f'</div>'
+    )
+
+
+def add_embed_facades(html_text: str, root: Path = PROJECT_ROOT, convert: bool = True) -> str:
+    """
+    HTML内の埋め込みプレーヤーをファサードに置き換える
+
+    ファサードを含むページには </body> の前に js/embed-facade.js を追加します。
+    convert=False の場合は置き換えを行わず、既にファサードを含むHTML
+    （年別ページが取り込む月別ページなど）にスクリプトだけを追加します。
+
+    Args:
+        html_text: ページのHTML
+        root: サイトのルート（サムネイルの確認に使う）
+        convert: iframe を置き換えるかどうか
+
+    Returns:
+        置き換え後のHTML
+    """
+    def replace(match):
+        if match.group(2) is None:
+            return match.group(0)
+        facade = build_facade(match.group(0), parse_attributes(match.group(2)), match.group(3), root)
+        return facade or match.group(0)
+
+    if convert:
+        html_text = TOKEN_PATTERN.sub(replace, html_text)
+
+    if 'class="embed-facade ' in html_text and 'embed-facade.js' not in html_text:
+        script = f'  <script src="{asset_url(FACADE_SCRIPT)}" defer></script>\n'
+        index = html_text.rfind('</body>')
+        if index != -1:
+            html_text = html_text[:index] + script + html_text[index:]
+    return html_text
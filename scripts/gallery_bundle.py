@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ギャラリーデータのバンドル（1ファイルにまとめた圧縮形式）モジュール
+
+gallery/data/ の全シリーズのJSONを、次の形式の1つのJSONにまとめます。
+
+- シリーズ名・タグ・画像のディレクトリは辞書にまとめ、作品側は番号で参照
+- 作品は項目ごとの配列（列形式）で保持
+- 日付は 1970-01-01 からの日数（YYYY-MM-DD でない値は文字列のまま）
+- path が '/gallery/image-page/<ID>.html' の場合は 0（省略）
+- タグごとに、そのタグを持つ作品の番号の一覧（ポスティングリスト）を保持
+
+ブラウザ側の読み込みは gallery/gallery-bundle.js（GalleryBundle）、
+Python 側は GalleryBundle クラスで行います。
+unpack_bundle() は元のシリーズのJSONと同じ内容を復元します。
+
+ブラウザはシリーズのJSONより先にバンドルを読み込むため、バンドルはコミットする生成物です。
+シリーズのJSONを編集したら build_gallery_bundle.py を実行してください
+（bundle_is_current() が古いバンドルを検出し、deploy.py はその場合デプロイしません）。
+"""
+
+from pathlib import Path
+from datetime import date, timedelta
+import json
+import re
+from typing import Dict, List, Optional
+
+BUNDLE_VERSION = 1
+BUNDLE_FILENAME = 'bundle.json'
+EPOCH = date(1970, 1, 1)
+DEFAULT_PATH = '/gallery/image-page/{id}.html'
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# 列として保持する項目（それ以外は extra に入れる）
+CORE_FIELDS = ('id', 'path', 'image_path', 'date', 'series', 'tags')
+
+
+def date_to_ordinal(value):
+    """'YYYY-MM-DD' を 1970-01-01 からの日数に変換（それ以外はそのまま）"""
+    if isinstance(value, str) and DATE_PATTERN.match(value):
+        try:
+            return (date.fromisoformat(value) - EPOCH).days
+        except ValueError:
+            return value
+    return value
+
+
+def ordinal_to_date(value):
+    """date_to_ordinal() の逆変換"""
+    if isinstance(value, int):
+        return (EPOCH + timedelta(days=value)).isoformat()
+    return value
+
+
+def load_series_files(data_dir: Path):
+    """
+    config.json に登録された順にシリーズのJSONを読み込む
+
+    Returns:
+        [(シリーズ名, JSONの内容), ...]
+    """
+    with open(data_dir / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    files = []
+    for name in config.get('series', {}):
+        json_path = data_dir / f'{name}.json'
+        if not json_path.exists():
+            continue
+        with open(json_path, 'r', encoding='utf-8') as f:
+            files.append((name, json.load(f)))
+    return files
+
+
+def pack_gallery(series_files) -> dict:
+    """
+    シリーズのJSONをバンドルにまとめる
+
+    Args:
+        series_files: load_series_files() の結果
+
+    Returns:
+        バンドル（JSONに書き出せる辞書）
+    """
+    files = []
+    works = []
+    for file_index, (name, data) in enumerate(series_files):
+        key = f'{name}_series'
+        entry = {'name': name}
+        extra_keys = {k: v for k, v in data.items() if k not in ('mainSeries', key)}
+        if 'mainSeries' in data:
+            entry['mainSeries'] = data['mainSeries']
+        if extra_keys:
+            entry['extra'] = extra_keys
+        if key not in data:
+            entry['missing'] = True
+        files.append(entry)
+        for work in data.get(key, []):
+            works.append((file_index, work))
+
+    # タグは使用数の多い順（番号が小さいほどJSONが短くなる）
+    tag_counts = {}
+    for _, work in works:
+        tags = work.get('tags')
+        if isinstance(tags, list) and all(isinstance(tag, str) for tag in tags):
+            for tag in tags:
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+    tags = sorted(tag_counts, key=lambda tag: (-tag_counts[tag], tag))
+    tag_index = {tag: i for i, tag in enumerate(tags)}
+
+    series_names: List[str] = []
+    dirs: List[str] = []
+    columns = {field: [] for field in ('id', 'file', 'series', 'date', 'tags', 'path', 'imageDir', 'imageName')}
+    extra = {}
+    postings = [[] for _ in tags]
+
+    lookup = {}
+
+    def intern(table, value):
+        key = (id(table), value)
+        if key not in lookup:
+            lookup[key] = len(table)
+            table.append(value)
+        return lookup[key]
+
+    for index, (file_index, work) in enumerate(works):
+        rest = {k: v for k, v in work.items() if k not in CORE_FIELDS}
+        columns['id'].append(work.get('id'))
+        columns['file'].append(file_index)
+
+        series = work.get('series')
+        if isinstance(series, str):
+            columns['series'].append(intern(series_names, series))
+        else:
+            columns['series'].append(None)
+            if 'series' in work:
+                rest['series'] = series
+
+        if isinstance(work.get('date'), str):
+            columns['date'].append(date_to_ordinal(work['date']))
+        else:
+            columns['date'].append(None)
+            if 'date' in work:
+                rest['date'] = work['date']
+
+        work_tags = work.get('tags')
+        if isinstance(work_tags, list) and all(isinstance(tag, str) for tag in work_tags):
+            numbers = [tag_index[tag] for tag in work_tags]
+            columns['tags'].append(numbers)
+            for number in sorted(set(numbers)):
+                postings[number].append(index)
+        else:
+            columns['tags'].append(None)
+            if 'tags' in work:
+                rest['tags'] = work_tags
+
+        path = work.get('path')
+        if isinstance(path, str):
+            columns['path'].append(0 if path == DEFAULT_PATH.format(id=work.get('id')) else path)
+        else:
+            columns['path'].append(None)
+            if 'path' in work:
+                rest['path'] = path
+
+        image_path = work.get('image_path')
+        if isinstance(image_path, str):
+            directory, _, filename = image_path.rpartition('/')
+            columns['imageDir'].append(intern(dirs, directory) if '/' in image_path else None)
+            columns['imageName'].append(filename if '/' in image_path else image_path)
+        else:
+            columns['imageDir'].append(None)
+            columns['imageName'].append(None)
+            if 'image_path' in work:
+                rest['image_path'] = image_path
+
+        if rest:
+            extra[str(index)] = rest
+
+    return {
+        'version': BUNDLE_VERSION,
+        'files': files,
+        'series': series_names,
+        'tags': tags,
+        'dirs': dirs,
+        'works': columns,
+        'extra': extra,
+        'postings': postings,
+    }
+
+
+def bundle_is_current(data_dir: Path) -> bool:
+    """
+    data_dir の bundle.json が現在のシリーズのJSONから生成したものと一致するか
+
+    JSONの内容で比較するため、最小化したコピー（dist/）にも使えます。
+    config.json がないディレクトリはギャラリーではないので True を返します。
+    """
+    if not (data_dir / 'config.json').exists():
+        return True
+    bundle_path = data_dir / BUNDLE_FILENAME
+    if not bundle_path.exists():
+        return False
+    try:
+        with open(bundle_path, 'r', encoding='utf-8') as f:
+            bundle = json.load(f)
+    except (OSError, ValueError):
+        return False
+    # JSON を経由して、書き出したバンドルと同じ型（タプルなし）にそろえる
+    expected = json.loads(json.dumps(pack_gallery(load_series_files(data_dir)), ensure_ascii=False))
+    return bundle == expected
+
+
+class GalleryBundle:
+    """
+    バンドルの読み込み（作品は必要になったときに元の形式へ戻す）
+
+    Example:
+        bundle = GalleryBundle.load(Path('gallery/data/bundle.json'))
+        for work in bundle.works_with_tag('1girl'):
+            print(work['id'])
+    """
+
+    def __init__(self, data: dict):
+        if data.get('version') != BUNDLE_VERSION:
+            raise ValueError(f'Unsupported gallery bundle version: {data.get("version")}')
+        self.data = data
+        self.columns = data['works']
+        self.tag_index = {tag: i for i, tag in enumerate(data['tags'])}
+        self.id_index = {work_id: i for i, work_id in enumerate(self.columns['id'])}
+        self._cache: Dict[int, dict] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> 'GalleryBundle':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def work(self, index: int) -> dict:
+        """作品を元のシリーズのJSONと同じ形で返す"""
+        if index in self._cache:
+            return self._cache[index]
+
+        columns = self.columns
+        work = {'id': columns['id'][index]}
+        if columns['path'][index] is not None:
+            path = columns['path'][index]
+            work['path'] = DEFAULT_PATH.format(id=work['id']) if path == 0 else path
+        if columns['imageName'][index] is not None:
+            directory = columns['imageDir'][index]
+            name = columns['imageName'][index]
+            work['image_path'] = name if directory is None else f'{self.data["dirs"][directory]}/{name}'
+        if columns['date'][index] is not None:
+            work['date'] = ordinal_to_date(columns['date'][index])
+        if columns['series'][index] is not None:
+            work['series'] = self.data['series'][columns['series'][index]]
+        if columns['tags'][index] is not None:
+            work['tags'] = [self.data['tags'][number] for number in columns['tags'][index]]
+        work.update(self.data['extra'].get(str(index), {}))
+
+        self._cache[index] = work
+        return work
+
+    def works(self) -> List[dict]:
+        return [self.work(index) for index in range(len(self))]
+
+    def get(self, work_id: str) -> Optional[dict]:
+        index = self.id_index.get(work_id)
+        return self.work(index) if index is not None else None
+
+    def works_with_tag(self, tag: str) -> List[dict]:
+        """タグを持つ作品（ポスティングリストを使い、全作品は走査しない）"""
+        number = self.tag_index.get(tag)
+        if number is None:
+            return []
+        return [self.work(index) for index in self.data['postings'][number]]
+
+    def main_series(self, index: int) -> str:
+        """作品が含まれるシリーズのJSONの mainSeries（なければシリーズ名）"""
+        entry = self.data['files'][self.columns['file'][index]]
+        return entry.get('mainSeries', entry['name'])
+
+
+def unpack_bundle(data: dict):
+    """
+    バンドルから元のシリーズのJSONを復元
+
+    Returns:
+        [(シリーズ名, JSONの内容), ...]（load_series_files() と同じ形式）
+    """
+    bundle = GalleryBundle(data)
+    files = []
+    for entry in data['files']:
+        content = {}
+        if 'mainSeries' in entry:
+            content['mainSeries'] = entry['mainSeries']
+        if not entry.get('missing'):
+            content[f'{entry["name"]}_series'] = []
+        content.update(entry.get('extra', {}))
+        files.append((entry['name'], content))
+
+    for index in range(len(bundle)):
+        name, content = files[bundle.columns['file'][index]]
+        content[f'{name}_series'].append(bundle.work(index))
+    return files
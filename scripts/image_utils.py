@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ビルドスクリプト用の画像ユーティリティモジュール
+
+このモジュールは以下の機能を提供します:
+- 画像ファイルのヘッダーだけを読んで寸法を取得（PNG / GIF / JPEG / WebP / AVIF）
+- 寸法のキャッシュ（パスと更新日時をキーに scripts/.build_cache/image_sizes.json に保存）
+- 生成したHTMLの <img> に width / height / loading / decoding を追加
+- build_images.py の縮小版があれば srcset / sizes を追加（asset_utils.image_srcset()）
+
+ピクセルデータはデコードしないため、Pillow などは不要です。
+"""
+
+from pathlib import Path
+from urllib.parse import urlsplit, unquote
+import json
+import re
+import struct
+from typing import Dict, Optional, Tuple
+from asset_utils import image_srcset
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_PATH = Path(__file__).resolve().parent / '.build_cache' / 'image_sizes.json'
+
+IMG_TAG_PATTERN = re.compile(r'<img\b((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', re.I)
+SRC_PATTERN = re.compile(r'\ssrc\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+
+# srcset を追加した画像の表示幅（本文の画像は最大 640px で表示される）
+SRCSET_SIZES = '(max-width: 640px) 100vw, 640px'
+
+# 読み込むヘッダーの最大サイズ（JPEG は SOF の位置が先頭から離れていることがある）
+HEADER_BYTES = 64 * 1024
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    """JPEG の SOF マーカーから寸法を取得（Exif の回転も考慮）"""
+    f.seek(2)
+    orientation = 1
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            f.seek(-1, 1)
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if code == 0xE1:
+            segment = f.read(length - 2)
+            orientation = _exif_orientation(segment) or orientation
+            continue
+        if code in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>HH', data[1:5])
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height
+        f.seek(length - 2, 1)
+
+
+def _exif_orientation(segment: bytes) -> Optional[int]:
+    """APP1（Exif）セグメントから Orientation を取得"""
+    if not segment.startswith(b'Exif\x00\x00'):
+        return None
+    tiff = segment[6:]
+    if len(tiff) < 8:
+        return None
+    endian = '<' if tiff[:2] == b'II' else '>'
+    offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    if offset + 2 > len(tiff):
+        return None
+    count = struct.unpack(endian + 'H', tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = offset + 2 + i * 12
+        if entry + 12 > len(tiff):
+            return None
+        tag = struct.unpack(endian + 'H', tiff[entry:entry + 2])[0]
+        if tag == 0x0112:
+            return struct.unpack(endian + 'H', tiff[entry + 8:entry + 10])[0]
+    return None
+
+
+def _avif_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """AVIF / HEIF の ispe ボックスから寸法を取得"""
+    index = head.find(b'ispe')
+    if index == -1 or index + 16 > len(head):
+        return None
+    width, height = struct.unpack('>II', head[index + 8:index + 16])
+    return width, height
+
+
+def read_image_size(path: Path) -> Optional[Tuple[int, int]]:
+    """
+    画像のヘッダーから寸法を取得
+
+    Args:
+        path: 画像ファイルのパス
+
+    Returns:
+        (width, height)。対応していない形式・壊れたファイルは None
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+            if head.startswith(b'\xff\xd8'):
+                return _jpeg_size(f)
+            if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+                chunk = head[12:16]
+                if chunk == b'VP8 ':
+                    width, height = struct.unpack('<HH', head[26:30])
+                    return width & 0x3FFF, height & 0x3FFF
+                if chunk == b'VP8L':
+                    bits = int.from_bytes(head[21:25], 'little')
+                    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+                if chunk == b'VP8X':
+                    return (int.from_bytes(head[24:27], 'little') + 1,
+                            int.from_bytes(head[27:30], 'little') + 1)
+                return None
+            if head[4:8] == b'ftyp':
+                f.seek(0)
+                return _avif_size(f.read(HEADER_BYTES))
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+class ImageSizeCache:
+    """
+    画像の寸法のキャッシュ（パスと更新日時が同じならファイルを開かない）
+    """
+
+    def __init__(self, cache_path: Path = CACHE_PATH):
+        self.cache_path = Path(cache_path)
+        self.entries: Dict[str, list] = {}
+        self.dirty = False
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, path: Path) -> Optional[Tuple[int, int]]:
+        """
+        寸法を取得（キャッシュになければヘッダーを読む）
+        """
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return None
+        key = path.as_posix()
+        cached = self.entries.get(key)
+        if cached and cached[0] == mtime:
+            return tuple(cached[1:]) if cached[1] else None
+
+        size = read_image_size(path)
+        self.entries[key] = [mtime, size[0], size[1]] if size else [mtime, 0, 0]
+        self.dirty = True
+        return size
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(',', ':'))
+        self.dirty = False
+
+
+_cache: Optional[ImageSizeCache] = None
+
+
+def get_image_size_cache() -> ImageSizeCache:
+    global _cache
+    if _cache is None:
+        _cache = ImageSizeCache()
+    return _cache
+
+
+def resolve_image_path(src: str, page_path: Path, root: Path = PROJECT_ROOT) -> Optional[Path]:
+    """
+    <img src> をローカルのファイルパスに変換（外部URLは None）
+    """
+    parts = urlsplit(src)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith('/'):
+        return root / path.lstrip('/')
+    return (Path(page_path).parent / path).resolve()
+
+
+def site_url(path: Path, root: Path = PROJECT_ROOT) -> Optional[str]:
+    """
+    ローカルのファイルパスをサイトルートからのURLに変換（ルートの外なら None）
+    """
+    try:
+        return '/' + Path(path).resolve().relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+def add_image_attributes(html: str, page_path: Path, root: Path = PROJECT_ROOT, eager: int = 1,
+                         save: bool = True) -> str:
+    """
+    HTML内の <img> に width / height / srcset / loading="lazy" / decoding="async" を追加
+
+    既に指定されている属性は変更しません。先頭の eager 枚は最初の画面に
+    表示される可能性が高いため loading="lazy" を付けません。
+    srcset は build_images.py のマニフェストに縮小版がある画像だけに付けます。
+
+    Args:
+        html: ページのHTML
+        page_path: ページの出力先（相対パスの画像の解決に使う）
+        root: サイトのルート
+        eager: loading="lazy" を付けない先頭の画像の数
+        save: 寸法のキャッシュをファイルに保存するかどうか（serve.py は保存しない）
+
+    Returns:
+        属性を追加したHTML
+    """
+    cache = get_image_size_cache()
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        attrs = match.group(1)
+        lowered = attrs.lower()
+        self_closing = attrs.rstrip().endswith('/')
+        if self_closing:
+            attrs = attrs.rstrip()[:-1].rstrip()
+        count += 1
+
+        src = SRC_PATTERN.search(attrs)
+        value = next((g for g in src.groups() if g is not None), '') if src else ''
+        image_path = resolve_image_path(value, page_path, root) if value else None
+
+        additions = []
+        if not re.search(r'\swidth\s*=', lowered) and not re.search(r'\sheight\s*=', lowered):
+            size = cache.get(image_path) if image_path else None
+            if size:
+                additions.append(f'width="{size[0]}" height="{size[1]}"')
+        if image_path and not re.search(r'\ssrcset\s*=', lowered):
+            srcset = image_srcset(site_url(image_path, root))
+            if srcset:
+                additions.append(f'srcset="{srcset}" sizes="{SRCSET_SIZES}"')
+        if count > eager and not re.search(r'\sloading\s*=', lowered):
+            additions.append('loading="lazy"')
+        if not re.search(r'\sdecoding\s*=', lowered):
+            additions.append('decoding="async"')
+
+        if not additions:
+            return match.group(0)
+        return f'<img{attrs} {" ".join(additions)}' + (' />' if self_closing else '>')
+
+    result = IMG_TAG_PATTERN.sub(replace, html)
+    if save:
+        cache.save()
+    return result
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Neocities API のローカル代替サーバー
+
+deploy.py の動作確認用に、Neocities API の upload / delete / list を
+ローカルディレクトリに対して実装します。本番のサイトに触れずに、
+差分デプロイ・再試行・一部の失敗の扱いを確かめられます。
+
+- アップロードされたファイルは --root のディレクトリに保存します
+- list の sha1_hash は保存したファイルの SHA-1 です（--sync-remote の確認に使えます）
+- --fail で、指定したパスへのリクエストに順番にエラーを返せます
+  （例: --fail index.html:429,503 で、1回目は 429、2回目は 503、3回目以降は成功）
+
+Usage:
+    python neocities_stub.py [options]
+
+Example:
+    python neocities_stub.py --root /tmp/neocities --port 8765
+    python deploy.py --endpoint http://127.0.0.1:8765/api --api-key test
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.parser import BytesParser
+from email.policy import HTTP
+from pathlib import Path
+from urllib import parse
+import sys
+import json
+import hashlib
+import argparse
+import threading
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+DEFAULT_API_KEY = 'test'
+
+
+class NeocitiesStub:
+    """
+    Neocities API の代替サーバー（別スレッドで動作）
+
+    使い方:
+        stub = NeocitiesStub(Path('/tmp/neocities'))
+        stub.fail('index.html', 429, 503)
+        stub.start()
+        uploader = NeocitiesUploader('test', stub.endpoint)
+        ...
+        stub.stop()
+    """
+
+    def __init__(self, root: Path, api_key: str = DEFAULT_API_KEY, host: str = '127.0.0.1',
+                 port: int = 0, debug: bool = False):
+        """
+        Args:
+            root: アップロードされたファイルの保存先
+            api_key: 受け付ける API キー
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0 で空いているポート）
+            debug: リクエストを表示する
+        """
+        self.root = Path(root)
+        self.api_key = api_key
+        self.debug = debug
+        self.requests = []   # (エンドポイント, パス, 返したステータス)
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/api'
+
+    def fail(self, path: str, *statuses: int):
+        """
+        指定したパスへの次のリクエストに、順番に statuses のエラーを返す
+        """
+        with self._lock:
+            self._failures.setdefault(path, []).extend(statuses)
+
+    def attempts(self, endpoint: str, path: str) -> int:
+        """
+        指定したパスへのリクエストの回数
+        """
+        return sum(1 for e, p, _ in self.requests if e == endpoint and p == path)
+
+    def start(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_failure(self, paths):
+        with self._lock:
+            for path in paths:
+                queued = self._failures.get(path)
+                if queued:
+                    return queued.pop(0)
+        return None
+
+    def _list(self):
+        files = []
+        for path in sorted(self.root.rglob('*')):
+            if path.is_file():
+                files.append({
+                    'path': path.relative_to(self.root).as_posix(),
+                    'is_directory': False,
+                    'size': path.stat().st_size,
+                    'sha1_hash': hashlib.sha1(path.read_bytes()).hexdigest(),
+                })
+        return files
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                if stub.debug:
+                    super().log_message(format, *args)
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _error(self, status, error_type, message):
+                self._reply(status, {'result': 'error', 'error_type': error_type, 'message': message})
+
+            def _authorized(self):
+                if self.headers.get('Authorization') == f'Bearer {stub.api_key}':
+                    return True
+                self._error(401, 'invalid_auth', 'invalid credentials')
+                return False
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _log(self, endpoint, paths, status):
+                with stub._lock:
+                    for path in paths or ['']:
+                        stub.requests.append((endpoint, path, status))
+
+            def _fail_if_requested(self, endpoint, paths):
+                status = stub._next_failure(paths)
+                if status is None:
+                    return False
+                self._log(endpoint, paths, status)
+                self._error(status, 'stub_failure', f'injected HTTP {status}')
+                return True
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/api/list':
+                    return self._error(404, 'not_found', 'not found')
+                if not self._authorized():
+                    return
+                self._log('list', [], 200)
+                self._reply(200, {'result': 'success', 'files': stub._list()})
+
+            def do_POST(self):
+                endpoint = self.path.split('?')[0]
+                if endpoint not in ('/api/upload', '/api/delete'):
+                    return self._error(404, 'not_found', 'not found')
+                if not self._authorized():
+                    return
+                body = self._body()
+                if endpoint == '/api/upload':
+                    self._upload(body)
+                else:
+                    self._delete(body)
+
+            def _upload(self, body):
+                header = f'Content-Type: {self.headers.get("Content-Type", "")}\r\n\r\n'.encode('utf-8')
+                message = BytesParser(policy=HTTP).parsebytes(header + body)
+                files = {}
+                for part in message.iter_parts():
+                    name = part.get_param('name', header='content-disposition')
+                    if name:
+                        files[parse.unquote(name)] = part.get_payload(decode=True) or b''
+                if not files:
+                    return self._error(400, 'missing_files', 'no files uploaded')
+                if self._fail_if_requested('upload', list(files)):
+                    return
+                for name, data in files.items():
+                    target = (stub.root / name).resolve()
+                    if stub.root.resolve() not in target.parents:
+                        self._log('upload', [name], 400)
+                        return self._error(400, 'invalid_file_path', f'invalid path: {name}')
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(data)
+                self._log('upload', list(files), 200)
+                self._reply(200, {'result': 'success', 'message': 'your file(s) have been successfully uploaded'})
+
+            def _delete(self, body):
+                names = parse.parse_qs(body.decode('utf-8')).get('filenames[]', [])
+                if self._fail_if_requested('delete', names):
+                    return
+                missing = [name for name in names if not (stub.root / name).is_file()]
+                if missing:
+                    self._log('delete', names, 400)
+                    return self._error(400, 'missing_files', f'{missing[0]} was not found on your site')
+                for name in names:
+                    (stub.root / name).unlink()
+                self._log('delete', names, 200)
+                self._reply(200, {'result': 'success', 'message': 'file(s) have been deleted'})
+
+        return Handler
+
+
+def parse_fail_option(value: str):
+    """
+    --fail の値（パス:ステータス,ステータス...）を解析
+    """
+    path, _, statuses = value.rpartition(':')
+    if not path:
+        raise argparse.ArgumentTypeError(f'invalid --fail value: {value}')
+    try:
+        return path, [int(status) for status in statuses.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid --fail value: {value}')
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='Neocities API のローカル代替サーバー',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # /tmp/neocities に保存するサーバーを起動
+  python neocities_stub.py --root /tmp/neocities --port 8765
+
+  # 別の端末から deploy.py を向ける
+  python deploy.py --endpoint http://127.0.0.1:8765/api --api-key test
+
+  # index.html の最初の2回のアップロードを 429・503 で失敗させる
+  python neocities_stub.py --root /tmp/neocities --fail index.html:429,503
+        '''
+    )
+
+    parser.add_argument(
+        '--root',
+        required=True,
+        help='アップロードされたファイルの保存先'
+    )
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='待ち受けるアドレス（デフォルト: 127.0.0.1）'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='待ち受けるポート（デフォルト: 8765）'
+    )
+
+    parser.add_argument(
+        '--api-key',
+        default=DEFAULT_API_KEY,
+        help=f'受け付ける API キー（デフォルト: {DEFAULT_API_KEY}）'
+    )
+
+    parser.add_argument(
+        '--fail',
+        action='append',
+        type=parse_fail_option,
+        default=[],
+        help='指定したパスへのリクエストに順番にエラーを返す（例: index.html:429,503、複数指定可）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='リクエストを表示する'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print('=' * 60)
+    print('Neocities API のローカル代替サーバー')
+    print('=' * 60)
+
+    stub = NeocitiesStub(Path(args.root), args.api_key, args.host, args.port, args.debug)
+    for path, statuses in args.fail:
+        stub.fail(path, *statuses)
+    stub.start()
+    print(f'✓ Listening on {stub.endpoint} (files: {Path(args.root).resolve()})')
+    print('Press Ctrl+C to stop')
+    try:
+        stub._thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+雑記のプレビュー用ローカルサーバー
+
+サイトのファイルをそのまま配信しつつ、月別・年別・タグページ（tag_main.html を含む）は
+リクエストのたびに日別HTMLからメモリ上で生成して返します。
+build_month.py / build_year.py / build_tags.py を実行しなくても下書きを確認できます。
+
+- 日別HTMLは一度だけ解析してメモリに保持し、更新日時が変わったファイルだけを解析し直します
+- 日別HTMLが変わると、その月・その年・タグページの生成結果だけを破棄します
+  （ファイルの追加・削除では前後の月へのリンクが変わるため、すべて破棄します）
+- 変更はブラウザに通知し、開いているページを自動で再読み込みします（Server-Sent Events）
+- 変更の検出は watchfiles（inotify など）があればそれを使い、なければ更新日時を定期的に確認します
+- --write を指定しない限り、ファイルには何も書き出しません
+
+Usage:
+    python serve.py [options]
+
+Example:
+    python serve.py
+    python serve.py --port 8080 --embed-facades
+    python serve.py --write
+"""
+
+from pathlib import Path
+from urllib.parse import urlsplit, unquote
+import io
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import mimetypes
+import contextlib
+import traceback
+from build_utils import load_config
+from build_month import load_day_article, render_month_page
+from build_year import render_year_page
+from build_tags import (
+    load_config as load_tags_config,
+    scan_day_file,
+    render_tag_page,
+    render_tag_main_html
+)
+
+# watchfiles は必須ではない（なければ更新日時の定期確認で変更を検出）
+try:
+    import watchfiles
+    WATCHFILES_AVAILABLE = True
+except ImportError:
+    WATCHFILES_AVAILABLE = False
+
+# UTF-8で出力（Windows対応）
+if sys.stdout.encoding != 'utf-8':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+
+MONTH_URL = re.compile(r'^/txt/zakki/(\d{4})/(\d{2})/\1-\2\.html$')
+YEAR_URL = re.compile(r'^/txt/zakki/(\d{4})/\1\.html$')
+TAG_URL = re.compile(r'^/txt/zakki/tag/([^/]+)\.html$')
+DAY_FILE = re.compile(r'^txt/zakki/(\d{4})/(\d{2})/days/[^/]+\.html$')
+
+LIVERELOAD_URL = '/__livereload'
+LIVERELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVERELOAD_URL}")'
+    '.addEventListener("reload", () => location.reload());</script>'
+)
+
+# 更新日時を定期確認する場合の対象（プロジェクトルートからの glob）
+POLL_PATTERNS = [
+    'txt/zakki/[0-9][0-9][0-9][0-9]/[0-9][0-9]/days/*.html',
+    'scripts/*.yaml',
+    '*.css',
+    '*.html',
+    'js/*.js',
+    'include/*.html',
+    'txt/**/*.css',
+    'txt/**/*.js',
+    'txt/*.html',
+]
+
+# 変更を無視するディレクトリ・拡張子
+IGNORE_DIRS = {'node_modules', '.git', 'dist', '__pycache__', '.build_cache'}
+IGNORE_SUFFIXES = {'.bak', '.pyc', '.swp', '.tmp'}
+
+# タグページの設定ファイル（変わったらすべて作り直す、月別・年別は --config のファイル）
+CONFIG_FILES = {'scripts/build_tags_config.yaml', 'scripts/build_tags_config.json'}
+
+
+class ZakkiCorpus:
+    """
+    日別HTMLの解析結果と、生成したページのキャッシュ
+    """
+
+    def __init__(self, root: Path, options):
+        self.root = root
+        self.zakki_root = root / 'txt' / 'zakki'
+        self.options = options
+        self.articles = {}  # {日別HTMLのパス: (更新日時, 省略処理済みの記事)}
+        self.sections = {}  # {日別HTMLのパス: (更新日時, [(タグ名, section_data), ...])}
+        self.renders = {}   # {URL: HTML}
+        self.load_configs()
+
+    def load_configs(self):
+        """
+        月別・年別ページとタグページの設定を読み込む
+        """
+        with self.quiet():
+            self.config = load_config(self.options.get('config'))
+            self.tags_config = load_tags_config(script_dir=self.root / 'scripts')
+        if self.options.get('embed_facades'):
+            self.config['embed_facades'] = True
+            self.tags_config['embed_facades'] = True
+        self.articles.clear()
+        self.renders.clear()
+
+    @contextlib.contextmanager
+    def quiet(self):
+        """
+        ビルド関数の進行状況の出力を抑える（--debug 指定時は表示）
+        """
+        if self.options.get('debug'):
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    def day_files(self):
+        """
+        日別HTMLを build_tags.py の走査と同じ順に列挙
+        """
+        return sorted(self.zakki_root.glob('[0-9][0-9][0-9][0-9]/[0-9][0-9]/days/*.html'))
+
+    def article(self, html_file: Path, truncate_config):
+        """
+        日別HTMLの省略処理済みの記事（更新日時が変わっていなければ前回の結果）
+        """
+        mtime = html_file.stat().st_mtime_ns
+        cached = self.articles.get(html_file)
+        if cached is None or cached[0] != mtime:
+            year, month = html_file.parent.parent.parent.name, html_file.parent.parent.name
+            cached = (mtime, load_day_article(html_file, year, month, truncate_config))
+            self.articles[html_file] = cached
+        return cached[1]
+
+    def tags_data(self):
+        """
+        全日別HTMLのタグ付きセクション（scan_zakki_directory() と同じ形）
+        """
+        tags = {}
+        for html_file in self.day_files():
+            mtime = html_file.stat().st_mtime_ns
+            cached = self.sections.get(html_file)
+            if cached is None or cached[0] != mtime:
+                year, month = html_file.parent.parent.parent.name, html_file.parent.parent.name
+                cached = (mtime, scan_day_file(html_file, year, month))
+                self.sections[html_file] = cached
+            for tag_name, section_data in cached[1]:
+                tags.setdefault(tag_name, []).append(section_data)
+        return tags
+
+    def warm(self):
+        """
+        全日別HTMLを解析しておく（最初のリクエストを速くする）
+        """
+        truncate_config = dict(self.config.get('truncate', {}), debug=False)
+        with self.quiet():
+            for html_file in self.day_files():
+                self.article(html_file, truncate_config)
+            self.tags_data()
+        return len(self.articles)
+
+    def render(self, url: str):
+        """
+        URLに対応するページを生成（月別・年別・タグページ以外は None）
+
+        Returns:
+            (HTML, キャッシュから返したかどうか) または None
+        """
+        if url in self.renders:
+            return self.renders[url], True
+
+        with self.quiet():
+            result = self._render(url)
+        if result is None:
+            return None
+        html, output_path = result
+
+        self.renders[url] = html
+        if self.options.get('write'):
+            output_path.write_text(html, encoding='utf-8')
+            print(f'  ✓ Wrote {output_path.relative_to(self.root)}')
+        return html, False
+
+    def _render(self, url: str):
+        save = bool(self.options.get('write'))
+
+        match = MONTH_URL.match(url)
+        if match:
+            year, month = match.groups()
+            days_dir = self.zakki_root / year / month / 'days'
+            if not days_dir.is_dir():
+                return None
+            html, output_path, _ = render_month_page(
+                year, month, days_dir, self.config,
+                load_article=self.article, save_image_cache=save
+            )
+            return html, output_path
+
+        match = YEAR_URL.match(url)
+        if match:
+            year = match.group(1)
+            if not (self.zakki_root / year).is_dir():
+                return None
+            html, output_path, _, _ = render_year_page(
+                year, str(self.zakki_root), self.config,
+                load_month_html=self.month_html, save_image_cache=save
+            )
+            return html, output_path
+
+        match = TAG_URL.match(url)
+        if match:
+            tag_name = match.group(1)
+            output_file = self.zakki_root / 'tag' / f'{tag_name}.html'
+            tags = self.tags_data()
+            if tag_name == 'tag_main':
+                if not tags:
+                    return None
+                return render_tag_main_html(tags, self.tags_config.get('tags', {})), output_file
+            if tag_name not in tags:
+                return None
+            html = render_tag_page(
+                tag_name, tags[tag_name], output_file,
+                tag_config=self.tags_config.get('tags', {}).get(tag_name, {}),
+                sort_by=self.tags_config.get('default_sort') or 'date-desc',
+                embed_facades=self.tags_config.get('embed_facades', False),
+                save_image_cache=save
+            )
+            return html, output_file
+
+        return None
+
+    def month_html(self, month_html_path: Path) -> str:
+        """
+        年別ページ用に月別ページのHTMLを返す（メモリ上で生成した結果を使う）
+        """
+        url = '/' + Path(month_html_path).relative_to(self.root).as_posix()
+        result = self.render(url)
+        if result is None:
+            return Path(month_html_path).read_text(encoding='utf-8')
+        return result[0]
+
+    def invalidate(self, changes):
+        """
+        変更されたファイルに応じて生成結果を破棄
+
+        Args:
+            changes: [(種類, プロジェクトルートからの相対パス), ...]
+                種類は 'added' / 'modified' / 'deleted'
+
+        Returns:
+            破棄したURLの数
+        """
+        before = len(self.renders)
+        for kind, rel in changes:
+            if rel in CONFIG_FILES or (self.root / rel) == self.options.get('config_path'):
+                self.load_configs()
+                continue
+            match = DAY_FILE.match(rel)
+            if not match:
+                continue
+            year, month = match.groups()
+            path = self.root / rel
+            self.articles.pop(path, None)
+            self.sections.pop(path, None)
+            if kind != 'modified':
+                # 記事数や前後の月へのリンクが変わる
+                self.renders.clear()
+                continue
+            for url in list(self.renders):
+                if (url == f'/txt/zakki/{year}/{month}/{year}-{month}.html'
+                        or url == f'/txt/zakki/{year}/{year}.html'
+                        or url.startswith('/txt/zakki/tag/')):
+                    del self.renders[url]
+        return before - len(self.renders)
+
+
+class LiveReload:
+    """
+    再読み込みの通知先（/__livereload に接続しているブラウザ）
+    """
+
+    def __init__(self):
+        self.clients = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self.clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.clients.discard(queue)
+
+    def notify(self, paths):
+        for queue in self.clients:
+            queue.put_nowait(paths)
+
+
+def is_ignored(rel: str) -> bool:
+    parts = rel.split('/')
+    return any(part in IGNORE_DIRS for part in parts) or Path(rel).suffix.lower() in IGNORE_SUFFIXES
+
+
+async def watch_with_watchfiles(root: Path, on_change):
+    """
+    watchfiles（inotify など）でプロジェクト内の変更を検出
+    """
+    kinds = {watchfiles.Change.added: 'added', watchfiles.Change.modified: 'modified',
+             watchfiles.Change.deleted: 'deleted'}
+    watch_filter = watchfiles.DefaultFilter(
+        ignore_dirs=tuple(watchfiles.DefaultFilter.ignore_dirs) + tuple(IGNORE_DIRS)
+    )
+    async for raw_changes in watchfiles.awatch(root, watch_filter=watch_filter, debounce=50, step=10):
+        changes = []
+        for change, path in raw_changes:
+            rel = Path(path).resolve().relative_to(root).as_posix()
+            if not is_ignored(rel):
+                changes.append((kinds.get(change, 'modified'), rel))
+        if changes:
+            on_change(changes)
+
+
+def poll_snapshot(root: Path):
+    """
+    監視対象のファイルの更新日時を取得
+    """
+    snapshot = {}
+    for pattern in POLL_PATTERNS:
+        for path in root.glob(pattern):
+            rel = path.relative_to(root).as_posix()
+            if rel in snapshot or is_ignored(rel):
+                continue
+            try:
+                snapshot[rel] = path.stat().st_mtime_ns
+            except OSError:
+                continue
+    return snapshot
+
+
+async def watch_with_polling(root: Path, on_change, interval: float):
+    """
+    更新日時を定期的に確認して変更を検出（watchfiles がない場合）
+    """
+    previous = poll_snapshot(root)
+    while True:
+        await asyncio.sleep(interval)
+        current = poll_snapshot(root)
+        changes = [('added', rel) for rel in current if rel not in previous]
+        changes += [('deleted', rel) for rel in previous if rel not in current]
+        changes += [('modified', rel) for rel, mtime in current.items()
+                    if rel in previous and previous[rel] != mtime]
+        previous = current
+        if changes:
+            on_change(changes)
+
+
+def inject_livereload(html: str) -> str:
+    """
+    HTMLに再読み込み用のスクリプトを追加
+    """
+    index = html.lower().rfind('</body>')
+    if index == -1:
+        return html + LIVERELOAD_SCRIPT
+    return html[:index] + LIVERELOAD_SCRIPT + html[index:]
+
+
+def resolve_static(root: Path, url: str):
+    """
+    URLをサイト内のファイルに変換（ディレクトリなら index.html、サイトの外は None）
+    """
+    path = (root / url.lstrip('/')).resolve()
+    if path != root and root not in path.parents:
+        return None
+    if path.is_dir():
+        path = path / 'index.html'
+    return path if path.is_file() else None
+
+
+class DevServer:
+    """
+    静的ファイルと生成したページを配信するHTTPサーバー（GET / HEAD のみ）
+    """
+
+    def __init__(self, root: Path, corpus: ZakkiCorpus, livereload: LiveReload):
+        self.root = root
+        self.corpus = corpus
+        self.livereload = livereload
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            parts = request_line.decode('latin-1').split()
+            if len(parts) < 2:
+                return
+            method, target = parts[0], parts[1]
+            url = unquote(urlsplit(target).path)
+
+            if method not in ('GET', 'HEAD'):
+                await self.respond(writer, 405, b'Method Not Allowed', 'text/plain', method)
+                return
+            if url == LIVERELOAD_URL:
+                await self.stream_events(writer)
+                return
+
+            start = time.perf_counter()
+            try:
+                result = self.corpus.render(url)
+            except BaseException:
+                # ビルド関数の sys.exit() も含めてエラーページとして返す
+                message = traceback.format_exc()
+                print(f'Error rendering {url}:\n{message}')
+                await self.respond(writer, 500, message.encode('utf-8'), 'text/plain; charset=utf-8', method)
+                return
+
+            if result is not None:
+                html, cached = result
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f'  200 {url} ({"cached" if cached else f"rendered in {elapsed:.0f} ms"})')
+                body = inject_livereload(html).encode('utf-8')
+                await self.respond(writer, 200, body, 'text/html; charset=utf-8', method)
+                return
+
+            path = resolve_static(self.root, url)
+            if path is None:
+                not_found = self.root / 'not_found.html'
+                body = not_found.read_bytes() if not_found.exists() else b'Not Found'
+                print(f'  404 {url}')
+                await self.respond(writer, 404, body, 'text/html; charset=utf-8', method)
+                return
+
+            body = path.read_bytes()
+            content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+            if content_type == 'text/html':
+                body = inject_livereload(body.decode('utf-8', errors='replace')).encode('utf-8')
+            if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+                content_type += '; charset=utf-8'
+            await self.respond(writer, 200, body, content_type, method)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            with contextlib.suppress(Exception):
+                writer.close()
+                await writer.wait_closed()
+
+    async def respond(self, writer, status: int, body: bytes, content_type: str, method: str):
+        reasons = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+        headers = (
+            f'HTTP/1.1 {status} {reasons.get(status, "")}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Cache-Control: no-store\r\n'
+            'Connection: close\r\n\r\n'
+        )
+        writer.write(headers.encode('latin-1'))
+        if method != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+    async def stream_events(self, writer):
+        """
+        /__livereload: 変更があるたびに reload イベントを送る
+        """
+        writer.write(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Type: text/event-stream\r\n'
+            b'Cache-Control: no-store\r\n'
+            b'Connection: keep-alive\r\n\r\n'
+            b'retry: 500\n\n'
+        )
+        await writer.drain()
+        queue = self.livereload.subscribe()
+        try:
+            while True:
+                try:
+                    paths = await asyncio.wait_for(queue.get(), timeout=15)
+                    writer.write(f'event: reload\ndata: {json.dumps(paths)}\n\n'.encode('utf-8'))
+                except asyncio.TimeoutError:
+                    writer.write(b': keep-alive\n\n')
+                await writer.drain()
+        finally:
+            self.livereload.unsubscribe(queue)
+
+
+async def serve(root: Path, options):
+    """
+    サーバーと変更の監視を起動
+    """
+    corpus = ZakkiCorpus(root, options)
+    start = time.perf_counter()
+    count = corpus.warm()
+    print(f'✓ Parsed {count} day file(s) in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    livereload = LiveReload()
+
+    def on_change(changes):
+        start = time.perf_counter()
+        dropped = corpus.invalidate(changes)
+        rels = sorted({rel for _, rel in changes})
+        print(f'Changed: {", ".join(rels[:5])}{" ..." if len(rels) > 5 else ""} '
+              f'({dropped} cached page(s) dropped in {(time.perf_counter() - start) * 1000:.1f} ms)')
+        livereload.notify(rels)
+
+    if WATCHFILES_AVAILABLE and not options.get('poll'):
+        watcher = asyncio.create_task(watch_with_watchfiles(root, on_change))
+        print('✓ Watching for changes with watchfiles')
+    else:
+        watcher = asyncio.create_task(watch_with_polling(root, on_change, options.get('interval', 0.05)))
+        print(f'✓ Watching for changes by polling every {options.get("interval", 0.05) * 1000:.0f} ms'
+              + ('' if WATCHFILES_AVAILABLE else ' (pip install watchfiles for inotify)'))
+
+    server = await asyncio.start_server(
+        DevServer(root, corpus, livereload).handle, options['host'], options['port']
+    )
+    print(f'✓ Serving {root} at http://{options["host"]}:{options["port"]}/')
+    if options.get('write'):
+        print('✓ Rendered pages are also written to disk (--write)')
+    print('Press Ctrl+C to stop\n')
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+def parse_arguments():
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(
+        description='雑記のプレビュー用ローカルサーバー',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+例:
+  # http://127.0.0.1:8000/ で起動
+  python serve.py
+
+  # ポートを指定し、埋め込みプレーヤーをファサードにする
+  python serve.py --port 8080 --embed-facades
+
+  # 生成したページをファイルにも書き出す
+  python serve.py --write
+        '''
+    )
+
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='待ち受けるアドレス（デフォルト: 127.0.0.1）'
+    )
+
+    parser.add_argument(
+        '--port', '-p',
+        type=int,
+        default=8000,
+        help='ポート番号（デフォルト: 8000）'
+    )
+
+    parser.add_argument(
+        '--config',
+        default=None,
+        help='月別・年別ページの設定ファイル（build_month.py の --config と同じ）'
+    )
+
+    parser.add_argument(
+        '--write',
+        action='store_true',
+        help='生成したページをファイルにも書き出す（デフォルト: 書き出さない）'
+    )
+
+    parser.add_argument(
+        '--embed-facades',
+        action='store_true',
+        help='埋め込みプレーヤーをクリックで読み込むファサードに置き換える'
+    )
+
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='watchfiles があっても更新日時の定期確認で変更を検出する'
+    )
+
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.05,
+        help='更新日時を確認する間隔（秒、デフォルト: 0.05）'
+    )
+
+    parser.add_argument(
+        '--debug',
+        action='store_true',
+        help='デバッグモードを有効化（ビルド関数の出力を表示）'
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    script_dir = Path(__file__).resolve().parent
+    project_root = script_dir.parent
+
+    print('=' * 60)
+    print('雑記のプレビュー用ローカルサーバー')
+    print('=' * 60)
+
+    options = {
+        'host': args.host,
+        'port': args.port,
+        'config': args.config,
+        'config_path': Path(args.config).resolve() if args.config else None,
+        'write': args.write,
+        'embed_facades': args.embed_facades,
+        'poll': args.poll,
+        'interval': args.interval,
+        'debug': args.debug,
+    }
+
+    try:
+        asyncio.run(serve(project_root, options))
+    except KeyboardInterrupt:
+        print('\nStopped')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+// サービスワーカー（共通アセット・フッターの断片・最近のページの事前キャッシュ）
+// 事前キャッシュする一覧は scripts/build_service_worker.py が生成する precache-manifest.json
+// 一覧のハッシュ（revision）が変わったURLだけを取得し直し、一覧から消えたURLは削除する
+const CACHE_NAME = 'precache-v1';
+const MANIFEST_URL = '/precache-manifest.json';
+// 前回取り込んだ一覧をキャッシュ内に保存するキー
+const MANIFEST_KEY = '/__precache-manifest';
+// ページ遷移時に一覧を確認し直す間隔
+const SYNC_INTERVAL = 10 * 60 * 1000;
+
+let lastSync = 0;
+let pendingSync = null;
+
+async function syncPrecache() {
+  const response = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+  if (!response.ok) return;
+  const manifest = await response.json();
+  if (manifest.version !== 1) return;
+
+  const cache = await caches.open(CACHE_NAME);
+  const stored = await cache.match(MANIFEST_KEY);
+  const previous = stored ? await stored.json() : { revision: null, entries: [] };
+  if (previous.revision === manifest.revision) return;
+
+  const previousRevisions = new Map(previous.entries.map(entry => [entry.url, entry.revision]));
+  const currentUrls = new Set(manifest.entries.map(entry => entry.url));
+
+  // ハッシュが変わったエントリだけを取得する（失敗したものは次回やり直す）
+  const entries = await Promise.all(manifest.entries.map(async entry => {
+    if (previousRevisions.get(entry.url) === entry.revision && await cache.match(entry.url)) {
+      return entry;
+    }
+    try {
+      const fresh = await fetch(entry.url, { cache: 'reload' });
+      if (!fresh.ok) throw new Error(`${fresh.status}`);
+      await cache.put(entry.url, fresh);
+      return entry;
+    } catch (error) {
+      console.warn('[sw] precache failed:', entry.url, error);
+      return { url: entry.url, revision: null };
+    }
+  }));
+
+  await Promise.all(previous.entries
+    .filter(entry => !currentUrls.has(entry.url))
+    .map(entry => cache.delete(entry.url)));
+
+  const failed = entries.some(entry => entry.revision === null);
+  await cache.put(MANIFEST_KEY, new Response(JSON.stringify({
+    revision: failed ? null : manifest.revision,
+    entries
+  }), { headers: { 'Content-Type': 'application/json' } }));
+}
+
+function requestSync() {
+  if (!pendingSync) {
+    lastSync = Date.now();
+    pendingSync = syncPrecache()
+      .catch(error => console.warn('[sw] manifest sync failed:', error))
+      .finally(() => { pendingSync = null; });
+  }
+  return pendingSync;
+}
+
+self.addEventListener('install', event => {
+  event.waitUntil(requestSync());
+  self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(names
+      .filter(name => name.startsWith('precache-') && name !== CACHE_NAME)
+      .map(name => caches.delete(name)));
+    await self.clients.claim();
+  })());
+});
+
+self.addEventListener('fetch', event => {
+  const request = event.request;
+  if (request.method !== 'GET') return;
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin || url.search || url.pathname === MANIFEST_URL) return;
+
+  if (request.mode === 'navigate' && Date.now() - lastSync > SYNC_INTERVAL) {
+    event.waitUntil(requestSync());
+  }
+
+  // 事前キャッシュにあればキャッシュから返し、なければ通常どおり取得
+  event.respondWith((async () => {
+    const cache = await caches.open(CACHE_NAME);
+    const cached = await cache.match(url.pathname);
+    return cached || fetch(request);
+  })());
+});
@@ -0,0 +1,15 @@
+"""
+テストの共通設定
+
+リポジトリ直下のモジュール（base_handler.py など）と scripts/ のビルドスクリプトを
+import できるようにします。
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+for path in (ROOT, ROOT / 'scripts'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,158 @@
+"""
+async_database.py のテスト
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from async_database import AsyncDatabase
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'bot.db'
+    with sqlite3.connect(path) as connection:
+        connection.executescript(
+            'CREATE TABLE users (id INTEGER PRIMARY KEY, point INTEGER NOT NULL);'
+            'INSERT INTO users VALUES (1, 0);'
+        )
+    return path
+
+
+def make_database(path, **kwargs):
+    database = AsyncDatabase(str(path), **kwargs)
+    database.prepare('add_point', 'UPDATE users SET point = point + ? WHERE id = ?')
+    database.prepare('add_user', 'INSERT INTO users (id, point) VALUES (?, ?)')
+    database.prepare('get_point', 'SELECT point FROM users WHERE id = ?')
+    database.prepare('count', 'SELECT COUNT(*) AS n FROM users')
+    return database
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+
+def test_writes_are_committed_in_batches_of_batch_size(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=1000, batch_size=100)
+        await database.open()
+        for i in range(250):
+            await database.write('add_user', (100 + i, i))
+        await database.flush()
+        count = (await database.fetchone('count'))['n']
+        stats = dict(database.stats)
+        await database.close()
+        return count, stats
+
+    count, stats = run(main())
+    assert count == 251
+    assert stats['writes'] == 250
+    assert stats['batches'] == 3
+
+
+def test_writes_are_committed_after_batch_interval(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=20, batch_size=1000)
+        await database.open()
+        for _ in range(5):
+            await database.write('add_point', (1, 1))
+        before = (await database.fetchone('get_point', (1,)))['point']
+        await asyncio.sleep(0.2)
+        after = (await database.fetchone('get_point', (1,)))['point']
+        stats = dict(database.stats)
+        await database.close()
+        return before, after, stats
+
+    before, after, stats = run(main())
+    assert before == 0
+    assert after == 5
+    assert stats['batches'] == 1
+
+
+def test_wait_returns_after_commit(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=1000)
+        await database.open()
+        await database.write('add_point', (3, 1), wait=True)
+        point = (await database.fetchone('get_point', (1,)))['point']
+        await database.close()
+        return point
+
+    assert run(main()) == 3
+
+
+def test_failed_row_is_retried_alone_and_others_commit(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=1000, batch_size=3)
+        await database.open()
+        results = await asyncio.gather(
+            database.write('add_user', (2, 0), wait=True),
+            database.write('add_user', (1, 0), wait=True),   # 主キーの重複
+            database.write('add_point', (1, 1), wait=True),
+            return_exceptions=True,
+        )
+        stats = dict(database.stats)
+        await database.close()
+        return results, stats
+
+    results, stats = run(main())
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert stats['failed_writes'] == 1
+    assert count_rows(db_path) == 2
+
+
+def test_non_sqlite_error_does_not_stop_the_writer(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=1000, batch_size=2)
+        await database.open()
+        results = await asyncio.gather(
+            database.write('add_point', (2 ** 70, 1), wait=True),   # OverflowError
+            database.write('add_user', (2, 0), wait=True),
+            return_exceptions=True,
+        )
+        await database.flush()
+        # 書き込みのまとめ処理が動き続けていること
+        await database.write('add_user', (3, 0), wait=True)
+        await database.close()
+        return results
+
+    results = run(main())
+    assert isinstance(results[0], OverflowError)
+    assert results[1] is None
+    assert count_rows(db_path) == 3
+
+
+def test_close_flushes_pending_writes(db_path):
+    async def main():
+        database = make_database(db_path, batch_interval=10000, batch_size=1000)
+        await database.open()
+        for i in range(50):
+            await database.write('add_user', (100 + i, i))
+        await database.close()
+
+    run(main())
+    assert count_rows(db_path) == 51
+
+
+def test_read_pool_is_bounded(db_path):
+    async def main():
+        database = make_database(db_path, pool_size=2)
+        await database.open()
+        rows = await asyncio.gather(*(database.fetchone('get_point', (1,)) for _ in range(20)))
+        connections = len(database._connections)
+        await database.close()
+        return rows, connections
+
+    rows, connections = run(main())
+    assert all(row['point'] == 0 for row in rows)
+    assert connections <= 2
@@ -0,0 +1,231 @@
+"""
+cached_data_service.py のテスト
+
+時刻は clock に渡した FakeClock で進めます。
+"""
+
+import asyncio
+
+import pytest
+
+from cached_data_service import CachedDataService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeDataService:
+    """呼び出しを記録するデータサービス
+
+    gate を設定すると、get_user は gate がセットされるまで戻りません。
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.version = 0
+        self.gate = None
+
+    async def get_user(self, user_id):
+        self.calls.append(('get_user', user_id))
+        version = self.version
+        if self.gate is not None:
+            await self.gate.wait()
+        return {'id': user_id, 'version': version}
+
+    def get_profile(self, user_id):
+        self.calls.append(('get_profile', user_id))
+        return {'id': user_id, 'bio': 'x' * 100}
+
+    async def update_profile(self, user_id, bio):
+        self.calls.append(('update_profile', user_id))
+        self.version += 1
+
+    def name(self):
+        return 'fake'
+
+
+def make_cache(service=None, **kwargs):
+    clock = FakeClock()
+    options = {'ttls': {'get_user': 10, 'get_profile': 60}, 'clock': clock}
+    options.update(kwargs)
+    return CachedDataService(service or FakeDataService(), **options), clock
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+async def wait_for_calls(service, count):
+    """データサービスが count 回呼ばれるまで待つ"""
+    while len(service.calls) < count:
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_are_coalesced():
+    async def main():
+        cache, _ = make_cache()
+        service = cache._service
+        service.gate = asyncio.Event()
+        tasks = [asyncio.create_task(cache.get_user(1)) for _ in range(5)]
+        await wait_for_calls(service, 1)
+        service.gate.set()
+        return cache, service, await asyncio.gather(*tasks)
+
+    cache, service, results = run(main())
+    assert service.calls == [('get_user', 1)]
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()['methods']['get_user']
+    assert (stats['misses'], stats['coalesced']) == (1, 4)
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_entries_expire_after_ttl():
+    async def main():
+        cache, clock = make_cache()
+        service = cache._service
+        first = await cache.get_user(1)
+        clock.advance(9.9)
+        cached = await cache.get_user(1)
+        clock.advance(0.1)
+        service.version += 1
+        reloaded = await cache.get_user(1)
+        return cache, service, first, cached, reloaded
+
+    cache, service, first, cached, reloaded = run(main())
+    assert cached is first
+    assert reloaded['version'] == 1
+    assert service.calls == [('get_user', 1), ('get_user', 1)]
+    assert cache.stats()['methods']['get_user']['hits'] == 1
+
+
+def test_sync_methods_are_cached_and_other_attributes_pass_through():
+    async def main():
+        cache, _ = make_cache()
+        await cache.get_profile(1)
+        await cache.get_profile(1)
+        return cache
+
+    cache = run(main())
+    assert cache._service.calls == [('get_profile', 1)]
+    assert cache.name() == 'fake'
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def main():
+        cache, _ = make_cache(max_entries=2)
+        service = cache._service
+        await cache.get_user(1)
+        await cache.get_user(2)
+        await cache.get_user(1)      # 1 を最近使ったことにする
+        await cache.get_user(3)      # 2 が捨てられる
+        calls = len(service.calls)
+        await cache.get_user(1)
+        await cache.get_user(3)
+        kept = len(service.calls) == calls
+        await cache.get_user(2)
+        return cache, kept, service.calls[-1]
+
+    cache, kept, last = run(main())
+    assert kept
+    assert last == ('get_user', 2)
+    assert cache.stats()['methods']['get_user']['evictions'] == 2
+    assert cache.stats()['entries'] == 2
+
+
+def test_max_bytes_evicts_oldest_entries():
+    async def main():
+        cache, _ = make_cache()
+        await cache.get_profile(1)
+        size = cache.stats()['bytes']
+        cache.max_bytes = size * 2
+        await cache.get_profile(2)
+        await cache.get_profile(3)
+        return cache, size
+
+    cache, size = run(main())
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= size * 2
+    assert stats['methods']['get_profile']['evictions'] == 1
+
+
+def test_invalidate_during_load_does_not_cache_stale_result():
+    async def main():
+        cache, _ = make_cache()
+        service = cache._service
+        service.gate = asyncio.Event()
+        stale = asyncio.create_task(cache.get_user(1))
+        await wait_for_calls(service, 1)
+
+        # 取得中に書き込みがあった
+        service.version += 1
+        assert cache.invalidate('get_user') == 0
+
+        # invalidate の後の呼び出しは、古い取得を共有せずに取得し直す
+        fresh = asyncio.create_task(cache.get_user(1))
+        await wait_for_calls(service, 2)
+        service.gate.set()
+        stale_result, fresh_result = await asyncio.gather(stale, fresh)
+        cached = await cache.get_user(1)
+        return cache, service, stale_result, fresh_result, cached
+
+    cache, service, stale_result, fresh_result, cached = run(main())
+    assert stale_result['version'] == 0
+    assert fresh_result['version'] == 1
+    assert cached is fresh_result
+    assert service.calls == [('get_user', 1), ('get_user', 1)]
+
+
+def test_invalidate_single_call():
+    async def main():
+        cache, _ = make_cache()
+        await cache.get_user(1)
+        await cache.get_user(2)
+        removed = cache.invalidate('get_user', 1)
+        await cache.get_user(1)
+        await cache.get_user(2)
+        return cache, removed
+
+    cache, removed = run(main())
+    assert removed == 1
+    assert cache._service.calls == [('get_user', 1), ('get_user', 2), ('get_user', 1)]
+
+
+def test_invalidate_on_write_method():
+    async def main():
+        cache, _ = make_cache()
+        cache.invalidate_on('update_profile', ['get_user', 'get_profile'])
+        notified = []
+        cache.add_invalidation_listener(lambda method, args, kwargs: notified.append(method))
+        await cache.get_user(1)
+        await cache.update_profile(1, 'bio')
+        user = await cache.get_user(1)
+        return cache, user, notified
+
+    cache, user, notified = run(main())
+    assert user['version'] == 1
+    assert notified == ['get_user', 'get_profile']
+    assert cache._service.calls.count(('get_user', 1)) == 2
+
+
+def test_unknown_method_names_are_rejected():
+    cache, _ = make_cache()
+    with pytest.raises(ValueError):
+        cache.invalidate('typo')
+    with pytest.raises(ValueError):
+        cache.invalidate('typo', 1)
+    with pytest.raises(ValueError):
+        cache.invalidate_on('update_profile', ['get_user', 'typo'])
+    with pytest.raises(ValueError):
+        cache.invalidate_on('get_user', ['get_profile'])
+    # 拒否された登録は残らない
+    assert 'update_profile' not in cache._invalidate_hooks
+    assert cache.invalidate() == 0
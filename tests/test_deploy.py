@@ -0,0 +1,182 @@
+"""
+deploy.py のテスト
+
+scripts/neocities_stub.py の代替サーバーに対してデプロイします。
+"""
+
+import http.client
+
+import pytest
+
+import deploy
+from deploy import NeocitiesUploader, UploadError, load_deployed_manifest
+from neocities_stub import NeocitiesStub
+
+SOURCE_FILES = {
+    'index.html': b'<!DOCTYPE html><title>top</title>',
+    'style.css': b'body { color: red; }',
+    'img/icon.png': b'\x89PNG\r\n\x1a\n' + bytes(range(256)),
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / 'site'
+    for rel, data in SOURCE_FILES.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return root
+
+
+@pytest.fixture
+def stub(tmp_path):
+    with NeocitiesStub(tmp_path / 'remote') as server:
+        yield server
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """再試行の待ち時間を記録し、実際には待たない"""
+    recorded = []
+    monkeypatch.setattr(deploy.time, 'sleep', recorded.append)
+    return recorded
+
+
+def run_deploy(source, stub, manifest_path, **config):
+    options = {'jobs': 2, 'retries': 3, 'retry_delay': 0.5}
+    options.update(config)
+    uploader = NeocitiesUploader('test', stub.endpoint, timeout=5)
+    return deploy.deploy(source, uploader, manifest_path, options)
+
+
+def remote_files(stub):
+    return {
+        path.relative_to(stub.root).as_posix(): path.read_bytes()
+        for path in stub.root.rglob('*') if path.is_file()
+    }
+
+
+def test_deploy_uploads_only_changed_files(source, stub, sleeps, tmp_path):
+    manifest_path = tmp_path / 'deploy.json'
+    assert run_deploy(source, stub, manifest_path)
+    assert remote_files(stub) == SOURCE_FILES
+
+    (source / 'style.css').write_bytes(b'body { color: blue; }')
+    (source / 'img/icon.png').unlink()
+    stub.requests.clear()
+    assert run_deploy(source, stub, manifest_path)
+
+    assert stub.requests == [
+        ('upload', 'style.css', 200),
+        ('delete', 'img/icon.png', 200),
+    ]
+    assert set(load_deployed_manifest(manifest_path)) == {'index.html', 'style.css'}
+    assert sleeps == []
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503])
+def test_transient_errors_are_retried_with_backoff(source, stub, sleeps, tmp_path, status):
+    stub.fail('style.css', status, status)
+    manifest_path = tmp_path / 'deploy.json'
+
+    assert run_deploy(source, stub, manifest_path, retry_delay=0.5)
+
+    assert stub.attempts('upload', 'style.css') == 3
+    assert remote_files(stub)['style.css'] == SOURCE_FILES['style.css']
+    # 指数バックオフ（ジッターは 0.5〜1.5 倍）
+    assert len(sleeps) == 2
+    for attempt, delay in enumerate(sleeps):
+        base = 0.5 * (2 ** attempt)
+        assert base * 0.5 <= delay <= base * 1.5
+    assert 'style.css' in load_deployed_manifest(manifest_path)
+
+
+def test_permanent_client_error_is_not_retried(source, stub, sleeps, tmp_path):
+    stub.fail('img/icon.png', 400)
+    manifest_path = tmp_path / 'deploy.json'
+
+    assert not run_deploy(source, stub, manifest_path)
+
+    assert stub.attempts('upload', 'img/icon.png') == 1
+    assert sleeps == []
+    deployed = load_deployed_manifest(manifest_path)
+    assert 'img/icon.png' not in deployed
+    assert set(deployed) == {'index.html', 'style.css'}
+
+
+def test_failed_files_are_left_out_of_manifest_and_retried_next_run(source, stub, sleeps, tmp_path):
+    stub.fail('index.html', 503, 503, 503, 503)
+    manifest_path = tmp_path / 'deploy.json'
+
+    # 再試行を使い切って失敗する
+    assert not run_deploy(source, stub, manifest_path, retries=3)
+    assert stub.attempts('upload', 'index.html') == 4
+    assert 'index.html' not in load_deployed_manifest(manifest_path)
+    assert 'index.html' not in remote_files(stub)
+
+    # 次の実行では失敗したファイルだけを送る
+    stub.requests.clear()
+    assert run_deploy(source, stub, manifest_path)
+    assert stub.requests == [('upload', 'index.html', 200)]
+    assert remote_files(stub) == SOURCE_FILES
+    assert set(load_deployed_manifest(manifest_path)) == set(SOURCE_FILES)
+
+
+def test_failed_deletions_stay_in_manifest(source, stub, sleeps, tmp_path):
+    manifest_path = tmp_path / 'deploy.json'
+    assert run_deploy(source, stub, manifest_path)
+
+    (source / 'style.css').unlink()
+    stub.fail('style.css', 403)
+    assert not run_deploy(source, stub, manifest_path)
+    assert 'style.css' in load_deployed_manifest(manifest_path)
+
+    assert run_deploy(source, stub, manifest_path)
+    assert 'style.css' not in load_deployed_manifest(manifest_path)
+    assert 'style.css' not in remote_files(stub)
+
+
+def test_list_files_matches_local_manifest(source, stub, sleeps, tmp_path):
+    assert run_deploy(source, stub, tmp_path / 'deploy.json')
+    uploader = NeocitiesUploader('test', stub.endpoint, timeout=5)
+    assert uploader.list_files() == load_deployed_manifest(tmp_path / 'deploy.json')
+
+
+def test_invalid_api_key_is_not_retried(stub):
+    uploader = NeocitiesUploader('wrong', stub.endpoint, timeout=5)
+    with pytest.raises(UploadError) as excinfo:
+        uploader.upload('index.html', b'x')
+    assert not excinfo.value.retryable
+
+
+def test_unexpected_error_fails_only_that_file(source, stub, sleeps, tmp_path):
+    class BrokenUploader(NeocitiesUploader):
+        def upload(self, remote_path, data):
+            if remote_path == 'style.css':
+                raise http.client.IncompleteRead(b'')
+            super().upload(remote_path, data)
+
+    manifest_path = tmp_path / 'deploy.json'
+    uploader = BrokenUploader('test', stub.endpoint, timeout=5)
+    assert not deploy.deploy(source, uploader, manifest_path, {'jobs': 2, 'retries': 0})
+    assert set(load_deployed_manifest(manifest_path)) == {'index.html', 'img/icon.png'}
+
+
+def test_sync_remote_ignores_files_that_are_not_deployed(source, stub, sleeps, tmp_path):
+    assert run_deploy(source, stub, tmp_path / 'first.json')
+    extra = {'README.md': b'# notes', 'scripts/tool.py': b'pass', 'package.json': b'{}', 'index.html.gz': b'gz'}
+    for rel, data in extra.items():
+        path = stub.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    manifest_path = tmp_path / 'deploy.json'
+    uploader = NeocitiesUploader('test', stub.endpoint, timeout=5)
+    assert deploy.sync_remote_manifest(uploader, manifest_path, 0) == (len(SOURCE_FILES), len(extra))
+    assert set(load_deployed_manifest(manifest_path)) == set(SOURCE_FILES)
+
+    stub.requests.clear()
+    assert run_deploy(source, stub, manifest_path)
+    assert stub.requests == []
+    assert remote_files(stub) == {**SOURCE_FILES, **extra}
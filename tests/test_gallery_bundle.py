@@ -0,0 +1,123 @@
+"""
+gallery_bundle.py のテスト
+
+gallery/data/ の実データと、境界的な値を含む小さなデータで、
+バンドルから元のJSONが復元できること・ポスティングリストが正しいことを確認します。
+"""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from gallery_bundle import (
+    BUNDLE_FILENAME,
+    GalleryBundle,
+    bundle_is_current,
+    load_series_files,
+    pack_gallery,
+    unpack_bundle,
+)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'gallery' / 'data'
+
+
+def round_trip(series_files):
+    """書き出し・読み込みと同じく JSON を経由してバンドルを復元する"""
+    bundle = json.loads(json.dumps(pack_gallery(series_files), ensure_ascii=False))
+    return bundle, unpack_bundle(bundle)
+
+
+def linear_scan(series_files, tag):
+    """ポスティングリストを使わずに、タグを持つ作品を全作品から探す"""
+    works = [work for name, data in series_files for work in data.get(f'{name}_series', [])]
+    return [index for index, work in enumerate(works)
+            if isinstance(work.get('tags'), list) and tag in work['tags']]
+
+
+@pytest.fixture(scope='module')
+def series_files():
+    return load_series_files(DATA_DIR)
+
+
+def test_all_series_files_are_bundled(series_files):
+    names = {path.stem for path in DATA_DIR.glob('*.json')} - {'config', Path(BUNDLE_FILENAME).stem}
+    assert {name for name, _ in series_files} == names
+
+
+def test_real_data_round_trips_to_source_files(series_files):
+    _, restored = round_trip(series_files)
+    assert [name for name, _ in restored] == [name for name, _ in series_files]
+    for name, content in restored:
+        with open(DATA_DIR / f'{name}.json', 'r', encoding='utf-8') as f:
+            source = json.load(f)
+        assert content == source, f'{name}.json does not round-trip'
+
+
+def test_real_data_posting_lists_match_linear_scan(series_files):
+    bundle, _ = round_trip(series_files)
+    reader = GalleryBundle(bundle)
+    assert bundle['tags']
+    for number, tag in enumerate(bundle['tags']):
+        expected = linear_scan(series_files, tag)
+        assert bundle['postings'][number] == expected, tag
+        assert reader.works_with_tag(tag) == [reader.work(index) for index in expected]
+
+
+def test_edge_cases_round_trip():
+    series_files = [
+        ('first', {
+            'mainSeries': 'Main',
+            'first_series': [
+                {'id': 'a', 'path': '/gallery/image-page/a.html', 'image_path': '/img/x/a.png',
+                 'date': '2024-02-29', 'series': 's1', 'tags': ['t1', 't2', 't1']},
+                {'id': 'b', 'path': '/custom/b.html', 'image_path': 'b.png',
+                 'date': '2024年頃', 'tags': [], 'title': 'タイトル', 'width': 10},
+                {'id': 'c', 'date': None, 'series': 3, 'tags': 'not-a-list', 'path': None},
+                {'id': 'd', 'image_path': None, 'date': '2024-13-40', 'extra': {'nested': [1, 2]}},
+            ],
+            'note': 'series-level field',
+        }),
+        ('empty', {'empty_series': []}),
+        ('missing', {'mainSeries': 'Other'}),
+    ]
+    bundle, restored = round_trip(series_files)
+    assert restored == series_files
+
+    reader = GalleryBundle(bundle)
+    for tag in bundle['tags']:
+        assert bundle['postings'][reader.tag_index[tag]] == linear_scan(series_files, tag)
+    assert [work['id'] for work in reader.works_with_tag('t1')] == ['a']
+    assert reader.works_with_tag('unknown') == []
+    assert reader.get('b')['date'] == '2024年頃'
+    assert reader.main_series(0) == 'Main'
+
+
+def test_unsupported_version_is_rejected(series_files):
+    bundle, _ = round_trip(series_files[:1])
+    bundle['version'] = 999
+    with pytest.raises(ValueError):
+        GalleryBundle(bundle)
+
+
+def test_committed_bundle_is_up_to_date():
+    # 失敗したら scripts/build_gallery_bundle.py を実行して bundle.json をコミットする
+    assert bundle_is_current(DATA_DIR)
+
+
+def test_edited_series_file_makes_bundle_stale(tmp_path):
+    data_dir = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, data_dir)
+    name, data = load_series_files(data_dir)[0]
+    path = data_dir / f'{name}.json'
+
+    # 書式だけの違い（インデントなし）は古いとみなさない
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    assert bundle_is_current(data_dir)
+
+    data[f'{name}_series'][0]['tags'].append('new-tag')
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    assert not bundle_is_current(data_dir)
+    (data_dir / BUNDLE_FILENAME).unlink()
+    assert not bundle_is_current(data_dir)
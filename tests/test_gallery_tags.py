@@ -0,0 +1,39 @@
+"""
+build_gallery_tags.py のテスト
+
+タグページへのリンクと、tag-system.js が並び替え・絞り込みに使うカードの属性を確認します。
+"""
+
+import html
+import json
+import re
+
+from build_gallery_tags import generate_tag_page, generate_tags_html, generate_work_card
+
+
+def test_tag_links_are_url_encoded():
+    links = generate_tags_html(['a b', '#x', 'q?&', '日本'], [])
+    assert re.findall(r'href="([^"]*)"', links) == [
+        '/gallery/tag-page/a%20b.html',
+        '/gallery/tag-page/%23x.html',
+        '/gallery/tag-page/q%3F%26.html',
+        '/gallery/tag-page/%E6%97%A5%E6%9C%AC.html',
+    ]
+    assert '#q?&amp;</a>' in links
+
+
+def test_work_card_carries_sort_and_filter_data():
+    work = {'id': 'w1', 'date': '2024-01-02', 'series': 'oc1', 'tags': ['nsfw', 'a "b"'], 'image_path': '/a.png'}
+    card = generate_work_card(work, ['nsfw'])
+    attrs = dict(re.findall(r'data-(\w+)="([^"]*)"', card))
+    assert attrs['date'] == '2024-01-02'
+    assert attrs['series'] == 'oc1'
+    assert json.loads(html.unescape(attrs['tags'])) == ['nsfw', 'a "b"']
+    assert 'piccard nsfw' in card
+
+
+def test_tag_page_config_cannot_close_script():
+    page = generate_tag_page('</script>', [], ['nsfw'], [])
+    assert 'targetTag: "<\\/script>",' in page
+    assert 'data-prerendered' in page
+    assert 'gallery-bundle.js' not in page
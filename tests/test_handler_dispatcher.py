@@ -0,0 +1,292 @@
+"""
+handler_dispatcher.py のテスト
+
+ハンドラーには偽の bot_client を渡し、返信の記録で処理の順番と結果を確認します。
+"""
+
+import asyncio
+
+import pytest
+
+from base_handler import BaseHandler
+from handler_dispatcher import (
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEW,
+    OVERFLOW_DROP_OLDEST,
+    HandlerDispatcher,
+    HandlerLimits,
+)
+
+
+class FakeBotClient:
+    def __init__(self):
+        self.replies = []
+
+    async def reply(self, note, text, **params):
+        self.replies.append(text)
+        return {'id': f'reply-{len(self.replies)}'}
+
+
+class EchoHandler(BaseHandler):
+    """コマンドの text をそのまま返信する
+
+    gate を設定すると、gate がセットされるまで返信しません。
+    コマンドの delay（省略時は delay 引数）の秒数だけ待ってから返信します。
+    """
+
+    def __init__(self, bot_client, gate=None, delay=0.0):
+        super().__init__({}, None, None, bot_client)
+        self.gate = gate
+        self.delay = delay
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+
+    async def handle(self, note, command):
+        self.started.append(command['text'])
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            if self.gate is not None:
+                await self.gate.wait()
+            delay = command.get('delay', self.delay)
+            if delay:
+                await asyncio.sleep(delay)
+            if command.get('fail'):
+                raise RuntimeError('failed')
+            return await self.reply(note, command['text'])
+        finally:
+            self.running -= 1
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def command(text, **extra):
+    return {'type': 'echo', 'text': text, **extra}
+
+
+async def wait_until(predicate):
+    while not predicate():
+        await asyncio.sleep(0)
+
+
+async def fill_queue(overflow):
+    """1件を実行中、1件を待ち行列に入れた状態で、3件目を dispatch する"""
+    bot_client = FakeBotClient()
+    gate = asyncio.Event()
+    handler = EchoHandler(bot_client, gate)
+    dispatcher = HandlerDispatcher()
+    dispatcher.register('echo', handler, HandlerLimits(concurrency=1, queue_size=1, overflow=overflow))
+    await dispatcher.start()
+    await dispatcher.dispatch({'id': 'n1'}, command('1'))
+    await wait_until(lambda: handler.started)
+    await dispatcher.dispatch({'id': 'n2'}, command('2'))
+    third = asyncio.create_task(dispatcher.dispatch({'id': 'n3'}, command('3')))
+    await asyncio.sleep(0.05)
+    return dispatcher, bot_client, gate, third
+
+
+def test_drop_new_rejects_command_when_queue_is_full():
+    async def main():
+        dispatcher, bot_client, gate, third = await fill_queue(OVERFLOW_DROP_NEW)
+        accepted = await third
+        gate.set()
+        await dispatcher.stop()
+        return dispatcher, bot_client, accepted
+
+    dispatcher, bot_client, accepted = run(main())
+    assert accepted is False
+    assert bot_client.replies == ['1', '2']
+    stats = dispatcher.stats()['EchoHandler']
+    assert (stats['dispatched'], stats['dropped'], stats['completed']) == (2, 1, 2)
+
+
+def test_drop_oldest_replaces_waiting_command():
+    async def main():
+        dispatcher, bot_client, gate, third = await fill_queue(OVERFLOW_DROP_OLDEST)
+        accepted = await third
+        gate.set()
+        await dispatcher.stop()
+        return dispatcher, bot_client, accepted
+
+    dispatcher, bot_client, accepted = run(main())
+    assert accepted is True
+    assert bot_client.replies == ['1', '3']
+    assert dispatcher.stats()['EchoHandler']['dropped'] == 1
+
+
+def test_block_waits_for_free_space():
+    async def main():
+        dispatcher, bot_client, gate, third = await fill_queue(OVERFLOW_BLOCK)
+        blocked = not third.done()
+        gate.set()
+        accepted = await third
+        await dispatcher.stop()
+        return bot_client, blocked, accepted
+
+    bot_client, blocked, accepted = run(main())
+    assert blocked
+    assert accepted is True
+    assert bot_client.replies == ['1', '2', '3']
+
+
+def test_slow_command_times_out_and_worker_continues():
+    async def main():
+        bot_client = FakeBotClient()
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', EchoHandler(bot_client), HandlerLimits(timeout=0.05))
+        await dispatcher.start()
+        await dispatcher.dispatch({'id': 'n1'}, command('slow', delay=1.0))
+        await dispatcher.dispatch({'id': 'n2'}, command('fast'))
+        await dispatcher.stop()
+        return dispatcher, bot_client
+
+    dispatcher, bot_client = run(main())
+    assert bot_client.replies == ['fast']
+    stats = dispatcher.stats()['EchoHandler']
+    assert (stats['timed_out'], stats['completed']) == (1, 1)
+
+
+def test_failing_command_is_counted_and_worker_continues():
+    async def main():
+        bot_client = FakeBotClient()
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', EchoHandler(bot_client))
+        await dispatcher.start()
+        await dispatcher.dispatch({'id': 'n1'}, command('broken', fail=True))
+        await dispatcher.dispatch({'id': 'n2'}, command('ok'))
+        await dispatcher.stop()
+        return dispatcher, bot_client
+
+    dispatcher, bot_client = run(main())
+    assert bot_client.replies == ['ok']
+    stats = dispatcher.stats()['EchoHandler']
+    assert (stats['failed'], stats['completed']) == (1, 1)
+
+
+def test_slow_handler_does_not_block_other_handlers():
+    async def main():
+        bot_client = FakeBotClient()
+        gate = asyncio.Event()
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('slow', EchoHandler(bot_client, gate), name='slow')
+        dispatcher.register('echo', EchoHandler(bot_client), name='fast')
+        await dispatcher.start()
+        await dispatcher.dispatch({'id': 'n1'}, {'type': 'slow', 'text': 'slow'})
+        await dispatcher.dispatch({'id': 'n2'}, command('fast'))
+        await wait_until(lambda: bot_client.replies)
+        replies = list(bot_client.replies)
+        gate.set()
+        await dispatcher.stop()
+        return replies, bot_client
+
+    replies, bot_client = run(main())
+    assert replies == ['fast']
+    assert bot_client.replies == ['fast', 'slow']
+
+
+def test_max_in_flight_limits_all_handlers():
+    async def main():
+        bot_client = FakeBotClient()
+        handler = EchoHandler(bot_client, delay=0.02)
+        dispatcher = HandlerDispatcher(max_in_flight=2)
+        dispatcher.register('echo', handler, HandlerLimits(concurrency=5))
+        await dispatcher.start()
+        for i in range(6):
+            await dispatcher.dispatch({'id': f'n{i}'}, command(str(i)))
+        await dispatcher.stop()
+        return handler, bot_client
+
+    handler, bot_client = run(main())
+    assert handler.max_running == 2
+    assert sorted(bot_client.replies) == [str(i) for i in range(6)]
+
+
+def test_stop_drains_queued_commands():
+    async def main():
+        bot_client = FakeBotClient()
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', EchoHandler(bot_client, delay=0.01))
+        await dispatcher.start()
+        for i in range(5):
+            await dispatcher.dispatch({'id': f'n{i}'}, command(str(i)))
+        await dispatcher.stop(drain=True)
+        return dispatcher, bot_client
+
+    dispatcher, bot_client = run(main())
+    assert bot_client.replies == [str(i) for i in range(5)]
+    assert dispatcher.stats()['EchoHandler']['queued'] == 0
+
+
+def test_stop_without_drain_cancels_pending_commands():
+    async def main():
+        bot_client = FakeBotClient()
+        handler = EchoHandler(bot_client, asyncio.Event())
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', handler)
+        await dispatcher.start()
+        for i in range(3):
+            await dispatcher.dispatch({'id': f'n{i}'}, command(str(i)))
+        await wait_until(lambda: handler.started)
+        await dispatcher.stop(drain=False)
+        return dispatcher, handler, bot_client
+
+    dispatcher, handler, bot_client = run(main())
+    assert bot_client.replies == []
+    assert handler.started == ['0']
+    assert handler.running == 0
+    assert dispatcher.stats()['EchoHandler']['queued'] == 2
+
+
+def test_stop_drain_timeout_gives_up_waiting():
+    async def main():
+        bot_client = FakeBotClient()
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', EchoHandler(bot_client, asyncio.Event()))
+        await dispatcher.start()
+        await dispatcher.dispatch({'id': 'n1'}, command('stuck'))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await dispatcher.stop(drain=True, timeout=0.1)
+        return loop.time() - started, dispatcher
+
+    elapsed, dispatcher = run(main())
+    assert 0.1 <= elapsed < 2
+    with pytest.raises(RuntimeError):
+        run(dispatcher.dispatch({'id': 'n2'}, command('late')))
+
+
+def test_stats_names_are_unique():
+    bot_client = FakeBotClient()
+    dispatcher = HandlerDispatcher()
+    first = EchoHandler(bot_client)
+    dispatcher.register('a', first)
+    dispatcher.register('b', EchoHandler(bot_client))
+    dispatcher.register('c', EchoHandler(bot_client), name='weather')
+    dispatcher.register('d', first)
+
+    assert set(dispatcher.stats()) == {'EchoHandler', 'EchoHandler#2', 'weather'}
+    with pytest.raises(ValueError):
+        dispatcher.register('e', EchoHandler(bot_client), name='weather')
+    with pytest.raises(ValueError):
+        dispatcher.register('f', first, name='renamed')
+    with pytest.raises(ValueError):
+        dispatcher.register('a', EchoHandler(bot_client))
+    # 失敗した登録はハンドラーを残さない
+    assert len(dispatcher.stats()) == 3
+
+
+def test_unknown_command_type_is_not_routed():
+    async def main():
+        dispatcher = HandlerDispatcher()
+        dispatcher.register('echo', EchoHandler(FakeBotClient()))
+        await dispatcher.start()
+        routed = await dispatcher.dispatch({'id': 'n1'}, {'type': 'other', 'text': 'x'})
+        await dispatcher.stop()
+        return dispatcher, routed
+
+    dispatcher, routed = run(main())
+    assert routed is False
+    assert dispatcher.unrouted == 1
@@ -0,0 +1,45 @@
+"""
+image_utils.py の add_image_attributes のテスト
+
+画像の寸法のキャッシュと build_images.py のマニフェストは一時ディレクトリ・テスト用の値に差し替えます。
+"""
+
+import struct
+
+import pytest
+
+import asset_utils
+import image_utils
+from image_utils import ImageSizeCache, add_image_attributes
+
+VARIANTS = [[320, '/img/variants/a.1234abcd.320w.webp'], [800, '/img/variants/a.1234abcd.800w.webp']]
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    png = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 800, 600)
+    (tmp_path / 'img').mkdir()
+    (tmp_path / 'img' / 'a.png').write_bytes(png)
+    (tmp_path / 'img' / 'b.png').write_bytes(png)
+    monkeypatch.setattr(image_utils, '_cache', ImageSizeCache(tmp_path / 'sizes.json'))
+    monkeypatch.setattr(asset_utils, '_image_manifest', {
+        '/img/a.png': {'width': 800, 'height': 600, 'variants': {'webp': VARIANTS}},
+    })
+    return tmp_path
+
+
+def test_srcset_is_added_for_images_with_variants(site):
+    html = add_image_attributes('<img src="/img/a.png" alt=""><img src="../img/b.png">', site / 'txt' / 'page.html', site)
+    first, second = html.split('><')
+    assert 'width="800" height="600"' in first
+    assert ('srcset="/img/variants/a.1234abcd.320w.webp 320w, /img/variants/a.1234abcd.800w.webp 800w" '
+            f'sizes="{image_utils.SRCSET_SIZES}"') in first
+    assert 'srcset' not in second
+    assert 'loading="lazy"' in second
+
+
+def test_existing_srcset_is_kept(site):
+    html = '<img src="/img/a.png" srcset="/x.webp 1x">'
+    result = add_image_attributes(html, site / 'page.html', site)
+    assert result.count('srcset') == 1
+    assert 'sizes=' not in result
@@ -0,0 +1,37 @@
+"""
+build_minify.py の minify_html のテスト
+
+表示に影響する空白（インライン要素・置換要素の隣）は1つに詰めて残し、
+ブロック要素の間の空白だけを削除することを確認します。
+"""
+
+import pytest
+
+from build_minify import minify_html
+
+
+def test_whitespace_between_block_elements_is_removed():
+    html = '<div>\n  <p>a</p>\n  <p>b</p>\n</div>'
+    assert minify_html(html) == '<div><p>a</p><p>b</p></div>\n'
+
+
+@pytest.mark.parametrize('tag, element', [
+    ('iframe', '<iframe src="/embed"></iframe>'),
+    ('video', '<video src="/a.mp4"></video>'),
+    ('audio', '<audio src="/a.mp3"></audio>'),
+    ('select', '<select><option>1</option></select>'),
+    ('picture', '<picture><img src="/a.png" alt=""></picture>'),
+])
+def test_whitespace_next_to_inline_elements_is_collapsed(tag, element):
+    html = f'<span>before</span>\n    {element}\n    <span>after</span>'
+    assert minify_html(html) == f'<span>before</span> {element} <span>after</span>\n'
+
+
+def test_whitespace_between_options_is_collapsed():
+    html = '<select>\n  <option>1</option>\n  <option>2</option>\n</select>'
+    assert minify_html(html) == '<select> <option>1</option> <option>2</option> </select>\n'
+
+
+def test_preserved_elements_are_unchanged():
+    html = '<pre>  a\n   b</pre>\n<p>x   y</p>'
+    assert minify_html(html) == '<pre>  a\n   b</pre><p>x y</p>\n'
@@ -0,0 +1,317 @@
+"""
+reply_sender.py のテスト
+
+ローカルに立てたスタブの Misskey サーバー（notes/create のみ）に対して送信します。
+"""
+
+import asyncio
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+from base_handler import BaseHandler
+from reply_sender import ReplyError, ReplySender
+
+
+class StubMisskey:
+    """notes/create だけを実装したスタブの Misskey サーバー
+
+    responses に本文 → [(ステータス, ヘッダー), ...] を入れておくと、その本文の投稿に
+    順番にそのレスポンスを返します（使い切ったら 200）。
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []          # (受信時刻, リクエストの本文)
+        self.responses = {}
+        self._runner = None
+        self.url = None
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post('/api/notes/create', self._create)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+    async def _create(self, request):
+        body = await request.json()
+        self.calls.append((time.monotonic(), body))
+        queued = self.responses.get(body['text'])
+        if queued:
+            status, headers = queued.pop(0)
+            return web.json_response({'error': {'code': 'STUB'}}, status=status, headers=headers)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        note = {'id': str(len(self.calls)), 'text': body['text'], 'replyId': body.get('replyId')}
+        return web.json_response({'createdNote': note})
+
+    def texts(self):
+        return [body['text'] for _, body in self.calls]
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def make_sender(stub, **kwargs):
+    options = {'rate': 100, 'burst': 10, 'backoff_base': 0.01, 'backoff_max': 0.05}
+    options.update(kwargs)
+    return ReplySender(stub.url, 'token', **options)
+
+
+def test_reply_targets_note_and_sends_token():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub)
+            await sender.start()
+            note = {'id': 'abc', 'visibility': 'specified', 'userId': 'u1'}
+            created = await sender.reply(note, 'hello')
+            await sender.close()
+        return stub, created
+
+    stub, created = run(main())
+    body = stub.calls[0][1]
+    assert created['replyId'] == 'abc'
+    assert body['i'] == 'token'
+    assert body['visibility'] == 'specified'
+    assert body['visibleUserIds'] == ['u1']
+
+
+def test_rate_limit_spaces_requests():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub, rate=10, burst=2)
+            await sender.start()
+            start = time.monotonic()
+            await asyncio.gather(*(sender.post(f'post {i}') for i in range(6)))
+            elapsed = time.monotonic() - start
+            await sender.close()
+        return stub, elapsed
+
+    stub, elapsed = run(main())
+    # 2件はすぐ、残りの4件は 10件/秒 で補充されるトークンを待つ
+    assert len(stub.calls) == 6
+    assert elapsed >= 0.35
+    times = [t for t, _ in stub.calls]
+    assert times[-1] - times[1] >= 0.35
+
+
+def test_direct_replies_go_before_normal_posts():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub, rate=20, burst=1, max_concurrency=1)
+            await sender.start()
+            normal = [asyncio.create_task(sender.post(f'normal {i}')) for i in range(4)]
+            await asyncio.sleep(0)
+            direct = asyncio.create_task(sender.reply({'id': 'n1'}, 'direct'))
+            await asyncio.gather(direct, *normal)
+            await sender.close()
+        return stub
+
+    stub = run(main())
+    # 最初の1件はトークンが余っていたので先に出るが、次は直接のリプライ
+    assert stub.texts().index('direct') <= 1
+
+
+def test_429_waits_for_retry_after_and_pauses_other_requests():
+    async def main():
+        async with StubMisskey() as stub:
+            stub.responses['limited'] = [(429, {'Retry-After': '0.3'})]
+            sender = make_sender(stub)
+            await sender.start()
+            limited = asyncio.create_task(sender.post('limited'))
+            await asyncio.sleep(0.05)
+            other = asyncio.create_task(sender.post('other'))
+            results = await asyncio.gather(limited, other)
+            await sender.close()
+        return stub, sender, results
+
+    stub, sender, results = run(main())
+    calls = {}
+    for t, body in stub.calls:
+        calls.setdefault(body['text'], []).append(t)
+    assert len(calls['limited']) == 2
+    assert calls['limited'][1] - calls['limited'][0] >= 0.3
+    # 429 の間は他のリクエストも送らない
+    assert calls['other'][0] - calls['limited'][0] >= 0.3
+    assert results[0]['text'] == 'limited'
+    assert sender.stats['retried'] == 1
+
+
+def test_5xx_is_retried_and_4xx_is_not():
+    async def main():
+        async with StubMisskey() as stub:
+            stub.responses['flaky'] = [(503, {}), (500, {})]
+            stub.responses['bad'] = [(400, {})]
+            stub.responses['down'] = [(502, {})] * 10
+            sender = make_sender(stub, max_retries=3)
+            await sender.start()
+            flaky = await sender.post('flaky')
+            with pytest.raises(ReplyError) as bad:
+                await sender.post('bad')
+            with pytest.raises(ReplyError) as down:
+                await sender.post('down')
+            await sender.close()
+        return stub, flaky, bad.value, down.value
+
+    stub, flaky, bad, down = run(main())
+    texts = stub.texts()
+    assert flaky['text'] == 'flaky' and texts.count('flaky') == 3
+    assert bad.status == 400 and texts.count('bad') == 1
+    assert down.status == 502 and texts.count('down') == 4
+
+
+def test_timeout_is_not_retried_to_avoid_duplicate_posts():
+    async def main():
+        async with StubMisskey(delay=0.5) as stub:
+            sender = make_sender(stub, timeout=0.1)
+            await sender.start()
+            with pytest.raises(ReplyError) as error:
+                await sender.post('slow')
+            await sender.close()
+        return stub, sender, error.value
+
+    stub, sender, error = run(main())
+    assert error.status is None
+    assert stub.texts() == ['slow']
+    assert sender.stats['retried'] == 0
+
+
+def test_connection_failure_is_retried():
+    async def main():
+        async with StubMisskey() as stub:
+            url = stub.url
+        # サーバーを止めた後のポートには接続できない
+        sender = ReplySender(url, 'token', rate=100, burst=10, backoff_base=0.01, backoff_max=0.05, max_retries=2)
+        await sender.start()
+        with pytest.raises(ReplyError):
+            await sender.post('unreachable')
+        await sender.close()
+        return sender
+
+    sender = run(main())
+    assert sender.stats['retried'] == 2
+
+
+def test_identical_pending_replies_are_coalesced():
+    async def main():
+        async with StubMisskey(delay=0.05) as stub:
+            sender = make_sender(stub)
+            await sender.start()
+            note = {'id': 'n1'}
+            results = await asyncio.gather(*(sender.reply(note, 'same') for _ in range(5)))
+            await sender.close()
+        return stub, sender, results
+
+    stub, sender, results = run(main())
+    assert len(stub.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert sender.stats['coalesced'] == 4
+
+
+def test_close_drains_queued_replies():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub, rate=20, burst=1)
+            await sender.start()
+            tasks = [asyncio.create_task(sender.post(f'post {i}')) for i in range(5)]
+            await asyncio.sleep(0)
+            await sender.close()
+            results = await asyncio.gather(*tasks)
+        return stub, sender, results
+
+    stub, sender, results = run(main())
+    assert sorted(stub.texts()) == [f'post {i}' for i in range(5)]
+    assert [result['text'] for result in results] == [f'post {i}' for i in range(5)]
+    assert sender.queued() == 0
+
+
+def test_flush_waits_for_retries():
+    async def main():
+        async with StubMisskey() as stub:
+            stub.responses['flaky'] = [(503, {})]
+            sender = make_sender(stub)
+            await sender.start()
+            task = asyncio.create_task(sender.post('flaky'))
+            await asyncio.sleep(0)
+            await sender.flush()
+            texts = stub.texts()
+            result = await task
+            await sender.close()
+        return texts, result
+
+    texts, result = run(main())
+    assert texts == ['flaky', 'flaky']
+    assert result['text'] == 'flaky'
+
+
+def test_unexpected_error_fails_request_without_hanging():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub)
+            await sender.start()
+
+            async def broken(request):
+                raise ValueError('broken')
+
+            sender._post = broken
+            with pytest.raises(ValueError):
+                await sender.post('text')
+            await sender.flush()
+            queued = sender.queued()
+            await sender.close()
+        return sender, queued
+
+    sender, queued = run(main())
+    assert queued == 0
+    assert sender.stats['failed'] == 1
+
+
+class EchoHandler(BaseHandler):
+    async def handle(self, note, command):
+        return await self.reply(note, command['text'])
+
+
+class FakeBotClient:
+    def __init__(self):
+        self.replies = []
+
+    async def reply(self, note, text, **params):
+        self.replies.append((note['id'], text))
+        return {'id': 'created'}
+
+
+def test_handler_reply_uses_shared_sender():
+    async def main():
+        async with StubMisskey() as stub:
+            sender = make_sender(stub)
+            await sender.start()
+            bot_client = FakeBotClient()
+            handler = EchoHandler({}, None, None, bot_client, reply_sender=sender)
+            created = await handler.handle({'id': 'n1'}, {'text': 'hi'})
+            await sender.close()
+        return stub, bot_client, created
+
+    stub, bot_client, created = run(main())
+    assert created['replyId'] == 'n1'
+    assert stub.texts() == ['hi']
+    assert bot_client.replies == []
+
+
+def test_handler_reply_falls_back_to_bot_client():
+    bot_client = FakeBotClient()
+    handler = EchoHandler({}, None, None, bot_client)
+    created = run(handler.handle({'id': 'n1'}, {'text': 'hi'}))
+    assert created == {'id': 'created'}
+    assert bot_client.replies == [('n1', 'hi')]
@@ -0,0 +1,293 @@
+// =============================================================================
+// TimelineLoader モジュール
+// =============================================================================
+// scripts/build_timeline.py が生成したシェルページ用のローダー
+//
+// 主な機能:
+// - index.json（列指向インデックス）の読み込み
+// - 検索文字列（search.json）は検索が行われたときにだけ読み込む
+// - 現在のフィルター状態に一致する項目を持つ年だけを、スクロールに合わせて順に読み込む
+// - 読み込み後に TimelineFilter のカテゴリタグ・フィルタリングを再適用
+// - 「今日はなんの日？」をインデックスから表示
+//
+// #timeline_layout に data-timeline-index がない通常のページでは何もしない
+// =============================================================================
+
+(function (global) {
+  'use strict';
+
+  const layout = document.getElementById('timeline_layout');
+  if (!layout || !layout.dataset.timelineIndex) {
+    return;
+  }
+
+  const CONSTANTS = {
+    BATCH_YEARS: 3,            // 一度に読み込む年の数
+    ROOT_MARGIN: '600px 0px',  // センチネルの先読み距離
+    MIXED: 'mixed'
+  };
+
+  const indexUrl = layout.dataset.timelineIndex;
+  const baseUrl = layout.dataset.timelineBase || '';
+
+  let index = null;
+  let searchStrings = null;
+  let searchRequest = null;
+  let categoryBits = new Map();
+  const loaded = new Set();
+  let busy = false;
+  let sentinelVisible = false;
+
+  // =============================================================================
+  // インデックスによる絞り込み
+  // =============================================================================
+
+  /**
+   * 検索文字列を build_timeline.py と同じ規則で正規化
+   * @param {string} text
+   * @returns {string}
+   */
+  function normalize(text) {
+    return (text || '').normalize('NFKC').toLowerCase().replace(/\s+/g, ' ').trim();
+  }
+
+  /**
+   * 検索が入力されている場合、検索用インデックスを読み込む
+   * @returns {Promise<void>}
+   */
+  function ensureSearchStrings() {
+    const filter = global.timelineFilter;
+    const searchText = filter ? normalize(filter.state.searchText) : '';
+    if (!searchText || searchStrings) {
+      return Promise.resolve();
+    }
+    if (!searchRequest) {
+      searchRequest = fetch(baseUrl + index.search)
+        .then(response => {
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          return response.json();
+        })
+        .then(data => {
+          searchStrings = data;
+        })
+        .catch(error => {
+          searchRequest = null;
+          console.warn('[TimelineLoader] 検索インデックスの読み込みに失敗:', error.message);
+        });
+    }
+    return searchRequest;
+  }
+
+  /**
+   * 現在のフィルター状態に一致する項目を持つ年のIDを、文書順で返す
+   * 検索用インデックスが未読み込みの場合、検索条件は判定に使わない
+   * @returns {Array<string>}
+   */
+  function matchingYears() {
+    const filter = global.timelineFilter;
+    const state = filter ? filter.state : null;
+    const entries = index.entries;
+    const matched = new Set();
+
+    let classBit = 0;
+    let checkboxMask = -1;
+    let search = '';
+
+    if (state) {
+      if (state.selectedClass && state.selectedClass !== CONSTANTS.MIXED) {
+        classBit = categoryBits.get(state.selectedClass) || 0;
+      }
+      if (state.selectedCheckboxes && state.selectedCheckboxes.size > 0) {
+        checkboxMask = 0;
+        state.selectedCheckboxes.forEach(name => {
+          checkboxMask |= categoryBits.get(name) || 0;
+        });
+      } else if (state.selectedCheckboxes) {
+        checkboxMask = 0;
+      }
+      search = normalize(state.searchText);
+    }
+
+    for (let i = 0; i < entries.id.length; i++) {
+      const mask = entries.mask[i];
+      if (classBit && !(mask & classBit)) continue;
+      if (!(mask & checkboxMask)) continue;
+      if (search && searchStrings && searchStrings[i].indexOf(search) === -1) continue;
+      matched.add(entries.year[i]);
+    }
+
+    return index.years.filter((year, i) => matched.has(i)).map(year => year.id);
+  }
+
+  // =============================================================================
+  // フラグメントの読み込み
+  // =============================================================================
+
+  /**
+   * 年のフラグメントを読み込んで <ul> に挿入
+   * @param {string} yearId
+   * @returns {Promise<void>}
+   */
+  function loadYear(yearId) {
+    if (loaded.has(yearId)) {
+      return Promise.resolve();
+    }
+    loaded.add(yearId);
+
+    const year = index.years.find(y => y.id === yearId);
+    const list = layout.querySelector(`ul[data-timeline-fragment="${yearId}"]`);
+    if (!year || !list) {
+      return Promise.resolve();
+    }
+
+    return fetch(baseUrl + year.fragment)
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.text();
+      })
+      .then(html => {
+        list.innerHTML = html;
+      })
+      .catch(error => {
+        loaded.delete(yearId);
+        console.warn(`[TimelineLoader] ${yearId} の読み込みに失敗:`, error.message);
+      });
+  }
+
+  /**
+   * 読み込んだ項目に TimelineFilter の処理を再適用
+   */
+  function refresh() {
+    const filter = global.timelineFilter;
+    if (!filter) return;
+    filter.initializeCategoryTags();
+    filter.performSearch();
+  }
+
+  /**
+   * 指定した年（省略時は次のバッチ）までの未読み込みの年を読み込む
+   * @param {string} [untilYear]
+   * @returns {Promise<void>}
+   */
+  function loadMore(untilYear) {
+    if (busy || !index) {
+      return Promise.resolve();
+    }
+
+    busy = true;
+    return ensureSearchStrings().then(() => {
+      const pending = matchingYears().filter(id => !loaded.has(id));
+      let targets = pending.slice(0, CONSTANTS.BATCH_YEARS);
+      if (untilYear && pending.includes(untilYear)) {
+        targets = pending.slice(0, pending.indexOf(untilYear) + 1);
+      }
+      return Promise.all(targets.map(loadYear)).then(() => targets.length);
+    }).then(count => {
+      busy = false;
+      // performSearch が timelineFilteringComplete を発火し、必要なら次のバッチに進む
+      if (count > 0) refresh();
+    });
+  }
+
+  // =============================================================================
+  // 今日はなんの日？
+  // =============================================================================
+
+  /**
+   * 今日の日付に一致する項目の年を読み込み、#today_event に表示
+   */
+  function renderTodayEvents() {
+    const target = document.getElementById('today_event');
+    if (!target) return;
+
+    const today = new Date();
+    const mmdd = ('00' + (today.getMonth() + 1)).slice(-2) + '-' + ('00' + today.getDate()).slice(-2);
+    const todayStr = mmdd.replace('-', '月') + '日';
+    const entries = index.entries;
+    const hits = [];
+
+    for (let i = 0; i < entries.id.length; i++) {
+      if (entries.date[i] === mmdd) hits.push(i);
+    }
+    if (hits.length === 0) return;
+
+    const years = [...new Set(hits.map(i => index.years[entries.year[i]].id))];
+    Promise.all(years.map(loadYear)).then(() => {
+      const items = hits.map(i => {
+        const li = layout.querySelector(`li[data-entry="${entries.id[i]}"]`);
+        if (!li) return '';
+        const clone = li.cloneNode(true);
+        clone.querySelectorAll('.category-tags-subtle').forEach(el => el.remove());
+        const label = index.years[entries.year[i]].label;
+        return '<li>' + label + clone.innerHTML.replace(todayStr, '<strong>' + todayStr + '</strong>') + '</li>';
+      }).filter(Boolean);
+      if (items.length > 0) {
+        target.innerHTML = '<ul>' + items.join('') + '</ul>';
+      }
+      refresh();
+    });
+  }
+
+  // =============================================================================
+  // 初期化
+  // =============================================================================
+
+  function init() {
+    const sentinel = document.createElement('div');
+    sentinel.className = 'timeline-lazy-sentinel';
+    layout.after(sentinel);
+
+    const observer = new IntersectionObserver(changes => {
+      sentinelVisible = changes.some(change => change.isIntersecting);
+      if (sentinelVisible) loadMore();
+    }, { rootMargin: CONSTANTS.ROOT_MARGIN });
+    observer.observe(sentinel);
+
+    // フィルター変更後、画面が埋まっていなければ続きを読み込む
+    document.addEventListener('timelineFilteringComplete', () => {
+      if (sentinelVisible) loadMore();
+    });
+
+    // 年へのジャンプ（#2010 など）はその年までを読み込んでからスクロール
+    const jumpToHash = () => {
+      const yearId = decodeURIComponent(global.location.hash.slice(1));
+      if (!index.years.some(year => year.id === yearId)) return;
+      loadMore(yearId).then(() => {
+        const el = document.getElementById(yearId);
+        if (el) el.scrollIntoView();
+      });
+    };
+    global.addEventListener('hashchange', jumpToHash);
+
+    renderTodayEvents();
+    if (global.location.hash) {
+      jumpToHash();
+    } else {
+      loadMore();
+    }
+  }
+
+  fetch(indexUrl)
+    .then(response => {
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      return response.json();
+    })
+    .then(data => {
+      index = data;
+      categoryBits = new Map(index.categories.map((name, i) => [name, 1 << i]));
+      if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+      } else {
+        init();
+      }
+    })
+    .catch(error => {
+      console.warn('[TimelineLoader] インデックスの読み込みに失敗:', error.message);
+    });
+
+  global.timelineLoader = {
+    loadMore: loadMore,
+    matchingYears: () => (index ? matchingYears() : [])
+  };
+
+})(window);